@@ -10,9 +10,18 @@ Functions:
 """
 
 import argparse
+import os
+import sys
 import numpy as np
 import pandas as pd
 
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
 
 def apply_1_plus_log_transformation(data, columns_to_transform):
     """
@@ -77,7 +86,9 @@ def main():
         description="Apply log(1 + x) transformation"
         "to specified columns in a DataFrame."
     )
-    parser.add_argument("file", type=str, help="Path to the input CSV file.")
+    parser.add_argument("file", type=str,
+                        help="Path to the input CSV file, a directory "
+                        "of partitions or a glob pattern.")
     parser.add_argument(
         "columns", nargs='+', type=str,
         help="Columns to apply the log(1 + x) transformation to."
@@ -91,7 +102,7 @@ def main():
 
     try:
         # Read the data from the CSV file
-        data = pd.read_csv(args.file)
+        data = load_data(args.file)
 
         # Apply the log(1 + x) transformation
         transformed_data = apply_1_plus_log_transformation(data, args.columns)
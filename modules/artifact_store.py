@@ -0,0 +1,432 @@
+"""
+This module provides a versioned, content-addressed store for tuned
+models and preprocessing state.
+
+Each saved object becomes a new version of a named artifact. The object
+is pickled with its large NumPy arrays taken out and written once as
+.npy files named after their content hash, so identical arrays are
+stored once and loading maps them read-only into memory: processes on
+the same host that load the same artifact share one copy through the
+page cache instead of each unpickling their own. Every version records
+a manifest with the content hash of the object, the arrays it refers
+to and free-form metadata; saving an object identical to the latest
+version returns that version instead of writing a new one. The pickle
+itself, which holds the structure of the object and its small arrays,
+is compressed with zlib. The array files are not: a compressed file
+cannot be memory-mapped, so compressing them would give up the shared,
+zero-copy loading they exist for.
+
+Layout of a store directory::
+
+    objects/<sha256>.npy                  array payloads
+    artifacts/<name>/v<N>/object.pkl      pickle referring to payloads
+    artifacts/<name>/v<N>/manifest.json   hashes and metadata
+
+Classes:
+- ArtifactStore: Versioned store of pickled objects with shared arrays.
+
+Functions:
+- parse_artifact_reference: Splits a 'name@version' reference.
+- main: Parses command-line arguments and lists the store contents.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+# Arrays smaller than this are kept inside the pickle
+MIN_ARRAY_BYTES = 1024
+
+# Default zlib level of the pickles, 0 to store them uncompressed
+COMPRESS = 3
+
+MANIFEST_FILE = 'manifest.json'
+OBJECT_FILE = 'object.pkl'
+
+
+class ArtifactNotFoundError(Exception):
+    """Custom exception for missing artifacts or versions."""
+
+
+def array_hash(array):
+    """
+    Returns the SHA-256 hash of an array's dtype, shape and content.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The array to hash.
+
+    Returns
+    -------
+    str
+        Hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((np.lib.format.dtype_to_descr(array.dtype),
+                        array.shape)).encode('utf-8'))
+    digest.update(np.ascontiguousarray(array).view(np.uint8).data)
+    return digest.hexdigest()
+
+
+def _to_json(value):
+    """Convert NumPy scalars and other values for the manifest."""
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+def _decompress(payload):
+    """Decompress a zlib stream, rejecting truncated or trailing data."""
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(payload)
+    if not decompressor.eof or decompressor.unused_data:
+        raise zlib.error("Incomplete or trailing compressed data.")
+    return data
+
+
+def parse_artifact_reference(reference):
+    """
+    Splits a 'name@version' reference into its name and version.
+
+    Parameters
+    ----------
+    reference : str
+        Artifact name, optionally followed by '@' and a version number.
+
+    Returns
+    -------
+    tuple
+        The name and the version (None for the latest version).
+
+    Raises
+    ------
+    ValueError
+        If the version is not an integer.
+    """
+    name, _, version = reference.partition('@')
+    if not version:
+        return name, None
+    if not version.isdigit():
+        raise ValueError(f"Invalid artifact version '{version}'.")
+    return name, int(version)
+
+
+class _ArrayPickler(pickle.Pickler):
+    """Pickler that writes large arrays to the store's object files."""
+
+    def __init__(self, file, store):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.store = store
+        self.arrays = {}
+
+    def persistent_id(self, obj):  # pylint: disable=method-hidden
+        if (type(obj) is not np.ndarray and not isinstance(obj, np.memmap)) \
+                or obj.dtype.hasobject \
+                or obj.nbytes < self.store.min_array_bytes:
+            return None
+        key = self.store.write_array(obj)
+        self.arrays[key] = {'dtype': str(obj.dtype),
+                            'shape': list(obj.shape)}
+        return ('ndarray', key)
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    """Unpickler that maps the arrays referenced by a pickle."""
+
+    def __init__(self, file, store, mmap_mode):
+        super().__init__(file)
+        self.store = store
+        self.mmap_mode = mmap_mode
+
+    def persistent_load(self, pid):
+        kind, key = pid
+        if kind != 'ndarray':
+            raise pickle.UnpicklingError(f"Unknown reference '{kind}'.")
+        return np.load(self.store.array_path(key), mmap_mode=self.mmap_mode)
+
+
+class ArtifactStore:
+    """
+    Versioned store of pickled objects with shared, memory-mapped
+    array payloads.
+
+    Parameters
+    ----------
+    root : str
+        Directory of the store; created if needed.
+    min_array_bytes : int
+        Arrays of at least this size are stored as separate files.
+    compress : int
+        zlib level (0-9) of the saved pickles; 0 stores them
+        uncompressed. Array files are never compressed, so that they
+        can be memory-mapped.
+    """
+
+    def __init__(self, root, min_array_bytes=MIN_ARRAY_BYTES,
+                 compress=COMPRESS):
+        if not 0 <= compress <= 9:
+            raise ValueError("compress must be between 0 and 9.")
+        self.root = root
+        self.min_array_bytes = min_array_bytes
+        self.compress = compress
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'artifacts'), exist_ok=True)
+
+    def array_path(self, key):
+        """Return the path of the array file with the given hash."""
+        return os.path.join(self.root, 'objects', f"{key}.npy")
+
+    def write_array(self, array):
+        """
+        Write an array once under its content hash.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            The array to store.
+
+        Returns
+        -------
+        str
+            The content hash of the array.
+        """
+        key = array_hash(array)
+        path = self.array_path(key)
+        if not os.path.exists(path):
+            handle, temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(handle, 'wb') as file:
+                np.save(file, np.ascontiguousarray(array))
+            os.replace(temp_path, path)
+        return key
+
+    def _artifact_dir(self, name):
+        """Return the directory holding the versions of an artifact."""
+        if not name or os.sep in name or name.startswith('.'):
+            raise ValueError(f"Invalid artifact name '{name}'.")
+        return os.path.join(self.root, 'artifacts', name)
+
+    def names(self):
+        """
+        List the artifact names in the store.
+
+        Returns
+        -------
+        list of str
+            Sorted artifact names.
+        """
+        return sorted(name for name in os.listdir(
+            os.path.join(self.root, 'artifacts')) if not name.startswith('.'))
+
+    def versions(self, name):
+        """
+        List the versions of an artifact.
+
+        Parameters
+        ----------
+        name : str
+            Artifact name.
+
+        Returns
+        -------
+        list of int
+            Sorted version numbers, empty if the artifact does not exist.
+        """
+        directory = self._artifact_dir(name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(entry[1:]) for entry in os.listdir(directory)
+                      if entry.startswith('v') and entry[1:].isdigit())
+
+    def _version_dir(self, name, version=None):
+        """Return the directory of a version (the latest if None)."""
+        versions = self.versions(name)
+        if not versions:
+            raise ArtifactNotFoundError(f"Artifact '{name}' does not exist.")
+        if version is None:
+            version = versions[-1]
+        elif version not in versions:
+            raise ArtifactNotFoundError(
+                f"Artifact '{name}' has no version {version}.")
+        return os.path.join(self._artifact_dir(name), f"v{version}")
+
+    def manifest(self, name, version=None):
+        """
+        Read the manifest of an artifact version.
+
+        Parameters
+        ----------
+        name : str
+            Artifact name.
+        version : int, optional
+            Version number; the latest version if None.
+
+        Returns
+        -------
+        dict
+            The manifest.
+
+        Raises
+        ------
+        ArtifactNotFoundError
+            If the artifact or version does not exist.
+        """
+        path = os.path.join(self._version_dir(name, version), MANIFEST_FILE)
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def save(self, name, obj, metadata=None):
+        """
+        Save an object as a new version of an artifact.
+
+        Parameters
+        ----------
+        name : str
+            Artifact name.
+        obj : object
+            The object to save; must be picklable.
+        metadata : dict, optional
+            JSON-serializable information stored in the manifest.
+
+        Returns
+        -------
+        int
+            The version holding the object. If the object is identical
+            to the latest version, that version is returned unchanged,
+            whatever the compression of either.
+        """
+        buffer = io.BytesIO()
+        pickler = _ArrayPickler(buffer, self)
+        pickler.dump(obj)
+        payload = buffer.getvalue()
+        content_hash = hashlib.sha256(payload).hexdigest()
+
+        if self.versions(name):
+            latest = self.manifest(name)
+            if latest['content_hash'] == content_hash:
+                return latest['version']
+
+        directory = self._artifact_dir(name)
+        os.makedirs(directory, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=directory, prefix='.tmp-')
+        try:
+            with open(os.path.join(temp_dir, OBJECT_FILE), 'wb') as file:
+                file.write(zlib.compress(payload, self.compress)
+                           if self.compress else payload)
+            # Claim the next free version; a concurrent writer that got
+            # there first makes the rename fail and we try the next one.
+            version = (self.versions(name) or [0])[-1] + 1
+            while True:
+                manifest = {
+                    'name': name,
+                    'version': version,
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'content_hash': content_hash,
+                    'compression': 'zlib' if self.compress else None,
+                    'type': f"{type(obj).__module__}.{type(obj).__qualname__}",
+                    'arrays': pickler.arrays,
+                    'metadata': metadata or {},
+                }
+                with open(os.path.join(temp_dir, MANIFEST_FILE), 'w',
+                          encoding='utf-8') as file:
+                    json.dump(manifest, file, indent=2, default=_to_json)
+                try:
+                    os.rename(temp_dir,
+                              os.path.join(directory, f"v{version}"))
+                    return version
+                except OSError:
+                    version += 1
+        finally:
+            if os.path.isdir(temp_dir):
+                shutil.rmtree(temp_dir)
+
+    def load(self, name, version=None, mmap_mode='r', verify=False):
+        """
+        Load an artifact version.
+
+        Parameters
+        ----------
+        name : str
+            Artifact name.
+        version : int, optional
+            Version number; the latest version if None.
+        mmap_mode : str, optional
+            Memory-map mode of the stored arrays; 'r' maps them
+            read-only and shared. None loads them into memory.
+        verify : bool
+            Check the uncompressed pickle against the recorded content
+            hash.
+
+        Returns
+        -------
+        object
+            The saved object.
+
+        Raises
+        ------
+        ArtifactNotFoundError
+            If the artifact or version does not exist.
+        ValueError
+            If the compressed pickle is damaged, or verify is set and
+            the content hash does not match.
+        """
+        directory = self._version_dir(name, version)
+        manifest = self.manifest(name, version)
+        with open(os.path.join(directory, OBJECT_FILE), 'rb') as file:
+            payload = file.read()
+        if manifest.get('compression') == 'zlib':
+            try:
+                payload = _decompress(payload)
+            except zlib.error as e:
+                raise ValueError(f"Artifact '{name}' version "
+                                 f"{manifest['version']} is "
+                                 "corrupted.") from e
+        if verify:
+            if hashlib.sha256(payload).hexdigest() != \
+                    manifest['content_hash']:
+                raise ValueError(f"Artifact '{name}' version "
+                                 f"{manifest['version']} is corrupted.")
+        return _ArrayUnpickler(io.BytesIO(payload), self, mmap_mode).load()
+
+
+def main():
+    """
+    Parses command-line arguments and lists the artifacts of a store,
+    or the versions of one artifact.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="List the contents of an artifact store."
+    )
+    parser.add_argument("store_dir", type=str,
+                        help="Directory of the artifact store.")
+    parser.add_argument("name", type=str, nargs='?', default=None,
+                        help="Artifact whose versions are listed.")
+
+    args = parser.parse_args()
+
+    try:
+        store = ArtifactStore(args.store_dir)
+        for name in [args.name] if args.name else store.names():
+            for version in store.versions(name):
+                manifest = store.manifest(name, version)
+                print(f"{name}@{version}\t{manifest['created']}\t"
+                      f"{manifest['content_hash'][:12]}\t{manifest['type']}")
+    except (ArtifactNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,610 @@
+"""
+This module provides a model-based (Bayesian) hyperparameter search over
+continuous, integer and categorical ranges, warm-started from the trials
+of earlier runs.
+
+A search space maps parameter names to a Real or Integer range
+(optionally on a log scale) or to a list of categorical values. Every
+candidate is placed in the unit cube, a Gaussian process with a Matérn
+kernel is fitted to the mean fold scores evaluated so far, and the next
+batch of candidates are the points of a random sample, plus
+perturbations of the best candidate, with the highest expected
+improvement. The candidates are evaluated with the fold machinery of
+CandidateSearchCV, so checkpoints, time budgets and racing work the
+same way; BinnedBayesianSearchCV evaluates LightGBM and XGBoost
+candidates on shared binned datasets.
+
+Every evaluated trial is appended to a trial history, a JSON lines
+file that skips repeated trials and keeps the most recent ones. A later
+search of the same model on similar data (the same feature columns and
+a row count within a factor of two) starts with the best configurations
+of earlier runs and fits its surrogate on the earlier trials as well,
+shifted by how much the re-evaluated configurations' scores moved, so
+it spends fewer fits to reach the previous quality.
+
+Classes:
+- Real: Continuous range of a parameter.
+- Integer: Integer range of a parameter.
+- TrialHistory: Trials of earlier searches in a JSON lines file.
+- BayesianSearchCV: Model-based search over a search space.
+- BinnedBayesianSearchCV: Model-based search reusing binned datasets.
+
+Functions:
+- data_signature: Describes the training data of a search.
+- main: Parses command-line arguments and lists the best trials of a
+  history file.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from joblib import effective_n_jobs
+from scipy.stats import norm
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import (
+    ConstantKernel, Matern, WhiteKernel
+)
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.binned_dataset_search import (  # noqa: E402
+    BinnedDatasetSearchCV
+)
+from modules.candidate_search import CandidateSearchCV  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+# Number of random points the expected improvement is maximized over
+N_SAMPLES = 2048
+
+# Largest ratio of row counts for data to count as similar
+MAX_ROW_RATIO = 2.0
+
+# Number of most recent trials a trial history keeps
+MAX_TRIALS = 20_000
+
+
+class Real:
+    """
+    Continuous range of a parameter.
+
+    Parameters
+    ----------
+    low, high : float
+        Bounds of the range.
+    log : bool
+        Whether to search the range on a log scale.
+    """
+
+    def __init__(self, low, high, log=False):
+        if not low < high or (log and low <= 0):
+            raise ValueError(f"Invalid range [{low}, {high}].")
+        self.low = low
+        self.high = high
+        self.log = log
+
+    def _bounds(self):
+        """Return the bounds on the search scale."""
+        if self.log:
+            return np.log(self.low), np.log(self.high)
+        return self.low, self.high
+
+    def to_unit(self, value):
+        """Map a value to [0, 1]."""
+        low, high = self._bounds()
+        value = np.log(value) if self.log else value
+        return float(np.clip((value - low) / (high - low), 0, 1))
+
+    def from_unit(self, unit):
+        """Map a point of [0, 1] to a value."""
+        low, high = self._bounds()
+        value = low + float(np.clip(unit, 0, 1)) * (high - low)
+        return float(np.exp(value)) if self.log else value
+
+    def __repr__(self):
+        return f"Real({self.low}, {self.high}, log={self.log})"
+
+
+class Integer(Real):
+    """
+    Integer range of a parameter.
+
+    Parameters
+    ----------
+    low, high : int
+        Bounds of the range, both included.
+    log : bool
+        Whether to search the range on a log scale.
+    """
+
+    def from_unit(self, unit):
+        """Map a point of [0, 1] to the nearest integer in the range."""
+        return int(np.clip(round(super().from_unit(unit)), self.low,
+                           self.high))
+
+    def __repr__(self):
+        return f"Integer({self.low}, {self.high}, log={self.log})"
+
+
+def _to_unit(dimension, value):
+    """Map a value of a Real, Integer or categorical dimension to [0, 1]."""
+    if isinstance(dimension, Real):
+        return dimension.to_unit(value)
+    values = list(dimension)
+    index = values.index(value) if value in values else 0
+    return index / max(len(values) - 1, 1)
+
+
+def _from_unit(dimension, unit):
+    """Map a point of [0, 1] to a value of a dimension."""
+    if isinstance(dimension, Real):
+        return dimension.from_unit(unit)
+    values = list(dimension)
+    return values[int(np.clip(round(unit * (len(values) - 1)), 0,
+                              len(values) - 1))]
+
+
+def data_signature(x, feature_columns=None):
+    """
+    Describes the training data of a search, to find earlier trials on
+    similar data.
+
+    Parameters
+    ----------
+    x : pd.DataFrame or np.ndarray
+        Training data features.
+    feature_columns : list of str, optional
+        Names of the feature columns, for arrays without them (e.g. the
+        memory-mapped matrices of a feature matrix store); the columns
+        of a DataFrame by default.
+
+    Returns
+    -------
+    dict
+        The feature columns (positions if unnamed) and the row count.
+    """
+    if feature_columns is not None:
+        columns = list(map(str, feature_columns))
+    elif hasattr(x, 'columns'):
+        columns = list(map(str, x.columns))
+    else:
+        columns = [str(index) for index in range(np.shape(x)[1])]
+    return {'columns': columns, 'n_rows': int(np.shape(x)[0])}
+
+
+class TrialHistory:
+    """
+    Trials of earlier searches in a JSON lines file, one trial (model,
+    data signature, parameters and mean score) per line.
+
+    A trial already in the history with the same score (e.g. from a
+    resumed or repeated search) is not appended again, and the history
+    keeps the max_trials most recent trials.
+
+    Parameters
+    ----------
+    path : str
+        Path of the history file; created on the first trial.
+    max_trials : int
+        Number of most recent trials kept.
+    """
+
+    def __init__(self, path, max_trials=MAX_TRIALS):
+        self.path = path
+        self.max_trials = max_trials
+
+    @staticmethod
+    def _key(model, signature, params, score):
+        """Return the identity of a trial, to skip repeated ones."""
+        return json.dumps([model, signature, params, round(score, 12)],
+                          sort_keys=True, default=_json_default)
+
+    def _read_lines(self):
+        """Return the lines of the history file."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return file.readlines()
+        except FileNotFoundError:
+            return []
+
+    def append(self, model, signature, trials):
+        """
+        Append trials to the history.
+
+        Parameters
+        ----------
+        model : str
+            Name of the model.
+        signature : dict
+            Signature of the training data, see data_signature.
+        trials : list of tuple
+            Parameters and mean score of each trial; failed (NaN) and
+            repeated trials are skipped.
+        """
+        lines = self._read_lines()
+        known = set()
+        for line in lines:
+            try:
+                trial = json.loads(line)
+                known.add(self._key(trial['model'], trial['signature'],
+                                    trial['params'], trial['score']))
+            except (ValueError, KeyError, TypeError):
+                continue
+        timestamp = time.time()
+        new_lines = []
+        for params, score in trials:
+            if not np.isfinite(score):
+                continue  # The candidate failed
+            # Through JSON so that numpy values compare like stored ones
+            params = json.loads(json.dumps(params, default=_json_default))
+            key = self._key(model, signature, params, float(score))
+            if key in known:
+                continue
+            known.add(key)
+            new_lines.append(json.dumps({
+                'model': model, 'signature': signature, 'params': params,
+                'score': float(score), 'timestamp': timestamp}) + '\n')
+        if not new_lines:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if len(lines) + len(new_lines) <= self.max_trials:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.writelines(new_lines)
+            return
+        # Rewrite the newest trials through a temporary file
+        kept = (lines + new_lines)[-self.max_trials:]
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.writelines(kept)
+        os.replace(temp_path, self.path)
+
+    def trials(self, model=None, signature=None):
+        """
+        Return the trials of a model on data similar to a signature.
+
+        Parameters
+        ----------
+        model : str, optional
+            Name of the model; all models if None.
+        signature : dict, optional
+            Signature of the training data; trials on other feature
+            columns, or on more than MAX_ROW_RATIO times more or fewer
+            rows, are left out. All trials if None.
+
+        Returns
+        -------
+        list of dict
+            The trials, oldest first; lines that cannot be read are
+            skipped.
+        """
+        trials = []
+        for line in self._read_lines():
+            try:
+                trial = json.loads(line)
+            except ValueError:
+                continue
+            if model is not None and trial.get('model') != model:
+                continue
+            if signature is not None and not _similar(
+                    trial.get('signature', {}), signature):
+                continue
+            trials.append(trial)
+        return trials
+
+
+def _json_default(value):
+    """Convert numpy scalars for json.dumps."""
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+
+def _similar(signature, other):
+    """Tell whether two data signatures describe similar data."""
+    if signature.get('columns') != other.get('columns'):
+        return False
+    n_rows, other_rows = signature.get('n_rows', 0), other.get('n_rows', 0)
+    if n_rows <= 0 or other_rows <= 0:
+        return False
+    return max(n_rows, other_rows) / min(n_rows, other_rows) <= MAX_ROW_RATIO
+
+
+def expected_improvement(mean, std, best):
+    """
+    Computes the expected improvement over the best score of points
+    with a normal posterior.
+
+    Parameters
+    ----------
+    mean, std : np.ndarray
+        Posterior mean and standard deviation of the score.
+    best : float
+        Best score observed so far.
+
+    Returns
+    -------
+    np.ndarray
+        The expected improvement of every point.
+    """
+    std = np.maximum(std, 1e-12)
+    z = (mean - best) / std
+    return (mean - best) * norm.cdf(z) + std * norm.pdf(z)
+
+
+class BayesianSearchCV(CandidateSearchCV):
+    """
+    Model-based search over a search space.
+
+    Parameters
+    ----------
+    estimator : object
+        The scikit-learn estimator to tune.
+    search_space : dict
+        Parameter names as keys and Real or Integer ranges, or lists of
+        categorical values, as values.
+    n_iter : int
+        Number of candidates evaluated.
+    n_initial : int
+        Number of candidates evaluated before the surrogate is used:
+        the best configurations of the history, then random points.
+    history : TrialHistory, optional
+        History to warm-start from and append the trials to.
+    history_name : str, optional
+        Name of the model in the history; the estimator's class name by
+        default.
+    feature_columns : list of str, optional
+        Names of the feature columns in the data signature of the
+        history, for arrays without them; see data_signature.
+    random_state : int
+        Seed of the random points.
+    batch_size : int, optional
+        Number of candidates proposed at a time; the number of parallel
+        jobs, at least 4, by default.
+    **kwargs : dict
+        Other arguments of CandidateSearchCV (cv, n_jobs, verbose,
+        checkpoint, time_budget, racing, ...).
+    """
+
+    def __init__(self, estimator, search_space, n_iter=30, n_initial=8,
+                 history=None, history_name=None, feature_columns=None,
+                 random_state=42, batch_size=None, **kwargs):
+        super().__init__(estimator, {}, batch_size=batch_size, **kwargs)
+        self.search_space = search_space
+        self.n_iter = n_iter
+        self.n_initial = n_initial
+        self.history = history
+        self.history_name = history_name
+        self.feature_columns = feature_columns
+        self.random_state = random_state
+
+    def _names(self):
+        """Return the parameter names in a fixed order."""
+        return sorted(self.search_space)
+
+    def _encode(self, params):
+        """Place a candidate in the unit cube."""
+        return [_to_unit(self.search_space[name], params[name])
+                for name in self._names()]
+
+    def _decode(self, point):
+        """Return the candidate of a point of the unit cube."""
+        return {name: _from_unit(self.search_space[name], unit)
+                for name, unit in zip(self._names(), point)}
+
+    def _snap(self, params):
+        """Return the candidate of the search space nearest to earlier
+        parameters, or None if they do not fit in it (e.g. a grid's
+        max_depth=None for an Integer range)."""
+        if set(params) != set(self.search_space):
+            return None
+        try:
+            return self._decode(self._encode(params))
+        except (TypeError, ValueError):
+            return None
+
+    def _seeds(self, trials):
+        """Return the distinct best configurations of earlier trials,
+        snapped to the search space."""
+        seeds = []
+        for trial in sorted(trials, key=lambda trial: -trial['score']):
+            params = self._snap(trial['params'])
+            if params is not None and params not in seeds:
+                seeds.append(params)
+        return seeds
+
+    def _propose(self, evaluated, scores, size):
+        """Return the next candidates: history seeds and random points
+        first, then the points of highest expected improvement."""
+        if not self.search_space:
+            return [{}] if not evaluated else []
+        rng = np.random.default_rng([self.random_state, len(evaluated)])
+        proposals = []
+
+        def add(params):
+            if (params not in evaluated and params not in proposals
+                    and len(proposals) < size):
+                proposals.append(params)
+
+        if len(evaluated) < max(self.n_initial, 1):
+            for params in self._seeds(self._history_trials):
+                add(params)
+            for point in rng.random((64 * size, len(self._names()))):
+                if len(evaluated) + len(proposals) >= self.n_initial:
+                    break
+                add(self._decode(point))
+            if proposals:
+                return proposals
+
+        x_observed, y_observed = self._observations(evaluated, scores)
+        if not len(y_observed):
+            # Every candidate so far failed: keep sampling at random
+            for point in rng.random((64 * size, len(self._names()))):
+                add(self._decode(point))
+            return proposals
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            kernel = (ConstantKernel() * Matern(
+                length_scale=np.full(len(self._names()), 0.3), nu=2.5)
+                + WhiteKernel(1e-3))
+            surrogate = GaussianProcessRegressor(
+                kernel, normalize_y=True, random_state=self.random_state)
+            surrogate.fit(x_observed, y_observed)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            means = np.nanmean(scores, axis=1)
+        best_point = (np.asarray(self._encode(evaluated[int(
+            np.nanargmax(means))])) if np.isfinite(means).any()
+            else x_observed[int(np.argmax(y_observed))])
+        points = np.vstack([
+            rng.random((N_SAMPLES, len(self._names()))),
+            np.clip(best_point + rng.normal(scale=0.05, size=(
+                N_SAMPLES // 4, len(self._names()))), 0, 1)])
+        # Snap to the grid of integer and categorical values
+        candidates = [self._decode(point) for point in points]
+        snapped = np.array([self._encode(params) for params in candidates])
+        mean, std = surrogate.predict(snapped, return_std=True)
+        improvement = expected_improvement(mean, std, np.max(y_observed))
+        for index in np.argsort(-improvement, kind='stable'):
+            add(candidates[index])
+            if len(proposals) == size:
+                break
+        return proposals
+
+    def _observations(self, evaluated, scores):
+        """
+        Return the unit-cube points and mean scores the surrogate is
+        fitted to: the candidates evaluated so far and the earlier
+        trials, shifted by the mean change of the scores of the
+        configurations evaluated again.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            means = np.nanmean(scores, axis=1)
+        points = [self._encode(params) for params in evaluated]
+        current = {json.dumps(params, sort_keys=True, default=repr): score
+                   for params, score in zip(evaluated, means)}
+        earlier = {}
+        for trial in self._history_trials:
+            params = self._snap(trial['params'])
+            if params is None:
+                continue
+            earlier[json.dumps(params, sort_keys=True,
+                               default=repr)] = (params, trial['score'])
+        shifts = [current[key] - score for key, (_, score) in earlier.items()
+                  if key in current and np.isfinite(current[key])]
+        shift = float(np.mean(shifts)) if shifts else 0.0
+        observed = list(means)
+        for key, (params, score) in earlier.items():
+            if key not in current:
+                points.append(self._encode(params))
+                observed.append(score + shift)
+        # Candidates that failed on every fold are not observed
+        observed = np.asarray(observed, dtype=np.float64)
+        known = np.isfinite(observed)
+        return np.asarray(points, dtype=np.float64)[known], observed[known]
+
+    def fit(self, x, y, **fit_params):
+        """
+        Run the search and refit the best candidate on all data.
+
+        Parameters
+        ----------
+        x : pd.DataFrame or np.ndarray
+            Training data features.
+        y : pd.Series or np.ndarray
+            Training data labels.
+        **fit_params : dict
+            Extra keyword arguments passed to the fit method.
+
+        Returns
+        -------
+        BayesianSearchCV
+            The fitted search.
+        """
+        start_time = time.perf_counter()
+        name = self.history_name or type(self.estimator).__name__
+        signature = data_signature(x, self.feature_columns)
+        self._history_trials = (self.history.trials(name, signature)
+                                if self.history is not None else [])
+        if self._history_trials and self.verbose > 0:
+            print(f"Warm-starting from {len(self._history_trials)} "
+                  "earlier trials")
+        n_candidates = self.n_iter if self.search_space else 1
+        batch_size = self.batch_size or max(4, effective_n_jobs(self.n_jobs))
+        self._search(x, y, fit_params, start_time, n_candidates, batch_size,
+                     self._propose)
+        if self.history is not None:
+            self.history.append(name, signature, [
+                (params, score) for params, score in zip(
+                    self.cv_results_['params'],
+                    self.cv_results_['mean_test_score'])])
+        return self
+
+
+class BinnedBayesianSearchCV(BayesianSearchCV, BinnedDatasetSearchCV):
+    """
+    Model-based search of LightGBM and XGBoost models that evaluates
+    the candidates on binned datasets shared per fold.
+
+    Parameters
+    ----------
+    estimator : lgb.LGBMRegressor or xgb.XGBRegressor
+        The estimator to tune.
+    search_space : dict
+        See BayesianSearchCV.
+    cache_dir : str, optional
+        Directory where constructed LightGBM datasets are cached.
+    **kwargs : dict
+        Other arguments of BayesianSearchCV.
+    """
+
+    def __init__(self, estimator, search_space, cache_dir=None, **kwargs):
+        super().__init__(estimator, search_space, cache_dir=cache_dir,
+                         **kwargs)
+
+
+def main():
+    """
+    Parses command-line arguments and prints the best trials of a trial
+    history per model.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="List the best trials of a trial history."
+    )
+    parser.add_argument("history_file", type=str,
+                        help="Path of the JSON lines trial history.")
+    parser.add_argument("--top", type=int, default=3,
+                        help="Number of trials listed per model.")
+
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.history_file):
+        print(f"Error: The file '{args.history_file}' was not found.")
+        return
+    trials = TrialHistory(args.history_file).trials()
+    for model in sorted({trial['model'] for trial in trials}):
+        best = sorted((trial for trial in trials if trial['model'] == model),
+                      key=lambda trial: -trial['score'])
+        print(f"{model}: {len(best)} trials")
+        for trial in best[:args.top]:
+            print(f"  {trial['score']:.5f}  {trial['params']}")
+
+
+if __name__ == "__main__":
+    main()
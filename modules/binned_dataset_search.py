@@ -0,0 +1,312 @@
+"""
+This module provides a cross-validated search for LightGBM and XGBoost
+regressors that bins the features once per fold instead of once per
+candidate.
+
+Both libraries train on a binned copy of the features (a LightGBM
+Dataset, an XGBoost QuantileDMatrix). Building it is a large fixed cost
+of every fit, and it only depends on the training rows and a few
+binning parameters. The search therefore builds one binned dataset per
+fold and binning configuration and trains every candidate that shares
+it with the native training API. Constructed LightGBM datasets can also
+be cached on disk and are reused by later runs on the same data; the
+cache keeps the max_cached_datasets most recently used datasets.
+Candidates are trained one after the other, each with n_jobs native
+threads, instead of in a pool of single-threaded workers.
+
+Classes:
+- BinnedDatasetSearchCV: Cross-validated search reusing binned datasets.
+
+Functions:
+- supports_binned_search: Tells whether an estimator can be tuned with
+  BinnedDatasetSearchCV.
+"""
+
+import os
+import time
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import xgboost as xgb
+
+# pylint: disable=import-error
+from modules.candidate_racing import RACING_ALPHA
+from modules.candidate_search import (
+    CandidateSearchCV, _take, failed_result, start_memory_trace,
+    stop_memory_trace
+)
+# pylint: enable=import-error
+
+# Parameters that change how LightGBM bins the features
+LGBM_BINNING_PARAMS = ('max_bin', 'min_data_in_bin', 'subsample_for_bin',
+                       'bin_construct_sample_cnt', 'use_missing',
+                       'zero_as_missing', 'linear_tree')
+
+# Parameters that change how XGBoost bins the features
+XGB_BINNING_PARAMS = ('max_bin',)
+
+# sklearn wrapper parameters that are not LightGBM training parameters
+LGBM_WRAPPER_PARAMS = ('n_estimators', 'class_weight', 'importance_type')
+
+# Default number of LightGBM datasets kept in the cache directory
+MAX_CACHED_DATASETS = 32
+
+
+def supports_binned_search(estimator):
+    """
+    Tells whether an estimator can be tuned with BinnedDatasetSearchCV.
+
+    Parameters
+    ----------
+    estimator : object
+        The estimator to tune.
+
+    Returns
+    -------
+    bool
+        True for LightGBM and XGBoost regressors.
+    """
+    return isinstance(estimator, (lgb.LGBMRegressor, xgb.XGBRegressor))
+
+
+def _lgbm_training_params(estimator):
+    """Translate LGBMRegressor parameters into native parameters."""
+    params = {name: value for name, value in estimator.get_params().items()
+              if value is not None and name not in LGBM_WRAPPER_PARAMS}
+    params.setdefault('objective', 'regression')
+    params.setdefault('verbose', -1)
+    params['feature_pre_filter'] = False
+    return params, estimator.get_params()['n_estimators']
+
+
+def _xgb_training_params(estimator):
+    """Translate XGBRegressor parameters into native parameters."""
+    params = {name: value
+              for name, value in estimator.get_xgb_params().items()
+              if value is not None}
+    num_boost_round = estimator.get_params()['n_estimators'] or 100
+    return params, num_boost_round
+
+
+class BinnedDatasetSearchCV(CandidateSearchCV):
+    """
+    Cross-validated search reusing binned datasets across candidates.
+
+    Parameters
+    ----------
+    estimator : lgb.LGBMRegressor or xgb.XGBRegressor
+        The estimator to tune.
+    param_grid : dict
+        Dictionary with parameter names (str) as keys and
+        lists of parameter settings to try as values.
+    cv : int
+        Number of folds.
+    cache_dir : str, optional
+        Directory where constructed LightGBM datasets are saved and
+        looked up. If None, datasets are only reused within the run.
+        XGBoost cannot serialize quantile matrices, so they are always
+        rebuilt per run.
+    max_cached_datasets : int
+        Number of datasets kept in cache_dir; the least recently used
+        ones above it are removed.
+    n_jobs : int, optional
+        Number of threads LightGBM or XGBoost trains each candidate
+        with; -1 uses all cores. If None, the estimator's own setting
+        is kept.
+    verbose : int
+        Print one line per fitted candidate and fold if above 1.
+    checkpoint : SearchCheckpoint, optional
+        Checkpoint to save every (candidate, fold) result to and to
+        resume from.
+    time_budget : float, optional
+        Wall-clock seconds after which no new batch of candidates is
+        started, see CandidateSearchCV.
+    batch_size : int, optional
+        Number of candidates evaluated between two checks of the time
+        budget.
+    racing : bool
+        Whether to eliminate candidates statistically worse than the
+        leader after each fold, see CandidateSearchCV.
+    racing_alpha : float
+        One-sided significance level of an elimination.
+    race_reference : np.ndarray, optional
+        Out-of-fold squared errors of another model on every row.
+    """
+
+    def __init__(self, estimator, param_grid, cv=3, cache_dir=None,
+                 max_cached_datasets=MAX_CACHED_DATASETS, n_jobs=None,
+                 verbose=0, checkpoint=None, time_budget=None,
+                 batch_size=None, racing=False, racing_alpha=RACING_ALPHA,
+                 race_reference=None):
+        if max_cached_datasets < 1:
+            raise ValueError("max_cached_datasets must be positive.")
+        super().__init__(estimator, param_grid, cv=cv, n_jobs=n_jobs,
+                         verbose=verbose,
+                         checkpoint=checkpoint, time_budget=time_budget,
+                         batch_size=batch_size, racing=racing,
+                         racing_alpha=racing_alpha,
+                         race_reference=race_reference)
+        self.cache_dir = cache_dir
+        self.max_cached_datasets = max_cached_datasets
+
+    def _prepare_folds(self, x, y, folds, fit_params):
+        """Start an empty set of binned datasets per fold."""
+        self._folds = folds
+        self._fold_datasets = [{} for _ in folds]
+
+    def _evaluate_fold(self, candidates, x, y, train_index, test_index,
+                       fit_params):
+        """
+        Evaluate all candidates on one fold, building the fold's binned
+        dataset of each binning configuration on first use and reusing
+        it for every later batch of candidates, and yield the result of
+        each candidate as soon as it is known; a candidate that fails
+        gets a NaN result, see _fit_and_score in candidate_search.
+        """
+        data = (np.asarray(_take(x, train_index)),
+                np.asarray(_take(y, train_index), dtype=np.float64),
+                np.asarray(_take(x, test_index)),
+                np.asarray(_take(y, test_index), dtype=np.float64))
+
+        fold = next(position for position, (_, test) in
+                    enumerate(self._folds)
+                    if np.array_equal(test, test_index))
+        datasets = self._fold_datasets[fold]
+        for candidate in candidates:
+            try:
+                yield self._fit_and_score(candidate, datasets, data,
+                                          fit_params)
+            except Exception as exc:  # pylint: disable=broad-except
+                yield failed_result(candidate, exc, self.racing)
+
+    def _fit_and_score(self, candidate, datasets, data, fit_params):
+        """
+        Train one candidate on the binned dataset of its binning
+        configuration, building it into datasets if needed, and return
+        its result as in CandidateSearchCV._evaluate_fold; data holds
+        the training and test features and targets of the fold.
+        """
+        x_train, y_train, x_test, y_test = data
+        is_lgbm = isinstance(self.estimator, lgb.LGBMRegressor)
+        binning_names = LGBM_BINNING_PARAMS if is_lgbm else XGB_BINNING_PARAMS
+        model = self.estimator.__class__(
+            **{**self.estimator.get_params(), **candidate})
+        if is_lgbm:
+            params, num_boost_round = _lgbm_training_params(model)
+        else:
+            params, num_boost_round = _xgb_training_params(model)
+        if self.n_jobs is not None:
+            # Candidates run sequentially, so each one gets the threads
+            params['n_jobs'] = joblib.effective_n_jobs(self.n_jobs)
+
+        binning = tuple((name, params[name]) for name in binning_names
+                        if name in params)
+        if binning not in datasets:
+            start = time.perf_counter()
+            if is_lgbm:
+                datasets[binning] = self._lgbm_dataset(
+                    x_train, y_train, dict(binning), fit_params)
+            else:
+                datasets[binning] = self._xgb_dataset(
+                    model, x_train, y_train, dict(binning))
+            self.dataset_build_time_ += time.perf_counter() - start
+
+        baseline = start_memory_trace()
+        start = time.perf_counter()
+        if is_lgbm:
+            booster = lgb.train(params, datasets[binning],
+                                num_boost_round=num_boost_round)
+        else:
+            booster = xgb.train(params, datasets[binning],
+                                num_boost_round=num_boost_round)
+        fit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if is_lgbm:
+            predictions = booster.predict(x_test)
+        else:
+            predictions = booster.inplace_predict(x_test)
+        errors = (y_test - predictions) ** 2
+        score = -np.mean(errors)
+        score_time = time.perf_counter() - start
+        peak_memory = stop_memory_trace(baseline)
+
+        if self.racing:
+            return score, fit_time, score_time, peak_memory, errors
+        return score, fit_time, score_time, peak_memory
+
+    def _lgbm_dataset(self, x_train, y_train, binning, fit_params):
+        """Build, or load from the cache, a LightGBM Dataset."""
+        params = {**binning, 'feature_pre_filter': False, 'verbose': -1}
+        categorical_feature = fit_params.get('categorical_feature', 'auto')
+
+        path = None
+        if self.cache_dir is not None:
+            key = joblib.hash((x_train, y_train, binning,
+                               categorical_feature))
+            path = os.path.join(self.cache_dir, f"lgbm_{key}.bin")
+            if os.path.isfile(path):
+                os.utime(path)  # Mark as recently used
+                return lgb.Dataset(path, params=params)
+
+        dataset = lgb.Dataset(x_train, y_train, params=params,
+                              categorical_feature=categorical_feature,
+                              free_raw_data=False).construct()
+        if path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            dataset.save_binary(path)
+            self._evict_datasets()
+        return dataset
+
+    def _evict_datasets(self):
+        """Remove the least recently used cached datasets above
+        max_cached_datasets."""
+        paths = sorted(
+            (os.path.join(self.cache_dir, name)
+             for name in os.listdir(self.cache_dir)
+             if name.startswith('lgbm_') and name.endswith('.bin')),
+            key=os.path.getmtime)
+        for path in paths[:-self.max_cached_datasets]:
+            os.remove(path)
+
+    @staticmethod
+    def _xgb_dataset(model, x_train, y_train, binning):
+        """Build an XGBoost QuantileDMatrix."""
+        return xgb.QuantileDMatrix(
+            x_train, y_train, max_bin=binning.get('max_bin'),
+            feature_types=model.feature_types,
+            enable_categorical=model.enable_categorical,
+            missing=model.missing)
+
+    def fit(self, x, y, **fit_params):
+        """
+        Run the search and refit the best candidate on all data with
+        the scikit-learn API.
+
+        Parameters
+        ----------
+        x : pd.DataFrame or np.ndarray
+            Training data features.
+        y : pd.Series or np.ndarray
+            Training data labels.
+        **fit_params : dict
+            Extra keyword arguments passed to the fit method, e.g. the
+            categorical features of LightGBM.
+
+        Returns
+        -------
+        BinnedDatasetSearchCV
+            The fitted search.
+        """
+        return super().fit(x, y, **fit_params)
+
+    def _refit(self, x, y, fit_params):
+        """Release the binned datasets and refit the best candidate."""
+        self._fold_datasets = []
+        return super()._refit(x, y, fit_params)
+
+    def _reset_search(self):
+        """Reset the binned datasets and the time spent building them."""
+        self.dataset_build_time_ = 0.0
+        self._fold_datasets = []
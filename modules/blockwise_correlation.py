@@ -0,0 +1,332 @@
+"""
+This module provides functionality to compute the correlation matrix of
+wide data (thousands of columns) block by block in float32, and to
+reduce it to a few features that can be drawn as a heatmap.
+
+The columns are standardized once in float32, and the matrix is filled
+block by block from products of column blocks, computing only the
+blocks on and above the diagonal. Memory stays at the standardized data
+plus the p×p float32 result, which can be written straight to a .npy
+file and opened memory-mapped later. Missing values count as the column
+mean, i.e. they contribute nothing to the correlation, instead of
+pandas' pairwise deletion.
+
+Features are reduced either to the top k correlated with a target, or
+to one representative per cluster of a hierarchical clustering on the
+distance 1 - |correlation|, ordered along the dendrogram so that
+correlated groups appear as blocks.
+
+Functions:
+- blockwise_correlation: Computes the correlation matrix block by block.
+- save_correlation: Saves a correlation matrix and its column names.
+- load_correlation: Loads a saved correlation matrix, memory-mapped.
+- correlation_fingerprint: Reads the fingerprint of the data a saved
+  correlation matrix was computed from.
+- top_k_by_target: Selects the features most correlated with a target.
+- cluster_representatives: Selects one feature per correlation cluster.
+- main: Parses command-line arguments and saves the correlation matrix
+  of a CSV file.
+"""
+
+import argparse
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+from scipy.cluster.hierarchy import fcluster, leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import infer_columns, load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+BLOCK_SIZE = 512
+
+
+def _standardize(values):
+    """Return float32 columns with zero mean and unit norm, the NaN
+    entries set to zero, and a mask of the constant columns."""
+    standardized = np.array(values, dtype=np.float32)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(standardized, axis=0, dtype=np.float64)
+    standardized -= np.nan_to_num(mean).astype(np.float32)
+    standardized[np.isnan(standardized)] = 0
+    norm = np.sqrt(np.einsum('ij,ij->j', standardized, standardized,
+                             dtype=np.float64)).astype(np.float32)
+    constant = norm == 0
+    norm[constant] = 1
+    standardized /= norm
+    return standardized, constant
+
+
+def blockwise_correlation(data, block_size=BLOCK_SIZE, output_file=None):
+    """
+    Computes the Pearson correlation matrix of the columns block by
+    block in float32.
+
+    Parameters
+    ----------
+    data : pd.DataFrame or np.ndarray
+        Numeric data with one column per feature.
+    block_size : int
+        Number of columns per block.
+    output_file : str, optional
+        Path of a .npy file the matrix is written to; the returned
+        matrix is then a memory map of that file.
+
+    Returns
+    -------
+    np.ndarray
+        The p×p float32 correlation matrix; rows and columns of
+        constant features are NaN.
+
+    Raises
+    ------
+    ValueError
+        If the data has no rows or no columns, or block_size is not
+        positive.
+    """
+    values = np.asarray(data)
+    if values.ndim != 2 or values.shape[0] == 0 or values.shape[1] == 0:
+        raise ValueError("The data must have at least one row and column.")
+    if block_size < 1:
+        raise ValueError("block_size must be positive.")
+
+    standardized, constant = _standardize(values)
+    n_features = standardized.shape[1]
+    if output_file is None:
+        corr = np.empty((n_features, n_features), dtype=np.float32)
+    else:
+        corr = np.lib.format.open_memmap(output_file, mode='w+',
+                                         dtype=np.float32,
+                                         shape=(n_features, n_features))
+
+    starts = range(0, n_features, block_size)
+    for row in starts:
+        left = standardized[:, row:row + block_size]
+        for col in starts:
+            if col < row:
+                continue
+            block = left.T @ standardized[:, col:col + block_size]
+            corr[row:row + block_size, col:col + block_size] = block
+            if col != row:
+                corr[col:col + block_size, row:row + block_size] = block.T
+
+    np.clip(corr, -1, 1, out=corr)
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    diagonal = np.arange(n_features)[~constant]
+    corr[diagonal, diagonal] = 1
+    if output_file is not None:
+        corr.flush()
+    return corr
+
+
+def _columns_file(matrix_file):
+    """Return the path of the column names saved next to a matrix."""
+    return os.path.splitext(matrix_file)[0] + '_columns.json'
+
+
+def _fingerprint_file(matrix_file):
+    """Return the path of the data fingerprint saved next to a matrix."""
+    return os.path.splitext(matrix_file)[0] + '_fingerprint.txt'
+
+
+def save_correlation(corr, columns, output_file, fingerprint=None):
+    """
+    Saves a correlation matrix as a float32 .npy file and its column
+    names as a JSON file next to it.
+
+    Parameters
+    ----------
+    corr : np.ndarray
+        The correlation matrix.
+    columns : list of str
+        Names of its rows and columns.
+    output_file : str
+        Path of the .npy file.
+    fingerprint : str, optional
+        Fingerprint of the data the matrix was computed from, saved in
+        a text file next to it (see correlation_fingerprint).
+    """
+    written = (isinstance(corr, np.memmap) and corr.filename is not None
+               and os.path.exists(output_file)
+               and os.path.samefile(corr.filename, output_file))
+    if not written:
+        np.save(output_file, np.asarray(corr, dtype=np.float32))
+    with open(_columns_file(output_file), 'w', encoding='utf-8') as file:
+        json.dump(list(columns), file)
+    fingerprint_file = _fingerprint_file(output_file)
+    if fingerprint is not None:
+        with open(fingerprint_file, 'w', encoding='utf-8') as file:
+            file.write(fingerprint)
+    elif os.path.exists(fingerprint_file):
+        os.remove(fingerprint_file)
+
+
+def correlation_fingerprint(matrix_file):
+    """
+    Reads the fingerprint of the data a saved correlation matrix was
+    computed from.
+
+    Parameters
+    ----------
+    matrix_file : str
+        Path of the .npy file.
+
+    Returns
+    -------
+    str or None
+        The fingerprint given to save_correlation, or None if the
+        matrix or its fingerprint was not saved.
+    """
+    if not os.path.exists(matrix_file):
+        return None
+    try:
+        with open(_fingerprint_file(matrix_file), 'r',
+                  encoding='utf-8') as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def load_correlation(input_file, mmap_mode='r'):
+    """
+    Loads a saved correlation matrix and its column names.
+
+    Parameters
+    ----------
+    input_file : str
+        Path of the .npy file.
+    mmap_mode : str, optional
+        Memory-map mode of the matrix; None loads it into memory.
+
+    Returns
+    -------
+    tuple
+        The matrix and the list of column names.
+    """
+    with open(_columns_file(input_file), 'r', encoding='utf-8') as file:
+        columns = json.load(file)
+    return np.load(input_file, mmap_mode=mmap_mode), columns
+
+
+def top_k_by_target(corr, columns, target, k=10):
+    """
+    Selects the features most correlated with a target.
+
+    Parameters
+    ----------
+    corr : np.ndarray
+        The correlation matrix.
+    columns : list of str
+        Names of its rows and columns.
+    target : str
+        Name of the target column.
+    k : int
+        Number of features selected, including the target.
+
+    Returns
+    -------
+    list of int
+        Indices of the selected features by decreasing correlation with
+        the target, the target first.
+
+    Raises
+    ------
+    ValueError
+        If the target is not a column.
+    """
+    columns = list(columns)
+    if target not in columns:
+        raise ValueError(f"Column '{target}' is not in the matrix.")
+    correlations = np.nan_to_num(np.asarray(corr[columns.index(target)],
+                                            dtype=np.float64), nan=-np.inf)
+    order = np.argsort(-correlations, kind='stable')
+    return order[:k].tolist()
+
+
+def cluster_representatives(corr, k=50):
+    """
+    Selects one feature per cluster of a hierarchical clustering of the
+    features on the distance 1 - |correlation|.
+
+    Parameters
+    ----------
+    corr : np.ndarray
+        The correlation matrix.
+    k : int
+        Number of clusters, i.e. of selected features.
+
+    Returns
+    -------
+    list of int
+        Indices of the selected features in dendrogram order. The
+        representative of a cluster is its feature with the highest
+        mean |correlation| with the other features of the cluster.
+    """
+    n_features = corr.shape[0]
+    if n_features <= k:
+        return list(range(n_features))
+    distance = 1 - np.abs(np.nan_to_num(np.asarray(corr, dtype=np.float64)))
+    distance = (distance + distance.T) / 2
+    np.fill_diagonal(distance, 0)
+    tree = linkage(squareform(np.clip(distance, 0, None), checks=False),
+                   method='average')
+    labels = fcluster(tree, t=k, criterion='maxclust')
+    position = np.empty(n_features, dtype=int)
+    position[leaves_list(tree)] = np.arange(n_features)
+
+    representatives = []
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        strength = (1 - distance[np.ix_(members, members)]).mean(axis=1)
+        representatives.append(members[np.argmax(strength)])
+    return sorted(representatives, key=lambda index: position[index])
+
+
+def main():
+    """
+    Parses command-line arguments, computes the correlation matrix of
+    the numeric columns of a CSV file block by block and saves it.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compute a blockwise float32 correlation matrix."
+    )
+    parser.add_argument("input_file", type=str,
+                        help="Path to the input CSV file, a directory of "
+                        "partitions or a glob pattern.")
+    parser.add_argument("output_file", type=str,
+                        help="Path of the .npy file to save the matrix in.")
+    parser.add_argument("--block_size", type=int, default=BLOCK_SIZE,
+                        help="Number of columns per block.")
+
+    args = parser.parse_args()
+
+    try:
+        columns = infer_columns(args.input_file, include='number')
+        data = load_data(args.input_file, columns=columns)
+        corr = blockwise_correlation(data, args.block_size,
+                                     args.output_file)
+        save_correlation(corr, data.columns, args.output_file)
+        print(f"Saved the {len(columns)}x{len(columns)} correlation matrix "
+              f"to {args.output_file}")
+    except FileNotFoundError:
+        print(f"Error: The file '{args.input_file}' was not found.")
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+This module provides bootstrap confidence intervals for the MSE and R²
+of regression models and for the differences between models, computed
+from predictions that were already made.
+
+The test rows are resampled with replacement many times. Replicates are
+drawn in blocks as a matrix of row indices (one row per replicate) and
+every model is evaluated on the whole block with vectorized NumPy
+operations, so no model is called again and no Python loop runs per
+replicate. The block size is chosen so that the index matrix and its
+gathered values stay within a memory budget, whatever the size of the
+test set. All models are evaluated on the same replicates, which makes
+the intervals of their differences paired.
+
+Functions:
+- iter_bootstrap_indices: Draws bootstrap index matrices block by block.
+- bootstrap_replicates: Computes the MSE and R² of every model on every
+  replicate.
+- bootstrap_confidence_intervals: Computes intervals of the metrics of
+  each model.
+- bootstrap_pairwise_differences: Computes intervals of the metric
+  differences between each pair of models.
+- save_bootstrap_intervals: Computes both kinds of intervals and saves
+  them as CSV files.
+- main: Parses command-line arguments and computes intervals from saved
+  prediction files.
+"""
+
+import argparse
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+# Memory budget of one block of replicates
+MAX_BLOCK_BYTES = 64 * 1024 ** 2
+
+METRICS = ('MSE', 'R2-Score')
+
+
+def iter_bootstrap_indices(n_samples, n_replicates, random_state=42,
+                           max_block_bytes=MAX_BLOCK_BYTES):
+    """
+    Draws bootstrap index matrices block by block.
+
+    Parameters
+    ----------
+    n_samples : int
+        Number of rows to resample.
+    n_replicates : int
+        Total number of replicates.
+    random_state : int
+        Seed of the random generator.
+    max_block_bytes : int
+        Memory budget of one block, counting the index matrix and the
+        two float64 matrices of gathered values that
+        bootstrap_replicates holds at a time.
+
+    Yields
+    ------
+    np.ndarray
+        Index matrix of shape (block size, n_samples).
+    """
+    rng = np.random.default_rng(random_state)
+    dtype = np.int32 if n_samples < np.iinfo(np.int32).max else np.int64
+    bytes_per_replicate = n_samples * (np.dtype(dtype).itemsize + 2 * 8)
+    block_size = max(1, min(n_replicates,
+                            max_block_bytes // bytes_per_replicate))
+    for start in range(0, n_replicates, block_size):
+        size = min(block_size, n_replicates - start)
+        yield rng.integers(0, n_samples, size=(size, n_samples), dtype=dtype)
+
+
+def bootstrap_replicates(y_true, predictions, n_replicates=1000,
+                         random_state=42, max_block_bytes=MAX_BLOCK_BYTES):
+    """
+    Computes the MSE and R² of every model on every replicate.
+
+    Parameters
+    ----------
+    y_true : np.ndarray
+        True values of the test set.
+    predictions : dict
+        Dictionary with model names as keys and their predictions for
+        the test set as values.
+    n_replicates : int
+        Number of bootstrap replicates.
+    random_state : int
+        Seed of the random generator.
+    max_block_bytes : int
+        Memory budget of one block of replicates.
+
+    Returns
+    -------
+    dict
+        Dictionary with metric names ('MSE', 'R2-Score') as keys and
+        arrays of shape (n_models, n_replicates) as values, with the
+        models in the order of predictions.
+
+    Raises
+    ------
+    ValueError
+        If there are no predictions, or their lengths do not match
+        y_true.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64).ravel()
+    if y_true.size == 0 or not predictions:
+        raise ValueError("y_true and predictions must not be empty.")
+    errors = []
+    for name, y_pred in predictions.items():
+        y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+        if y_pred.shape != y_true.shape:
+            raise ValueError(f"The predictions of '{name}' do not match "
+                             "the number of true values.")
+        errors.append((y_true - y_pred) ** 2)
+
+    n_samples = y_true.size
+    # Center y once so that the total sum of squares of each replicate
+    # is computed from its sums without cancellation
+    centered = y_true - y_true.mean()
+    mse = np.empty((len(errors), n_replicates))
+    r2 = np.empty_like(mse)
+
+    start = 0
+    for indices in iter_bootstrap_indices(n_samples, n_replicates,
+                                          random_state, max_block_bytes):
+        stop = start + len(indices)
+        # The gathered targets are squared in place and stay alive
+        # next to one model's gathered errors at a time
+        values = centered[indices]
+        sums = values.sum(axis=1)
+        total = np.square(values, out=values).sum(axis=1) - \
+            sums ** 2 / n_samples
+        for row, error in enumerate(errors):
+            residual = error[indices].sum(axis=1)
+            mse[row, start:stop] = residual / n_samples
+            with np.errstate(divide='ignore', invalid='ignore'):
+                r2[row, start:stop] = 1 - residual / total
+        start = stop
+
+    return {'MSE': mse, 'R2-Score': r2}
+
+
+def _interval(replicates, confidence):
+    """Return the percentile interval of each row of replicates."""
+    alpha = (1 - confidence) / 2
+    return np.nanquantile(replicates, [alpha, 1 - alpha], axis=-1)
+
+
+def _point_metrics(y_true, y_pred):
+    """Return the MSE and R² of one model on the whole test set."""
+    y_true = np.asarray(y_true, dtype=np.float64).ravel()
+    residual = np.sum((y_true - np.asarray(y_pred, dtype=np.float64)
+                       .ravel()) ** 2)
+    total = np.sum((y_true - y_true.mean()) ** 2)
+    return {'MSE': residual / y_true.size,
+            'R2-Score': 1 - residual / total if total > 0 else np.nan}
+
+
+def bootstrap_confidence_intervals(y_true, predictions, replicates=None,
+                                   confidence=0.95, **kwargs):
+    """
+    Computes bootstrap confidence intervals of the metrics of each model.
+
+    Parameters
+    ----------
+    y_true : np.ndarray
+        True values of the test set.
+    predictions : dict
+        Dictionary with model names as keys and their predictions for
+        the test set as values.
+    replicates : dict, optional
+        Result of bootstrap_replicates; computed if None.
+    confidence : float
+        Confidence level of the percentile intervals.
+    **kwargs : dict
+        Arguments passed to bootstrap_replicates.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per model and metric with the columns Model, Metric,
+        Estimate, Lower and Upper.
+    """
+    if replicates is None:
+        replicates = bootstrap_replicates(y_true, predictions, **kwargs)
+    rows = []
+    for metric in METRICS:
+        lower, upper = _interval(replicates[metric], confidence)
+        for row, (name, y_pred) in enumerate(predictions.items()):
+            rows.append({'Model': name, 'Metric': metric,
+                         'Estimate': _point_metrics(y_true, y_pred)[metric],
+                         'Lower': lower[row], 'Upper': upper[row]})
+    return pd.DataFrame(rows)
+
+
+def bootstrap_pairwise_differences(y_true, predictions, replicates=None,
+                                   confidence=0.95, **kwargs):
+    """
+    Computes bootstrap confidence intervals of the metric differences
+    between each pair of models.
+
+    Parameters
+    ----------
+    y_true : np.ndarray
+        True values of the test set.
+    predictions : dict
+        Dictionary with model names as keys and their predictions for
+        the test set as values.
+    replicates : dict, optional
+        Result of bootstrap_replicates; computed if None.
+    confidence : float
+        Confidence level of the percentile intervals.
+    **kwargs : dict
+        Arguments passed to bootstrap_replicates.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per pair of models and metric with the columns Model A,
+        Model B, Metric, Difference (A minus B), Lower, Upper and
+        Significant (the interval excludes zero).
+    """
+    if replicates is None:
+        replicates = bootstrap_replicates(y_true, predictions, **kwargs)
+    names = list(predictions)
+    estimates = {name: _point_metrics(y_true, predictions[name])
+                 for name in names}
+    rows = []
+    for metric in METRICS:
+        for first, second in itertools.combinations(range(len(names)), 2):
+            lower, upper = _interval(replicates[metric][first] -
+                                     replicates[metric][second], confidence)
+            rows.append({
+                'Model A': names[first], 'Model B': names[second],
+                'Metric': metric,
+                'Difference': (estimates[names[first]][metric] -
+                               estimates[names[second]][metric]),
+                'Lower': lower, 'Upper': upper,
+                'Significant': bool(lower > 0 or upper < 0),
+            })
+    return pd.DataFrame(rows)
+
+
+def save_bootstrap_intervals(y_true, predictions, output_dir,
+                             n_replicates=1000, confidence=0.95,
+                             random_state=42):
+    """
+    Computes the intervals of the metrics and of their pairwise
+    differences and saves them as CSV files.
+
+    Parameters
+    ----------
+    y_true : np.ndarray
+        True values of the test set.
+    predictions : dict
+        Dictionary with model names as keys and their predictions for
+        the test set as values.
+    output_dir : str
+        Directory to save bootstrap_metrics.csv and
+        bootstrap_differences.csv in.
+    n_replicates : int
+        Number of bootstrap replicates.
+    confidence : float
+        Confidence level of the percentile intervals.
+    random_state : int
+        Seed of the random generator.
+
+    Returns
+    -------
+    tuple of pd.DataFrame
+        The metric intervals and the difference intervals.
+    """
+    replicates = bootstrap_replicates(y_true, predictions, n_replicates,
+                                      random_state)
+    intervals = bootstrap_confidence_intervals(
+        y_true, predictions, replicates, confidence)
+    differences = bootstrap_pairwise_differences(
+        y_true, predictions, replicates, confidence)
+    os.makedirs(output_dir, exist_ok=True)
+    intervals.to_csv(os.path.join(output_dir, 'bootstrap_metrics.csv'),
+                     index=False)
+    differences.to_csv(os.path.join(output_dir,
+                                    'bootstrap_differences.csv'),
+                       index=False)
+    return intervals, differences
+
+
+def main():
+    """
+    Parses command-line arguments and computes bootstrap intervals from
+    prediction files written by model_evaluation (Predicted,Actual).
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compute bootstrap confidence intervals of MSE and "
+        "R2 from saved predictions."
+    )
+    parser.add_argument("files", type=str, nargs='+',
+                        help="Prediction files with the columns Predicted "
+                        "and Actual, one per model.")
+    parser.add_argument("output_dir", type=str,
+                        help="Directory to save the intervals in.")
+    parser.add_argument("--n_replicates", type=int, default=1000,
+                        help="Number of bootstrap replicates.")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="Confidence level of the intervals.")
+
+    args = parser.parse_args()
+
+    try:
+        predictions = {}
+        y_true = None
+        for path in args.files:
+            table = pd.read_csv(path)
+            name = os.path.splitext(os.path.basename(path))[0]
+            predictions[name] = table['Predicted'].to_numpy()
+            if y_true is None:
+                y_true = table['Actual'].to_numpy()
+        intervals, differences = save_bootstrap_intervals(
+            y_true, predictions, args.output_dir, args.n_replicates,
+            args.confidence)
+        print(intervals)
+        print(differences)
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+    except (KeyError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+This module provides the detection of equivalent hyperparameter
+candidates of scikit-learn tree models (decision trees, random forests
+and extra trees), so that a search fits each distinct model once and
+reuses its result for the equivalent candidates.
+
+Two rules are used:
+
+- Provable: a tree node is only split if it holds at least
+  min_samples_split samples and at least 2 * min_samples_leaf samples,
+  so candidates with the same max(min_samples_split,
+  2 * min_samples_leaf), e.g. min_samples_split 2 and 5 with
+  min_samples_leaf 4, grow the same trees.
+- Empirical: a fitted tree whose realized depth r is below its
+  max_depth was never limited by it, so any max_depth of at least r
+  (e.g. None, 20 and 30 on this data) grows the same tree. The largest
+  max_depth of a group is fitted first and the smaller ones are only
+  fitted if they are below the realized depth. With an unset
+  random_state the reused fit differs from a refit only by its random
+  draw.
+
+Functions:
+- supports_deduplication: Tells whether an estimator's candidates can
+  be deduplicated.
+- equivalence_key: Computes the key of a candidate without max_depth
+  and its max_depth.
+- realized_depth: Returns the depth of a fitted tree model.
+- plan_rounds: Groups candidates into the fits needed when depths are
+  unknown.
+- main: Parses command-line arguments and reports how a parameter grid
+  collapses under the provable rule.
+"""
+
+import argparse
+import json
+import numbers
+
+import joblib
+import numpy as np
+from sklearn.ensemble import BaseEnsemble
+from sklearn.model_selection import ParameterGrid
+from sklearn.pipeline import Pipeline
+from sklearn.tree import BaseDecisionTree
+
+
+def _final_step(estimator):
+    """Return the last step of a pipeline, or the estimator itself."""
+    return estimator.steps[-1][1] if isinstance(estimator,
+                                                Pipeline) else estimator
+
+
+def supports_deduplication(estimator):
+    """
+    Tells whether an estimator's candidates can be deduplicated.
+
+    Parameters
+    ----------
+    estimator : object
+        The estimator to tune.
+
+    Returns
+    -------
+    bool
+        True for scikit-learn trees and forests of trees, also as the
+        last step of a pipeline.
+    """
+    model = _final_step(estimator)
+    if isinstance(model, BaseDecisionTree):
+        return True
+    return (isinstance(model, BaseEnsemble)
+            and isinstance(getattr(model, 'estimator', None),
+                           BaseDecisionTree)
+            and 'max_depth' in model.get_params(deep=False))
+
+
+def _is_count(value):
+    """Tell whether a parameter value is an absolute count."""
+    return isinstance(value, numbers.Integral) and not isinstance(value,
+                                                                  bool)
+
+
+def equivalence_key(estimator, params):
+    """
+    Computes the key of a candidate without its max_depth, with
+    min_samples_split replaced by the effective minimum node size, and
+    its max_depth.
+
+    Parameters
+    ----------
+    estimator : object
+        The estimator to tune.
+    params : dict
+        The candidate's parameters.
+
+    Returns
+    -------
+    key : str
+        Candidates with equal keys differ at most in max_depth.
+    depth : float
+        The candidate's max_depth, inf for None.
+    """
+    prefix = ''
+    if isinstance(estimator, Pipeline):
+        prefix = estimator.steps[-1][0] + '__'
+    merged = {**estimator.get_params(), **params}
+    split_name = prefix + 'min_samples_split'
+    leaf_name = prefix + 'min_samples_leaf'
+    depth_name = prefix + 'max_depth'
+    canonical = {name: value for name, value in params.items()
+                 if name != depth_name}
+    split, leaf = merged.get(split_name), merged.get(leaf_name)
+    if _is_count(split) and _is_count(leaf):
+        canonical[split_name] = max(split, 2 * leaf)
+        canonical[leaf_name] = leaf
+    depth = merged.get(depth_name)
+    key = joblib.hash(json.dumps(canonical, sort_keys=True, default=repr))
+    return key, np.inf if depth is None else float(depth)
+
+
+def realized_depth(model):
+    """
+    Returns the depth of a fitted tree model.
+
+    Parameters
+    ----------
+    model : object
+        A fitted tree, forest of trees or pipeline ending in one.
+
+    Returns
+    -------
+    int or None
+        The depth of the tree, the largest depth of a forest's trees,
+        or None for other models.
+    """
+    model = _final_step(model)
+    if isinstance(model, BaseDecisionTree):
+        return int(model.get_depth())
+    trees = getattr(model, 'estimators_', None)
+    if trees is not None and all(isinstance(tree, BaseDecisionTree)
+                                 for tree in trees):
+        return max(int(tree.get_depth()) for tree in trees)
+    return None
+
+
+def plan_rounds(keys):
+    """
+    Groups candidates by key and orders each group by decreasing
+    max_depth, the order in which they have to be fitted.
+
+    Parameters
+    ----------
+    keys : list of tuple
+        The equivalence_key of every candidate.
+
+    Returns
+    -------
+    dict
+        Key as keys and, as values, lists of (depth, candidate indices)
+        by decreasing depth; candidates with equal key and depth are
+        provably equivalent.
+    """
+    groups = {}
+    for index, (key, depth) in enumerate(keys):
+        groups.setdefault(key, {}).setdefault(depth, []).append(index)
+    return {key: sorted(depths.items(), key=lambda item: -item[0])
+            for key, depths in groups.items()}
+
+
+def main():
+    """
+    Parses command-line arguments and reports how many distinct
+    DecisionTree models a JSON parameter grid holds under the provable
+    rule; max_depth values can only be merged after fitting.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Report the equivalent candidates of a tree grid."
+    )
+    parser.add_argument("param_grid", type=str,
+                        help="Parameter grid as JSON, e.g. "
+                        "'{\"min_samples_split\": [2, 5, 10], "
+                        "\"min_samples_leaf\": [1, 2, 4]}'.")
+
+    args = parser.parse_args()
+
+    # pylint: disable=import-outside-toplevel
+    from sklearn.tree import DecisionTreeRegressor
+    try:
+        grid = json.loads(args.param_grid)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return
+    candidates = list(ParameterGrid(grid))
+    keys = [equivalence_key(DecisionTreeRegressor(), params)
+            for params in candidates]
+    n_distinct = len(set(keys))
+    print(f"{len(candidates)} candidates, {n_distinct} distinct before "
+          f"fitting; {len(candidates) - n_distinct} fits saved by the "
+          "min_samples_split rule.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+This module provides the statistics of racing hyperparameter candidates:
+evaluating the folds of a cross-validated search one at a time and
+eliminating candidates as soon as they are statistically worse than the
+current leader, so that no more folds are spent on them.
+
+Candidates are compared on the squared errors of the same test rows, so
+the comparison is paired and works after a single fold: the difference
+of the summed squared errors of a candidate and the leader over the
+folds both completed, divided by its standard error (from the variance
+of the per-row differences within each fold), is a z statistic. A
+candidate is eliminated when it exceeds the one-sided normal quantile
+of the significance level. The leader is the candidate with the lowest
+mean squared error over those folds; a reference, the out-of-fold
+errors of the best model tuned before, competes as well, so a whole
+model is dropped once all its candidates are worse than another model.
+
+Only the squared errors of candidates still in the race are kept, one
+float32 value per test row and fold.
+
+Classes:
+- CandidateRace: Squared errors and eliminations of a racing search.
+
+Functions:
+- paired_z_statistic: Computes the paired z statistic of two
+  candidates.
+- main: Parses command-line arguments and summarizes the eliminations
+  of a racing search.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+# One-sided significance level of an elimination
+RACING_ALPHA = 0.01
+
+# Key of the reference in a race
+REFERENCE = 'reference'
+
+
+def paired_z_statistic(errors, leader_errors):
+    """
+    Computes the paired z statistic of the difference of the squared
+    errors of a candidate and the leader.
+
+    Parameters
+    ----------
+    errors : list of np.ndarray
+        Squared errors of the candidate on the test rows of each fold.
+    leader_errors : list of np.ndarray
+        Squared errors of the leader on the same rows.
+
+    Returns
+    -------
+    float
+        The z statistic; positive if the candidate has the larger
+        errors, and very large if it is worse on every row by the
+        same amount.
+    """
+    total = 0.0
+    variance = 0.0
+    for fold_errors, fold_leader_errors in zip(errors, leader_errors):
+        difference = (np.asarray(fold_errors, dtype=np.float64) -
+                      np.asarray(fold_leader_errors, dtype=np.float64))
+        total += difference.sum()
+        if len(difference) > 1:
+            variance += len(difference) * difference.var(ddof=1)
+    if variance == 0:
+        return float(np.sign(total) * np.inf) if total else 0.0
+    return float(total / np.sqrt(variance))
+
+
+class CandidateRace:
+    """
+    Squared errors and eliminations of a racing search.
+
+    Parameters
+    ----------
+    folds : list of tuple
+        Training and test row positions of each fold.
+    alpha : float
+        One-sided significance level of an elimination.
+    reference : np.ndarray, optional
+        Out-of-fold squared errors of another model on every row, e.g.
+        the best model tuned before; it competes for the lead but is
+        never eliminated.
+    """
+
+    def __init__(self, folds, alpha=RACING_ALPHA, reference=None):
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be between 0 and 1.")
+        self.folds = folds
+        self.alpha = alpha
+        self.threshold = norm.ppf(1 - alpha)
+        self.errors = {}
+        self.eliminated = set()
+        if reference is not None:
+            reference = np.asarray(reference, dtype=np.float32)
+            self.errors[REFERENCE] = [reference[test_index]
+                                      for _, test_index in folds]
+
+    def add(self, index, fold, errors):
+        """
+        Record the squared errors of a candidate on a fold.
+
+        Parameters
+        ----------
+        index : int
+            Index of the candidate.
+        fold : int
+            Index of the fold; the folds of a candidate are added in
+            order.
+        errors : np.ndarray or None
+            Squared errors on the fold's test rows, or None if they are
+            not known (e.g. a result resumed from a checkpoint); such a
+            candidate is never eliminated and never leads.
+        """
+        if errors is None:
+            self.errors[index] = None
+        elif self.errors.get(index, []) is not None:
+            fold_errors = self.errors.setdefault(index, [])
+            if len(fold_errors) == fold:
+                fold_errors.append(np.asarray(errors, dtype=np.float32))
+
+    def leader(self, n_folds):
+        """
+        Return the key of the candidate, or the reference, with the
+        lowest mean squared error on the first n_folds folds, among
+        those with known errors on all of them.
+        """
+        best_key, best_error = None, np.inf
+        for key, fold_errors in self.errors.items():
+            if fold_errors is None or len(fold_errors) < n_folds:
+                continue
+            error = sum(float(errors.sum(dtype=np.float64))
+                        for errors in fold_errors[:n_folds])
+            if error < best_error:
+                best_key, best_error = key, error
+        return best_key
+
+    def eliminate(self, n_folds):
+        """
+        Eliminate the candidates that completed n_folds folds and are
+        statistically worse than the leader on them.
+
+        Parameters
+        ----------
+        n_folds : int
+            Number of folds completed by the candidates to test.
+
+        Returns
+        -------
+        list of int
+            Indices of the newly eliminated candidates.
+        """
+        leader = self.leader(n_folds)
+        if leader is None:
+            return []
+        leader_errors = self.errors[leader][:n_folds]
+        eliminated = []
+        for key, fold_errors in list(self.errors.items()):
+            if (key in (leader, REFERENCE) or fold_errors is None
+                    or len(fold_errors) != n_folds):
+                continue
+            if paired_z_statistic(fold_errors,
+                                  leader_errors) > self.threshold:
+                eliminated.append(key)
+                self.eliminated.add(key)
+                del self.errors[key]
+        return sorted(eliminated)
+
+    def is_alive(self, index):
+        """Tell whether a candidate is still in the race."""
+        return index not in self.eliminated
+
+    def out_of_fold_errors(self, index, n_samples):
+        """
+        Return the out-of-fold squared errors of a candidate on every
+        row, or None if they are not known for all folds.
+
+        Parameters
+        ----------
+        index : int
+            Index of the candidate.
+        n_samples : int
+            Number of rows of the searched data.
+
+        Returns
+        -------
+        np.ndarray or None
+            Squared errors in row order.
+        """
+        fold_errors = self.errors.get(index)
+        if fold_errors is None or len(fold_errors) < len(self.folds):
+            return None
+        errors = np.empty(n_samples, dtype=np.float32)
+        for (_, test_index), values in zip(self.folds, fold_errors):
+            errors[test_index] = values
+        return errors
+
+
+def main():
+    """
+    Parses command-line arguments and summarizes, for every model of the
+    tuning performance table of a racing search, how many candidates
+    were eliminated after each fold and how many fits that saved.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Summarize the eliminations of a racing search."
+    )
+    parser.add_argument("performance_file", type=str,
+                        help="Path to tuning_performance.csv.")
+
+    args = parser.parse_args()
+
+    try:
+        table = pd.read_csv(args.performance_file)
+    except FileNotFoundError:
+        print(f"Error: The file '{args.performance_file}' was not found.")
+        return
+    if 'n_folds_evaluated' not in table.columns:
+        print("Error: The table does not come from a racing search.")
+        return
+    n_folds = sum(column.startswith('split') and
+                  column.endswith('_test_score') for column in table.columns)
+    for model, group in table.groupby('model', sort=False):
+        evaluated = group['n_folds_evaluated'].to_numpy()
+        eliminated = ', '.join(
+            f"{int(np.sum(evaluated == fold))} after fold {fold}"
+            for fold in range(1, n_folds) if np.any(evaluated == fold))
+        print(f"{model}: {len(group)} candidates, eliminated "
+              f"{eliminated or 'none'}; "
+              f"{len(group) * n_folds - int(evaluated.sum())} fits saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,633 @@
+"""
+This module provides a cross-validated search over a grid of
+hyperparameter candidates, with the same results interface as
+scikit-learn's GridSearchCV (best_estimator_, best_params_,
+best_score_ and cv_results_) and negative mean squared error scoring.
+Besides fit and score times, cv_results_ records the peak memory of
+each candidate: the growth of the process's peak resident set size
+while it is fitted and scored, which includes the buffers of native
+libraries such as LightGBM and XGBoost. It relies on resetting the peak
+through /proc and is NaN on platforms without it. Candidates fitted in
+parallel threads of one process share the measurement. As in
+GridSearchCV, a candidate that fails on a fold is scored NaN there with
+a FitFailedWarning, and the search only fails if all candidates do.
+
+The search runs fold by fold and delegates the evaluation of all
+candidates on one fold to a single method, so that subclasses can
+share expensive per-fold work (such as building a binned dataset)
+across candidates. With a checkpoint (see tuning_checkpoint), every
+(candidate, fold) result is saved as soon as it is known and results
+saved by an earlier, interrupted run are not computed again. With a
+time budget, the search is anytime: candidates are evaluated in batches
+in an order that covers the space evenly, and the search stops between
+batches when the budget is spent, keeping the best candidate so far.
+With racing, candidates statistically worse than the leader after a
+fold are not evaluated on the remaining folds (see candidate_racing).
+With deduplication, candidates of tree models that grow the same trees
+as another candidate reuse its result instead of being fitted again
+(see candidate_equivalence).
+
+Functions:
+- prioritize_candidates: Orders candidates to cover the space evenly.
+- failed_result: Warns that a candidate failed and returns its NaN
+  result.
+- out_of_fold_errors: Computes the out-of-fold squared errors of one
+  candidate on the folds of a search.
+
+Classes:
+- CandidateSearchCV: Cross-validated search over candidate parameters.
+"""
+
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.exceptions import FitFailedWarning
+from sklearn.model_selection import KFold, ParameterGrid
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.candidate_equivalence import (  # noqa: E402
+    equivalence_key, plan_rounds, realized_depth, supports_deduplication
+)
+from modules.candidate_racing import (  # noqa: E402
+    RACING_ALPHA, CandidateRace
+)
+# pylint: enable=wrong-import-position, import-error
+
+
+def _take(data, indices):
+    """Select rows of an array or DataFrame by position."""
+    return data.iloc[indices] if hasattr(data, 'iloc') else data[indices]
+
+
+def prioritize_candidates(candidates):
+    """
+    Orders candidates so that any prefix of the order covers the
+    parameter space evenly.
+
+    Every parameter value is placed at its relative position in the
+    list of values of the parameter (in the order of the grid). The
+    first candidate is the one nearest to the middle of the space, and
+    each next one is the candidate farthest from all candidates already
+    chosen (greedy maximin), so that a search stopped early has
+    sampled the whole space coarsely rather than one corner of it
+    finely.
+
+    Parameters
+    ----------
+    candidates : list of dict
+        The candidate parameter dictionaries.
+
+    Returns
+    -------
+    list of dict
+        The candidates in priority order; ties keep the grid order.
+    """
+    if len(candidates) < 3:
+        return list(candidates)
+    names = sorted({name for params in candidates for name in params})
+    positions = np.zeros((len(candidates), len(names)))
+    for column, name in enumerate(names):
+        values = []
+        for params in candidates:
+            value = repr(params.get(name))
+            if value not in values:
+                values.append(value)
+        if len(values) > 1:
+            positions[:, column] = [
+                values.index(repr(params.get(name))) / (len(values) - 1)
+                for params in candidates]
+
+    distance = np.linalg.norm(positions - 0.5, axis=1)
+    order = [int(np.argmin(distance))]
+    nearest = np.linalg.norm(positions - positions[order[0]], axis=1)
+    nearest[order[0]] = -1
+    while len(order) < len(candidates):
+        index = int(np.argmax(nearest))
+        order.append(index)
+        nearest = np.minimum(nearest, np.linalg.norm(
+            positions - positions[index], axis=1))
+        nearest[order] = -1
+    return [candidates[index] for index in order]
+
+
+def _read_memory_status():
+    """Return the current and peak resident set size in bytes."""
+    sizes = {}
+    with open('/proc/self/status', 'r', encoding='utf-8') as file:
+        for line in file:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmHWM'):
+                sizes[key] = int(value.split()[0]) * 1024
+    return sizes['VmRSS'], sizes['VmHWM']
+
+
+def start_memory_trace():
+    """
+    Reset the peak resident set size of the process.
+
+    Returns
+    -------
+    int or None
+        The resident set size at start, to pass to stop_memory_trace,
+        or None if the peak cannot be reset on this platform.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='utf-8') as file:
+            file.write('5')
+        return _read_memory_status()[0]
+    except OSError:
+        return None
+
+
+def stop_memory_trace(baseline):
+    """
+    Return the peak memory used above the baseline since
+    start_memory_trace, in bytes, or NaN if it cannot be measured.
+    """
+    if baseline is None:
+        return np.nan
+    return max(_read_memory_status()[1] - baseline, 0)
+
+
+def _fit_and_score(estimator, params, x_train, y_train, x_test, y_test,
+                   fit_params, return_errors=False, return_depth=False):
+    """
+    Fit one candidate on one fold and return its negative MSE together
+    with the fit and score times and the peak memory, followed by the
+    squared error of every test row if return_errors is True and by the
+    realized depth of the fitted trees if return_depth is True.
+
+    Like GridSearchCV with error_score=np.nan, a candidate that fails to
+    fit or predict gets NaN measures (and no errors or depth) and a
+    FitFailedWarning instead of failing the search.
+    """
+    baseline = start_memory_trace()
+    try:
+        model = clone(estimator).set_params(**params)
+        start = time.perf_counter()
+        model.fit(x_train, y_train, **fit_params)
+        fit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        predictions = np.asarray(model.predict(x_test), dtype=np.float64)
+        errors = (np.asarray(y_test, dtype=np.float64) - predictions) ** 2
+        score = -np.mean(errors)
+        score_time = time.perf_counter() - start
+    except Exception as exc:  # pylint: disable=broad-except
+        stop_memory_trace(baseline)
+        return failed_result(params, exc, return_errors, return_depth)
+    peak_memory = stop_memory_trace(baseline)
+
+    result = (score, fit_time, score_time, peak_memory)
+    if return_errors:
+        result += (errors,)
+    if return_depth:
+        result += (realized_depth(model),)
+    return result
+
+
+def failed_result(params, exc, return_errors=False, return_depth=False):
+    """
+    Warn that a candidate failed on a fold and return its NaN result,
+    in the layout of _fit_and_score.
+    """
+    warnings.warn(f"Candidate {params} failed and is scored NaN: "
+                  f"{type(exc).__name__}: {exc}", FitFailedWarning)
+    result = (np.nan, np.nan, np.nan, np.nan)
+    if return_errors:
+        result += (None,)
+    if return_depth:
+        result += (None,)
+    return result
+
+
+def out_of_fold_errors(estimator, params, x, y, cv=3, fit_params=None):
+    """
+    Computes the out-of-fold squared errors of one candidate on the
+    folds of a search, e.g. to race against a model whose search was
+    restored from a checkpoint.
+
+    Parameters
+    ----------
+    estimator : object
+        The scikit-learn estimator.
+    params : dict
+        The candidate's parameters.
+    x : pd.DataFrame or np.ndarray
+        Training data features.
+    y : pd.Series or np.ndarray
+        Training data labels.
+    cv : int
+        Number of folds.
+    fit_params : dict, optional
+        Extra keyword arguments passed to the fit method.
+
+    Returns
+    -------
+    np.ndarray
+        Squared errors in row order.
+    """
+    errors = np.empty(len(y), dtype=np.float32)
+    for train_index, test_index in KFold(n_splits=cv).split(x):
+        errors[test_index] = _fit_and_score(
+            estimator, params, _take(x, train_index), _take(y, train_index),
+            _take(x, test_index), _take(y, test_index), fit_params or {},
+            return_errors=True)[4]
+    return errors
+
+
+class CandidateSearchCV:
+    """
+    Cross-validated search over candidate parameters.
+
+    Parameters
+    ----------
+    estimator : object
+        The scikit-learn estimator to tune.
+    param_grid : dict
+        Dictionary with parameter names (str) as keys and
+        lists of parameter settings to try as values.
+    cv : int
+        Number of folds.
+    n_jobs : int
+        Number of jobs fitting candidates in parallel.
+    verbose : int
+        Print one line per fitted candidate and fold if above 1.
+    checkpoint : SearchCheckpoint, optional
+        Checkpoint to save every (candidate, fold) result to and to
+        resume from.
+    time_budget : float, optional
+        Wall-clock seconds after which no new batch of candidates is
+        started; the best candidate is still refitted. If None, every
+        candidate is evaluated.
+    batch_size : int, optional
+        Number of candidates evaluated on all folds between two checks
+        of the time budget; the number of parallel jobs, at least 4, by
+        default.
+    racing : bool
+        Whether to evaluate the folds one at a time and stop evaluating
+        candidates that are statistically worse than the leader (see
+        candidate_racing).
+    racing_alpha : float
+        One-sided significance level of an elimination.
+    race_reference : np.ndarray, optional
+        Out-of-fold squared errors of another model on every row of the
+        searched data, e.g. the best model tuned before; if all
+        candidates are worse than it, the whole search is dropped.
+    deduplicate : bool
+        Whether to fit candidates of tree models that grow the same
+        trees as another candidate only once per fold and reuse the
+        result (see candidate_equivalence).
+    """
+
+    def __init__(self, estimator, param_grid, cv=3, n_jobs=None,
+                 verbose=0, checkpoint=None, time_budget=None,
+                 batch_size=None, racing=False, racing_alpha=RACING_ALPHA,
+                 race_reference=None, deduplicate=False):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+        self.checkpoint = checkpoint
+        self.time_budget = time_budget
+        self.batch_size = batch_size
+        self.racing = racing
+        self.racing_alpha = racing_alpha
+        self.race_reference = race_reference
+        self.deduplicate = deduplicate
+
+    def _candidates(self):
+        """Return the list of candidate parameter dictionaries."""
+        return list(ParameterGrid(self.param_grid))
+
+    def _evaluate_fold(self, candidates, x, y, train_index, test_index,
+                       fit_params):
+        """
+        Evaluate all candidates on one fold.
+
+        Returns
+        -------
+        iterable of tuple
+            Score, fit time, score time and peak memory of each
+            candidate, in order, each yielded as soon as it is known;
+            when racing, followed by the squared errors of the test
+            rows.
+        """
+        x_train, x_test = _take(x, train_index), _take(x, test_index)
+        y_train, y_test = _take(y, train_index), _take(y, test_index)
+        data = (x_train, y_train, x_test, y_test, fit_params)
+        if self.deduplicate and supports_deduplication(self.estimator):
+            return self._evaluate_equivalent(candidates, data)
+        return Parallel(n_jobs=self.n_jobs, return_as='generator')(
+            delayed(_fit_and_score)(self.estimator, params, *data,
+                                    self.racing)
+            for params in candidates
+        )
+
+    def _evaluate_equivalent(self, candidates, data):
+        """
+        Evaluate the candidates of a tree model on one fold, fitting
+        equivalent candidates once.
+
+        Candidates that only differ in max_depth are fitted in rounds
+        from the largest max_depth down; after each round, the smaller
+        max_depth values that are still at least the realized depth of
+        the fitted trees reuse its result, and only the others are
+        fitted in the next round.
+
+        Yields
+        ------
+        tuple
+            The result of each candidate, in order, as soon as it and
+            all candidates before it are known; reused results have
+            zero fit and score times and NaN peak memory, so the cost
+            of the search only counts the fits that ran.
+        """
+        groups = plan_rounds([equivalence_key(self.estimator, params)
+                              for params in candidates])
+        results = {}
+        n_yielded = 0
+        while groups:
+            fits = [(key, *levels[0]) for key, levels in groups.items()]
+            outputs = Parallel(n_jobs=self.n_jobs)(
+                delayed(_fit_and_score)(self.estimator, candidates[indices[0]],
+                                        *data, self.racing, True)
+                for _, _, indices in fits
+            )
+            for (key, max_depth, indices), output in zip(fits, outputs):
+                result, depth = output[:-1], output[-1]
+                levels = groups[key]
+                levels.pop(0)
+                if np.isnan(result[0]) and len(indices) > 1:
+                    # A failed fit says nothing about the others, e.g.
+                    # min_samples_split=1 keyed like 2: fit them again
+                    levels.insert(0, (max_depth, indices[1:]))
+                    indices = indices[:1]
+                elif depth is not None and depth < max_depth:
+                    while levels and levels[0][0] >= depth:
+                        indices = indices + levels.pop(0)[1]
+                # Reused results cost no fit, score or memory of their own
+                reused = (result[0], 0.0, 0.0, np.nan) + result[4:]
+                results[indices[0]] = result
+                for index in indices[1:]:
+                    results[index] = reused
+                self.n_reused_fits_ += len(indices) - 1
+                if not levels:
+                    del groups[key]
+            while n_yielded in results:
+                yield results.pop(n_yielded)
+                n_yielded += 1
+
+    def _resolve_fold(self, candidates, indices, x, y, fold, folds,
+                      fit_params):
+        """
+        Return the results of some candidates on one fold, loading the
+        ones saved in the checkpoint and evaluating (and saving) the
+        others.
+        """
+        results = {}
+        if self.checkpoint is not None:
+            for index in indices:
+                result = self.checkpoint.load_result(candidates[index], fold)
+                if result is not None:
+                    results[index] = result
+            if results and self.verbose > 0:
+                print(f"[CV {fold + 1}/{len(folds)}] Resumed "
+                      f"{len(results)} of {len(indices)} "
+                      "candidates from the checkpoint")
+        pending = [index for index in indices if index not in results]
+        if pending:
+            train_index, test_index = folds[fold]
+            evaluated = self._evaluate_fold(
+                [candidates[index] for index in pending], x, y,
+                train_index, test_index, fit_params)
+            for index, result in zip(pending, evaluated):
+                if self.checkpoint is not None:
+                    self.checkpoint.save_result(candidates[index], fold,
+                                                result[:4])
+                results[index] = result
+        return results
+
+    def fit(self, x, y, **fit_params):
+        """
+        Run the search and refit the best candidate on all data.
+
+        Without a time budget every candidate is evaluated. With one,
+        the candidates are evaluated in batches in the order of
+        prioritize_candidates, and no new batch is started once the
+        budget is spent or the next batch is expected to overrun it;
+        the first batch always runs. Only candidates evaluated on all
+        folds enter cv_results_, and coverage_ records how much of the
+        space was covered.
+
+        When racing, candidates eliminated after a fold keep NaN scores
+        on the remaining ones and rank after the survivors, and
+        oof_squared_errors_ holds the out-of-fold squared errors of the
+        best candidate (None if not known for every fold). eliminated_
+        tells whether every candidate lost to the race reference.
+
+        Parameters
+        ----------
+        x : pd.DataFrame or np.ndarray
+            Training data features.
+        y : pd.Series or np.ndarray
+            Training data labels.
+        **fit_params : dict
+            Extra keyword arguments passed to the fit method.
+
+        Returns
+        -------
+        CandidateSearchCV
+            The fitted search.
+        """
+        start_time = time.perf_counter()
+        candidates = self._candidates()
+        batch_size = len(candidates)
+        if self.time_budget is not None:
+            candidates = prioritize_candidates(candidates)
+            batch_size = self.batch_size or max(4,
+                                                effective_n_jobs(self.n_jobs))
+        return self._search(
+            x, y, fit_params, start_time, len(candidates), batch_size,
+            lambda evaluated, scores, size: candidates[
+                len(evaluated):len(evaluated) + size])
+
+    def _reset_search(self):
+        """Reset the state a subclass keeps during one search."""
+
+    def _prepare_folds(self, x, y, folds, fit_params):
+        """Prepare per-fold state shared by all candidates."""
+
+    def _refit(self, x, y, fit_params):
+        """Return the best candidate fitted on all data."""
+        model = clone(self.estimator).set_params(**self.best_params_)
+        return model.fit(x, y, **fit_params)
+
+    def _search(self, x, y, fit_params, start_time, n_candidates,
+                batch_size, propose):
+        """
+        Evaluate batches of candidates on all folds until n_candidates
+        were evaluated, the proposals run out or the time budget is
+        spent, then select and refit the best candidate.
+
+        Parameters
+        ----------
+        x, y, fit_params
+            The training data and extra fit arguments.
+        start_time : float
+            time.perf_counter() at the start of the search.
+        n_candidates : int
+            Size of the search space.
+        batch_size : int
+            Number of candidates evaluated per batch.
+        propose : callable
+            Called with the candidates evaluated so far, their fold
+            scores (NaN where not evaluated) and a number of candidates;
+            returns at most that many next candidates, or none when the
+            search is done.
+
+        Returns
+        -------
+        CandidateSearchCV
+            The fitted search.
+        """
+        self._reset_search()
+        self.n_reused_fits_ = 0
+        folds = list(KFold(n_splits=self.cv).split(x))
+        self._prepare_folds(x, y, folds, fit_params)
+        race = None
+        if self.racing:
+            race = CandidateRace(folds, self.racing_alpha,
+                                 self.race_reference)
+
+        candidates = []
+        # Scores, fit times, score times and peak memory per fold
+        measures = np.empty((4, 0, len(folds)))
+        batch_time = 0.0
+        while len(candidates) < n_candidates:
+            elapsed = time.perf_counter() - start_time
+            if (candidates and self.time_budget is not None
+                    and elapsed + batch_time > self.time_budget):
+                break
+            batch = propose(candidates, measures[0],
+                            min(batch_size, n_candidates - len(candidates)))
+            if not batch:
+                break
+            batch_start = time.perf_counter()
+            indices = range(len(candidates), len(candidates) + len(batch))
+            candidates.extend(batch)
+            measures = np.concatenate(
+                [measures, np.full((4, len(batch), len(folds)), np.nan)],
+                axis=1)
+            for fold in range(len(folds)):
+                # Eliminated candidates are not submitted again, so the
+                # workers go to the ones still in the race
+                alive = [index for index in indices
+                         if race is None or race.is_alive(index)]
+                if not alive:
+                    break
+                results = self._resolve_fold(candidates, alive, x, y,
+                                             fold, folds, fit_params)
+                for index in alive:
+                    measures[:, index, fold] = results[index][:4]
+                    if race is not None:
+                        race.add(index, fold, results[index][4]
+                                 if len(results[index]) > 4 else None)
+                    if self.verbose > 1:
+                        score, fit_time, score_time = results[index][:3]
+                        print(f"[CV {fold + 1}/{len(folds)}] END "
+                              f"{candidates[index]}; score={score:.3f} "
+                              f"total time={fit_time + score_time:.1f}s")
+                if race is not None:
+                    eliminated = race.eliminate(fold + 1)
+                    if eliminated and self.verbose > 0:
+                        print(f"[CV {fold + 1}/{len(folds)}] Eliminated "
+                              f"{len(eliminated)} of {len(alive)} "
+                              "candidates")
+            batch_time = time.perf_counter() - batch_start
+
+        n_evaluated = len(candidates)
+        self.coverage_ = {
+            'n_candidates': n_candidates,
+            'n_evaluated': n_evaluated,
+            'coverage': n_evaluated / n_candidates,
+            'search_time': time.perf_counter() - start_time,
+            'time_budget': self.time_budget,
+            'complete': n_evaluated == n_candidates,
+        }
+        if self.n_reused_fits_ and self.verbose > 0:
+            print(f"Reused the results of {self.n_reused_fits_} fits of "
+                  "equivalent candidates")
+        if not self.coverage_['complete'] and self.verbose > 0:
+            print(f"Time budget spent after {n_evaluated} of "
+                  f"{n_candidates} candidates")
+        n_folds_evaluated = np.sum(~np.isnan(measures[0]), axis=1)
+        if not n_folds_evaluated.any():
+            raise ValueError(f"All {len(candidates)} candidates failed "
+                             "to fit on every fold.")
+        self.cv_results_ = self._build_results(candidates, *measures)
+        if race is not None:
+            self.cv_results_['n_folds_evaluated'] = n_folds_evaluated
+        if self.deduplicate:
+            self.cv_results_['n_reused_folds'] = np.sum(measures[1] == 0,
+                                                        axis=1)
+        # Without survivors the search lost to the reference and its best
+        # candidate is the best over the folds evaluated the most
+        self.eliminated_ = bool(race is not None and
+                                n_folds_evaluated.max() < len(folds))
+        self.best_index_ = int(np.argmin(self.cv_results_['rank_test_score']))
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = self.cv_results_['mean_test_score'][
+            self.best_index_]
+        self.oof_squared_errors_ = None
+        if race is not None:
+            self.oof_squared_errors_ = race.out_of_fold_errors(
+                self.best_index_, len(y))
+            if self.eliminated_ and self.verbose > 0:
+                print("All candidates are worse than the reference")
+
+        self.best_estimator_ = self._refit(x, y, fit_params)
+        return self
+
+    @staticmethod
+    def _build_results(candidates, scores, fit_times, score_times,
+                       peak_memory):
+        """
+        Assemble a GridSearchCV-style cv_results_ dictionary; folds a
+        candidate was not evaluated on (NaN) are left out of its means,
+        and candidates evaluated on fewer folds rank after the others.
+        """
+        with warnings.catch_warnings():
+            # Candidates that failed on every fold have NaN means
+            warnings.simplefilter('ignore', RuntimeWarning)
+            results = {
+                'params': candidates,
+                'mean_fit_time': np.nanmean(fit_times, axis=1),
+                'std_fit_time': np.nanstd(fit_times, axis=1),
+                'mean_score_time': np.nanmean(score_times, axis=1),
+                'std_score_time': np.nanstd(score_times, axis=1),
+                'max_peak_memory': np.fmax.reduce(peak_memory, axis=1),
+                'mean_test_score': np.nanmean(scores, axis=1),
+                'std_test_score': np.nanstd(scores, axis=1),
+            }
+        names = sorted({name for params in candidates for name in params})
+        for name in names:
+            results[f'param_{name}'] = np.array(
+                [params.get(name) for params in candidates], dtype=object)
+        for fold in range(scores.shape[1]):
+            results[f'split{fold}_test_score'] = scores[:, fold]
+        n_folds = np.sum(~np.isnan(scores), axis=1)
+        order = np.lexsort((-results['mean_test_score'], -n_folds))
+        ranks = np.empty(len(candidates), dtype=np.int32)
+        ranks[order] = np.arange(1, len(candidates) + 1)
+        results['rank_test_score'] = ranks
+        return results
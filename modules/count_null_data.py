@@ -10,8 +10,17 @@ Functions:
 """
 
 import argparse
+import os
+import sys
 import pandas as pd
 
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
 
 def count_null_data(data):
     """
@@ -85,12 +94,14 @@ def main():
         description="Count the number of zero"
         "and NaN values in each column of a DataFrame."
     )
-    parser.add_argument("file", type=str, help="Path to the input CSV file.")
+    parser.add_argument("file", type=str,
+                        help="Path to the input CSV file, a directory "
+                        "of partitions or a glob pattern.")
     args = parser.parse_args()
 
     try:
         # Read the data from the CSV file
-        data = pd.read_csv(args.file)
+        data = load_data(args.file)
     except FileNotFoundError:
         print(f"Error: The file '{args.file}' was not found.")
         return
@@ -0,0 +1,91 @@
+"""
+This module provides content fingerprints of pandas DataFrames, used to
+tell whether the data behind a derived file (a rendered figure, a
+feature matrix store) changed since the file was written.
+
+The fingerprint is a SHA-256 hash over the column names, the dtypes, a
+version, extra parameters as sorted JSON and the row hashes of pandas'
+vectorized hash_pandas_object. The index is not part of it, so the same
+rows under a different index have the same fingerprint.
+
+Functions:
+- data_fingerprint: Computes the fingerprint of a DataFrame and
+  parameters.
+- main: Parses command-line arguments and prints the fingerprint of a
+  CSV file.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+
+def data_fingerprint(data, version=1, **params):
+    """
+    Computes the fingerprint of a DataFrame and parameters.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The data.
+    version : int
+        Version of the code that derives files from the data; bumping
+        it changes every fingerprint.
+    **params : dict
+        Parameters that change the derived file; they must be
+        JSON-serializable or have a stable str.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    header = {'version': version,
+              'columns': [str(column) for column in data.columns],
+              'dtypes': [str(dtype) for dtype in data.dtypes],
+              'params': params}
+    digest.update(json.dumps(header, sort_keys=True,
+                             default=str).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(data, index=False)
+                  .to_numpy().data)
+    return digest.hexdigest()
+
+
+def main():
+    """
+    Parses command-line arguments and prints the fingerprint of a CSV
+    file.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Print the fingerprint of a CSV file."
+    )
+    parser.add_argument("input_file", type=str,
+                        help="Path to the input CSV file.")
+
+    args = parser.parse_args()
+
+    try:
+        print(data_fingerprint(load_data(args.input_file)))
+    except FileNotFoundError:
+        print(f"Error: The file '{args.input_file}' was not found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,17 @@ Functions:
 """
 
 import argparse
+import os
+import sys
 import pandas as pd
 
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
 
 def delete_columns_with_zero_data(data: pd.DataFrame,
                                   threshold: int) -> pd.DataFrame:
@@ -93,7 +102,9 @@ def main() -> None:
         description="Delete columns from a DataFrame where"
         "zero values exceed a given threshold."
     )
-    parser.add_argument("file", type=str, help="Path to the input CSV file.")
+    parser.add_argument("file", type=str,
+                        help="Path to the input CSV file, a directory "
+                        "of partitions or a glob pattern.")
     parser.add_argument(
         "threshold", type=int,
         help="Threshold for the maximum allowed"
@@ -108,7 +119,7 @@ def main() -> None:
 
     try:
         # Read the data from the CSV file
-        data = pd.read_csv(args.file)
+        data = load_data(args.file)
     except FileNotFoundError:
         print(f"Error: The file '{args.file}' was not found.")
         return
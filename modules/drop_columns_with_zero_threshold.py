@@ -10,7 +10,15 @@ Functions:
 """
 
 import argparse
-import pandas as pd
+import os
+import sys
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
 
 
 def drop_columns_with_zero_threshold(data, threshold):
@@ -81,7 +89,9 @@ def main():
             "exceeds a given threshold."
         )
     )
-    parser.add_argument("file", type=str, help="Path to the input CSV file.")
+    parser.add_argument("file", type=str,
+                        help="Path to the input CSV file, a directory "
+                        "of partitions or a glob pattern.")
     parser.add_argument(
         "threshold", type=int,
         help="Threshold for the maximum allowed"
@@ -95,7 +105,7 @@ def main():
     args = parser.parse_args()
 
     # Read the data from the CSV file
-    data = pd.read_csv(args.file)
+    data = load_data(args.file)
 
     # Apply the column dropping based on zero values
     filtered_data = drop_columns_with_zero_threshold(data, args.threshold)
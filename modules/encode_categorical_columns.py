@@ -0,0 +1,285 @@
+"""
+This module provides functionality to encode categorical columns of a
+pandas DataFrame into compact integer codes and to reuse that encoding
+at scoring time.
+
+Functions:
+- encode_categorical_columns: Learns the levels of categorical columns and
+  replaces their values with integer codes.
+- apply_categorical_encoding: Applies a previously learned encoding to new
+  data.
+- save_encoding: Saves an encoding to a JSON file.
+- load_encoding: Loads an encoding from a JSON file.
+- categorical_feature_indices: Returns the positions of encoded columns
+  in a list of feature columns.
+- make_sparse_one_hot_encoder: Builds a transformer that expands encoded
+  columns into a sparse one-hot matrix for linear models.
+- main: Parses command-line arguments and encodes the categorical columns
+  of the input CSV file.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+# Label used for missing values, as in data/data_description.txt
+MISSING_LEVEL = 'NA'
+
+
+def _compact_code_dtype(n_levels):
+    """Return the smallest signed integer dtype that holds n_levels codes."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_levels <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def encode_categorical_columns(data, columns=None):
+    """
+    Learns the levels of categorical columns and
+    replaces their values with integer codes.
+
+    Missing values are treated as their own level
+    ('NA'), which matches the data description.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The input data as a pandas DataFrame.
+    columns : list, optional
+        The columns to encode. If None, every
+        non-numeric column is encoded.
+
+    Returns
+    -------
+    tuple
+        The encoded DataFrame and the encoding, a dictionary
+        mapping each column name to its ordered list of levels.
+
+    Raises
+    ------
+    TypeError
+        If input data is not a pandas DataFrame.
+    ValueError
+        If any column in columns is not in the DataFrame.
+    """
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError("Input data must be a pandas DataFrame.")
+
+    if columns is None:
+        columns = data.select_dtypes(exclude='number').columns.tolist()
+
+    encoding = {}
+    for column in columns:
+        if column not in data.columns:
+            raise ValueError(f"Column '{column}' is not in the DataFrame.")
+        values = data[column].astype(object).fillna(MISSING_LEVEL)
+        encoding[column] = sorted(str(value) for value in values.unique())
+
+    return apply_categorical_encoding(data, encoding), encoding
+
+
+def apply_categorical_encoding(data, encoding):
+    """
+    Applies a previously learned encoding to new data.
+
+    Levels that were not seen when the encoding was learned
+    get a missing code (NaN), which tree models route as
+    missing values and the one-hot encoder ignores.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The input data as a pandas DataFrame.
+    encoding : dict
+        Dictionary mapping column names to their ordered list of levels.
+
+    Returns
+    -------
+    pd.DataFrame
+        A copy of the data with the encoded columns replaced by codes.
+
+    Raises
+    ------
+    TypeError
+        If input data is not a pandas DataFrame.
+    ValueError
+        If any encoded column is not in the DataFrame.
+    """
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError("Input data must be a pandas DataFrame.")
+
+    encoded_data = data.copy()
+
+    for column, levels in encoding.items():
+        if column not in encoded_data.columns:
+            raise ValueError(f"Column '{column}' is not in the DataFrame.")
+
+        values = encoded_data[column].astype(object).fillna(MISSING_LEVEL)
+        codes = pd.Index(levels).get_indexer(values.astype(str))
+
+        unseen = codes < 0
+        if unseen.any():
+            print(f"Column '{column}' has {unseen.sum()} values with "
+                  "unseen levels. They are encoded as missing.")
+            encoded_data[column] = np.where(unseen, np.nan, codes)
+        else:
+            encoded_data[column] = codes.astype(
+                _compact_code_dtype(len(levels)))
+
+    return encoded_data
+
+
+def save_encoding(encoding, output_file):
+    """
+    Saves an encoding to a JSON file.
+
+    Parameters
+    ----------
+    encoding : dict
+        Dictionary mapping column names to their ordered list of levels.
+    output_file : str
+        Path of the JSON file.
+    """
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(encoding, file, indent=2)
+
+
+def load_encoding(input_file):
+    """
+    Loads an encoding from a JSON file.
+
+    Parameters
+    ----------
+    input_file : str
+        Path of the JSON file.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping column names to their ordered list of levels.
+    """
+    with open(input_file, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def categorical_feature_indices(feature_columns, encoding):
+    """
+    Returns the positions of encoded columns in a list of feature columns.
+
+    Parameters
+    ----------
+    feature_columns : list
+        The feature column names, in the order the models receive them.
+    encoding : dict
+        Dictionary mapping column names to their ordered list of levels.
+
+    Returns
+    -------
+    list
+        Positions of the encoded columns.
+    """
+    return [index for index, column in enumerate(feature_columns)
+            if column in encoding]
+
+
+def make_sparse_one_hot_encoder(categorical_indices, n_levels):
+    """
+    Builds a transformer that expands encoded columns into a sparse
+    one-hot matrix and passes the other columns through unchanged.
+
+    Parameters
+    ----------
+    categorical_indices : list
+        Positions of the encoded columns in the feature matrix.
+    n_levels : list
+        Number of levels of each encoded column.
+
+    Returns
+    -------
+    ColumnTransformer
+        Transformer producing a sparse matrix.
+    """
+    one_hot = OneHotEncoder(
+        categories=[np.arange(count) for count in n_levels],
+        handle_unknown='ignore', sparse_output=True
+    )
+    return ColumnTransformer(
+        [('onehot', one_hot, list(categorical_indices))],
+        remainder='passthrough', sparse_threshold=1.0
+    )
+
+
+def main():
+    """
+    Parses command-line arguments and encodes the categorical
+    columns of the input CSV file.
+
+    The encoded data and the encoding are saved to the specified files.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Encode categorical columns into integer codes."
+    )
+    parser.add_argument("file", type=str,
+                        help="Path to the input CSV file, a directory "
+                        "of partitions or a glob pattern.")
+    parser.add_argument(
+        "--encoding_file", type=str, default=None,
+        help="Path to an existing encoding to apply. If not specified, "
+        "a new encoding is learned."
+    )
+    parser.add_argument(
+        "--output", type=str, default="encoded_data.csv",
+        help="Path to save the encoded CSV file."
+    )
+    parser.add_argument(
+        "--output_encoding", type=str, default="encoding.json",
+        help="Path to save the learned encoding."
+    )
+
+    args = parser.parse_args()
+
+    try:
+        data = load_data(args.file)
+    except FileNotFoundError:
+        print(f"Error: The file '{args.file}' was not found.")
+        return
+    except pd.errors.EmptyDataError:
+        print(f"Error: The file '{args.file}' is empty.")
+        return
+
+    try:
+        if args.encoding_file:
+            encoded_data = apply_categorical_encoding(
+                data, load_encoding(args.encoding_file))
+        else:
+            encoded_data, encoding = encode_categorical_columns(data)
+            save_encoding(encoding, args.output_encoding)
+            print(f"Encoding saved to {args.output_encoding}")
+
+        encoded_data.to_csv(args.output, index=False)
+        print(f"Encoded data saved to {args.output}")
+    except (TypeError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+This module provides a store of the train/test split of a dataset as
+memory-mapped float32 feature matrices.
+
+The split is done on row indices only, and the feature matrix is written
+once to a .npy file in row blocks, converting each block straight to
+float32, with the training rows first and the test rows after them. The
+training and test matrices are then two contiguous slices of the same
+memory map, so tuning and evaluation read them without copying, and the
+pandas DataFrame, a float64 copy of it and the four split arrays are
+never in memory at the same time. Tree models (scikit-learn trees,
+LightGBM, XGBoost) work in float32 internally anyway.
+
+The split indices and a fingerprint of the data are saved with the
+matrices, so a later run on the same data and split parameters reuses
+the files instead of writing them again.
+
+Layout of a store directory::
+
+    features.npy      float32 features, training rows first
+    target.npy        target values in the same row order
+    split.npz         row positions of the training and test rows
+    manifest.json     columns, fingerprint and split parameters
+
+Classes:
+- FeatureMatrixStore: Memory-mapped float32 train/test split.
+
+Functions:
+- main: Parses command-line arguments and writes the split of a CSV
+  file.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.data_fingerprint import data_fingerprint  # noqa: E402
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+# Number of rows converted to float32 at a time
+BLOCK_ROWS = 65_536
+
+FEATURES_FILE = 'features.npy'
+TARGET_FILE = 'target.npy'
+SPLIT_FILE = 'split.npz'
+MANIFEST_FILE = 'manifest.json'
+
+
+class FeatureMatrixStore:
+    """
+    Memory-mapped float32 train/test split of a dataset.
+
+    Parameters
+    ----------
+    store_dir : str
+        Directory of the store; created if needed.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, name):
+        """Return the path of a file of the store."""
+        return os.path.join(self.store_dir, name)
+
+    def manifest(self):
+        """
+        Return the manifest of the stored split, or None if there is
+        none.
+        """
+        try:
+            with open(self._path(MANIFEST_FILE), 'r',
+                      encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    @property
+    def feature_columns(self):
+        """Names of the feature columns of the stored split."""
+        return self.manifest()['feature_columns']
+
+    def is_current(self, fingerprint, test_size, random_state):
+        """
+        Tell whether the stored split was written from data with the
+        given fingerprint and split parameters.
+
+        Parameters
+        ----------
+        fingerprint : str
+            Fingerprint of the data.
+        test_size : float
+            Fraction of test rows.
+        random_state : int
+            Seed of the split.
+
+        Returns
+        -------
+        bool
+            True if the split can be reused.
+        """
+        manifest = self.manifest()
+        return (manifest is not None
+                and manifest['fingerprint'] == fingerprint
+                and manifest['test_size'] == test_size
+                and manifest['random_state'] == random_state
+                and all(os.path.exists(self._path(name)) for name in
+                        (FEATURES_FILE, TARGET_FILE, SPLIT_FILE)))
+
+    def write(self, data, test_size=0.2, random_state=42,
+              block_rows=BLOCK_ROWS):
+        """
+        Split a dataset and write it to the store, unless the stored
+        split already comes from the same data and parameters.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The data; the target is the last column and all columns are
+            numeric.
+        test_size : float
+            Fraction of test rows.
+        random_state : int
+            Seed of the split, as in train_test_split.
+        block_rows : int
+            Number of rows converted to float32 at a time.
+
+        Returns
+        -------
+        bool
+            True if the files were written, False if they were reused.
+
+        Raises
+        ------
+        ValueError
+            If the data has no rows or no feature columns.
+        """
+        if len(data) == 0 or data.shape[1] < 2:
+            raise ValueError("The data must have rows, feature columns "
+                             "and a target column.")
+        fingerprint = data_fingerprint(data)
+        if self.is_current(fingerprint, test_size, random_state):
+            return False
+
+        if os.path.exists(self._path(MANIFEST_FILE)):
+            os.remove(self._path(MANIFEST_FILE))
+
+        # Only the row positions are split; the rows are written in
+        # order training rows first, so both sets are contiguous
+        train_index, test_index = train_test_split(
+            np.arange(len(data)), test_size=test_size,
+            random_state=random_state)
+        order = np.concatenate([train_index, test_index])
+
+        # New files replace the old ones, so that matrices of an earlier
+        # split that are still mapped keep their content
+        temp_path = self._path(FEATURES_FILE + '.tmp')
+        features = np.lib.format.open_memmap(
+            temp_path, mode='w+', dtype=np.float32,
+            shape=(len(data), data.shape[1] - 1))
+        for start in range(0, len(order), block_rows):
+            rows = order[start:start + block_rows]
+            features[start:start + len(rows)] = \
+                data.iloc[rows, :-1].to_numpy(dtype=np.float32)
+        features.flush()
+        del features
+        os.replace(temp_path, self._path(FEATURES_FILE))
+        with open(temp_path, 'wb') as file:
+            np.save(file, data.iloc[:, -1].to_numpy(dtype=np.float64)[order])
+        os.replace(temp_path, self._path(TARGET_FILE))
+        with open(temp_path, 'wb') as file:
+            np.savez(file, train_index=train_index, test_index=test_index)
+        os.replace(temp_path, self._path(SPLIT_FILE))
+
+        with open(self._path(MANIFEST_FILE), 'w', encoding='utf-8') as file:
+            json.dump({'feature_columns': data.columns[:-1].tolist(),
+                       'target': str(data.columns[-1]),
+                       'fingerprint': fingerprint,
+                       'test_size': test_size,
+                       'random_state': random_state,
+                       'n_train': int(len(train_index)),
+                       'n_test': int(len(test_index))}, file, indent=2)
+        return True
+
+    def split_indices(self):
+        """
+        Return the row positions of the training and test rows in the
+        original data.
+
+        Returns
+        -------
+        tuple
+            Arrays of the training and test row positions.
+        """
+        with np.load(self._path(SPLIT_FILE)) as split:
+            return split['train_index'], split['test_index']
+
+    def load(self, mmap_mode='r'):
+        """
+        Load the split as views of the memory-mapped matrices.
+
+        Parameters
+        ----------
+        mmap_mode : str, optional
+            Memory-map mode; None loads the matrices into memory.
+
+        Returns
+        -------
+        tuple
+            x_train, x_test, y_train, y_test; the feature matrices are
+            float32 slices of one memory map.
+
+        Raises
+        ------
+        FileNotFoundError
+            If no split was written to the store.
+        """
+        manifest = self.manifest()
+        if manifest is None:
+            raise FileNotFoundError(self._path(MANIFEST_FILE))
+        features = np.load(self._path(FEATURES_FILE), mmap_mode=mmap_mode)
+        target = np.load(self._path(TARGET_FILE), mmap_mode=mmap_mode)
+        n_train = manifest['n_train']
+        return (features[:n_train], features[n_train:],
+                target[:n_train], target[n_train:])
+
+
+def main():
+    """
+    Parses command-line arguments and writes the memory-mapped train/test
+    split of a preprocessed CSV file (the last column is the target).
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Write a memory-mapped float32 train/test split."
+    )
+    parser.add_argument("input_file", type=str,
+                        help="Path to the preprocessed CSV file, a "
+                        "directory of partitions or a glob pattern.")
+    parser.add_argument("store_dir", type=str,
+                        help="Directory to write the split to.")
+    parser.add_argument("--test_size", type=float, default=0.2,
+                        help="Fraction of test rows.")
+    parser.add_argument("--random_state", type=int, default=42,
+                        help="Seed of the split.")
+
+    args = parser.parse_args()
+
+    try:
+        store = FeatureMatrixStore(args.store_dir)
+        written = store.write(load_data(args.input_file), args.test_size,
+                              args.random_state)
+        manifest = store.manifest()
+        print(f"{'Wrote' if written else 'Reused'} the split of "
+              f"{manifest['n_train']} training and {manifest['n_test']} "
+              f"test rows in {args.store_dir}")
+    except FileNotFoundError:
+        print(f"Error: The file '{args.input_file}' was not found.")
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
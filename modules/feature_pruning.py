@@ -0,0 +1,261 @@
+"""
+This module provides functionality to prune redundant and uninformative
+features before hyperparameter tuning.
+
+Every feature is scored by its mutual information with the target,
+computed in parallel over columns (categorical code columns are scored
+as discrete features). Features whose score does not exceed a minimum
+are uninformative. The remaining numeric features are then visited by
+decreasing score and a feature is kept only if its absolute correlation
+with every feature kept before it stays within a threshold, so of a pair
+of near-duplicates such as GarageCars/GarageArea the more informative
+one is kept. The correlations come from one blockwise float32 matrix.
+Categorical code columns take no part in the correlation check, as the
+order of their codes carries no meaning.
+
+The kept features are saved as a JSON list so that the same columns
+are selected at scoring time.
+
+Functions:
+- mutual_information_scores: Scores every feature against the target.
+- prune_features: Selects the kept features and reports the decisions.
+- save_kept_features: Saves the kept features to a JSON file.
+- load_kept_features: Loads the kept features from a JSON file.
+- main: Parses command-line arguments and prunes the features of a
+  preprocessed CSV file.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_selection import mutual_info_regression
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.blockwise_correlation import (  # noqa: E402
+    blockwise_correlation
+)
+from modules.encode_categorical_columns import load_encoding  # noqa: E402
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+# Absolute correlation above which a feature duplicates a kept one
+CORRELATION_THRESHOLD = 0.75
+
+# Mutual information (nats) a feature needs to be kept
+MIN_MUTUAL_INFO = 0.0
+
+KEPT = 'kept'
+REDUNDANT = 'redundant'
+UNINFORMATIVE = 'uninformative'
+
+
+def mutual_information_scores(x, y, discrete_features=None, n_jobs=-1,
+                              random_state=42):
+    """
+    Scores every feature by its mutual information with the target.
+
+    Parameters
+    ----------
+    x : pd.DataFrame or np.ndarray
+        Feature matrix.
+    y : array-like
+        Target values.
+    discrete_features : list of int, optional
+        Indices of the categorical code columns.
+    n_jobs : int
+        Number of parallel jobs over columns.
+    random_state : int
+        Seed of the nearest-neighbour estimator's noise.
+
+    Returns
+    -------
+    np.ndarray
+        Mutual information of every column, in nats.
+    """
+    x = np.nan_to_num(np.asarray(x, dtype=np.float64), nan=-1)
+    discrete = np.zeros(x.shape[1], dtype=bool)
+    discrete[list(discrete_features or [])] = True
+    return mutual_info_regression(x, np.asarray(y, dtype=np.float64),
+                                  discrete_features=discrete,
+                                  random_state=random_state, n_jobs=n_jobs)
+
+
+def prune_features(x, y, categorical_columns=None,
+                   correlation_threshold=CORRELATION_THRESHOLD,
+                   min_mutual_info=MIN_MUTUAL_INFO, n_jobs=-1):
+    """
+    Selects the features to keep and reports the decision on each.
+
+    Parameters
+    ----------
+    x : pd.DataFrame
+        Feature matrix with named columns.
+    y : array-like
+        Target values.
+    categorical_columns : list of str, optional
+        Columns holding categorical codes.
+    correlation_threshold : float
+        Absolute correlation above which a numeric feature duplicates a
+        kept one.
+    min_mutual_info : float
+        Mutual information a feature must exceed to be kept.
+    n_jobs : int
+        Number of parallel jobs of the mutual information scores.
+
+    Returns
+    -------
+    kept : list of str
+        The kept features in their original order.
+    report : pd.DataFrame
+        One row per feature with the columns feature, mutual_info,
+        status ('kept', 'redundant' or 'uninformative'), correlated_with
+        (the kept feature it duplicates) and correlation.
+
+    Raises
+    ------
+    TypeError
+        If x is not a pandas DataFrame.
+    ValueError
+        If x has no columns.
+    """
+    if not isinstance(x, pd.DataFrame):
+        raise TypeError("Input data must be a pandas DataFrame.")
+    if x.shape[1] == 0:
+        raise ValueError("The DataFrame has no feature columns.")
+
+    columns = x.columns.tolist()
+    categorical = set(categorical_columns or []) & set(columns)
+    scores = mutual_information_scores(
+        x, y, [index for index, column in enumerate(columns)
+               if column in categorical], n_jobs)
+
+    numeric = [index for index, column in enumerate(columns)
+               if column not in categorical]
+    corr = np.abs(np.nan_to_num(blockwise_correlation(x.iloc[:, numeric]))) \
+        if numeric else np.empty((0, 0))
+    position = {index: row for row, index in enumerate(numeric)}
+
+    status = [KEPT] * len(columns)
+    correlated_with = [None] * len(columns)
+    correlation = [np.nan] * len(columns)
+    kept_rows = []
+    for index in np.argsort(-scores, kind='stable'):
+        if not scores[index] > min_mutual_info:
+            status[index] = UNINFORMATIVE
+            continue
+        if index not in position:
+            continue
+        row = position[index]
+        if kept_rows:
+            kept_corr = corr[row, kept_rows]
+            strongest = int(np.argmax(kept_corr))
+            if kept_corr[strongest] > correlation_threshold:
+                status[index] = REDUNDANT
+                correlated_with[index] = columns[numeric[
+                    kept_rows[strongest]]]
+                correlation[index] = float(kept_corr[strongest])
+                continue
+        kept_rows.append(row)
+
+    report = pd.DataFrame({'feature': columns, 'mutual_info': scores,
+                           'status': status,
+                           'correlated_with': correlated_with,
+                           'correlation': correlation})
+    kept = [column for column, decision in zip(columns, status)
+            if decision == KEPT]
+    return kept, report
+
+
+def save_kept_features(kept, output_file):
+    """
+    Saves the kept features to a JSON file.
+
+    Parameters
+    ----------
+    kept : list of str
+        The kept features.
+    output_file : str
+        Path of the JSON file.
+    """
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(list(kept), file, indent=2)
+
+
+def load_kept_features(input_file):
+    """
+    Loads the kept features from a JSON file.
+
+    Parameters
+    ----------
+    input_file : str
+        Path of the JSON file.
+
+    Returns
+    -------
+    list of str
+        The kept features.
+    """
+    with open(input_file, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def main():
+    """
+    Parses command-line arguments, prunes the features of a
+    preprocessed CSV file (the last column is the target) and saves the
+    kept features and the report.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Prune redundant and uninformative features."
+    )
+    parser.add_argument("input_file", type=str,
+                        help="Path to the preprocessed CSV file, a "
+                        "directory of partitions or a glob pattern.")
+    parser.add_argument("output_file", type=str,
+                        help="Path of the JSON file of kept features.")
+    parser.add_argument("--encoding_file", type=str, default=None,
+                        help="Categorical encoding of the preprocessing, "
+                        "naming the categorical code columns.")
+    parser.add_argument("--correlation_threshold", type=float,
+                        default=CORRELATION_THRESHOLD,
+                        help="Absolute correlation of duplicate features.")
+    parser.add_argument("--min_mutual_info", type=float,
+                        default=MIN_MUTUAL_INFO,
+                        help="Mutual information a feature must exceed.")
+    parser.add_argument("--report_file", type=str, default=None,
+                        help="Path of a CSV file to save the report in.")
+
+    args = parser.parse_args()
+
+    try:
+        data = load_data(args.input_file)
+        encoding = load_encoding(args.encoding_file) \
+            if args.encoding_file else {}
+        kept, report = prune_features(
+            data.iloc[:, :-1], data.iloc[:, -1], list(encoding),
+            args.correlation_threshold, args.min_mutual_info)
+        save_kept_features(kept, args.output_file)
+        if args.report_file:
+            report.to_csv(args.report_file, index=False)
+        print(f"Kept {len(kept)} of {len(report)} features.")
+        print(report[report['status'] != KEPT].to_string(index=False))
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+    except (TypeError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+This module provides a fingerprint-keyed cache of rendered figures, so
+that plots whose data and parameters did not change are not rendered
+again.
+
+A plotting function computes the fingerprint of exactly the data slice
+and the parameters it draws, see data_fingerprint. The fingerprint is
+written into the PNG file as a text chunk, so an existing image tells
+by itself whether it is up to date, and rendering is skipped when it
+matches. A FigureCache
+additionally keeps copies of the last rendered figures in a directory,
+named after their fingerprints, so that a figure drawn before (e.g. the
+previous night's, later overwritten) is copied back instead of being
+rendered. The cache is bounded: above max_entries figures the least
+recently used ones are removed.
+
+Classes:
+- FigureCache: Bounded directory of rendered figures by fingerprint.
+
+Functions:
+- data_fingerprint: Computes the fingerprint of a data slice and
+  parameters.
+- read_fingerprint: Reads the fingerprint stored in a PNG file.
+- figure_up_to_date: Tells whether a figure needs no rendering,
+  restoring it from a cache if possible.
+- save_figure: Saves the current figure with its fingerprint and
+  caches it.
+- main: Parses command-line arguments and lists or clears a cache.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import matplotlib.pyplot as plt
+from PIL import Image
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules import data_fingerprint as fingerprints  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+# Bump to invalidate all cached figures when the plotting code changes
+FIGURE_CACHE_VERSION = 1
+
+# PNG text key holding the fingerprint
+FINGERPRINT_KEY = 'Fingerprint'
+
+# Default number of figures kept by a FigureCache
+MAX_ENTRIES = 128
+
+
+def data_fingerprint(data, **params):
+    """
+    Computes the fingerprint of a data slice and plotting parameters.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Exactly the data the figure is drawn from.
+    **params : dict
+        Parameters that change the figure, e.g. the figure kind and the
+        plotted columns; they must be JSON-serializable or have a
+        stable str.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest, see data_fingerprint.data_fingerprint.
+    """
+    return fingerprints.data_fingerprint(data, FIGURE_CACHE_VERSION,
+                                         **params)
+
+
+def read_fingerprint(image_file):
+    """
+    Reads the fingerprint stored in a PNG file.
+
+    Parameters
+    ----------
+    image_file : str
+        Path of the PNG file.
+
+    Returns
+    -------
+    str or None
+        The fingerprint, or None if the file does not exist, cannot be
+        read or has no fingerprint.
+    """
+    try:
+        with Image.open(image_file) as image:
+            return getattr(image, 'text', {}).get(FINGERPRINT_KEY)
+    except (OSError, ValueError):
+        return None
+
+
+class FigureCache:
+    """
+    Bounded directory of rendered figures by fingerprint.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory of the cached figures; created if needed.
+    max_entries : int
+        Number of figures kept; the least recently used ones are
+        removed above it.
+    """
+
+    def __init__(self, cache_dir, max_entries=MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive.")
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, fingerprint):
+        """Return the path of the cached figure of a fingerprint."""
+        return os.path.join(self.cache_dir, f"{fingerprint}.png")
+
+    def entries(self):
+        """
+        List the cached figures, least recently used first.
+
+        Returns
+        -------
+        list of str
+            Paths of the cached figures.
+        """
+        paths = [os.path.join(self.cache_dir, name)
+                 for name in os.listdir(self.cache_dir)
+                 if name.endswith('.png')]
+        return sorted(paths, key=os.path.getmtime)
+
+    def restore(self, fingerprint, output_file):
+        """
+        Copy the cached figure of a fingerprint to an output file.
+
+        Parameters
+        ----------
+        fingerprint : str
+            Fingerprint of the figure.
+        output_file : str
+            Path the figure is copied to.
+
+        Returns
+        -------
+        bool
+            True if the figure was cached and copied.
+        """
+        path = self._path(fingerprint)
+        if read_fingerprint(path) != fingerprint:
+            return False
+        shutil.copyfile(path, output_file)
+        os.utime(path)  # Mark as recently used
+        return True
+
+    def store(self, fingerprint, image_file):
+        """
+        Add a rendered figure to the cache and evict the least recently
+        used figures above max_entries.
+
+        Parameters
+        ----------
+        fingerprint : str
+            Fingerprint of the figure.
+        image_file : str
+            Path of the rendered PNG file.
+        """
+        handle, temp_path = tempfile.mkstemp(suffix='.tmp',
+                                             dir=self.cache_dir)
+        os.close(handle)
+        shutil.copyfile(image_file, temp_path)
+        os.replace(temp_path, self._path(fingerprint))
+        for path in self.entries()[:-self.max_entries]:
+            os.remove(path)
+
+    def clear(self):
+        """Remove all cached figures."""
+        for path in self.entries():
+            os.remove(path)
+
+
+def figure_up_to_date(output_file, fingerprint, cache=None):
+    """
+    Tells whether a figure needs no rendering: the output file already
+    holds the figure of the fingerprint, or the cache has it and it was
+    copied to the output file.
+
+    Parameters
+    ----------
+    output_file : str
+        Path of the PNG file.
+    fingerprint : str
+        Fingerprint of the figure to draw.
+    cache : FigureCache, optional
+        Cache to restore the figure from.
+
+    Returns
+    -------
+    bool
+        True if the output file holds the figure.
+    """
+    if read_fingerprint(output_file) == fingerprint:
+        return True
+    if cache is not None:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        return cache.restore(fingerprint, output_file)
+    return False
+
+
+def save_figure(output_file, fingerprint, cache=None):
+    """
+    Saves the current figure as PNG with its fingerprint and adds it to
+    a cache.
+
+    Parameters
+    ----------
+    output_file : str
+        Path of the PNG file.
+    fingerprint : str
+        Fingerprint of the figure.
+    cache : FigureCache, optional
+        Cache to add the figure to.
+    """
+    plt.savefig(output_file, metadata={FINGERPRINT_KEY: fingerprint})
+    if cache is not None:
+        cache.store(fingerprint, output_file)
+
+
+def main():
+    """
+    Parses command-line arguments and lists or clears the figures of a
+    cache directory.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="List or clear a figure cache."
+    )
+    parser.add_argument("cache_dir", type=str,
+                        help="Directory of the figure cache.")
+    parser.add_argument("--clear", action="store_true",
+                        help="Remove all cached figures.")
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.cache_dir):
+        print(f"Error: The directory '{args.cache_dir}' was not found.")
+        return
+    cache = FigureCache(args.cache_dir)
+    entries = cache.entries()
+    if args.clear:
+        cache.clear()
+        print(f"Removed {len(entries)} cached figures.")
+        return
+    for path in entries:
+        print(f"{os.path.basename(path)}  {os.path.getsize(path)} bytes")
+    print(f"{len(entries)} cached figures.")
+
+
+if __name__ == "__main__":
+    main()
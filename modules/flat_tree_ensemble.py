@@ -0,0 +1,530 @@
+"""
+This module provides functionality to compile tuned tree models into a
+compact, flattened node-array representation for fast batch scoring.
+
+All trees of a model are stored in shared arrays (split feature,
+threshold, child indices, leaf values, missing-value direction and
+categorical split sets). Prediction walks every tree for a whole batch
+of rows at once with vectorized NumPy indexing, one tree level per
+step, and can split large batches into chunks scored on several
+threads. A compiled model can be saved as plain .npy files and loaded
+back memory-mapped for fast cold starts.
+
+Supported models are scikit-learn DecisionTreeRegressor and
+RandomForestRegressor, LightGBM LGBMRegressor and XGBoost XGBRegressor
+(or their boosters).
+
+Classes:
+- FlatTreeEnsemble: Tree ensemble stored as flat node arrays.
+
+Functions:
+- supports_compilation: Tells whether a model can be compiled.
+- compile_tree_ensemble: Compiles a tree model into a FlatTreeEnsemble.
+- main: Parses command-line arguments and compiles a saved model.
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+# How a node treats missing values
+MISSING_DEFAULT = 0   # NaN follows the default direction
+MISSING_AS_ZERO = 1   # NaN is compared as 0 (LightGBM missing_type None)
+MISSING_ZERO = 2      # NaN and 0 follow the default direction
+
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value',
+               'default_left', 'missing_mode', 'category_row', 'categories',
+               'roots')
+
+
+class FlatTreeEnsemble:
+    """
+    Tree ensemble stored as flat node arrays.
+
+    The prediction is base_score + scale * (sum of the leaf values
+    reached in every tree).
+
+    Parameters
+    ----------
+    feature : np.ndarray
+        Split feature of each node (-1 for leaves).
+    threshold : np.ndarray
+        Split threshold of each node.
+    left, right : np.ndarray
+        Child indices of each node (-1 for leaves).
+    value : np.ndarray
+        Leaf value of each node.
+    default_left : np.ndarray
+        Whether missing values go to the left child.
+    missing_mode : np.ndarray
+        How each node treats missing values (MISSING_* constants).
+    category_row : np.ndarray
+        Row of categories for categorical splits (-1 for numerical ones).
+    categories : np.ndarray
+        Boolean matrix; categories[row, code] is True if the category
+        code is listed in the split set.
+    roots : np.ndarray
+        Root node index of each tree.
+    base_score : float
+        Constant added to every prediction.
+    scale : float
+        Factor applied to the sum of leaf values.
+    listed_left : bool
+        Whether listed categories go to the left child (LightGBM) or
+        to the right child (XGBoost). Unlisted, negative and unknown
+        codes go the other way.
+    strict : bool
+        Whether a row goes left when its value is strictly less than
+        the threshold (XGBoost) instead of less or equal.
+    float32_input : bool
+        Whether features are rounded to float32 before comparison, as
+        scikit-learn and XGBoost do.
+    max_depth : int
+        Depth of the deepest tree.
+    """
+
+    # pylint: disable=too-many-instance-attributes, too-many-arguments
+    def __init__(self, feature, threshold, left, right, value, default_left,
+                 missing_mode, category_row, categories, roots,
+                 base_score=0.0, scale=1.0, listed_left=True, strict=False,
+                 float32_input=False, max_depth=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.default_left = default_left
+        self.missing_mode = missing_mode
+        self.category_row = category_row
+        self.categories = categories
+        self.roots = roots
+        self.base_score = float(base_score)
+        self.scale = float(scale)
+        self.listed_left = bool(listed_left)
+        self.strict = bool(strict)
+        self.float32_input = bool(float32_input)
+        self.max_depth = (int(max_depth) if max_depth is not None
+                          else _max_depth(left, right, roots))
+
+    @property
+    def n_trees(self):
+        """Number of trees in the ensemble."""
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        """Total number of nodes in the ensemble."""
+        return len(self.feature)
+
+    def _predict_batch(self, x):
+        """Score one batch of rows with a vectorized level-wise walk."""
+        nodes = np.tile(self.roots, (len(x), 1))
+        rows = np.arange(len(x))[:, np.newaxis]
+        has_categories = self.categories.shape[0] > 0
+
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+
+            values = x[rows, np.maximum(self.feature[nodes], 0)]
+            missing_mode = self.missing_mode[nodes]
+            is_nan = np.isnan(values)
+            values = np.where(is_nan & (missing_mode == MISSING_AS_ZERO),
+                              0.0, values)
+            is_missing = np.where(missing_mode == MISSING_ZERO,
+                                  is_nan | (values == 0.0),
+                                  is_nan & (missing_mode == MISSING_DEFAULT))
+
+            with np.errstate(invalid='ignore'):
+                if self.strict:
+                    go_left = values < self.threshold[nodes]
+                else:
+                    go_left = values <= self.threshold[nodes]
+
+            if has_categories:
+                category_row = self.category_row[nodes]
+                categorical = category_row >= 0
+                if categorical.any():
+                    codes = values[categorical]
+                    valid = (codes >= 0) & (codes < self.categories.shape[1])
+                    member = np.zeros(codes.shape, dtype=bool)
+                    member[valid] = self.categories[
+                        category_row[categorical][valid],
+                        codes[valid].astype(np.int64)]
+                    go_left[categorical] = member == self.listed_left
+
+            go_left = np.where(is_missing, self.default_left[nodes], go_left)
+            nodes = np.where(internal,
+                             np.where(go_left, left, self.right[nodes]),
+                             nodes)
+
+        return self.base_score + self.scale * self.value[nodes].sum(axis=1)
+
+    def predict(self, x, n_jobs=1, chunk_size=10_000):
+        """
+        Predict target values for a batch of rows.
+
+        Parameters
+        ----------
+        x : np.ndarray or pd.DataFrame
+            Feature matrix.
+        n_jobs : int
+            Number of threads scoring chunks in parallel.
+        chunk_size : int
+            Number of rows scored at a time, which bounds the memory of
+            the (rows x trees) node matrix.
+
+        Returns
+        -------
+        np.ndarray
+            Predicted values.
+
+        Raises
+        ------
+        ValueError
+            If x is not a two-dimensional matrix.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim != 2:
+            raise ValueError("x must be a two-dimensional matrix.")
+        if self.float32_input:
+            x = x.astype(np.float32).astype(np.float64)
+
+        chunks = [x[start:start + chunk_size]
+                  for start in range(0, len(x), chunk_size)]
+        if len(chunks) <= 1:
+            return self._predict_batch(x)
+
+        if n_jobs == 1:
+            return np.concatenate([self._predict_batch(chunk)
+                                   for chunk in chunks])
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            return np.concatenate(list(executor.map(self._predict_batch,
+                                                    chunks)))
+
+    def save(self, directory):
+        """
+        Save the ensemble as .npy files and a JSON header.
+
+        Parameters
+        ----------
+        directory : str
+            Directory to save the files in.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"),
+                    np.ascontiguousarray(getattr(self, name)))
+        header = {'base_score': self.base_score, 'scale': self.scale,
+                  'listed_left': self.listed_left, 'strict': self.strict,
+                  'float32_input': self.float32_input,
+                  'max_depth': self.max_depth}
+        with open(os.path.join(directory, 'ensemble.json'), 'w',
+                  encoding='utf-8') as file:
+            json.dump(header, file, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Load an ensemble saved with save.
+
+        Parameters
+        ----------
+        directory : str
+            Directory the ensemble was saved in.
+        mmap_mode : str, optional
+            Memory-map mode of the arrays; 'r' maps them read-only so
+            that processes on the same host share one copy. None loads
+            them into memory.
+
+        Returns
+        -------
+        FlatTreeEnsemble
+            The loaded ensemble.
+        """
+        with open(os.path.join(directory, 'ensemble.json'), 'r',
+                  encoding='utf-8') as file:
+            header = json.load(file)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"),
+                                mmap_mode=mmap_mode)
+                  for name in ARRAY_NAMES}
+        return cls(**arrays, **header)
+
+
+def _max_depth(left, right, roots):
+    """Return the depth of the deepest tree."""
+    depth = 0
+    level = np.asarray(roots)
+    while len(level):
+        level = level[left[level] >= 0]
+        level = np.concatenate([left[level], right[level]])
+        if len(level):
+            depth += 1
+    return depth
+
+
+class _NodeArrays:
+    """Accumulates the nodes of several trees into flat lists."""
+
+    def __init__(self):
+        self.columns = {name: [] for name in ARRAY_NAMES[:-2]}
+        self.category_sets = []
+        self.roots = []
+
+    def add_tree(self, tree):
+        """
+        Add one tree given as a dictionary of per-node lists with
+        child indices local to the tree.
+        """
+        offset = len(self.columns['feature'])
+        self.roots.append(offset)
+        for position, row in enumerate(tree.pop('category_sets')):
+            if row is not None:
+                tree['category_row'][position] = len(self.category_sets)
+                self.category_sets.append(row)
+        for name in ('left', 'right'):
+            tree[name] = [child + offset if child >= 0 else -1
+                          for child in tree[name]]
+        for name, values in tree.items():
+            self.columns[name].extend(values)
+
+    def build(self, **options):
+        """Return the FlatTreeEnsemble of all added trees."""
+        width = max((max(row) + 1 for row in self.category_sets if row),
+                    default=0)
+        categories = np.zeros((len(self.category_sets), width), dtype=bool)
+        for row, codes in enumerate(self.category_sets):
+            categories[row, list(codes)] = True
+
+        arrays = {
+            'feature': np.asarray(self.columns['feature'], dtype=np.int32),
+            'threshold': np.asarray(self.columns['threshold'],
+                                    dtype=np.float64),
+            'left': np.asarray(self.columns['left'], dtype=np.int32),
+            'right': np.asarray(self.columns['right'], dtype=np.int32),
+            'value': np.asarray(self.columns['value'], dtype=np.float64),
+            'default_left': np.asarray(self.columns['default_left'],
+                                       dtype=bool),
+            'missing_mode': np.asarray(self.columns['missing_mode'],
+                                       dtype=np.int8),
+            'category_row': np.asarray(self.columns['category_row'],
+                                       dtype=np.int32),
+            'categories': categories,
+            'roots': np.asarray(self.roots, dtype=np.int32),
+        }
+        return FlatTreeEnsemble(**arrays, **options)
+
+
+def _sklearn_tree(estimator):
+    """Convert a fitted scikit-learn tree into per-node lists."""
+    tree = estimator.tree_
+    n_nodes = tree.node_count
+    return {
+        'feature': np.where(tree.children_left >= 0, tree.feature,
+                            -1).tolist(),
+        'threshold': tree.threshold.tolist(),
+        'left': tree.children_left.tolist(),
+        'right': tree.children_right.tolist(),
+        'value': tree.value[:, 0, 0].tolist(),
+        'default_left': np.asarray(tree.missing_go_to_left,
+                                   dtype=bool).tolist(),
+        'missing_mode': [MISSING_DEFAULT] * n_nodes,
+        'category_row': [-1] * n_nodes,
+        'category_sets': [None] * n_nodes,
+    }
+
+
+def _lgbm_tree(structure):
+    """Convert a LightGBM dumped tree structure into per-node lists."""
+    tree = {name: [] for name in ('feature', 'threshold', 'left', 'right',
+                                  'value', 'default_left', 'missing_mode',
+                                  'category_row', 'category_sets')}
+    missing_modes = {'None': MISSING_AS_ZERO, 'Zero': MISSING_ZERO,
+                     'NaN': MISSING_DEFAULT}
+
+    def add(node):
+        index = len(tree['feature'])
+        for values in tree.values():
+            values.append(None)
+        if 'leaf_value' in node:
+            tree['feature'][index] = -1
+            tree['threshold'][index] = 0.0
+            tree['left'][index] = tree['right'][index] = -1
+            tree['value'][index] = node['leaf_value']
+            tree['default_left'][index] = False
+            tree['missing_mode'][index] = MISSING_DEFAULT
+        else:
+            categorical = node['decision_type'] == '=='
+            tree['feature'][index] = node['split_feature']
+            tree['value'][index] = 0.0
+            if categorical:
+                # LightGBM sends missing and negative categories right
+                tree['threshold'][index] = 0.0
+                tree['category_sets'][index] = [
+                    int(code) for code in str(node['threshold']).split('||')]
+                tree['default_left'][index] = False
+                tree['missing_mode'][index] = MISSING_DEFAULT
+            else:
+                tree['threshold'][index] = float(node['threshold'])
+                tree['default_left'][index] = node['default_left']
+                tree['missing_mode'][index] = missing_modes[
+                    node['missing_type']]
+            tree['left'][index] = add(node['left_child'])
+            tree['right'][index] = add(node['right_child'])
+        tree['category_row'][index] = -1
+        return index
+
+    add(structure)
+    return tree
+
+
+def _xgb_tree(tree_json):
+    """Convert a tree of an XGBoost JSON model into per-node lists."""
+    left = tree_json['left_children']
+    n_nodes = len(left)
+    is_leaf = [child == -1 for child in left]
+    conditions = np.asarray(tree_json['split_conditions'], dtype=np.float32)
+
+    category_sets = [None] * n_nodes
+    for node, start, size in zip(tree_json.get('categories_nodes', []),
+                                 tree_json.get('categories_segments', []),
+                                 tree_json.get('categories_sizes', [])):
+        category_sets[node] = tree_json['categories'][start:start + size]
+
+    return {
+        'feature': [-1 if leaf else feature for leaf, feature
+                    in zip(is_leaf, tree_json['split_indices'])],
+        'threshold': [0.0 if leaf else float(condition)
+                      for leaf, condition in zip(is_leaf, conditions)],
+        'left': left,
+        'right': tree_json['right_children'],
+        'value': [float(condition) if leaf else 0.0
+                  for leaf, condition in zip(is_leaf, conditions)],
+        'default_left': [bool(flag) for flag in tree_json['default_left']],
+        'missing_mode': [MISSING_DEFAULT] * n_nodes,
+        'category_row': [-1] * n_nodes,
+        'category_sets': category_sets,
+    }
+
+
+def supports_compilation(model):
+    """
+    Tells whether a model can be compiled into a FlatTreeEnsemble.
+
+    Parameters
+    ----------
+    model : object
+        A fitted model.
+
+    Returns
+    -------
+    bool
+        True for the supported tree models.
+    """
+    return isinstance(model, (DecisionTreeRegressor, RandomForestRegressor,
+                              lgb.LGBMRegressor, lgb.Booster,
+                              xgb.XGBRegressor, xgb.Booster))
+
+
+def compile_tree_ensemble(model):
+    """
+    Compiles a fitted tree model into a FlatTreeEnsemble.
+
+    Parameters
+    ----------
+    model : object
+        A fitted DecisionTreeRegressor, RandomForestRegressor,
+        LGBMRegressor, XGBRegressor or LightGBM/XGBoost booster.
+
+    Returns
+    -------
+    FlatTreeEnsemble
+        The compiled model.
+
+    Raises
+    ------
+    TypeError
+        If the model type is not supported.
+    ValueError
+        If an XGBoost model does not use a squared error objective.
+    """
+    nodes = _NodeArrays()
+
+    if isinstance(model, DecisionTreeRegressor):
+        nodes.add_tree(_sklearn_tree(model))
+        return nodes.build(float32_input=True)
+
+    if isinstance(model, RandomForestRegressor):
+        for estimator in model.estimators_:
+            nodes.add_tree(_sklearn_tree(estimator))
+        return nodes.build(scale=1.0 / len(model.estimators_),
+                           float32_input=True)
+
+    if isinstance(model, (lgb.LGBMRegressor, lgb.Booster)):
+        booster = model.booster_ if isinstance(model, lgb.LGBMRegressor) \
+            else model
+        for tree in booster.dump_model()['tree_info']:
+            nodes.add_tree(_lgbm_tree(tree['tree_structure']))
+        return nodes.build()
+
+    if isinstance(model, (xgb.XGBRegressor, xgb.Booster)):
+        booster = model.get_booster() if isinstance(model, xgb.XGBRegressor) \
+            else model
+        learner = json.loads(booster.save_raw('json'))['learner']
+        objective = learner['objective']['name']
+        if objective != 'reg:squarederror':
+            raise ValueError(f"Objective '{objective}' is not supported.")
+        for tree in learner['gradient_booster']['model']['trees']:
+            nodes.add_tree(_xgb_tree(tree))
+        base_score = float(str(
+            learner['learner_model_param']['base_score']).strip('[]'))
+        return nodes.build(base_score=base_score, strict=True,
+                           float32_input=True, listed_left=False)
+
+    raise TypeError(f"Model of type '{type(model).__name__}' cannot be "
+                    "compiled into a flat tree ensemble.")
+
+
+def main():
+    """
+    Parses command-line arguments and compiles a model saved with
+    joblib into a directory of memory-mappable arrays.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compile a tree model into flat node arrays."
+    )
+    parser.add_argument("model_file", type=str,
+                        help="Path to the trained model file (joblib).")
+    parser.add_argument("output_dir", type=str,
+                        help="Directory to save the compiled model in.")
+
+    args = parser.parse_args()
+
+    try:
+        ensemble = compile_tree_ensemble(joblib.load(args.model_file))
+        ensemble.save(args.output_dir)
+        print(f"Compiled {ensemble.n_trees} trees with {ensemble.n_nodes} "
+              f"nodes to {args.output_dir}")
+    except FileNotFoundError:
+        print(f"Error: The file '{args.model_file}' was not found.")
+    except (TypeError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
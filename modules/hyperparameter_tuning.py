@@ -1,25 +1,78 @@
 """
-This module provides functionality to perform hyperparameter tuning using
-GridSearchCV for multiple models.
+This module provides functionality to perform hyperparameter tuning with a
+cross-validated grid search for multiple models. LightGBM and XGBoost
+models are tuned with BinnedDatasetSearchCV, which bins the features once
+per fold, linear models fitted from their normal equations with
+NormalEquationSearchCV, which reads the data once for all candidates
+and folds, and other models with CandidateSearchCV. All record the fit
+time, score time, peak memory and fold scores of every candidate. With a
+checkpoint directory the searches save every completed (candidate,
+fold) result, an interrupted run resumes from them, and models whose
+search already completed on the same data are not tuned again. With a
+time budget, global or per model, the searches evaluate their candidates
+in priority order and stop cleanly when their share is spent, keeping
+the best candidate found so far and a record of the coverage. With
+racing, the folds are evaluated one at a time and candidates, and whole
+models, that are statistically worse than the leader are dropped.
+Instead of grids, a model-based search explores continuous and integer
+ranges, warm-started from the trials of earlier runs. Candidates of
+tree models that grow the same trees as another candidate reuse its
+result instead of being fitted again.
 
 Functions:
-- hyperparameter_tuning: Perform hyperparameter tuning using GridSearchCV
+- hyperparameter_tuning: Perform hyperparameter tuning with a grid search
   for multiple models.
 - main: Parses command-line arguments and performs hyperparameter tuning
   on the specified models and parameter grids.
 """
 
 import argparse
+import os
+import sys
+import time
+
 import joblib
-import pandas as pd
+import numpy as np
 from sklearn.exceptions import NotFittedError
-from sklearn.model_selection import GridSearchCV
 from sklearn.base import BaseEstimator
+from sklearn.model_selection import ParameterGrid
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.artifact_store import ArtifactStore  # noqa: E402
+from modules.bayesian_search import (  # noqa: E402
+    BayesianSearchCV, BinnedBayesianSearchCV, TrialHistory, data_signature
+)
+from modules.binned_dataset_search import (  # noqa: E402
+    BinnedDatasetSearchCV, supports_binned_search
+)
+from modules.candidate_racing import RACING_ALPHA  # noqa: E402
+from modules.candidate_search import (  # noqa: E402
+    CandidateSearchCV, out_of_fold_errors
+)
+from modules.load_data import load_data  # noqa: E402
+from modules.normal_equation_regression import (  # noqa: E402
+    NormalEquationSearchCV, supports_normal_equations
+)
+from modules.tuning_checkpoint import SearchCheckpoint  # noqa: E402
+from modules.tuning_performance import (  # noqa: E402
+    save_tuning_performance
+)
+# pylint: enable=wrong-import-position, import-error
 
 
-def hyperparameter_tuning(models, param_grids, x_train, y_train):
+def hyperparameter_tuning(models, param_grids, x_train, y_train,
+                          fit_params=None, dataset_cache_dir=None,
+                          return_cv_results=False, n_jobs=-1,
+                          checkpoint_dir=None, time_budget=None,
+                          model_time_budget=None, return_coverage=False,
+                          racing=False, racing_alpha=RACING_ALPHA,
+                          search='grid', n_iter=30, trial_history=None,
+                          deduplicate=True, feature_columns=None):
     """
-    Perform hyperparameter tuning using GridSearchCV for multiple models.
+    Perform hyperparameter tuning with a grid search for multiple models.
 
     Parameters
     ----------
@@ -33,6 +86,67 @@ def hyperparameter_tuning(models, param_grids, x_train, y_train):
         Training data features.
     y_train : pd.Series or np.ndarray
         Training data labels.
+    fit_params : list of dict, optional
+        List of dictionaries with extra keyword arguments passed to
+        the fit method of each model, e.g. the categorical features
+        of LightGBM. If None, no extra arguments are passed.
+    dataset_cache_dir : str, optional
+        Directory where the binned LightGBM datasets of each fold are
+        cached between runs. If None, they are only reused within
+        the run.
+    return_cv_results : bool
+        Whether to also return the cv_results_ of each search.
+    n_jobs : int
+        Number of parallel jobs of the candidate searches; 1 when the
+        tuning itself runs in a worker of a process pool. LightGBM and
+        XGBoost candidates are trained one at a time with n_jobs
+        native threads instead.
+    checkpoint_dir : str, optional
+        Directory of the search checkpoints (see tuning_checkpoint). If
+        None, nothing is saved and every search starts from scratch.
+    time_budget : float, optional
+        Wall-clock seconds for the tuning of all models. Each search gets
+        the time left divided by the number of models left, evaluates
+        its candidates in priority order and stops between batches when
+        its share is spent (see CandidateSearchCV). If None, and
+        model_time_budget is None, every candidate is evaluated.
+    model_time_budget : float or dict, optional
+        Wall-clock seconds for the search of each model, or a dictionary
+        of them by model name; capped by the share of time_budget.
+    return_coverage : bool
+        Whether to also return how much of each search space was
+        covered.
+    racing : bool
+        Whether to evaluate the folds one at a time and drop candidates
+        statistically worse than the leader (see candidate_racing). The
+        out-of-fold errors of the best model tuned so far compete in
+        every later search, so a model whose candidates are all worse
+        is dropped after as few folds as possible; its best candidate
+        so far is still refitted and returned. Raced searches are not
+        saved as completed in the checkpoint, and a model restored from
+        it races with the out-of-fold errors of its best candidate.
+    racing_alpha : float
+        One-sided significance level of an elimination.
+    search : str
+        'grid' to evaluate every candidate of param_grids, or 'bayes'
+        for a model-based search (see bayesian_search); param_grids then
+        hold search spaces of Real and Integer ranges and lists of
+        categorical values.
+    n_iter : int
+        Number of candidates evaluated per model by the 'bayes' search.
+    trial_history : str, optional
+        Path of the trial history the 'bayes' search warm-starts from;
+        the trials of both searches are appended to it. If None, the
+        'bayes' search starts cold.
+    deduplicate : bool
+        Whether candidates of decision trees and random forests that
+        provably or empirically grow the same trees as another
+        candidate reuse its result instead of being fitted again (see
+        candidate_equivalence).
+    feature_columns : list of str, optional
+        Names of the feature columns of x_train, which identify similar
+        data in the trial history when x_train is an array without
+        column names.
 
     Returns
     -------
@@ -42,6 +156,15 @@ def hyperparameter_tuning(models, param_grids, x_train, y_train):
     best_params : dict
         Dictionary with model names as keys
         and the best found parameters as values.
+    cv_results : dict
+        Dictionary with model names as keys and the cv_results_ of
+        their search as values (None if tuning failed). Only returned
+        if return_cv_results is True.
+    coverage : dict
+        Dictionary with model names as keys and the coverage_ of their
+        search as values (None if tuning failed); the coverage of a
+        search restored from the checkpoint has 'restored' set to True.
+        Only returned if return_coverage is True.
 
     Raises
     ------
@@ -56,10 +179,26 @@ def hyperparameter_tuning(models, param_grids, x_train, y_train):
         raise ValueError("The 'models' and 'param_grids'"
                          "lists must have the same length.")
 
+    if search not in ('grid', 'bayes'):
+        raise ValueError(f"Unknown search '{search}'.")
+
+    if fit_params is None:
+        fit_params = [{}] * len(models)
+    elif len(fit_params) != len(models):
+        raise ValueError("The 'models' and 'fit_params'"
+                         "lists must have the same length.")
+
     best_models = {}
     best_params = {}
+    cv_results = {}
+    coverage = {}
+    start_time = time.perf_counter()
+    # Out-of-fold errors and score of the best model so far when racing
+    reference, reference_name, reference_score = None, None, -np.inf
+    history = TrialHistory(trial_history) if trial_history else None
 
-    for (name, model), param_grid in zip(models, param_grids):
+    for position, ((name, model), param_grid, model_fit_params) in \
+            enumerate(zip(models, param_grids, fit_params)):
         print(f"Tuning hyperparameters for {name}...")
 
         try:
@@ -67,30 +206,153 @@ def hyperparameter_tuning(models, param_grids, x_train, y_train):
                 raise ValueError(f"Model '{name}' is not"
                                  "a valid scikit-learn estimator.")
 
-            grid_search = GridSearchCV(
-                estimator=model, param_grid=param_grid, cv=3,
-                scoring='neg_mean_squared_error', n_jobs=-1, verbose=2
-            )
-            grid_search.fit(x_train, y_train)
+            checkpoint = None
+            if checkpoint_dir is not None:
+                checkpoint = SearchCheckpoint.for_search(
+                    checkpoint_dir, name, model, x_train, y_train, 3,
+                    model_fit_params)
+            # Model-based searches resume from the saved results, but
+            # their candidates are only known once they ran
+            if checkpoint is not None and search == 'grid':
+                finished = checkpoint.load_finished(
+                    list(ParameterGrid(param_grid)))
+                if finished is not None:
+                    (best_models[name], best_params[name],
+                     cv_results[name]) = finished
+                    n_candidates = len(cv_results[name]['params'])
+                    coverage[name] = {
+                        'n_candidates': n_candidates,
+                        'n_evaluated': n_candidates, 'coverage': 1.0,
+                        'search_time': 0.0, 'time_budget': None,
+                        'complete': True, 'restored': True}
+                    print(f"Search for {name} already completed; "
+                          f"best parameters: {best_params[name]}")
+                    # The restored model still competes in later races
+                    score = np.nanmax(cv_results[name]['mean_test_score'])
+                    if racing and score > reference_score:
+                        reference = out_of_fold_errors(
+                            model, best_params[name], x_train, y_train, 3,
+                            model_fit_params)
+                        reference_name, reference_score = name, score
+                    continue
+
+            budget = _model_budget(name, model_time_budget, time_budget,
+                                   start_time, len(models) - position)
+            if search == 'bayes':
+                grid_search = _bayesian_search(
+                    model, param_grid, name, dataset_cache_dir, n_jobs,
+                    checkpoint, budget, racing, racing_alpha, reference,
+                    n_iter, history, deduplicate, feature_columns)
+            elif supports_binned_search(model):
+                grid_search = BinnedDatasetSearchCV(
+                    estimator=model, param_grid=param_grid, cv=3,
+                    cache_dir=dataset_cache_dir, n_jobs=n_jobs, verbose=2,
+                    checkpoint=checkpoint, time_budget=budget,
+                    racing=racing, racing_alpha=racing_alpha,
+                    race_reference=reference
+                )
+            elif supports_normal_equations(model):
+                grid_search = NormalEquationSearchCV(
+                    estimator=model, param_grid=param_grid, cv=3,
+                    n_jobs=n_jobs, verbose=2, checkpoint=checkpoint,
+                    time_budget=budget, racing=racing,
+                    racing_alpha=racing_alpha, race_reference=reference
+                )
+            else:
+                grid_search = CandidateSearchCV(
+                    estimator=model, param_grid=param_grid, cv=3,
+                    n_jobs=n_jobs, verbose=2, checkpoint=checkpoint,
+                    time_budget=budget, racing=racing,
+                    racing_alpha=racing_alpha, race_reference=reference,
+                    deduplicate=deduplicate
+                )
+            grid_search.fit(x_train, y_train, **model_fit_params)
 
             best_models[name] = grid_search.best_estimator_
             best_params[name] = grid_search.best_params_
+            cv_results[name] = grid_search.cv_results_
+            coverage[name] = grid_search.coverage_
+            if history is not None and search == 'grid':
+                history.append(name, data_signature(
+                    x_train, feature_columns), list(zip(
+                    grid_search.cv_results_['params'],
+                    grid_search.cv_results_['mean_test_score'])))
+            if grid_search.eliminated_:
+                print(f"Dropped {name}: all candidates are worse than "
+                      f"{reference_name}")
+            elif (racing and grid_search.oof_squared_errors_ is not None
+                  and grid_search.best_score_ > reference_score):
+                reference = grid_search.oof_squared_errors_
+                reference_name = name
+                reference_score = grid_search.best_score_
+            # A search stopped by its budget is not finished: a later
+            # run resumes it from the saved results and covers more. A
+            # raced search leaves eliminated candidates unscored on some
+            # folds, so it cannot stand in for a full search either
+            if (checkpoint is not None and search == 'grid'
+                    and grid_search.coverage_['complete'] and not racing):
+                checkpoint.save_finished(
+                    grid_search.cv_results_['params'],
+                    grid_search.best_estimator_, grid_search.best_params_,
+                    grid_search.cv_results_)
 
             print(f"Best parameters for {name}: {grid_search.best_params_}")
         except (ValueError, NotFittedError, TypeError) as exc:
             print(f"Error during hyperparameter tuning for {name}: {exc}")
             best_models[name] = None
             best_params[name] = None
+            cv_results[name] = None
+            coverage[name] = None
 
-    return best_models, best_params
+    results = (best_models, best_params)
+    if return_cv_results:
+        results += (cv_results,)
+    if return_coverage:
+        results += (coverage,)
+    return results
+
+
+def _bayesian_search(model, search_space, name, dataset_cache_dir, n_jobs,
+                     checkpoint, budget, racing, racing_alpha, reference,
+                     n_iter, history, deduplicate, feature_columns):
+    """Return the model-based search of a model."""
+    kwargs = {'n_iter': n_iter, 'history': history, 'history_name': name,
+              'feature_columns': feature_columns,
+              'cv': 3, 'verbose': 2, 'checkpoint': checkpoint,
+              'time_budget': budget, 'racing': racing,
+              'racing_alpha': racing_alpha, 'race_reference': reference}
+    if supports_binned_search(model):
+        return BinnedBayesianSearchCV(model, search_space,
+                                      cache_dir=dataset_cache_dir,
+                                      n_jobs=n_jobs, **kwargs)
+    return BayesianSearchCV(model, search_space, n_jobs=n_jobs,
+                            deduplicate=deduplicate, **kwargs)
+
+
+def _model_budget(name, model_time_budget, time_budget, start_time,
+                  n_models_left):
+    """
+    Return the time budget of a model's search: its own budget, capped
+    by an even share of what is left of the global budget.
+    """
+    if isinstance(model_time_budget, dict):
+        model_time_budget = model_time_budget.get(name)
+    if time_budget is None:
+        return model_time_budget
+    share = max(time_budget - (time.perf_counter() - start_time),
+                0.0) / n_models_left
+    if model_time_budget is None:
+        return share
+    return min(model_time_budget, share)
 
 
 def main():
     """
     Parses command-line arguments and performs hyperparameter tuning
-    using GridSearchCV for multiple models.
+    with a grid search for multiple models.
 
-    The best models and parameters are saved to joblib files.
+    The best models and parameters are saved to joblib files, or to an
+    artifact store with one artifact per model.
 
     Raises
     ------
@@ -98,8 +360,8 @@ def main():
         If the command-line arguments are invalid.
     """
     parser = argparse.ArgumentParser(
-        description="Perform hyperparameter tuning using"
-        "GridSearchCV for multiple models."
+        description="Perform hyperparameter tuning with a "
+        "grid search for multiple models."
     )
     parser.add_argument("x_train_file", type=str,
                         help="Path to the CSV file"
@@ -119,29 +381,88 @@ def main():
     parser.add_argument("--output_params", type=str,
                         default="best_params.joblib",
                         help="Path to save the best parameters.")
+    parser.add_argument("--dataset_cache_dir", type=str, default=None,
+                        help="Directory to cache binned LightGBM datasets.")
+    parser.add_argument("--checkpoint_dir", type=str, default=None,
+                        help="Directory to checkpoint the searches in and "
+                        "resume them from.")
+    parser.add_argument("--time_budget", type=float, default=None,
+                        help="Wall-clock seconds for tuning all models.")
+    parser.add_argument("--model_time_budget", type=float, default=None,
+                        help="Wall-clock seconds for tuning each model.")
+    parser.add_argument("--racing", action="store_true",
+                        help="Drop candidates and models statistically "
+                        "worse than the leader after each fold.")
+    parser.add_argument("--no_deduplicate", dest="deduplicate",
+                        action="store_false",
+                        help="Fit every tree candidate, even those "
+                        "equivalent to another one.")
+    parser.add_argument("--search", choices=['grid', 'bayes'],
+                        default='grid',
+                        help="Grid search, or model-based search over the "
+                        "search spaces in param_grids_file.")
+    parser.add_argument("--n_iter", type=int, default=30,
+                        help="Candidates per model of the model-based "
+                        "search.")
+    parser.add_argument("--trial_history", type=str, default=None,
+                        help="Trial history to warm-start the model-based "
+                        "search from.")
+    parser.add_argument("--artifact_store", type=str, default=None,
+                        help="Artifact store directory to save the best "
+                        "models in, instead of the joblib files.")
+    parser.add_argument("--performance_dir", type=str, default=None,
+                        help="Directory to save the per-candidate "
+                        "performance table and its summaries in.")
 
     args = parser.parse_args()
 
     try:
         # Load data
-        x_train = pd.read_csv(args.x_train_file)
-        y_train = pd.read_csv(args.y_train_file).squeeze()  # Convert to Series
+        x_train = load_data(args.x_train_file)
+        y_train = load_data(args.y_train_file).squeeze()  # Convert to Series
 
         # Load models and parameter grids
         models = joblib.load(args.models_file)
         param_grids = joblib.load(args.param_grids_file)
 
         # Perform hyperparameter tuning
-        best_models, best_params = hyperparameter_tuning(
-            models, param_grids, x_train, y_train
+        best_models, best_params, cv_results, coverage = \
+            hyperparameter_tuning(
+                models, param_grids, x_train, y_train,
+                dataset_cache_dir=args.dataset_cache_dir,
+                return_cv_results=True, checkpoint_dir=args.checkpoint_dir,
+                time_budget=args.time_budget,
+                model_time_budget=args.model_time_budget,
+                return_coverage=True, racing=args.racing,
+                search=args.search, n_iter=args.n_iter,
+                trial_history=args.trial_history,
+                deduplicate=args.deduplicate
             )
+        for name, record in coverage.items():
+            if record is not None:
+                print(f"{name}: evaluated {record['n_evaluated']} of "
+                      f"{record['n_candidates']} candidates in "
+                      f"{record['search_time']:.1f}s")
+        if args.performance_dir:
+            save_tuning_performance(cv_results, args.performance_dir)
+            print(f"Tuning performance saved to {args.performance_dir}")
 
         # Save the best models and parameters
-        joblib.dump(best_models, args.output_models)
-        joblib.dump(best_params, args.output_params)
+        if args.artifact_store:
+            store = ArtifactStore(args.artifact_store)
+            for name, model in best_models.items():
+                if model is None:
+                    continue
+                version = store.save(name, model,
+                                     {'best_params': best_params[name]})
+                print(f"Best model {name} saved to "
+                      f"{args.artifact_store} as {name}@{version}")
+        else:
+            joblib.dump(best_models, args.output_models)
+            joblib.dump(best_params, args.output_params)
 
-        print(f"Best models saved to {args.output_models}")
-        print(f"Best parameters saved to {args.output_params}")
+            print(f"Best models saved to {args.output_models}")
+            print(f"Best parameters saved to {args.output_params}")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
         raise
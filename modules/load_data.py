@@ -0,0 +1,471 @@
+"""
+This module provides functionality to load a dataset that is stored as
+one CSV file or as many partition files.
+
+A data source is a CSV file, a directory (searched recursively for CSV
+files) or a glob pattern. Directories named key=value, as in
+listings/Bundesland=Bayern/month=2024-01/part-0.csv, define partition
+columns: their values are added to the rows of the files below them,
+and filters on these columns skip whole files without reading them.
+Partitions are read concurrently in a thread pool, and their columns
+can be unioned when not all partitions have the same schema.
+
+Each file is parsed with the multi-threaded pyarrow engine when pyarrow
+is installed, and with the C engine otherwise. Only the columns a stage
+declares are parsed (column projection), either by name or by type
+inferred from a sample of rows. Compressed files (.gz, .bz2, .xz, .zst)
+are decompressed while they are parsed, chunk by chunk when iterating.
+
+Functions:
+- default_engine: Returns the fastest available CSV parser engine.
+- resolve_partitions: Lists the CSV files of a data source.
+- infer_columns: Selects columns by type from a sample of rows.
+- partition_values: Parses the key=value directories of a partition path.
+- parse_filters: Parses KEY=VALUE[,VALUE...] filter arguments.
+- load_data: Loads a data source into one DataFrame.
+- iter_data_chunks: Iterates over a data source in chunks.
+- main: Parses command-line arguments and summarizes a data source.
+"""
+
+import argparse
+import glob
+import importlib.util
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Suffixes of the files found in a directory of partitions
+CSV_SUFFIXES = ('.csv', '.csv.gz', '.csv.bz2', '.csv.xz', '.csv.zst')
+
+
+def default_engine():
+    """
+    Returns the fastest available CSV parser engine.
+
+    Returns
+    -------
+    str
+        'pyarrow' (multi-threaded) if pyarrow is installed, else 'c'.
+    """
+    if importlib.util.find_spec('pyarrow') is not None:
+        return 'pyarrow'
+    return 'c'
+
+
+def resolve_partitions(source):
+    """
+    Lists the CSV files of a data source.
+
+    Parameters
+    ----------
+    source : str
+        Path to a CSV file, a directory of CSV files (searched
+        recursively) or a glob pattern.
+
+    Returns
+    -------
+    list of str
+        Sorted paths of the files.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the source does not match any file.
+    """
+    if os.path.isfile(source):
+        return [source]
+    if os.path.isdir(source):
+        paths = [path for suffix in CSV_SUFFIXES
+                 for path in glob.glob(os.path.join(source, '**',
+                                                    '*' + suffix),
+                                       recursive=True)]
+    else:
+        paths = [path for path in glob.glob(source, recursive=True)
+                 if os.path.isfile(path)]
+    if not paths:
+        raise FileNotFoundError(source)
+    return sorted(paths)
+
+
+def partition_values(path, root=None):
+    """
+    Parses the key=value directories of a partition path.
+
+    Parameters
+    ----------
+    path : str
+        Path of a partition file.
+    root : str, optional
+        Directory of the data source; only directories below it are
+        parsed.
+
+    Returns
+    -------
+    dict
+        Partition column names and their (string) values.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if root is not None and os.path.isdir(root):
+        directory = os.path.relpath(directory, os.path.abspath(root))
+    values = {}
+    for part in directory.split(os.sep):
+        key, separator, value = part.partition('=')
+        if separator and key:
+            values[key] = value
+    return values
+
+
+def parse_filters(arguments):
+    """
+    Parses KEY=VALUE[,VALUE...] filter arguments.
+
+    Parameters
+    ----------
+    arguments : list of str
+        Filter arguments, e.g. ['Bundesland=Bayern,Berlin'].
+
+    Returns
+    -------
+    dict
+        Column names and the list of accepted values.
+
+    Raises
+    ------
+    ValueError
+        If an argument is not of the form KEY=VALUE.
+    """
+    filters = {}
+    for argument in arguments or []:
+        key, separator, values = argument.partition('=')
+        if not separator or not key:
+            raise ValueError(f"Invalid filter '{argument}', "
+                             "expected KEY=VALUE[,VALUE...].")
+        filters.setdefault(key, []).extend(values.split(','))
+    return filters
+
+
+def _accepted(values, filters):
+    """Tell whether partition values pass the filters on their keys."""
+    return all(str(values[key]) in {str(value) for value in accepted}
+               for key, accepted in filters.items() if key in values)
+
+
+def _filter_rows(data, filters):
+    """Keep the rows whose columns pass the filters."""
+    for key, accepted in filters.items():
+        if key in data.columns:
+            accepted = {str(value) for value in accepted}
+            data = data[data[key].astype(str).isin(accepted)]
+    return data
+
+
+def _add_partition_columns(data, values):
+    """Insert the partition columns at the front of a partition."""
+    for position, (key, value) in enumerate(values.items()):
+        if key not in data.columns:
+            data.insert(position, key, value)
+    return data
+
+
+def _column_selector(columns):
+    """Return a predicate telling whether a column is selected."""
+    if columns is None:
+        return lambda column: True
+    if callable(columns):
+        return columns
+    selected = set(columns)
+    return lambda column: column in selected
+
+
+def _projection(header, selector, filters):
+    """Return the columns of a file to parse: the selected ones and
+    those needed by the row filters, in file order."""
+    return [column for column in header
+            if selector(column) or column in filters]
+
+
+def _read_header(path, read_csv_kwargs):
+    """Read the column names of a file without parsing its rows."""
+    kwargs = {key: value for key, value in read_csv_kwargs.items()
+              if key in ('sep', 'delimiter', 'header', 'encoding',
+                         'compression')}
+    return pd.read_csv(path, nrows=0, **kwargs).columns.tolist()
+
+
+def _check_projection(data, columns):
+    """Raise if selected columns are missing from the data."""
+    if columns is None or callable(columns):
+        return
+    missing = [column for column in columns if column not in data.columns]
+    if missing:
+        raise ValueError(f"Columns {missing} are not in the data.")
+
+
+def infer_columns(source, include=None, exclude=None, sample_rows=1000,
+                  **read_csv_kwargs):
+    """
+    Selects columns by type from a sample of rows of the first file.
+
+    Parameters
+    ----------
+    source : str
+        Path to a CSV file, a directory of partitions or a glob pattern.
+    include : str or list, optional
+        Dtypes to select, as in pd.DataFrame.select_dtypes, e.g.
+        'number'.
+    exclude : str or list, optional
+        Dtypes to leave out, e.g. 'number' for the categorical columns.
+    sample_rows : int
+        Number of rows whose types are inferred.
+    **read_csv_kwargs : dict
+        Extra keyword arguments passed to pd.read_csv.
+
+    Returns
+    -------
+    list of str
+        The selected columns in file order. Partition columns count as
+        non-numeric.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the source does not match any file.
+    """
+    path, values = _selected_partitions(source, {})[0]
+    sample = _add_partition_columns(
+        pd.read_csv(path, nrows=sample_rows, **read_csv_kwargs),
+        {key: str(value) for key, value in values.items()})
+    return sample.select_dtypes(include=include,
+                                exclude=exclude).columns.tolist()
+
+
+def _union_columns(column_lists):
+    """
+    Merge column lists, keeping the relative order of every list so
+    that e.g. a target column that is last everywhere stays last.
+    """
+    columns = list(column_lists[0])
+    for other in column_lists[1:]:
+        for position, column in enumerate(other):
+            if column in columns:
+                continue
+            following = next((name for name in other[position + 1:]
+                              if name in columns), None)
+            index = (columns.index(following) if following is not None
+                     else len(columns))
+            columns.insert(index, column)
+    return columns
+
+
+def _selected_partitions(source, filters):
+    """Return the partition files and their values after pruning."""
+    paths = resolve_partitions(source)
+    if os.path.isfile(source):
+        # A single file is read as it is, whatever its directory name
+        return [(source, {})]
+    root = source if os.path.isdir(source) else None
+    partitions = [(path, partition_values(path, root)) for path in paths]
+    return [(path, values) for path, values in partitions
+            if _accepted(values, filters)]
+
+
+def _check_schemas(column_lists, union_schema):
+    """Return the output columns, or raise if schemas differ."""
+    columns = _union_columns(column_lists)
+    if not union_schema:
+        for other in column_lists:
+            if list(other) != columns:
+                missing = sorted(set(columns) - set(other))
+                raise ValueError(
+                    "Partitions have different columns (missing "
+                    f"{missing}); pass union_schema=True to union them.")
+    return columns
+
+
+def load_data(source, filters=None, union_schema=False, n_jobs=None,
+              columns=None, engine=None, **read_csv_kwargs):
+    """
+    Loads a data source into one DataFrame.
+
+    Parameters
+    ----------
+    source : str
+        Path to a CSV file, a directory of partitions or a glob pattern.
+    filters : dict, optional
+        Column names and the list of accepted values. Filters on
+        partition columns skip whole files; other filters are applied
+        to the rows.
+    union_schema : bool
+        Whether partitions may have different columns; missing columns
+        are filled with NaN. If False, differing columns raise.
+    n_jobs : int, optional
+        Number of threads reading partitions concurrently.
+    columns : list of str or callable, optional
+        Columns to parse, by name or as a predicate on the name; all
+        columns if None. Columns needed by the filters are parsed too
+        but only returned if selected.
+    engine : str, optional
+        Parser engine of pd.read_csv; default_engine() if None.
+    **read_csv_kwargs : dict
+        Extra keyword arguments passed to pd.read_csv, e.g.
+        compression for files without a compression suffix.
+
+    Returns
+    -------
+    pd.DataFrame
+        The rows of all selected partitions.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the source does not match any file.
+    ValueError
+        If no partition passes the filters, the partitions have
+        different columns and union_schema is False, or selected
+        columns are missing.
+    """
+    filters = filters or {}
+    partitions = _selected_partitions(source, filters)
+    if not partitions:
+        raise ValueError(f"No partition of '{source}' matches the filters.")
+    selector = _column_selector(columns)
+    engine = engine or default_engine()
+
+    def read(partition):
+        path, values = partition
+        usecols = None
+        if columns is not None:
+            usecols = _projection(_read_header(path, read_csv_kwargs),
+                                  selector, filters)
+        data = pd.read_csv(path, usecols=usecols, engine=engine,
+                           **read_csv_kwargs)
+        return _add_partition_columns(
+            data, {key: value for key, value in values.items()
+                   if selector(key) or key in filters})
+
+    if len(partitions) == 1:
+        frames = [read(partitions[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            frames = list(executor.map(read, partitions))
+
+    output_columns = _check_schemas(
+        [frame.columns.tolist() for frame in frames], union_schema)
+    data = frames[0] if len(frames) == 1 else pd.concat(
+        frames, ignore_index=True, join='outer', sort=False)
+    data = _filter_rows(data[output_columns], filters)
+    data = data[[column for column in output_columns if selector(column)]]
+    _check_projection(data, columns)
+    return data.reset_index(drop=True)
+
+
+def iter_data_chunks(source, chunksize=100_000, filters=None,
+                     union_schema=False, columns=None, **read_csv_kwargs):
+    """
+    Iterates over a data source in chunks, one partition after another.
+
+    Parameters
+    ----------
+    source : str
+        Path to a CSV file, a directory of partitions or a glob pattern.
+    chunksize : int
+        Number of rows read at a time.
+    filters : dict, optional
+        Column names and the list of accepted values, see load_data.
+    union_schema : bool
+        Whether partitions may have different columns, see load_data.
+    columns : list of str or callable, optional
+        Columns to parse, see load_data.
+    **read_csv_kwargs : dict
+        Extra keyword arguments passed to pd.read_csv. Compressed files
+        are decompressed as the chunks are read.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next chunk of rows, with the columns of all partitions.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the source does not match any file.
+    ValueError
+        If the partitions have different columns and union_schema is
+        False.
+    """
+    filters = filters or {}
+    partitions = _selected_partitions(source, filters)
+    file_headers = [_read_header(path, read_csv_kwargs)
+                    for path, _ in partitions]
+    headers = [list(values) + [column for column in header
+                               if column not in values]
+               for (_, values), header in zip(partitions, file_headers)]
+    if not headers:
+        return
+    selector = _column_selector(columns)
+    union = _check_schemas(headers, union_schema)
+    parsed = [column for column in union
+              if selector(column) or column in filters]
+    output_columns = [column for column in union if selector(column)]
+    if columns is not None and not callable(columns):
+        missing = [column for column in columns if column not in union]
+        if missing:
+            raise ValueError(f"Columns {missing} are not in the data.")
+
+    for (path, values), header in zip(partitions, file_headers):
+        usecols = None
+        if columns is not None:
+            usecols = _projection(header, selector, filters)
+        with pd.read_csv(path, chunksize=chunksize, usecols=usecols,
+                         **read_csv_kwargs) as reader:
+            for chunk in reader:
+                chunk = _add_partition_columns(chunk, values)
+                chunk = _filter_rows(chunk.reindex(columns=parsed),
+                                     filters)
+                if len(chunk):
+                    yield chunk[output_columns]
+
+
+def main():
+    """
+    Parses command-line arguments and prints a summary of the selected
+    partitions of a data source.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Load a partitioned dataset and summarize it."
+    )
+    parser.add_argument("source", type=str,
+                        help="CSV file, directory of partitions or glob.")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="Keep rows with KEY=VALUE[,VALUE...]; "
+                        "may be repeated.")
+    parser.add_argument("--union_schema", action="store_true",
+                        help="Union the columns of the partitions.")
+    parser.add_argument("--columns", type=str, nargs='+', default=None,
+                        help="Columns to read; all columns by default.")
+    parser.add_argument("--engine", type=str, default=None,
+                        choices=['pyarrow', 'c', 'python'],
+                        help="CSV parser engine; pyarrow if installed.")
+
+    args = parser.parse_args()
+
+    try:
+        data = load_data(args.source, parse_filters(args.filter),
+                         args.union_schema, columns=args.columns,
+                         engine=args.engine)
+        print(f"Loaded {len(data)} rows and {data.shape[1]} columns from "
+              f"{len(resolve_partitions(args.source))} file(s).")
+    except FileNotFoundError:
+        print(f"Error: No data found at '{args.source}'.")
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+This module provides functionality to map ordinal rating columns of a
+pandas DataFrame (e.g. quality ratings such as 'Ex', 'Gd', 'TA') to
+numerical values.
+
+The mapping is driven by a declarative spec: each named scale lists its
+levels from worst to best and the columns rated on it. The level at
+position i is mapped to i + 1; missing and unknown values become NaN.
+All columns are mapped at once through a single lookup table indexed by
+scale and level code, so adding columns does not add per-column passes.
+
+Functions:
+- map_ordinal_columns: Maps the ordinal columns of a DataFrame to numbers.
+- parse_ordinal_spec: Generates a spec from the ordered level lists in
+  the data description file.
+- load_ordinal_spec: Loads a spec from a JSON file.
+- save_ordinal_spec: Saves a spec to a JSON file.
+- main: Parses command-line arguments and maps the ordinal columns in the
+  input CSV file.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+DEFAULT_ORDINAL_SPEC = {
+    'quality': {
+        'levels': ['Po', 'Fa', 'TA', 'Gd', 'Ex'],
+        'columns': ['GarageQual', 'GarageCond', 'PoolQC', 'FireplaceQu',
+                    'KitchenQual', 'HeatingQC', 'BsmtCond', 'BsmtQual',
+                    'ExterCond', 'ExterQual']
+    },
+    'basement_exposure': {
+        'levels': ['No', 'Mn', 'Av', 'Gd'],
+        'columns': ['BsmtExposure']
+    },
+    'basement_finish': {
+        'levels': ['Unf', 'LwQ', 'Rec', 'BLQ', 'ALQ', 'GLQ'],
+        'columns': ['BsmtFinType1', 'BsmtFinType2']
+    },
+    'garage_finish': {
+        'levels': ['Unf', 'RFn', 'Fin'],
+        'columns': ['GarageFinish']
+    },
+    'functional': {
+        'levels': ['Sal', 'Sev', 'Maj2', 'Maj1', 'Mod', 'Min2', 'Min1',
+                   'Typ'],
+        'columns': ['Functional']
+    },
+    'lot_shape': {
+        'levels': ['IR3', 'IR2', 'IR1', 'Reg'],
+        'columns': ['LotShape']
+    },
+    'land_slope': {
+        'levels': ['Sev', 'Mod', 'Gtl'],
+        'columns': ['LandSlope']
+    },
+    'utilities': {
+        'levels': ['ELO', 'NoSeWa', 'NoSewr', 'AllPub'],
+        'columns': ['Utilities']
+    },
+    'paved_drive': {
+        'levels': ['N', 'P', 'Y'],
+        'columns': ['PavedDrive']
+    }
+}
+
+# Level used in the data description for "not present" (no garage, ...)
+MISSING_LEVEL = 'NA'
+
+
+def map_ordinal_columns(data, spec=None):
+    """
+    Maps the ordinal columns of a DataFrame to numerical values.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The input data as a pandas DataFrame.
+    spec : dict, optional
+        Dictionary mapping scale names to a dictionary with the 'levels'
+        of the scale, ordered from worst to best, and the 'columns'
+        rated on it. Columns that are not in the DataFrame are skipped.
+        Defaults to DEFAULT_ORDINAL_SPEC.
+
+    Returns
+    -------
+    pd.DataFrame
+        A copy of the data with the ordinal columns mapped to numbers.
+
+    Raises
+    ------
+    TypeError
+        If input data is not a pandas DataFrame.
+    ValueError
+        If a column is rated on more than one scale.
+    """
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError("Input data must be a pandas DataFrame.")
+
+    if spec is None:
+        spec = DEFAULT_ORDINAL_SPEC
+
+    scales = list(spec.values())
+    columns = []
+    column_scales = []
+    for scale_index, scale in enumerate(scales):
+        for column in scale['columns']:
+            if column in columns:
+                raise ValueError(f"Column '{column}' is rated on more "
+                                 "than one scale.")
+            if column in data.columns:
+                columns.append(column)
+                column_scales.append(scale_index)
+
+    mapped_data = data.copy()
+    if not columns or data.empty:
+        return mapped_data
+
+    # One vocabulary over all scales; the extra last column of the table
+    # stays NaN and catches unknown and missing values (code -1)
+    vocabulary = pd.Index(
+        pd.unique(np.concatenate([scale['levels'] for scale in scales])))
+    table = np.full((len(scales), len(vocabulary) + 1), np.nan)
+    for scale_index, scale in enumerate(scales):
+        table[scale_index, vocabulary.get_indexer(scale['levels'])] = (
+            np.arange(1, len(scale['levels']) + 1))
+
+    values = data[columns].to_numpy(dtype=object)
+    codes = vocabulary.get_indexer(values.ravel()).reshape(values.shape)
+    mapped = table[np.asarray(column_scales)[np.newaxis, :], codes]
+
+    mapped_data[columns] = pd.DataFrame(mapped, index=data.index,
+                                        columns=columns)
+    return mapped_data
+
+
+def parse_ordinal_spec(description_file, columns):
+    """
+    Generates a spec from the ordered level lists in the data
+    description file.
+
+    The description lists levels from best to worst with 'NA' last;
+    columns with the same level list share one scale.
+
+    Parameters
+    ----------
+    description_file : str
+        Path to the data description file.
+    columns : list
+        The ordinal columns to include in the spec.
+
+    Returns
+    -------
+    dict
+        The generated spec.
+
+    Raises
+    ------
+    ValueError
+        If a column has no level list in the description.
+    """
+    levels_by_column = {}
+    current = None
+    with open(description_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            header = re.match(r'^(\w+):', line)
+            if header:
+                current = header.group(1)
+                levels_by_column[current] = []
+                continue
+            level = re.match(r'^\s+(\S+)\t', line)
+            if level and current is not None:
+                levels_by_column[current].append(level.group(1))
+
+    spec = {}
+    for column in columns:
+        levels = [level for level in levels_by_column.get(column, [])
+                  if level != MISSING_LEVEL]
+        if not levels:
+            raise ValueError(f"Column '{column}' has no level list in "
+                             f"'{description_file}'.")
+        levels = levels[::-1]
+        for scale in spec.values():
+            if scale['levels'] == levels:
+                scale['columns'].append(column)
+                break
+        else:
+            spec[column] = {'levels': levels, 'columns': [column]}
+
+    return spec
+
+
+def load_ordinal_spec(input_file):
+    """
+    Loads a spec from a JSON file.
+
+    Parameters
+    ----------
+    input_file : str
+        Path of the JSON file.
+
+    Returns
+    -------
+    dict
+        The spec.
+    """
+    with open(input_file, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_ordinal_spec(spec, output_file):
+    """
+    Saves a spec to a JSON file.
+
+    Parameters
+    ----------
+    spec : dict
+        The spec.
+    output_file : str
+        Path of the JSON file.
+    """
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(spec, file, indent=2)
+
+
+def main():
+    """
+    Parses command-line arguments and maps the ordinal columns in the
+    input CSV file, or generates a spec from the data description.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Map ordinal rating columns to numerical values."
+    )
+    parser.add_argument("file", type=str,
+                        help="Path to the input CSV file, a directory "
+                        "of partitions or a glob pattern.")
+    parser.add_argument(
+        "--spec", type=str, default=None,
+        help="Path to a JSON spec. If not specified, the default spec "
+        "is used."
+    )
+    parser.add_argument(
+        "--description_file", type=str, default=None,
+        help="Generate the spec for the default spec's columns from "
+        "this data description file instead."
+    )
+    parser.add_argument(
+        "--output_spec", type=str, default=None,
+        help="Path to save the spec that was used."
+    )
+    parser.add_argument(
+        "--output", type=str, default="mapped_data.csv",
+        help="Path to save the mapped CSV file."
+    )
+
+    args = parser.parse_args()
+
+    try:
+        data = load_data(args.file)
+    except FileNotFoundError:
+        print(f"Error: The file '{args.file}' was not found.")
+        return
+    except pd.errors.EmptyDataError:
+        print(f"Error: The file '{args.file}' is empty.")
+        return
+
+    try:
+        if args.description_file:
+            spec = parse_ordinal_spec(
+                args.description_file,
+                [column for scale in DEFAULT_ORDINAL_SPEC.values()
+                 for column in scale['columns']])
+        elif args.spec:
+            spec = load_ordinal_spec(args.spec)
+        else:
+            spec = DEFAULT_ORDINAL_SPEC
+
+        mapped_data = map_ordinal_columns(data, spec)
+        mapped_data.to_csv(args.output, index=False)
+        print(f"Mapped data saved to {args.output}")
+
+        if args.output_spec:
+            save_ordinal_spec(spec, args.output_spec)
+            print(f"Spec saved to {args.output_spec}")
+    except (TypeError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
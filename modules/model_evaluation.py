@@ -2,24 +2,176 @@
 This module provides functionality to evaluate a trained model and save
 the predicted and actual values to a file.
 
+Test sets that do not fit in memory can be evaluated in streaming mode:
+the test set is read in chunks, each chunk is predicted and appended to
+the output file, and the metrics are updated by running accumulators.
+
+Classes:
+- RegressionMetricsAccumulator: Running MSE, R², MAE and residual
+  histogram.
+
 Functions:
 - model_evaluation: Evaluate a model and save
 the predicted and actual values to a file.
+- iter_test_chunks: Reads test features and values in matching chunks.
+- stream_model_evaluation: Evaluate a model chunk by chunk and append
+  the predicted and actual values to a file.
 - main: Parses command-line arguments and evaluates the specified model.
 """
 
 import argparse
+import os
+import sys
+
 import joblib
 import numpy as np
 import pandas as pd
 from sklearn.metrics import mean_squared_error, r2_score
 
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.artifact_store import (  # noqa: E402
+    ArtifactStore, parse_artifact_reference
+)
+from modules.encode_categorical_columns import (  # noqa: E402
+    apply_categorical_encoding, load_encoding
+)
+from modules.feature_pruning import load_kept_features  # noqa: E402
+from modules.load_data import iter_data_chunks, load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+
+# Number of bins of the residual histogram (must be a multiple of 4)
+HISTOGRAM_BINS = 64
+
 
 class ModelEvaluationError(Exception):
     """Custom exception for errors during model evaluation."""
 
 
-def model_evaluation(name, model, x_test, y_test, output_file):
+class RegressionMetricsAccumulator:
+    """
+    Running MSE, R², MAE and residual histogram.
+
+    The mean and sum of squared deviations of the true values are
+    combined chunk by chunk with Chan's parallel update, and the
+    squared and absolute errors are kept as running means, so the
+    results match the metrics of the whole test set up to rounding
+    whatever the chunking.
+
+    The residual histogram has a fixed number of bins over a
+    symmetric range. The range starts as the smallest power of two
+    covering the first chunk and doubles, merging neighbouring bins,
+    whenever a residual falls outside it.
+
+    Parameters
+    ----------
+    n_bins : int
+        Number of histogram bins; a multiple of 4.
+    """
+
+    def __init__(self, n_bins=HISTOGRAM_BINS):
+        if n_bins % 4:
+            raise ValueError("n_bins must be a multiple of 4.")
+        self.n_samples = 0
+        self.mean_true = 0.0
+        self.m2_true = 0.0
+        self.mean_squared_error = 0.0
+        self.mean_absolute_error = 0.0
+        self.histogram_range = None
+        self.histogram_counts = np.zeros(n_bins, dtype=np.int64)
+
+    def _grow_histogram(self, max_residual):
+        """Double the histogram range until it covers max_residual."""
+        if self.histogram_range is None:
+            self.histogram_range = 2.0 ** np.ceil(
+                np.log2(max(max_residual, np.finfo(float).tiny)))
+        n_bins = len(self.histogram_counts)
+        while max_residual > self.histogram_range:
+            merged = self.histogram_counts.reshape(-1, 2).sum(axis=1)
+            padding = np.zeros(n_bins // 4, dtype=np.int64)
+            self.histogram_counts = np.concatenate([padding, merged,
+                                                    padding])
+            self.histogram_range *= 2
+
+    def update(self, y_true, y_pred):
+        """
+        Add a chunk of true values and predictions.
+
+        Parameters
+        ----------
+        y_true : np.ndarray
+            True values of the chunk.
+        y_pred : np.ndarray
+            Predictions of the chunk.
+        """
+        y_true = np.asarray(y_true, dtype=np.float64).ravel()
+        residuals = np.asarray(y_pred, dtype=np.float64).ravel() - y_true
+        n_chunk = y_true.size
+        if n_chunk == 0:
+            return
+
+        total = self.n_samples + n_chunk
+        chunk_mean = y_true.mean()
+        delta = chunk_mean - self.mean_true
+        self.m2_true += (np.sum((y_true - chunk_mean) ** 2) +
+                         delta ** 2 * self.n_samples * n_chunk / total)
+        self.mean_true += delta * n_chunk / total
+        weight = n_chunk / total
+        self.mean_squared_error += (np.mean(residuals ** 2) -
+                                    self.mean_squared_error) * weight
+        self.mean_absolute_error += (np.mean(np.abs(residuals)) -
+                                     self.mean_absolute_error) * weight
+        self.n_samples = total
+
+        self._grow_histogram(np.max(np.abs(residuals)))
+        counts, _ = np.histogram(residuals, bins=len(self.histogram_counts),
+                                 range=(-self.histogram_range,
+                                        self.histogram_range))
+        self.histogram_counts += counts
+
+    def metrics(self):
+        """
+        Return the metrics of all rows added so far.
+
+        Returns
+        -------
+        dict
+            MSE, R2-Score, MAE and the number of samples.
+
+        Raises
+        ------
+        ValueError
+            If no rows were added.
+        """
+        if self.n_samples == 0:
+            raise ValueError("No predictions were evaluated.")
+        sum_squares = self.m2_true
+        r2 = (1 - self.mean_squared_error * self.n_samples / sum_squares
+              if sum_squares > 0 else np.nan)
+        return {'MSE': self.mean_squared_error, 'R2-Score': r2,
+                'MAE': self.mean_absolute_error,
+                'n_samples': self.n_samples}
+
+    def histogram(self):
+        """
+        Return the residual histogram (prediction minus true value).
+
+        Returns
+        -------
+        tuple
+            Bin counts and bin edges.
+        """
+        edges = np.linspace(-(self.histogram_range or 1.0),
+                            self.histogram_range or 1.0,
+                            len(self.histogram_counts) + 1)
+        return self.histogram_counts.copy(), edges
+
+
+def model_evaluation(name, model, x_test, y_test, output_file,
+                     return_predictions=False):
     """
     Evaluate a model and save the predicted and actual values to a file.
 
@@ -35,11 +187,16 @@ def model_evaluation(name, model, x_test, y_test, output_file):
         True values for the test set.
     output_file : str
         Path to the file where predictions and true values will be saved.
+    return_predictions : bool
+        Whether to also return the unrounded predictions, e.g. to
+        bootstrap the metrics without predicting again.
 
     Returns
     -------
     dict
         Dictionary containing evaluation metrics.
+    np.ndarray
+        The predictions; only returned if return_predictions is True.
 
     Raises
     ------
@@ -88,6 +245,134 @@ def model_evaluation(name, model, x_test, y_test, output_file):
         raise ModelEvaluationError(f"Error writing"
                                    f"results to file: {exc}") from exc
 
+    if return_predictions:
+        return metrics_dict, y_pred
+    return metrics_dict
+
+
+def iter_test_chunks(x_test_file, y_test_file, chunksize=100_000,
+                     encoding=None, columns=None):
+    """
+    Reads test features and values in matching chunks.
+
+    Parameters
+    ----------
+    x_test_file : str
+        Path to the CSV file containing the test features.
+    y_test_file : str
+        Path to the CSV file containing the true test values.
+    chunksize : int
+        Number of rows per chunk.
+    encoding : dict, optional
+        Categorical encoding applied to the features.
+    columns : list of str, optional
+        Feature columns to read, in the order the model expects, e.g.
+        the kept features of the pruning stage; all columns if None.
+
+    Yields
+    ------
+    tuple
+        Features and true values of the next chunk.
+
+    Raises
+    ------
+    ValueError
+        If the files do not have the same number of rows.
+    """
+    if columns is not None and encoding:
+        encoding = {column: levels for column, levels in encoding.items()
+                    if column in columns}
+    y_reader = iter_data_chunks(y_test_file, chunksize)
+    for x_chunk in iter_data_chunks(x_test_file, chunksize,
+                                    columns=columns):
+        y_chunk = next(y_reader, None)
+        if y_chunk is None or len(y_chunk) != len(x_chunk):
+            raise ValueError("The number of samples"
+                             "in x_test and y_test must be the same.")
+        if columns is not None:
+            x_chunk = x_chunk[list(columns)]
+        if encoding:
+            x_chunk = apply_categorical_encoding(x_chunk, encoding)
+        yield x_chunk.values, y_chunk.values.ravel()
+    if next(y_reader, None) is not None:
+        raise ValueError("The number of samples"
+                         "in x_test and y_test must be the same.")
+
+
+def stream_model_evaluation(name, model, test_chunks, output_file,
+                            return_predictions=False, histogram_file=None):
+    """
+    Evaluate a model chunk by chunk and append the predicted and actual
+    values to a file.
+
+    Only one chunk of the test set is held in memory at a time.
+
+    Parameters
+    ----------
+    name : str
+        Name of the model.
+    model : object
+        Trained model to be evaluated.
+    test_chunks : iterable of tuple
+        Chunks of test features and true values, e.g. from
+        iter_test_chunks.
+    output_file : str
+        Path to the file where predictions and true values will be saved.
+    return_predictions : bool
+        Whether to also return all predictions (one float per row).
+    histogram_file : str, optional
+        Path to a CSV file to save the residual histogram in.
+
+    Returns
+    -------
+    dict
+        Dictionary containing evaluation metrics (MSE, R2-Score, MAE).
+    np.ndarray
+        The predictions; only returned if return_predictions is True.
+
+    Raises
+    ------
+    ValueError
+        If the test set is empty.
+    ModelEvaluationError
+        For any error that occurs during model prediction or file writing.
+    """
+    accumulator = RegressionMetricsAccumulator()
+    predictions = []
+    try:
+        file = open(output_file, "w", encoding="utf-8")
+    except OSError as exc:
+        raise ModelEvaluationError(f"Error writing"
+                                   f"results to file: {exc}") from exc
+
+    with file:
+        file.write("Predicted,Actual\n")
+        for x_chunk, y_chunk in test_chunks:
+            try:
+                y_pred = np.asarray(model.predict(x_chunk))
+            except Exception as exc:
+                raise ModelEvaluationError(
+                    f"Error during model prediction: {exc}") from exc
+            accumulator.update(y_chunk, y_pred)
+            np.savetxt(file, np.column_stack((y_pred, y_chunk)),
+                       fmt="%.2f", delimiter=",")
+            if return_predictions:
+                predictions.append(y_pred)
+
+    metrics = accumulator.metrics()
+    if histogram_file:
+        counts, edges = accumulator.histogram()
+        pd.DataFrame({'Lower': edges[:-1], 'Upper': edges[1:],
+                      'Count': counts}).to_csv(histogram_file, index=False)
+
+    metrics_dict = {
+        'Model': name,
+        'MSE': metrics['MSE'],
+        'R2-Score': metrics['R2-Score'],
+        'MAE': metrics['MAE']
+    }
+    if return_predictions:
+        return metrics_dict, np.concatenate(predictions)
     return metrics_dict
 
 
@@ -108,7 +393,8 @@ def main():
     )
     parser.add_argument(
         "model_file", type=str,
-        help="Path to the trained model file (joblib format)."
+        help="Path to the trained model file (joblib format), or "
+        "'name[@version]' of an artifact with --artifact_store."
     )
     parser.add_argument(
         "x_test_file", type=str,
@@ -127,24 +413,76 @@ def main():
         "--model_name", type=str, default="Model",
         help="Name of the model being evaluated."
     )
+    parser.add_argument(
+        "--encoding_file", type=str, default=None,
+        help="Path to the categorical encoding saved at preprocessing, "
+        "applied to raw categorical columns of the test features."
+    )
+    parser.add_argument(
+        "--artifact_store", type=str, default=None,
+        help="Artifact store directory to load the model from; its "
+        "arrays are memory-mapped and shared between processes."
+    )
+
+    parser.add_argument(
+        "--chunksize", type=int, default=None,
+        help="Evaluate in streaming mode, reading this many test rows "
+        "at a time."
+    )
+    parser.add_argument(
+        "--histogram_file", type=str, default=None,
+        help="Path to save the residual histogram in streaming mode."
+    )
+    parser.add_argument(
+        "--kept_features", type=str, default=None,
+        help="Path to the kept features JSON file of the pruning stage; "
+        "only these columns of the test features are scored."
+    )
 
     args = parser.parse_args()
 
     # Load the model
-    model = joblib.load(args.model_file)
+    if args.artifact_store:
+        model = ArtifactStore(args.artifact_store).load(
+            *parse_artifact_reference(args.model_file))
+    else:
+        model = joblib.load(args.model_file)
+
+    encoding = load_encoding(args.encoding_file) \
+        if args.encoding_file else None
+    columns = load_kept_features(args.kept_features) \
+        if args.kept_features else None
+    if columns is not None and encoding:
+        encoding = {column: levels for column, levels in encoding.items()
+                    if column in columns}
 
-    # Load the test data
-    x_test = pd.read_csv(args.x_test_file).values
-    y_test = pd.read_csv(args.y_test_file).values.flatten()
+    if args.chunksize:
+        # Evaluate the model chunk by chunk
+        metrics = stream_model_evaluation(
+            args.model_name, model,
+            iter_test_chunks(args.x_test_file, args.y_test_file,
+                             args.chunksize, encoding, columns),
+            args.output_file, histogram_file=args.histogram_file)
+    else:
+        # Load the test data
+        x_test = load_data(args.x_test_file, columns=columns)
+        if columns is not None:
+            x_test = x_test[columns]
+        if encoding:
+            x_test = apply_categorical_encoding(x_test, encoding)
+        x_test = x_test.values
+        y_test = load_data(args.y_test_file).values.flatten()
 
-    # Evaluate the model
-    metrics = model_evaluation(args.model_name, model,
-                               x_test, y_test, args.output_file)
+        # Evaluate the model
+        metrics = model_evaluation(args.model_name, model,
+                                   x_test, y_test, args.output_file)
 
     # Print evaluation metrics
     print(f"Evaluation metrics for {args.model_name}:")
     print(f"MSE: {metrics['MSE']}")
     print(f"R2-Score: {metrics['R2-Score']}")
+    if 'MAE' in metrics:
+        print(f"MAE: {metrics['MAE']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,347 @@
+"""
+This module provides functionality to refresh tuned models with newly
+arrived rows instead of re-running the hyperparameter search.
+
+The tuned hyperparameters are kept. LightGBM and XGBoost models continue
+boosting from their existing trees on the new rows only; other models
+(linear regression, decision trees, random forests) are refitted with
+their tuned parameters on all rows, which costs one fit instead of a
+grid search. Before refreshing, each model's error on a holdout of the
+new rows is compared with the reference error recorded when it was
+tuned. If the relative increase passes the drift threshold, the model
+is marked for a full re-tune instead.
+
+Functions:
+- supports_continued_training: Tells whether a model can continue
+  boosting from its trees.
+- continue_training: Adds boosting rounds trained on new rows.
+- refit_model: Refits a model with its parameters on given rows.
+- holdout_mse: Computes the mean squared error on a holdout.
+- relative_drift: Computes the relative increase of an error.
+- refresh_model: Refreshes one model by continued boosting or refitting.
+- stored_fit_params: Reads the feature columns and fit parameters of a
+  stored model from its preprocessing state.
+- main: Parses command-line arguments and refreshes a model of an
+  artifact store.
+"""
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+from lightgbm import LGBMRegressor
+from sklearn.base import clone
+from sklearn.exceptions import NotFittedError
+from sklearn.utils.validation import check_is_fitted
+from xgboost import XGBRegressor
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.artifact_store import (  # noqa: E402
+    ArtifactNotFoundError, ArtifactStore
+)
+from modules.encode_categorical_columns import (  # noqa: E402
+    categorical_feature_indices
+)
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+# Relative holdout MSE increase that triggers a full re-tune
+DRIFT_THRESHOLD = 0.2
+
+ACTION_CONTINUE = 'continued'
+ACTION_REFIT = 'refit'
+ACTION_RETUNE = 'retune'
+
+
+def supports_continued_training(model):
+    """
+    Tells whether a model can continue boosting from its trees.
+
+    Parameters
+    ----------
+    model : object
+        A fitted model.
+
+    Returns
+    -------
+    bool
+        True for fitted LightGBM and XGBoost regressors.
+    """
+    if not isinstance(model, (LGBMRegressor, XGBRegressor)):
+        return False
+    try:
+        check_is_fitted(model)
+    except NotFittedError:
+        return False
+    return True
+
+
+def continue_training(model, x_new, y_new, n_rounds=None, fit_params=None):
+    """
+    Adds boosting rounds trained on new rows to a boosted model.
+
+    Parameters
+    ----------
+    model : LGBMRegressor or XGBRegressor
+        The fitted model; it is not modified.
+    x_new : np.ndarray
+        Features of the new rows.
+    y_new : np.ndarray
+        Target of the new rows.
+    n_rounds : int, optional
+        Number of rounds to add; a tenth of n_estimators by default.
+    fit_params : dict, optional
+        Extra keyword arguments of fit, e.g. the categorical features
+        of LightGBM.
+
+    Returns
+    -------
+    LGBMRegressor or XGBRegressor
+        A new model with the trees of the old one followed by the new
+        rounds. Its parameters are those of the old model.
+
+    Raises
+    ------
+    TypeError
+        If the model cannot continue boosting.
+    """
+    if not supports_continued_training(model):
+        raise TypeError(f"Model '{type(model).__name__}' cannot continue "
+                        "boosting.")
+    params = model.get_params()
+    if n_rounds is None:
+        n_rounds = max(1, math.ceil(params['n_estimators'] / 10))
+
+    refreshed = clone(model).set_params(n_estimators=n_rounds)
+    if isinstance(model, LGBMRegressor):
+        refreshed.fit(x_new, y_new, init_model=model.booster_,
+                      **(fit_params or {}))
+    else:
+        refreshed.fit(x_new, y_new, xgb_model=model.get_booster(),
+                      **(fit_params or {}))
+    # Keep the tuned parameters; the booster holds all the rounds
+    return refreshed.set_params(n_estimators=params['n_estimators'])
+
+
+def refit_model(model, x, y, fit_params=None):
+    """
+    Refits a model with its parameters on given rows.
+
+    Parameters
+    ----------
+    model : object
+        A scikit-learn compatible model; it is not modified.
+    x : np.ndarray
+        Features.
+    y : np.ndarray
+        Target.
+    fit_params : dict, optional
+        Extra keyword arguments of fit.
+
+    Returns
+    -------
+    object
+        A new model with the same parameters fitted on x and y.
+    """
+    return clone(model).fit(x, y, **(fit_params or {}))
+
+
+def holdout_mse(model, x, y):
+    """
+    Computes the mean squared error of a model on a holdout.
+
+    Parameters
+    ----------
+    model : object
+        A fitted model.
+    x : np.ndarray
+        Holdout features.
+    y : np.ndarray
+        Holdout target.
+
+    Returns
+    -------
+    float
+        The mean squared error.
+    """
+    residual = np.asarray(y, dtype=np.float64) - model.predict(x)
+    return float(np.mean(residual ** 2))
+
+
+def relative_drift(mse, reference_mse):
+    """
+    Computes the relative increase of an error over a reference.
+
+    Parameters
+    ----------
+    mse : float
+        The current error.
+    reference_mse : float
+        The error recorded when the model was tuned.
+
+    Returns
+    -------
+    float
+        (mse - reference_mse) / reference_mse; NaN without a positive
+        reference.
+    """
+    if reference_mse is None or not reference_mse > 0:
+        return float('nan')
+    return (mse - reference_mse) / reference_mse
+
+
+def refresh_model(model, x_new, y_new, x_all=None, y_all=None,
+                  fit_params=None, n_rounds=None):
+    """
+    Refreshes one model by continued boosting or refitting.
+
+    Parameters
+    ----------
+    model : object
+        The fitted model; it is not modified.
+    x_new : np.ndarray
+        Features of the new rows.
+    y_new : np.ndarray
+        Target of the new rows.
+    x_all : np.ndarray, optional
+        Features of all rows (history and new rows) used to refit
+        models that cannot continue boosting; the new rows if None.
+    y_all : np.ndarray, optional
+        Target of all rows.
+    fit_params : dict, optional
+        Extra keyword arguments of fit.
+    n_rounds : int, optional
+        Number of rounds added to boosted models, see
+        continue_training.
+
+    Returns
+    -------
+    tuple
+        The refreshed model and the action taken ('continued' or
+        'refit').
+    """
+    if supports_continued_training(model):
+        return (continue_training(model, x_new, y_new, n_rounds,
+                                  fit_params), ACTION_CONTINUE)
+    if x_all is None:
+        x_all, y_all = x_new, y_new
+    return refit_model(model, x_all, y_all, fit_params), ACTION_REFIT
+
+
+def stored_fit_params(store, model, manifest):
+    """
+    Reads the feature columns and fit parameters of a stored model from
+    its preprocessing state.
+
+    LightGBM models are given the positions of the encoded categorical
+    features, as when they were tuned.
+
+    Parameters
+    ----------
+    store : ArtifactStore
+        The artifact store of the model.
+    model : object
+        The stored model.
+    manifest : dict
+        The manifest of the model version, whose metadata names the
+        version of its preprocessing state.
+
+    Returns
+    -------
+    tuple
+        The feature columns, or None if the store has no preprocessing
+        state, and the extra keyword arguments of fit.
+    """
+    try:
+        preprocessing = store.load(
+            'preprocessing',
+            manifest['metadata'].get('preprocessing_version'))
+    except ArtifactNotFoundError:
+        return None, {}
+    feature_columns = preprocessing['feature_columns']
+    indices = categorical_feature_indices(feature_columns,
+                                          preprocessing['encoding'])
+    if indices and isinstance(model, LGBMRegressor):
+        return feature_columns, {'categorical_feature': indices}
+    return feature_columns, {}
+
+
+def main():
+    """
+    Parses command-line arguments, checks the holdout drift of a model
+    saved in an artifact store and, if it is within the threshold,
+    saves a refreshed version of it.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Refresh a stored model with new rows."
+    )
+    parser.add_argument("store_dir", type=str,
+                        help="Directory of the artifact store.")
+    parser.add_argument("name", type=str, help="Name of the model.")
+    parser.add_argument("new_file", type=str,
+                        help="CSV file of the new preprocessed rows; the "
+                        "last column is the target.")
+    parser.add_argument("--history_file", type=str, default=None,
+                        help="CSV file of the rows the model was trained "
+                        "on, used to refit models that cannot continue "
+                        "boosting.")
+    parser.add_argument("--holdout_fraction", type=float, default=0.2,
+                        help="Fraction of the new rows used as holdout.")
+    parser.add_argument("--drift_threshold", type=float,
+                        default=DRIFT_THRESHOLD,
+                        help="Relative MSE increase that requires a "
+                        "full re-tune.")
+
+    args = parser.parse_args()
+
+    try:
+        store = ArtifactStore(args.store_dir)
+        model = store.load(args.name, mmap_mode=None)
+        manifest = store.manifest(args.name)
+        feature_columns, fit_params = stored_fit_params(store, model,
+                                                        manifest)
+        data = load_data(args.new_file)
+        if feature_columns is not None:
+            data = data[feature_columns + [data.columns[-1]]]
+        n_holdout = max(1, int(len(data) * args.holdout_fraction))
+        x, y = data.iloc[:, :-1].values, data.iloc[:, -1].values
+        reference = manifest['metadata'].get('metrics', {}).get('MSE')
+        drift = relative_drift(holdout_mse(model, x[-n_holdout:],
+                                           y[-n_holdout:]), reference)
+        print(f"Holdout drift of {args.name}: {drift:.3f}")
+        if drift > args.drift_threshold:
+            print("Drift exceeds the threshold; re-tune the model.")
+            return
+        x_all, y_all = None, None
+        if args.history_file:
+            history = load_data(args.history_file)
+            if feature_columns is not None:
+                history = history[feature_columns + [history.columns[-1]]]
+            x_all = np.vstack([history.iloc[:, :-1].values, x[:-n_holdout]])
+            y_all = np.concatenate([history.iloc[:, -1].values,
+                                    y[:-n_holdout]])
+        refreshed, action = refresh_model(model, x[:-n_holdout],
+                                          y[:-n_holdout], x_all, y_all,
+                                          fit_params)
+        version = store.save(args.name, refreshed, {
+            **manifest['metadata'], 'refreshed_from': manifest['version'],
+            'refresh_action': action})
+        print(f"Saved {action} model as {args.name}@{version}.")
+    except FileNotFoundError:
+        print(f"Error: The file '{args.new_file}' was not found.")
+    except (ArtifactNotFoundError, KeyError, TypeError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
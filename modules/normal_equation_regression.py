@@ -0,0 +1,746 @@
+"""
+This module provides linear regression solved from streamed sufficient
+statistics, so that a linear baseline is fitted and cross-validated in
+a single pass over data that does not need to fit in memory.
+
+Instead of X'X and X'y themselves, each chunk of rows contributes its
+row count, the means of its features and target and the matrix of
+their centered cross products; the statistics of two sets of rows
+merge exactly in any order (Chan et al.), so chunks can be accumulated
+by parallel workers and merged at the end, without the cancellation of
+raw sums of large values. Sparse chunks, such as the one-hot matrices of
+encoded categorical columns, are accumulated with sparse products and
+never made dense. The coefficients are the closed-form least
+squares (or ridge) solution of the normal equations. Because the sum of
+squared errors of any coefficients on a set of rows follows from the
+same statistics, a cross-validation only keeps the statistics of each
+fold: the model of a fold is solved from the merged statistics of the
+other folds and scored on the fold's own, for every regularization
+strength, without reading the data again.
+
+Classes:
+- NormalEquations: Mergeable sufficient statistics of a linear
+  regression.
+- NormalEquationRegressor: Linear regression fitted from NormalEquations.
+- NormalEquationSearchCV: Cross-validated search scoring candidates from
+  per-fold statistics.
+
+Functions:
+- supports_normal_equations: Tells whether an estimator can be tuned
+  with NormalEquationSearchCV.
+- normal_equations_from_csv: Accumulates per-fold statistics of a CSV
+  file in parallel.
+- fit_normal_equations_from_csv: Cross-validates and fits a linear
+  model on a CSV file in one pass.
+- main: Parses command-line arguments and fits a linear model on a CSV
+  file out of core.
+"""
+
+import argparse
+import functools
+import operator
+import os
+import sys
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy import sparse
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.exceptions import NotFittedError
+from sklearn.model_selection import ParameterGrid
+from sklearn.pipeline import Pipeline
+from sklearn.utils.validation import check_is_fitted
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.candidate_racing import RACING_ALPHA  # noqa: E402
+from modules.candidate_search import (  # noqa: E402
+    CandidateSearchCV, _take
+)
+from modules.out_of_core_training import (  # noqa: E402
+    HASH_BUCKETS, iter_csv_chunks, row_hashes
+)
+# pylint: enable=wrong-import-position, import-error
+
+# Number of rows accumulated at a time
+CHUNKSIZE = 10_000
+
+
+def _sparse_moments(x, y):
+    """
+    Return the means and centered cross products of a sparse chunk of
+    features and its targets.
+
+    Columns that are non-zero in most rows are centered as a dense
+    block; the others (e.g. one-hot columns) stay sparse and enter
+    through their products, X'X - n mm' for two sparse columns and
+    X'(z - m) against the centered block, whose columns sum to zero.
+    """
+    x = sparse.csc_matrix(x, dtype=np.float64)
+    n_rows, n_features = x.shape
+    dense_columns = np.flatnonzero(np.diff(x.indptr) > n_rows // 2)
+    sparse_columns = np.setdiff1d(np.arange(n_features), dense_columns)
+    block = np.column_stack([x[:, dense_columns].toarray(), y])
+    rest = x[:, sparse_columns]
+
+    block_index = np.append(dense_columns, n_features)
+    mean = np.empty(n_features + 1)
+    mean[block_index] = block.mean(axis=0)
+    mean[sparse_columns] = np.asarray(rest.mean(axis=0)).ravel()
+    block -= mean[block_index]
+
+    cross = np.asarray(rest.T @ block)
+    comoment = np.empty((n_features + 1, n_features + 1))
+    comoment[np.ix_(block_index, block_index)] = block.T @ block
+    comoment[np.ix_(sparse_columns, block_index)] = cross
+    comoment[np.ix_(block_index, sparse_columns)] = cross.T
+    comoment[np.ix_(sparse_columns, sparse_columns)] = (
+        (rest.T @ rest).toarray() -
+        n_rows * np.outer(mean[sparse_columns], mean[sparse_columns]))
+    return mean, comoment
+
+
+class NormalEquations:
+    """
+    Mergeable sufficient statistics of a linear regression.
+
+    Parameters
+    ----------
+    n_features : int
+        Number of features.
+
+    Attributes
+    ----------
+    n : int
+        Number of rows.
+    mean : np.ndarray
+        Means of the features followed by the mean of the target.
+    comoment : np.ndarray
+        Sums of the centered cross products of the features and the
+        target, the last row and column being the target.
+    """
+
+    def __init__(self, n_features):
+        self.n = 0
+        self.mean = np.zeros(n_features + 1)
+        self.comoment = np.zeros((n_features + 1, n_features + 1))
+
+    @property
+    def n_features(self):
+        """Number of features."""
+        return len(self.mean) - 1
+
+    def update(self, x, y):
+        """
+        Add rows to the statistics.
+
+        Parameters
+        ----------
+        x : np.ndarray or sparse matrix
+            Features of the rows.
+        y : np.ndarray
+            Targets of the rows.
+
+        Returns
+        -------
+        NormalEquations
+            The updated statistics.
+        """
+        if len(y) == 0:
+            return self
+        y = np.asarray(y, dtype=np.float64)
+        other = NormalEquations(self.n_features)
+        other.n = len(y)
+        if sparse.issparse(x):
+            other.mean, other.comoment = _sparse_moments(x, y)
+        else:
+            z = np.column_stack([np.asarray(x, dtype=np.float64), y])
+            other.mean = z.mean(axis=0)
+            z -= other.mean
+            other.comoment = z.T @ z
+        return self.merge(other)
+
+    def merge(self, other):
+        """
+        Merge the statistics of other rows into these in place.
+
+        Parameters
+        ----------
+        other : NormalEquations
+            Statistics of disjoint rows with the same features.
+
+        Returns
+        -------
+        NormalEquations
+            The merged statistics.
+        """
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = (self.comoment + other.comoment +
+                         np.outer(delta, delta) * self.n * other.n / n)
+        self.mean = self.mean + delta * other.n / n
+        self.n = n
+        return self
+
+    def __add__(self, other):
+        merged = NormalEquations(self.n_features)
+        return merged.merge(self).merge(other)
+
+    def solve(self, alpha=0.0, fit_intercept=True):
+        """
+        Solve the normal equations.
+
+        Parameters
+        ----------
+        alpha : float
+            Ridge penalty on the squared coefficients. With 0 and
+            collinear features, the solution of minimum norm once the
+            features are scaled to a unit diagonal is returned; it fits
+            the rows as well as LinearRegression's, which is of minimum
+            norm in the original units, but its coefficients and its
+            predictions on other rows can differ.
+        fit_intercept : bool
+            Whether to fit an intercept.
+
+        Returns
+        -------
+        coef : np.ndarray
+            The coefficients of the features.
+        intercept : float
+            The intercept, 0 if not fitted.
+
+        Raises
+        ------
+        ValueError
+            If the statistics hold no rows.
+        """
+        if self.n == 0:
+            raise ValueError("The normal equations hold no rows.")
+        gram = self.comoment
+        if not fit_intercept:
+            gram = gram + self.n * np.outer(self.mean, self.mean)
+        p = self.n_features
+        lhs = gram[:p, :p] + alpha * np.eye(p)
+        # Scaling to a unit diagonal keeps features of very different
+        # magnitudes from being cut off as rank-deficient
+        scale = np.sqrt(np.diag(lhs))
+        scale[scale == 0] = 1.0
+        coef = np.linalg.lstsq(lhs / np.outer(scale, scale),
+                               gram[:p, p] / scale, rcond=None)[0] / scale
+        intercept = (self.mean[p] - self.mean[:p] @ coef
+                     if fit_intercept else 0.0)
+        return coef, float(intercept)
+
+    def squared_error(self, coef, intercept):
+        """
+        Return the sum of squared errors of a linear model on the rows.
+
+        Parameters
+        ----------
+        coef : np.ndarray
+            The coefficients of the features.
+        intercept : float
+            The intercept.
+
+        Returns
+        -------
+        float
+            The sum of squared errors.
+        """
+        weights = np.append(-np.asarray(coef, dtype=np.float64), 1.0)
+        mean_residual = self.mean @ weights - intercept
+        error = weights @ self.comoment @ weights + self.n * mean_residual ** 2
+        return float(max(error, 0.0))
+
+
+class NormalEquationRegressor(RegressorMixin, BaseEstimator):
+    """
+    Linear regression fitted from NormalEquations.
+
+    Rows are accumulated in chunks, so a memory-mapped feature matrix is
+    never copied as a whole, and partial_fit adds rows to a fitted
+    model.
+
+    Parameters
+    ----------
+    alpha : float
+        Ridge penalty on the squared coefficients.
+    fit_intercept : bool
+        Whether to fit an intercept.
+    chunksize : int
+        Number of rows accumulated at a time.
+    """
+
+    def __init__(self, alpha=0.0, fit_intercept=True, chunksize=CHUNKSIZE):
+        self.alpha = alpha
+        self.fit_intercept = fit_intercept
+        self.chunksize = chunksize
+
+    def fit(self, x, y):
+        """Fit the model on all rows of x and y."""
+        self.statistics_ = NormalEquations(x.shape[1])
+        return self.partial_fit(x, y)
+
+    def partial_fit(self, x, y):
+        """Add rows to the statistics and solve again."""
+        if not hasattr(self, 'statistics_'):
+            self.statistics_ = NormalEquations(x.shape[1])
+        y = np.asarray(y)
+        for start in range(0, x.shape[0], self.chunksize):
+            self.statistics_.update(x[start:start + self.chunksize],
+                                    y[start:start + self.chunksize])
+        return self.fit_statistics(self.statistics_)
+
+    def fit_statistics(self, statistics):
+        """
+        Fit the model from statistics accumulated elsewhere.
+
+        Parameters
+        ----------
+        statistics : NormalEquations
+            The statistics of the training rows.
+
+        Returns
+        -------
+        NormalEquationRegressor
+            The fitted model.
+        """
+        self.statistics_ = statistics
+        self.coef_, self.intercept_ = statistics.solve(self.alpha,
+                                                       self.fit_intercept)
+        self.n_features_in_ = statistics.n_features
+        return self
+
+    def predict(self, x):
+        """Predict the target of the rows of x."""
+        return np.asarray(x @ self.coef_, dtype=np.float64) + self.intercept_
+
+
+def supports_normal_equations(estimator):
+    """
+    Tells whether an estimator can be tuned with NormalEquationSearchCV.
+
+    Parameters
+    ----------
+    estimator : object
+        The estimator to tune.
+
+    Returns
+    -------
+    bool
+        True for a NormalEquationRegressor, also as the last step of a
+        pipeline.
+    """
+    if isinstance(estimator, Pipeline):
+        estimator = estimator.steps[-1][1]
+    return isinstance(estimator, NormalEquationRegressor)
+
+
+def _split_pipeline(estimator):
+    """Return the transformers of a pipeline (or None) and its model."""
+    if isinstance(estimator, Pipeline):
+        return Pipeline(estimator.steps[:-1]), estimator.steps[-1]
+    return None, (None, estimator)
+
+
+def _is_fitted(preprocess):
+    """Tell whether every transformer is stateless or already fitted."""
+    for _, step in preprocess.steps:
+        if step is None or step == 'passthrough':
+            continue
+        try:
+            check_is_fitted(step)
+        except NotFittedError:
+            return False
+    return True
+
+
+def _block_statistics(preprocess, x, y, fold_ids, n_folds):
+    """Return the statistics of each fold's rows of a block."""
+    if preprocess is not None:
+        x = preprocess.transform(x)
+    if sparse.issparse(x):
+        x = sparse.csr_matrix(x)
+    else:
+        x = np.asarray(x, dtype=np.float64)
+    statistics = [NormalEquations(x.shape[1]) for _ in range(n_folds)]
+    for fold, fold_statistics in enumerate(statistics):
+        rows = np.flatnonzero(fold_ids == fold)
+        if len(rows):
+            fold_statistics.update(x[rows], y[rows])
+    return statistics
+
+
+def _merge_folds(blocks, n_folds):
+    """Merge the per-fold statistics of several blocks."""
+    merged = None
+    for statistics in blocks:
+        if merged is None:
+            merged = statistics
+        else:
+            for fold in range(n_folds):
+                merged[fold].merge(statistics[fold])
+    return merged
+
+
+def _split_statistics(fold_statistics, fold):
+    """Return the merged statistics of all folds but one and its own."""
+    train = functools.reduce(operator.add, [
+        statistics for other, statistics in enumerate(fold_statistics)
+        if other != fold])
+    return train, fold_statistics[fold]
+
+
+def _score_fold(train, test, candidates, estimator):
+    """
+    Solve every candidate from the statistics of the training rows of a
+    fold and return, per candidate, its negative MSE on the test rows,
+    the time spent solving and its coefficients and intercept.
+    """
+    results = []
+    for params in candidates:
+        start = time.perf_counter()
+        _, (_, model) = _split_pipeline(
+            clone(estimator).set_params(**params))
+        coef, intercept = train.solve(model.alpha, model.fit_intercept)
+        solve_time = time.perf_counter() - start
+        score = (-test.squared_error(coef, intercept) / test.n
+                 if test.n else np.nan)
+        results.append((score, solve_time, coef, intercept))
+    return results
+
+
+class NormalEquationSearchCV(CandidateSearchCV):
+    """
+    Cross-validated search scoring linear candidates from per-fold
+    statistics.
+
+    Before the first candidate, one pass over the rows accumulates the
+    NormalEquations of each fold, in parallel over blocks of rows; each
+    candidate is then solved and scored per fold from them, and the best
+    one is fitted from their merge, so the data is read once whatever
+    the number of candidates. Transformers of a pipeline that are
+    stateless or already fitted are applied as they are. Others are
+    fitted for each fold on its first block of training rows, so that
+    they never see the fold's test rows; the rows are then accumulated
+    once per fold, and once more with the transformers fitted on the
+    first block of all rows for the refit.
+    When racing, the squared errors of a fold's test rows are computed
+    by predicting them.
+
+    Parameters
+    ----------
+    estimator : NormalEquationRegressor or Pipeline
+        The estimator to tune, or a pipeline ending in one.
+    param_grid : dict
+        Dictionary with parameter names (str) as keys and
+        lists of parameter settings to try as values.
+    cv : int
+        Number of folds.
+    n_jobs : int
+        Number of jobs accumulating blocks of rows in parallel.
+    verbose : int
+        Print one line per candidate and fold if above 1.
+    checkpoint : SearchCheckpoint, optional
+        Checkpoint to save every (candidate, fold) result to and to
+        resume from.
+    time_budget : float, optional
+        Wall-clock seconds after which no new batch of candidates is
+        started, see CandidateSearchCV.
+    batch_size : int, optional
+        Number of candidates evaluated between two checks of the time
+        budget.
+    racing : bool
+        Whether to eliminate candidates statistically worse than the
+        leader after each fold, see CandidateSearchCV.
+    racing_alpha : float
+        One-sided significance level of an elimination.
+    race_reference : np.ndarray, optional
+        Out-of-fold squared errors of another model on every row.
+    chunksize : int
+        Number of rows per block.
+    """
+
+    def __init__(self, estimator, param_grid, cv=3, n_jobs=None,
+                 verbose=0, checkpoint=None, time_budget=None,
+                 batch_size=None, racing=False, racing_alpha=RACING_ALPHA,
+                 race_reference=None, chunksize=CHUNKSIZE):
+        super().__init__(estimator, param_grid, cv=cv, n_jobs=n_jobs,
+                         verbose=verbose, checkpoint=checkpoint,
+                         time_budget=time_budget, batch_size=batch_size,
+                         racing=racing, racing_alpha=racing_alpha,
+                         race_reference=race_reference)
+        self.chunksize = chunksize
+
+    def _accumulate(self, preprocess, x, y, groups, n_groups):
+        """Accumulate the statistics of each group of rows in parallel
+        over blocks of rows."""
+        blocks = Parallel(n_jobs=self.n_jobs, prefer='threads',
+                          return_as='generator_unordered')(
+            delayed(_block_statistics)(
+                preprocess,
+                _take(x, np.arange(block, min(block + self.chunksize,
+                                              len(y)))),
+                y[block:block + self.chunksize],
+                groups[block:block + self.chunksize], n_groups)
+            for block in range(0, len(y), self.chunksize)
+        )
+        return _merge_folds(blocks, n_groups)
+
+    def _fit_preprocess(self, x, rows):
+        """Fit the transformers on the first block of some rows."""
+        preprocess, _ = _split_pipeline(clone(self.estimator))
+        return preprocess.fit(_take(x, rows[:self.chunksize]))
+
+    def _prepare_folds(self, x, y, folds, fit_params):
+        """
+        Accumulate the statistics of the training and test rows of
+        every fold, in one pass if the transformers need no fitting.
+        """
+        start = time.perf_counter()
+        self._folds = folds
+        y = np.asarray(y)
+        preprocess, _ = _split_pipeline(self.estimator)
+        if preprocess is None or _is_fitted(preprocess):
+            fold_ids = np.empty(len(y), dtype=np.int64)
+            for fold, (_, test_index) in enumerate(folds):
+                fold_ids[test_index] = fold
+            statistics = self._accumulate(preprocess, x, y, fold_ids,
+                                          len(folds))
+            self._preprocess_per_fold = False
+            self._fold_preprocess = [preprocess] * len(folds)
+            self.fold_statistics_ = [_split_statistics(statistics, fold)
+                                     for fold in range(len(folds))]
+        else:
+            self._preprocess_per_fold = True
+            self._fold_preprocess = []
+            self.fold_statistics_ = []
+            for train_index, test_index in folds:
+                fold_preprocess = self._fit_preprocess(x, train_index)
+                is_test = np.zeros(len(y), dtype=np.int64)
+                is_test[test_index] = 1
+                self._fold_preprocess.append(fold_preprocess)
+                self.fold_statistics_.append(tuple(self._accumulate(
+                    fold_preprocess, x, y, is_test, 2)))
+        self.accumulation_time_ = time.perf_counter() - start
+
+    def _evaluate_fold(self, candidates, x, y, train_index, test_index,
+                       fit_params):
+        """
+        Solve and score the candidates on one fold from the statistics.
+
+        Returns
+        -------
+        list of tuple
+            Score, solve time, score time (0) and peak memory (NaN) of
+            each candidate; when racing, followed by the squared errors
+            of the test rows.
+        """
+        fold = next(position for position, (_, test) in
+                    enumerate(self._folds)
+                    if np.array_equal(test, test_index))
+        train, test = self.fold_statistics_[fold]
+        results = []
+        for score, solve_time, coef, intercept in _score_fold(
+                train, test, candidates, self.estimator):
+            result = (score, solve_time, 0.0, np.nan)
+            if self.racing:
+                start = time.perf_counter()
+                x_test = _take(x, test_index)
+                if self._fold_preprocess[fold] is not None:
+                    x_test = self._fold_preprocess[fold].transform(x_test)
+                predictions = np.asarray(x_test @ coef) + intercept
+                errors = (np.asarray(_take(y, test_index), np.float64) -
+                          predictions) ** 2
+                result = (score, solve_time, time.perf_counter() - start,
+                          np.nan, errors)
+            results.append(result)
+        return results
+
+    def _refit(self, x, y, fit_params):
+        """
+        Fit the best candidate from the statistics of all rows, merged
+        from a fold's unless the transformers were fitted per fold.
+        """
+        estimator = clone(self.estimator).set_params(**self.best_params_)
+        _, (name, model) = _split_pipeline(estimator)
+        if not self._preprocess_per_fold:
+            preprocess = self._fold_preprocess[0]
+            statistics = operator.add(*self.fold_statistics_[0])
+        else:
+            preprocess = self._fit_preprocess(x, np.arange(len(y)))
+            statistics = self._accumulate(
+                preprocess, x, np.asarray(y),
+                np.zeros(len(y), dtype=np.int64), 1)[0]
+        model.fit_statistics(statistics)
+        if preprocess is None:
+            return model
+        return Pipeline(preprocess.steps + [(name, model)])
+
+
+def normal_equations_from_csv(train_file, n_folds=3, chunksize=100_000,
+                              preprocess=None, n_jobs=None,
+                              random_state=42):
+    """
+    Accumulates the per-fold statistics of a CSV file in parallel.
+
+    Chunks are read in order and accumulated by parallel worker threads
+    (the products release the GIL), and the workers' statistics are
+    merged as they finish. Each row is
+    assigned to a fold by a hash of its content, so the folds do not
+    depend on the chunking.
+
+    Parameters
+    ----------
+    train_file : str
+        Path to the CSV file, a directory of partitions or a glob
+        pattern; the last column is the target.
+    n_folds : int
+        Number of folds.
+    chunksize : int
+        Number of rows per chunk.
+    preprocess : object, optional
+        Fitted transformer applied to the features of each chunk.
+    n_jobs : int, optional
+        Number of workers accumulating chunks.
+    random_state : int
+        Seed of the fold assignment.
+
+    Returns
+    -------
+    list of NormalEquations
+        The statistics of each fold.
+
+    Raises
+    ------
+    ValueError
+        If the file holds no rows.
+    """
+    def blocks():
+        for chunk in iter_csv_chunks(train_file, chunksize):
+            fold_ids = ((row_hashes(chunk, random_state) //
+                         np.uint64(HASH_BUCKETS)) %
+                        np.uint64(n_folds)).astype(np.int64)
+            yield (chunk.iloc[:, :-1].to_numpy(dtype=np.float64),
+                   chunk.iloc[:, -1].to_numpy(dtype=np.float64), fold_ids)
+
+    statistics = _merge_folds(
+        Parallel(n_jobs=n_jobs, prefer='threads',
+                 return_as='generator_unordered')(
+            delayed(_block_statistics)(preprocess, x, y, fold_ids, n_folds)
+            for x, y, fold_ids in blocks()),
+        n_folds)
+    if statistics is None:
+        raise ValueError(f"The file '{train_file}' holds no rows.")
+    return statistics
+
+
+def fit_normal_equations_from_csv(estimator, train_file, param_grid=None,
+                                  n_folds=3, chunksize=100_000,
+                                  n_jobs=None):
+    """
+    Cross-validates and fits a linear model on a CSV file in one pass.
+
+    The transformers of a pipeline are fitted on the first chunk, which
+    holds rows of every fold: they should not learn from the data (e.g.
+    a one-hot encoder with declared categories), or the cross-validated
+    scores are optimistic.
+
+    Parameters
+    ----------
+    estimator : NormalEquationRegressor or Pipeline
+        The model, or a pipeline ending in one.
+    train_file : str
+        Path to the CSV file with the training rows; the last column
+        is the target.
+    param_grid : dict, optional
+        Candidate parameters, e.g. ridge penalties; the one with the
+        best cross-validated MSE is fitted. If None, the estimator's
+        parameters are used.
+    n_folds : int
+        Number of cross-validation folds.
+    chunksize : int
+        Number of rows per chunk.
+    n_jobs : int, optional
+        Number of workers accumulating chunks.
+
+    Returns
+    -------
+    model : object
+        The best candidate fitted on all rows.
+    cv_scores : dict
+        Mean negative MSE of each candidate, by the string of its
+        parameters.
+    """
+    estimator = clone(estimator)
+    preprocess, _ = _split_pipeline(estimator)
+    if preprocess is not None:
+        first = next(iter_csv_chunks(train_file, chunksize))
+        preprocess.fit(first.iloc[:, :-1].to_numpy(dtype=np.float64))
+    fold_statistics = normal_equations_from_csv(
+        train_file, n_folds, chunksize, preprocess, n_jobs)
+    candidates = list(ParameterGrid(param_grid or {}))
+    scores = np.nanmean([[result[0] for result in _score_fold(
+        *_split_statistics(fold_statistics, fold), candidates, estimator)]
+        for fold in range(n_folds)], axis=0)
+    best = candidates[int(np.argmax(scores))]
+
+    estimator.set_params(**best)
+    _, (name, model) = _split_pipeline(estimator)
+    model.fit_statistics(functools.reduce(operator.add, fold_statistics))
+    if preprocess is not None:
+        model = Pipeline(preprocess.steps + [(name, model)])
+    return model, {str(params): float(score)
+                   for params, score in zip(candidates, scores)}
+
+
+def main():
+    """
+    Parses command-line arguments, cross-validates ridge penalties of a
+    linear model on a CSV file without loading it into memory and
+    prints the coefficients of the best one.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Fit a linear model on a CSV file out of core."
+    )
+    parser.add_argument("train_file", type=str,
+                        help="Path to the CSV file; the last column is "
+                        "the target.")
+    parser.add_argument("--alphas", type=float, nargs='+', default=[0.0],
+                        help="Ridge penalties to cross-validate.")
+    parser.add_argument("--chunksize", type=int, default=100_000,
+                        help="Number of rows read at a time.")
+    parser.add_argument("--n_jobs", type=int, default=None,
+                        help="Number of workers accumulating chunks.")
+
+    args = parser.parse_args()
+
+    try:
+        model, cv_scores = fit_normal_equations_from_csv(
+            NormalEquationRegressor(), args.train_file,
+            {'alpha': args.alphas}, chunksize=args.chunksize,
+            n_jobs=args.n_jobs)
+    except FileNotFoundError:
+        print(f"Error: The file '{args.train_file}' was not found.")
+        return
+    except ValueError as ve:
+        print(f"Error: {ve}")
+        return
+    for params, score in cv_scores.items():
+        print(f"{params}: CV MSE {-score:.6g}")
+    print(f"Best alpha {model.alpha}: intercept {model.intercept_:.6g}, "
+          f"coefficients {np.round(model.coef_, 6).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
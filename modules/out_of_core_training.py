@@ -0,0 +1,338 @@
+"""
+This module provides functionality to train models on CSV files that do
+not fit in memory.
+
+The data is never loaded as a whole: the train/test split is decided
+per row from a hash of its content, LightGBM builds its dataset directly
+from the file, and XGBoost builds an external-memory quantile matrix
+from a chunk iterator. Linear models are fitted from streamed normal
+equations, see normal_equation_regression.
+
+Functions:
+- iter_csv_chunks: Iterates over a CSV file in chunks.
+- row_hashes: Hashes the content of each row.
+- hash_split_mask: Decides per row whether it belongs to the test set.
+- split_csv_by_hash: Streams a CSV file into a train and a test file.
+- train_lgbm_from_csv: Trains a LightGBM model from a CSV file on disk.
+- train_xgb_from_csv: Trains an XGBoost model from an external-memory
+  matrix built from CSV chunks.
+- main: Parses command-line arguments and splits a CSV file by row hash.
+"""
+
+import argparse
+import os
+import sys
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import iter_data_chunks  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+# Number of hash buckets used to express the test size
+HASH_BUCKETS = 10_000
+
+
+def iter_csv_chunks(input_file, chunksize=100_000, filters=None,
+                    union_schema=False):
+    """
+    Iterates over a CSV file in chunks.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the CSV file, a directory of partitions or a glob
+        pattern; partitions are read one after another.
+    chunksize : int
+        Number of rows per chunk.
+    filters : dict, optional
+        Column names and the list of accepted values; filters on
+        partition columns skip whole partitions.
+    union_schema : bool
+        Whether partitions may have different columns.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next chunk of rows.
+    """
+    yield from iter_data_chunks(input_file, chunksize, filters,
+                                union_schema)
+
+
+def row_hashes(chunk, random_state=42):
+    """
+    Hashes the content of each row.
+
+    Parameters
+    ----------
+    chunk : pd.DataFrame
+        The rows to hash.
+    random_state : int
+        Seed that selects a different hash for the same data.
+
+    Returns
+    -------
+    np.ndarray
+        One uint64 hash per row.
+    """
+    hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+    # Mix the seed in with the 64-bit finalizer of MurmurHash3
+    with np.errstate(over='ignore'):
+        hashes = hashes ^ np.uint64(random_state)
+        hashes ^= hashes >> np.uint64(33)
+        hashes *= np.uint64(0xff51afd7ed558ccd)
+        hashes ^= hashes >> np.uint64(33)
+        hashes *= np.uint64(0xc4ceb9fe1a85ec53)
+        hashes ^= hashes >> np.uint64(33)
+    return hashes
+
+
+def hash_split_mask(chunk, test_size=0.2, random_state=42):
+    """
+    Decides per row whether it belongs to the test set.
+
+    The decision only depends on the content of the row, so it does
+    not depend on how the data is chunked or ordered and identical
+    rows always land in the same set.
+
+    Parameters
+    ----------
+    chunk : pd.DataFrame
+        The rows to split.
+    test_size : float
+        Fraction of rows that go to the test set.
+    random_state : int
+        Seed that selects a different split for the same data.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask that is True for test rows.
+
+    Raises
+    ------
+    ValueError
+        If test_size is not between 0 and 1.
+    """
+    if not 0 < test_size < 1:
+        raise ValueError("test_size must be between 0 and 1.")
+
+    hashes = row_hashes(chunk, random_state)
+    return (hashes % HASH_BUCKETS) < int(test_size * HASH_BUCKETS)
+
+
+def split_csv_by_hash(input_file, train_file, test_file, test_size=0.2,
+                      random_state=42, chunksize=100_000, filters=None,
+                      union_schema=False):
+    """
+    Streams a CSV file into a train and a test file.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the input CSV file, a directory of partitions or a glob
+        pattern.
+    train_file : str
+        Path to save the training rows.
+    test_file : str
+        Path to save the test rows.
+    test_size : float
+        Fraction of rows that go to the test set.
+    random_state : int
+        Seed that selects a different split for the same data.
+    chunksize : int
+        Number of rows read at a time.
+    filters : dict, optional
+        Column names and the list of accepted values.
+    union_schema : bool
+        Whether partitions may have different columns.
+
+    Returns
+    -------
+    tuple
+        Number of training rows and number of test rows.
+    """
+    n_train = n_test = 0
+    for i, chunk in enumerate(iter_csv_chunks(input_file, chunksize,
+                                              filters, union_schema)):
+        is_test = hash_split_mask(chunk, test_size, random_state)
+        mode = 'w' if i == 0 else 'a'
+        chunk[~is_test].to_csv(train_file, mode=mode, header=i == 0,
+                               index=False)
+        chunk[is_test].to_csv(test_file, mode=mode, header=i == 0,
+                              index=False)
+        n_test += int(is_test.sum())
+        n_train += int((~is_test).sum())
+    return n_train, n_test
+
+
+def train_lgbm_from_csv(train_file, params, num_boost_round=100,
+                        categorical_feature=None):
+    """
+    Trains a LightGBM model from a CSV file on disk.
+
+    LightGBM reads and bins the file itself in two rounds, so the raw
+    float matrix is never held in memory.
+
+    Parameters
+    ----------
+    train_file : str
+        Path to the CSV file with the training rows; the last column
+        is the target.
+    params : dict
+        LightGBM training parameters.
+    num_boost_round : int
+        Number of boosting rounds.
+    categorical_feature : list, optional
+        Positions of the categorical feature columns.
+
+    Returns
+    -------
+    lgb.Booster
+        The trained model.
+    """
+    target = pd.read_csv(train_file, nrows=0).columns[-1]
+    dataset = lgb.Dataset(
+        train_file,
+        params={'header': True, 'label_column': f'name:{target}',
+                'two_round': True, 'verbose': -1},
+        categorical_feature=categorical_feature or 'auto'
+    )
+    return lgb.train({'verbose': -1, **params}, dataset,
+                     num_boost_round=num_boost_round)
+
+
+class CsvChunkIter(xgb.DataIter):
+    """
+    Iterator feeding the chunks of a CSV file to XGBoost.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the CSV file; the last column is the target.
+    chunksize : int
+        Number of rows per chunk.
+    cache_prefix : str
+        Path prefix for the external-memory cache files.
+    feature_types : list, optional
+        XGBoost feature types ('q' or 'c') of the feature columns.
+    """
+
+    def __init__(self, input_file, chunksize, cache_prefix,
+                 feature_types=None):
+        self.input_file = input_file
+        self.chunksize = chunksize
+        self.feature_types = feature_types
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        """Pass the next chunk to XGBoost; return False when done."""
+        if self._chunks is None:
+            self._chunks = iter_csv_chunks(self.input_file, self.chunksize)
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        input_data(data=chunk.iloc[:, :-1].to_numpy(dtype=np.float32),
+                   label=chunk.iloc[:, -1].to_numpy(dtype=np.float32),
+                   feature_types=self.feature_types)
+        return True
+
+    def reset(self):
+        """Restart the iteration from the first chunk."""
+        self._chunks = None
+
+
+def train_xgb_from_csv(train_file, params, num_boost_round=100,
+                       chunksize=100_000, cache_dir='.',
+                       feature_types=None):
+    """
+    Trains an XGBoost model from an external-memory matrix built from
+    CSV chunks.
+
+    Parameters
+    ----------
+    train_file : str
+        Path to the CSV file with the training rows; the last column
+        is the target.
+    params : dict
+        XGBoost training parameters.
+    num_boost_round : int
+        Number of boosting rounds.
+    chunksize : int
+        Number of rows per chunk.
+    cache_dir : str
+        Directory for the external-memory cache files.
+    feature_types : list, optional
+        XGBoost feature types ('q' or 'c') of the feature columns.
+
+    Returns
+    -------
+    xgb.XGBRegressor
+        The trained model, usable with predict on arrays.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    chunks = CsvChunkIter(train_file, chunksize,
+                          os.path.join(cache_dir, 'xgb_cache'),
+                          feature_types)
+    dmatrix = xgb.ExtMemQuantileDMatrix(
+        chunks, enable_categorical=feature_types is not None and
+        'c' in feature_types)
+    booster = xgb.train({'tree_method': 'hist', **params}, dmatrix,
+                        num_boost_round=num_boost_round)
+
+    model = xgb.XGBRegressor()
+    model.load_model(booster.save_raw('json'))
+    return model
+
+
+def main():
+    """
+    Parses command-line arguments and splits a CSV file into a train
+    and a test file by row hash.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Split a CSV file into train and test files "
+        "by row hash, without loading it into memory."
+    )
+    parser.add_argument("file", type=str,
+                        help="Path to the input CSV file, a directory "
+                        "of partitions or a glob pattern.")
+    parser.add_argument("train_file", type=str,
+                        help="Path to save the training rows.")
+    parser.add_argument("test_file", type=str,
+                        help="Path to save the test rows.")
+    parser.add_argument("--test_size", type=float, default=0.2,
+                        help="Fraction of rows that go to the test set.")
+    parser.add_argument("--chunksize", type=int, default=100_000,
+                        help="Number of rows read at a time.")
+
+    args = parser.parse_args()
+
+    try:
+        n_train, n_test = split_csv_by_hash(
+            args.file, args.train_file, args.test_file,
+            args.test_size, chunksize=args.chunksize)
+        print(f"Wrote {n_train} training rows to {args.train_file} "
+              f"and {n_test} test rows to {args.test_file}")
+    except FileNotFoundError:
+        print(f"Error: The file '{args.file}' was not found.")
+    except ValueError as ve:
+        print(f"Error: {ve}")
+
+
+if __name__ == "__main__":
+    main()
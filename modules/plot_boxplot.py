@@ -2,6 +2,9 @@
 This module provides functionality to plot a boxplot of specified columns
 in a DataFrame and save the plot to a file.
 
+The plot is not rendered again when the existing image was drawn from
+the same two columns (see figure_cache).
+
 Functions:
 - plot_boxplot: Plot a boxplot of the specified columns
 in a DataFrame and save the plot to a file.
@@ -10,17 +13,29 @@ in a DataFrame and save the plot to a file.
 
 import argparse
 import os
+import sys
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
 
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.figure_cache import (  # noqa: E402
+    FigureCache, data_fingerprint, figure_up_to_date, save_figure
+)
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
 
 class PlotSaveError(Exception):
     """Custom exception for errors during plot saving."""
 
 
 def plot_boxplot(df: pd.DataFrame, x_column: str,
-                 y_column: str, output_dir: str) -> None:
+                 y_column: str, output_dir: str,
+                 cache: FigureCache = None) -> None:
     """
     Plot a boxplot of the specified columns in
     a DataFrame and save the plot to a file.
@@ -35,6 +50,9 @@ def plot_boxplot(df: pd.DataFrame, x_column: str,
         The column name to be used for the y-axis.
     output_dir : str
         The directory where the plot will be saved.
+    cache : FigureCache, optional
+        Cache of rendered figures to restore the plot from and add it
+        to.
 
     Raises
     ------
@@ -60,6 +78,12 @@ def plot_boxplot(df: pd.DataFrame, x_column: str,
         )
 
     data = df[[x_column, y_column]]
+    name = f"Boxplot_of_{y_column}_by_{x_column}.png"
+    plot_file = os.path.join(output_dir, name)
+    fingerprint = data_fingerprint(data, kind='boxplot')
+    if figure_up_to_date(plot_file, fingerprint, cache):
+        print(f"Boxplot is up to date: {plot_file}")
+        return
 
     print(f"Plotting Boxplot for {x_column} vs {y_column}")
     print(data.describe())
@@ -70,13 +94,12 @@ def plot_boxplot(df: pd.DataFrame, x_column: str,
     plt.title(f'Boxplot of {y_column} by {x_column}')
     plt.xlabel(x_column)
     plt.ylabel(y_column)
-    name = f"Boxplot_of_{y_column}_by_{x_column}.png"
 
     try:
         os.makedirs(output_dir, exist_ok=True)
         fig.tight_layout()
-        plt.savefig(os.path.join(output_dir, name))
-        print(f"Boxplot saved as {os.path.join(output_dir, name)}")
+        save_figure(plot_file, fingerprint, cache)
+        print(f"Boxplot saved as {plot_file}")
     except OSError as exc:
         plt.close(fig)  # Close the figure in case of an error
         raise PlotSaveError(f"Error saving the boxplot: {exc}") from exc
@@ -104,7 +127,8 @@ def main() -> None:
     )
     parser.add_argument(
         "input_file", type=str,
-        help="Path to the input CSV file containing the data."
+        help="Path to the input CSV file containing the data, a "
+        "directory of partitions or a glob pattern."
     )
     parser.add_argument(
         "x_column", type=str,
@@ -118,11 +142,17 @@ def main() -> None:
         "output_dir", type=str,
         help="The directory where the plot will be saved."
     )
+    parser.add_argument(
+        "--figure_cache", type=str, default=None,
+        help="Directory of a cache of rendered figures."
+    )
 
     args = parser.parse_args()
 
     try:
-        df = pd.read_csv(args.input_file)
+        # Only the two plotted columns are parsed
+        df = load_data(args.input_file,
+                       columns=[args.x_column, args.y_column])
     except FileNotFoundError:
         print(f"Error: The file '{args.input_file}' was not found.")
         return
@@ -131,7 +161,10 @@ def main() -> None:
         return
 
     try:
-        plot_boxplot(df, args.x_column, args.y_column, args.output_dir)
+        cache = FigureCache(args.figure_cache) if args.figure_cache \
+            else None
+        plot_boxplot(df, args.x_column, args.y_column, args.output_dir,
+                     cache)
     except (ValueError, PlotSaveError) as e:
         print(f"Error: {str(e)}")
 
@@ -2,6 +2,9 @@
 This module provides functionality to plot bar charts for the value counts
 of each categorical column in a DataFrame.
 
+Saved plots are not rendered again when the existing image was drawn
+from the same categorical columns (see figure_cache).
+
 Functions:
 - plot_categorical_columns: Plots bar charts for the value counts of each
   categorical column in a DataFrame.
@@ -10,17 +13,28 @@ Functions:
 
 import argparse
 import os
+import sys
 
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
 
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.figure_cache import (  # noqa: E402
+    FigureCache, data_fingerprint, figure_up_to_date, save_figure
+)
+from modules.load_data import infer_columns, load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
 
 class PlotSaveError(Exception):
     """Custom exception for errors during plot saving."""
 
 
-def plot_categorical_columns(data, output_dir=None):
+def plot_categorical_columns(data, output_dir=None, cache=None):
     """
     Plots bar charts for the value counts of
         each categorical column in the DataFrame.
@@ -32,6 +46,9 @@ def plot_categorical_columns(data, output_dir=None):
     output_dir : str, optional
         The directory where the plots will
         be saved. If None, plots are displayed.
+    cache : FigureCache, optional
+        Cache of rendered figures to restore the plots from and add
+        them to.
 
     Raises
     ------
@@ -59,6 +76,14 @@ def plot_categorical_columns(data, output_dir=None):
             "reasonable number of unique values to plot."
         )
 
+    if output_dir:
+        plot_file = os.path.join(output_dir, "categorical_columns_plots.png")
+        fingerprint = data_fingerprint(data[categorical_columns],
+                                       kind='categorical_columns')
+        if figure_up_to_date(plot_file, fingerprint, cache):
+            print(f"Plots are up to date: {plot_file}")
+            return
+
     num_cols = len(categorical_columns)
     num_rows = (num_cols - 1) // 6 + 1
     fig, axes = plt.subplots(nrows=num_rows,
@@ -83,9 +108,7 @@ def plot_categorical_columns(data, output_dir=None):
 
         if output_dir:
             os.makedirs(output_dir, exist_ok=True)
-            plot_file = os.path.join(output_dir,
-                                     "categorical_columns_plots.png")
-            plt.savefig(plot_file)
+            save_figure(plot_file, fingerprint, cache)
             print(f"Plots saved to {plot_file}")
         else:
             plt.show()
@@ -118,7 +141,8 @@ def main():
     )
     parser.add_argument(
         "input_file", type=str,
-        help="Path to the input CSV file containing the data."
+        help="Path to the input CSV file containing the data, a "
+        "directory of partitions or a glob pattern."
     )
     parser.add_argument(
         "--output_dir", type=str, default=None,
@@ -127,15 +151,23 @@ def main():
             "plots will be shown."
         )
     )
+    parser.add_argument(
+        "--figure_cache", type=str, default=None,
+        help="Directory of a cache of rendered figures."
+    )
 
     args = parser.parse_args()
 
     try:
-        # Load the data from the CSV file
-        data = pd.read_csv(args.input_file)
+        # Load only the non-numeric columns from the CSV file
+        data = load_data(args.input_file,
+                         columns=infer_columns(args.input_file,
+                                               exclude='number'))
 
         # Plot the categorical columns
-        plot_categorical_columns(data, args.output_dir)
+        cache = FigureCache(args.figure_cache) if args.figure_cache \
+            else None
+        plot_categorical_columns(data, args.output_dir, cache)
     except FileNotFoundError:
         print(f"Error: The file '{args.input_file}' was not found.")
     except pd.errors.EmptyDataError:
@@ -2,6 +2,16 @@
 This module provides functionality to plot correlation matrix heatmaps
 from a DataFrame and save them to a file.
 
+Wide data with more than max_features numeric columns is handled in a
+reduced mode: the correlation matrix is computed block by block in
+float32 (see blockwise_correlation) and only a selection of n_display
+features, cluster representatives or the features most correlated with
+SalePrice, is drawn. The full matrix can be saved as a .npy file.
+
+The heatmaps are not rendered again when the existing image was drawn
+from the same numeric columns and parameters (see figure_cache) and the
+requested correlation file was saved from the same numeric columns.
+
 Functions:
 - plot_heatmaps: Plot correlation matrix heatmaps
 from a DataFrame and save them to a file.
@@ -10,17 +20,43 @@ from a DataFrame and save them to a file.
 
 import argparse
 import os
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
 
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import infer_columns, load_data  # noqa: E402
+from modules.figure_cache import (  # noqa: E402
+    FigureCache, data_fingerprint, figure_up_to_date, save_figure
+)
+from modules.blockwise_correlation import (  # noqa: E402
+    blockwise_correlation, cluster_representatives, correlation_fingerprint,
+    save_correlation, top_k_by_target
+)
+# pylint: enable=wrong-import-position, import-error
+
+
+# Above this number of numeric columns only a selection is drawn
+MAX_FEATURES = 200
+
+# Number of features drawn in the reduced mode
+N_DISPLAY = 50
+
 
 class PlotSaveError(Exception):
     """Custom exception for errors during plot saving."""
 
 
-def plot_heatmaps(df: pd.DataFrame, output_dir: str) -> None:
+def plot_heatmaps(df: pd.DataFrame, output_dir: str,
+                  max_features: int = MAX_FEATURES,
+                  n_display: int = N_DISPLAY, selection: str = 'cluster',
+                  correlation_file: str = None,
+                  cache: FigureCache = None) -> None:
     """
     Plot correlation matrix heatmaps from a DataFrame and save them to a file.
 
@@ -30,6 +66,22 @@ def plot_heatmaps(df: pd.DataFrame, output_dir: str) -> None:
         The DataFrame containing the data.
     output_dir : str
         The directory where the heatmaps will be saved.
+    max_features : int
+        Above this number of numeric columns, the correlations are
+        computed blockwise in float32 and only n_display features are
+        drawn.
+    n_display : int
+        Number of features drawn in the reduced mode.
+    selection : str
+        Features drawn in the reduced mode: 'cluster' for one
+        representative per correlation cluster, 'target' for the
+        features most correlated with SalePrice.
+    correlation_file : str, optional
+        Path of a .npy file to save the full float32 correlation matrix
+        in, with its column names in a JSON file next to it.
+    cache : FigureCache, optional
+        Cache of rendered figures to restore the heatmaps from and add
+        them to.
 
     Raises
     ------
@@ -46,18 +98,56 @@ def plot_heatmaps(df: pd.DataFrame, output_dir: str) -> None:
     if numeric_df.empty:
         raise ValueError("The DataFrame does not contain numeric columns.")
 
-    corrmat = numeric_df.corr()
+    columns = numeric_df.columns
+    wide = len(columns) > max_features
+    plot_file = os.path.join(output_dir, "Correlation_Matrix_Heatmap.png")
+    fingerprint = data_fingerprint(
+        numeric_df, kind='heatmaps', wide=wide, n_display=n_display,
+        selection=selection)
+    # The saved matrix only depends on the numeric columns
+    correlation_signature = (
+        data_fingerprint(numeric_df, kind='correlation')
+        if correlation_file else None)
+    if ((correlation_file is None or
+         correlation_fingerprint(correlation_file) == correlation_signature)
+            and figure_up_to_date(plot_file, fingerprint, cache)):
+        print(f"Heatmaps are up to date: {plot_file}")
+        return
+
+    if wide or correlation_file:
+        corr = blockwise_correlation(numeric_df, output_file=correlation_file)
+        if correlation_file:
+            save_correlation(corr, columns, correlation_file,
+                             correlation_signature)
+
+    if wide:
+        if selection == 'target' and 'SalePrice' in columns:
+            shown = top_k_by_target(corr, columns, 'SalePrice', n_display)
+        else:
+            shown = cluster_representatives(corr, n_display)
+        corrmat = pd.DataFrame(corr[np.ix_(shown, shown)],
+                               index=columns[shown], columns=columns[shown])
+        title = (f'Correlation Matrix Heatmap ({len(shown)} of '
+                 f'{len(columns)} features)')
+    else:
+        corrmat = numeric_df.corr()
+        title = 'Correlation Matrix Heatmap'
 
     fig, ax = plt.subplots(1, 2, figsize=(20, 10))
 
-    # Plot the full correlation matrix heatmap
+    # Plot the (reduced) correlation matrix heatmap
     sns.heatmap(corrmat, vmax=0.8, square=True, cmap="RdBu", ax=ax[0])
-    ax[0].set_title('Correlation Matrix Heatmap')
+    ax[0].set_title(title)
 
     k = 10
-    if 'SalePrice' in corrmat.columns:
-        cols = corrmat.nlargest(k, 'SalePrice')['SalePrice'].index
-        cm = np.corrcoef(df[cols].values.T)
+    if 'SalePrice' in columns:
+        if wide:
+            top = top_k_by_target(corr, columns, 'SalePrice', k)
+            cols = columns[top]
+            cm = corr[np.ix_(top, top)]
+        else:
+            cols = corrmat.nlargest(k, 'SalePrice')['SalePrice'].index
+            cm = np.corrcoef(df[cols].values.T)
         sns.set(font_scale=1.25)
         sns.heatmap(cm, cbar=True, annot=True, square=True, fmt='.2f',
                     annot_kws={'size': 10}, yticklabels=cols.values,
@@ -72,7 +162,7 @@ def plot_heatmaps(df: pd.DataFrame, output_dir: str) -> None:
     # Save the heatmap as a PNG file
     fig.tight_layout()
     try:
-        fig.savefig(os.path.join(output_dir, "Correlation_Matrix_Heatmap.png"))
+        save_figure(plot_file, fingerprint, cache)
     except Exception as e:
         raise PlotSaveError(f"Error saving the heatmap: {e}") from e
     finally:
@@ -99,21 +189,50 @@ def main() -> None:
     )
     parser.add_argument(
         "input_file", type=str,
-        help="Path to the input CSV file containing the data."
+        help="Path to the input CSV file containing the data, a "
+        "directory of partitions or a glob pattern."
     )
     parser.add_argument(
         "output_dir", type=str,
         help="Directory where the heatmaps will be saved."
     )
+    parser.add_argument(
+        "--max_features", type=int, default=MAX_FEATURES,
+        help="Above this number of numeric columns, only a selection of "
+        "features is drawn."
+    )
+    parser.add_argument(
+        "--n_display", type=int, default=N_DISPLAY,
+        help="Number of features drawn for wide data."
+    )
+    parser.add_argument(
+        "--selection", choices=['cluster', 'target'], default='cluster',
+        help="Draw cluster representatives or the features most "
+        "correlated with SalePrice."
+    )
+    parser.add_argument(
+        "--correlation_file", type=str, default=None,
+        help="Path of a .npy file to save the full correlation matrix in."
+    )
+    parser.add_argument(
+        "--figure_cache", type=str, default=None,
+        help="Directory of a cache of rendered figures."
+    )
 
     args = parser.parse_args()
 
     try:
-        # Load the data from the CSV file
-        df = pd.read_csv(args.input_file)
+        # Load only the numeric columns from the CSV file
+        df = load_data(args.input_file,
+                       columns=infer_columns(args.input_file,
+                                             include='number'))
 
         # Plot the heatmaps
-        plot_heatmaps(df, args.output_dir)
+        cache = FigureCache(args.figure_cache) if args.figure_cache \
+            else None
+        plot_heatmaps(df, args.output_dir, args.max_features,
+                      args.n_display, args.selection,
+                      args.correlation_file, cache)
         print(f"Heatmaps saved to {args.output_dir}")
     except FileNotFoundError:
         print(f"Error: The file '{args.input_file}' was not found.")
@@ -0,0 +1,253 @@
+"""
+This module provides the fitted state of the preprocessing step, so that
+newly arrived rows can be preprocessed and appended without rebuilding
+the whole output.
+
+The state records the decisions taken on the full history: the output
+columns and their order, the categorical and log-transformed columns,
+and, for every zero-count threshold step (delete_columns_with_zero_data
+and drop_columns_with_zero_threshold), the threshold, the candidate
+columns and the columns it dropped. It also keeps running statistics of
+the candidate columns (the number of rows and the zero or missing count
+of every column), which are updated with each appended batch. Comparing
+the running counts with the thresholds tells which columns the steps
+would now keep or drop differently, i.e. when a full rebuild is due.
+
+Classes:
+- PreprocessingState: Fitted decisions and running column statistics.
+
+Functions:
+- zero_counts: Counts the zero or missing values of numeric columns.
+- main: Parses command-line arguments and reports the threshold
+  decisions of a saved state.
+"""
+
+import argparse
+import json
+
+import pandas as pd
+
+
+def zero_counts(data):
+    """
+    Counts the zero or missing values of the numeric columns.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The input data as a pandas DataFrame.
+
+    Returns
+    -------
+    dict
+        Column names as keys and counts as values.
+    """
+    numeric_data = data.select_dtypes(include='number')
+    counts = (numeric_data == 0).sum() + numeric_data.isna().sum()
+    return {column: int(count) for column, count in counts.items()}
+
+
+class PreprocessingState:
+    """
+    Fitted decisions and running column statistics of the
+    preprocessing step.
+
+    Parameters
+    ----------
+    columns : list of str, optional
+        Output columns in their order; the target is last.
+    categorical_columns : list of str, optional
+        Columns encoded as categorical codes.
+    log_columns : list of str, optional
+        Columns transformed with log(1 + x).
+    """
+
+    def __init__(self, columns=None, categorical_columns=None,
+                 log_columns=None):
+        self.columns = list(columns if columns is not None else [])
+        self.categorical_columns = list(
+            categorical_columns if categorical_columns is not None else [])
+        self.log_columns = list(log_columns if log_columns is not None
+                                else [])
+        self.n_rows = 0
+        self.zero_counts = {}
+        self.steps = []
+
+    def update(self, data):
+        """
+        Add the rows of a batch to the running column statistics.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The batch, with the columns the threshold steps consider.
+        """
+        self.n_rows += len(data)
+        for column, count in zero_counts(data).items():
+            self.zero_counts[column] = self.zero_counts.get(column, 0) + count
+
+    def record_threshold(self, name, threshold, candidates, kept):
+        """
+        Record the decision of a zero-count threshold step.
+
+        Parameters
+        ----------
+        name : str
+            Name of the step.
+        threshold : int
+            Maximum allowed number of zero values of a column.
+        candidates : list of str
+            Columns the step considered.
+        kept : list of str
+            Columns the step kept.
+        """
+        kept = set(kept)
+        self.steps.append({
+            'name': name,
+            'threshold': int(threshold),
+            'candidates': list(candidates),
+            'dropped': [column for column in candidates
+                        if column not in kept],
+        })
+
+    def threshold_changes(self):
+        """
+        List the columns whose threshold decision differs from the
+        fitted one under the running statistics.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per changed decision with the columns step, column,
+            zero_count, threshold, fitted and current ('keep' or
+            'drop'), and affects_output, which tells whether the column
+            would enter or leave the output; a column newly dropped by
+            one step but dropped by another step anyway does not.
+        """
+        decisions = []
+        for step in self.steps:
+            dropped = set(step['dropped'])
+            for column in step['candidates']:
+                count = self.zero_counts.get(column, 0)
+                decisions.append({
+                    'step': step['name'], 'column': column,
+                    'zero_count': count, 'threshold': step['threshold'],
+                    'fitted': 'drop' if column in dropped else 'keep',
+                    'current': ('drop' if count > step['threshold']
+                                else 'keep')})
+
+        fitted_kept = {}
+        current_kept = {}
+        for decision in decisions:
+            column = decision['column']
+            fitted_kept[column] = (fitted_kept.get(column, True) and
+                                   decision['fitted'] == 'keep')
+            current_kept[column] = (current_kept.get(column, True) and
+                                    decision['current'] == 'keep')
+
+        rows = [{**decision,
+                 'affects_output': (fitted_kept[decision['column']] !=
+                                    current_kept[decision['column']])}
+                for decision in decisions
+                if decision['fitted'] != decision['current']]
+        return pd.DataFrame(rows, columns=['step', 'column', 'zero_count',
+                                           'threshold', 'fitted', 'current',
+                                           'affects_output'])
+
+    def to_dict(self):
+        """Return the state as a JSON-serializable dictionary."""
+        return {'columns': self.columns,
+                'categorical_columns': self.categorical_columns,
+                'log_columns': self.log_columns,
+                'n_rows': self.n_rows,
+                'zero_counts': self.zero_counts,
+                'steps': self.steps}
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        Create a state from a dictionary written by to_dict.
+
+        Parameters
+        ----------
+        values : dict
+            The state as a dictionary.
+
+        Returns
+        -------
+        PreprocessingState
+            The state.
+        """
+        state = cls(values['columns'], values['categorical_columns'],
+                    values['log_columns'])
+        state.n_rows = values['n_rows']
+        state.zero_counts = dict(values['zero_counts'])
+        state.steps = list(values['steps'])
+        return state
+
+    def save(self, output_file):
+        """
+        Save the state to a JSON file.
+
+        Parameters
+        ----------
+        output_file : str
+            Path of the JSON file.
+        """
+        with open(output_file, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @classmethod
+    def load(cls, input_file):
+        """
+        Load a state from a JSON file.
+
+        Parameters
+        ----------
+        input_file : str
+            Path of the JSON file.
+
+        Returns
+        -------
+        PreprocessingState
+            The state.
+        """
+        with open(input_file, 'r', encoding='utf-8') as file:
+            return cls.from_dict(json.load(file))
+
+
+def main():
+    """
+    Parses command-line arguments and reports the threshold decisions
+    of a saved preprocessing state that changed since it was fitted.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Report changed threshold decisions of a "
+        "preprocessing state."
+    )
+    parser.add_argument("state_file", type=str,
+                        help="Path to the preprocessing state JSON file.")
+
+    args = parser.parse_args()
+
+    try:
+        state = PreprocessingState.load(args.state_file)
+        changes = state.threshold_changes()
+        print(f"{state.n_rows} rows, {len(state.columns)} output columns.")
+        if changes.empty:
+            print("All threshold decisions are unchanged.")
+        else:
+            print(changes.to_string(index=False))
+    except FileNotFoundError:
+        print(f"Error: The file '{args.state_file}' was not found.")
+    except (KeyError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+"""
+This module provides a run-history database: an SQLite file that keeps,
+for every run of the evaluation pipeline, the fingerprint of its data,
+its settings, the metrics and best parameters of every model, the
+tuning timings of every search and the duration of every stage. Unlike
+the CSV files of a run, which the next run overwrites, the history
+grows, and its indexes answer questions across runs such as the R²
+trend of a model or the slowest stages of the last runs.
+
+A run is compared with the earlier runs on the same data and with the
+same settings to detect regressions: a metric worse than the median of
+the previous runs by more than a relative tolerance, or a stage or
+search slower than it. Searches restored from a tuning checkpoint did
+not run, so their timings are not recorded and the tuning stage of
+runs with restored searches is not compared.
+
+Tables:
+    runs        run_id, started_at, finished_at, data_fingerprint,
+                input_file, n_rows, n_features, settings (JSON)
+    metrics     run_id, model, metric, value
+    params      run_id, model, params (JSON)
+    tuning      run_id, model, n_candidates, n_evaluated, fit_time,
+                search_time, best_score, max_peak_memory, restored
+    stages      run_id, stage, duration
+
+Classes:
+- RunHistory: Run-history database of the evaluation pipeline.
+
+Functions:
+- file_fingerprint: Computes the fingerprint of data files from their
+  names, sizes and modification times.
+- main: Parses command-line arguments and queries a run history.
+"""
+
+import argparse
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+# Default file name of the run history
+RUN_HISTORY_FILE = 'run_history.sqlite'
+
+# Metrics where a higher value is better; lower is better for the others
+HIGHER_IS_BETTER = ('R2-Score',)
+
+# Relative change of a metric or duration counted as a regression
+METRIC_TOLERANCE = 0.02
+TIME_TOLERANCE = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    data_fingerprint TEXT,
+    input_file TEXT,
+    n_rows INTEGER,
+    n_features INTEGER,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    model TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    model TEXT NOT NULL,
+    params TEXT
+);
+CREATE TABLE IF NOT EXISTS tuning (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    model TEXT NOT NULL,
+    n_candidates INTEGER,
+    n_evaluated INTEGER,
+    fit_time REAL,
+    search_time REAL,
+    best_score REAL,
+    max_peak_memory REAL,
+    restored INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    stage TEXT NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_fingerprint
+    ON runs (data_fingerprint, settings, run_id);
+CREATE INDEX IF NOT EXISTS metrics_model_metric
+    ON metrics (model, metric, run_id);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics (run_id);
+CREATE INDEX IF NOT EXISTS params_model ON params (model, run_id);
+CREATE INDEX IF NOT EXISTS tuning_model ON tuning (model, run_id);
+CREATE INDEX IF NOT EXISTS stages_stage ON stages (stage, run_id);
+CREATE INDEX IF NOT EXISTS stages_run ON stages (run_id);
+"""
+
+
+def _now():
+    """Return the current UTC time in ISO 8601 format."""
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(
+        timespec='seconds')
+
+
+def _float(value):
+    """Return a value as a float, or None if it is missing."""
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def file_fingerprint(paths):
+    """
+    Computes the fingerprint of data files from their names, sizes and
+    modification times, for data too large to hash its content.
+
+    Parameters
+    ----------
+    paths : list of str
+        Paths of the data files.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        status = os.stat(path)
+        digest.update(json.dumps([os.path.basename(path), status.st_size,
+                                  status.st_mtime_ns]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RunHistory:
+    """
+    Run-history database of the evaluation pipeline.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite file; created with its tables and indexes if
+        needed.
+
+    Attributes
+    ----------
+    run_id : int or None
+        Id of the run started last by this object; the default run of
+        the record methods.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.run_id = None
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and close it."""
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _query(self, sql, parameters=()):
+        """Return the result of a query as a DataFrame."""
+        with self._connect() as connection:
+            return pd.read_sql_query(sql, connection, params=parameters)
+
+    def start_run(self, data_fingerprint=None, input_file=None,
+                  n_rows=None, n_features=None, settings=None):
+        """
+        Record the start of a run.
+
+        Parameters
+        ----------
+        data_fingerprint : str, optional
+            Fingerprint of the data; runs on the same data are compared
+            for regressions.
+        input_file : str, optional
+            The input file, directory of partitions or glob pattern.
+        n_rows, n_features : int, optional
+            Shape of the data.
+        settings : dict, optional
+            Settings of the run, stored as JSON.
+
+        Returns
+        -------
+        int
+            Id of the new run.
+        """
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO runs (started_at, data_fingerprint, "
+                "input_file, n_rows, n_features, settings) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (_now(), data_fingerprint, input_file, n_rows, n_features,
+                 json.dumps(settings or {}, sort_keys=True, default=str)))
+            self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def set_data(self, data_fingerprint, n_rows=None, n_features=None,
+                 run_id=None):
+        """Record the data of a run once it is known."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE runs SET data_fingerprint = ?, n_rows = ?, "
+                "n_features = ? WHERE run_id = ?",
+                (data_fingerprint, n_rows, n_features,
+                 run_id or self.run_id))
+
+    def finish_run(self, run_id=None):
+        """Record the end of a run."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE runs SET finished_at = ? WHERE run_id = ?",
+                (_now(), run_id or self.run_id))
+
+    @contextlib.contextmanager
+    def stage(self, name, run_id=None):
+        """
+        Context manager recording the duration of a stage of a run.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage, e.g. 'tuning'.
+        run_id : int, optional
+            Id of the run; the run started last by default.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start, run_id)
+
+    def record_stage(self, name, duration, run_id=None):
+        """Record the duration in seconds of a stage of a run."""
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO stages (run_id, stage, duration) "
+                "VALUES (?, ?, ?)", (run_id or self.run_id, name,
+                                     float(duration)))
+
+    def record_metrics(self, metrics_list, run_id=None):
+        """
+        Record the metrics of the models of a run.
+
+        Parameters
+        ----------
+        metrics_list : list of dict
+            The metrics of each model, with its name under 'Model', as
+            returned by model_evaluation.
+        run_id : int, optional
+            Id of the run; the run started last by default.
+        """
+        rows = [(run_id or self.run_id, metrics['Model'], name,
+                 _float(value))
+                for metrics in metrics_list
+                for name, value in metrics.items() if name != 'Model']
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO metrics (run_id, model, metric, value) "
+                "VALUES (?, ?, ?, ?)", rows)
+
+    def record_params(self, best_params, run_id=None):
+        """Record the best parameters of each model of a run."""
+        rows = [(run_id or self.run_id, name,
+                 json.dumps(params, sort_keys=True, default=str))
+                for name, params in best_params.items()]
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO params (run_id, model, params) "
+                "VALUES (?, ?, ?)", rows)
+
+    def record_tuning(self, cv_results, coverage=None, run_id=None):
+        """
+        Record the tuning timings of each model of a run.
+
+        Parameters
+        ----------
+        cv_results : dict
+            The cv_results_ of each model's search by name; None for a
+            failed search.
+        coverage : dict, optional
+            The coverage_ of each model's search by name, for the
+            wall-clock search time; the fit and search times of
+            searches restored from a checkpoint are not recorded.
+        run_id : int, optional
+            Id of the run; the run started last by default.
+        """
+        rows = []
+        for name, results in cv_results.items():
+            if results is None:
+                continue
+            n_splits = sum(key.startswith('split') and
+                           key.endswith('_test_score') for key in results)
+            n_folds = np.asarray(results.get(
+                'n_folds_evaluated',
+                np.full(len(results['params']), n_splits)))
+            record = (coverage or {}).get(name) or {}
+            restored = bool(record.get('restored', False))
+            rows.append((
+                run_id or self.run_id, name,
+                record.get('n_candidates', len(results['params'])),
+                len(results['params']),
+                None if restored else _float(
+                    np.nansum(results['mean_fit_time'] * n_folds)),
+                None if restored else _float(record.get('search_time')),
+                _float(np.nanmax(results['mean_test_score'])),
+                _float(np.nanmax(results['max_peak_memory'])
+                       if 'max_peak_memory' in results and
+                       not np.all(np.isnan(results['max_peak_memory']))
+                       else None),
+                int(restored)))
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO tuning (run_id, model, n_candidates, "
+                "n_evaluated, fit_time, search_time, best_score, "
+                "max_peak_memory, restored) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def runs(self, last=None):
+        """Return the runs, the most recent last."""
+        table = self._query(
+            "SELECT * FROM runs ORDER BY run_id DESC LIMIT ?",
+            (last if last is not None else -1,))
+        return table.iloc[::-1].reset_index(drop=True)
+
+    def metric_trend(self, model, metric='R2-Score', last=None):
+        """
+        Return the values of a metric of a model over the runs.
+
+        Parameters
+        ----------
+        model : str
+            Name of the model, e.g. 'LGBM'.
+        metric : str
+            Name of the metric.
+        last : int, optional
+            Number of most recent runs; all by default.
+
+        Returns
+        -------
+        pd.DataFrame
+            run_id, started_at, data_fingerprint and value, oldest
+            first.
+        """
+        table = self._query(
+            "SELECT m.run_id, r.started_at, r.data_fingerprint, m.value "
+            "FROM metrics AS m JOIN runs AS r ON r.run_id = m.run_id "
+            "WHERE m.model = ? AND m.metric = ? "
+            "ORDER BY m.run_id DESC LIMIT ?",
+            (model, metric, last if last is not None else -1))
+        return table.iloc[::-1].reset_index(drop=True)
+
+    def slowest_stages(self, last=30):
+        """
+        Return the stages of the last runs by decreasing mean duration.
+
+        Parameters
+        ----------
+        last : int
+            Number of most recent runs.
+
+        Returns
+        -------
+        pd.DataFrame
+            stage, n_runs, mean_duration and max_duration.
+        """
+        return self._query(
+            "SELECT stage, COUNT(*) AS n_runs, "
+            "AVG(duration) AS mean_duration, "
+            "MAX(duration) AS max_duration FROM stages "
+            "WHERE run_id IN "
+            "(SELECT run_id FROM runs ORDER BY run_id DESC LIMIT ?) "
+            "GROUP BY stage ORDER BY mean_duration DESC", (last,))
+
+    def regressions(self, run_id=None, window=5,
+                    metric_tolerance=METRIC_TOLERANCE,
+                    time_tolerance=TIME_TOLERANCE):
+        """
+        Compare a run with the earlier runs on the same data and with
+        the same settings.
+
+        A metric is a regression when it is worse than the median of
+        the same model's metric over the previous runs by more than
+        metric_tolerance, relative to that median; a stage, or a
+        model's search, when it took longer than the median by more
+        than time_tolerance. The tuning stage of runs that restored
+        searches from a checkpoint is left out of the comparison.
+
+        Parameters
+        ----------
+        run_id : int, optional
+            Id of the run; the most recent run by default.
+        window : int
+            Number of previous comparable runs to compare with.
+        metric_tolerance : float
+            Relative worsening of a metric tolerated.
+        time_tolerance : float
+            Relative slowdown tolerated.
+
+        Returns
+        -------
+        pd.DataFrame
+            kind ('metric', 'stage' or 'tuning'), name (model or
+            stage), measure, value, baseline and relative change; empty
+            if there are no regressions or no earlier runs.
+        """
+        columns = ['kind', 'name', 'measure', 'value', 'baseline',
+                   'change']
+        if run_id is None:
+            runs = self.runs(last=1)
+            if runs.empty:
+                return pd.DataFrame(columns=columns)
+            run_id = int(runs['run_id'].iloc[0])
+        previous = self._query(
+            "SELECT r.run_id FROM runs AS r JOIN runs AS c "
+            "ON c.run_id = ? AND r.data_fingerprint = c.data_fingerprint "
+            "AND r.settings = c.settings "
+            "WHERE r.run_id < ? ORDER BY r.run_id DESC LIMIT ?",
+            (run_id, run_id, window))['run_id'].tolist()
+        if not previous:
+            return pd.DataFrame(columns=columns)
+
+        placeholders = ', '.join('?' * len(previous))
+        restored = set(self._query(
+            "SELECT DISTINCT run_id FROM tuning WHERE restored = 1 "
+            f"AND run_id IN (?, {placeholders})",
+            (run_id, *previous))['run_id'])
+        comparisons = (
+            ('metric', "SELECT run_id, model AS name, metric AS measure, "
+             "value FROM metrics"),
+            ('stage', "SELECT run_id, stage AS name, 'duration' AS "
+             "measure, duration AS value FROM stages"),
+            ('tuning', "SELECT run_id, model AS name, 'search_time' AS "
+             "measure, search_time AS value FROM tuning"),
+        )
+        rows = []
+        for kind, select in comparisons:
+            table = self._query(
+                f"{select} WHERE run_id IN (?, {placeholders})",
+                (run_id, *previous)).dropna(subset=['value'])
+            if kind == 'stage':
+                table = table[~((table['name'] == 'tuning') &
+                                table['run_id'].isin(restored))]
+            current = table[table['run_id'] == run_id]
+            baseline = (table[table['run_id'] != run_id]
+                        .groupby(['name', 'measure'])['value'].median())
+            for row in current.itertuples():
+                reference = baseline.get((row.name, row.measure))
+                if reference is None or reference == 0:
+                    continue
+                change = (row.value - reference) / abs(reference)
+                if kind == 'metric':
+                    worse = (-change if row.measure in HIGHER_IS_BETTER
+                             else change) > metric_tolerance
+                else:
+                    worse = change > time_tolerance
+                if worse:
+                    rows.append((kind, row.name, row.measure, row.value,
+                                 reference, change))
+        return pd.DataFrame(rows, columns=columns)
+
+
+def main():
+    """
+    Parses command-line arguments and prints the runs, the trend of a
+    metric of a model, the slowest stages or the regressions of the
+    latest run of a run history.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Query the run history of the evaluation pipeline."
+    )
+    parser.add_argument("history_file", type=str,
+                        help="Path to the run history SQLite file.")
+    parser.add_argument("--trend", type=str, default=None, metavar="MODEL",
+                        help="Print the trend of --metric for a model.")
+    parser.add_argument("--metric", type=str, default='R2-Score',
+                        help="Metric of the trend.")
+    parser.add_argument("--slowest", action="store_true",
+                        help="Print the stages by decreasing duration.")
+    parser.add_argument("--regressions", action="store_true",
+                        help="Print the regressions of the latest run.")
+    parser.add_argument("--last", type=int, default=30,
+                        help="Number of most recent runs considered.")
+
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.history_file):
+        print(f"Error: The file '{args.history_file}' was not found.")
+        return
+    history = RunHistory(args.history_file)
+    if args.trend:
+        table = history.metric_trend(args.trend, args.metric, args.last)
+    elif args.slowest:
+        table = history.slowest_stages(args.last)
+    elif args.regressions:
+        table = history.regressions()
+        if table.empty:
+            print("No regressions.")
+            return
+    else:
+        table = history.runs(args.last).drop(columns='settings')
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+This module provides functionality to train one model set per segment of
+a dataset, e.g. per Neighborhood or Bundesland, with a shared process
+pool.
+
+The data is grouped by the segment column once. Segments smaller than a
+minimum size are pooled into one extra segment (or skipped), and the
+jobs are submitted to a single process pool largest segment first, so
+the longest jobs start early and the small ones fill the gaps at the
+end. Each job only receives the rows of its own segment. Workers are
+started with the 'spawn' method so that they do not inherit the OpenMP
+thread pools of LightGBM or XGBoost from the parent process.
+
+Functions:
+- plan_segments: Groups rows by segment and orders the segments.
+- segment_plan_table: Describes a plan as a DataFrame.
+- run_segment_jobs: Runs one job per segment in a process pool.
+- segment_metrics_table: Combines the per-segment metrics.
+- main: Parses command-line arguments and prints the segment plan of a
+  dataset.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
+POOLED_SEGMENT = '__pooled__'
+
+
+def plan_segments(segment_keys, min_segment_size=50, pool_small=True):
+    """
+    Groups rows by segment and orders the segments largest first.
+
+    Parameters
+    ----------
+    segment_keys : array-like
+        Segment key of every row.
+    min_segment_size : int
+        Segments with fewer rows are pooled or skipped.
+    pool_small : bool
+        Whether to train the small segments together as one pooled
+        segment (if it reaches min_segment_size) instead of skipping
+        them.
+
+    Returns
+    -------
+    segments : list of tuple
+        (name, row indices) of every segment to train, largest first.
+    skipped : dict
+        Names and sizes of the segments that are not trained.
+    """
+    keys = pd.Series(np.asarray(segment_keys)).astype(str)
+    groups = keys.groupby(keys, sort=True).indices
+    segments = []
+    small = {}
+    for name, indices in groups.items():
+        if len(indices) >= min_segment_size:
+            segments.append((name, indices))
+        else:
+            small[name] = indices
+
+    skipped = {name: len(indices) for name, indices in small.items()}
+    if pool_small and small:
+        pooled = np.sort(np.concatenate(list(small.values())))
+        if len(pooled) >= min_segment_size:
+            segments.append((POOLED_SEGMENT, pooled))
+            skipped = {}
+    segments.sort(key=lambda segment: len(segment[1]), reverse=True)
+    return segments, skipped
+
+
+def segment_plan_table(segments, skipped, segment_keys=None):
+    """
+    Describes a plan as a DataFrame.
+
+    Parameters
+    ----------
+    segments : list of tuple
+        Segments returned by plan_segments.
+    skipped : dict
+        Skipped segments returned by plan_segments.
+    segment_keys : array-like, optional
+        Segment key of every row, used to list the segments pooled
+        into the pooled segment.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per segment with the columns Segment, n_rows and Status
+        ('trained', 'pooled' or 'skipped'), in scheduling order.
+    """
+    rows = [{'Segment': name, 'n_rows': len(indices), 'Status': 'trained'}
+            for name, indices in segments]
+    if segment_keys is not None and any(name == POOLED_SEGMENT
+                                        for name, _ in segments):
+        keys = pd.Series(np.asarray(segment_keys)).astype(str)
+        pooled = dict(segments)[POOLED_SEGMENT]
+        counts = keys.iloc[pooled].value_counts(sort=False)
+        rows += [{'Segment': name, 'n_rows': int(count), 'Status': 'pooled'}
+                 for name, count in sorted(counts.items())]
+    rows += [{'Segment': name, 'n_rows': size, 'Status': 'skipped'}
+             for name, size in skipped.items()]
+    return pd.DataFrame(rows, columns=['Segment', 'n_rows', 'Status'])
+
+
+def run_segment_jobs(job, segment_data, n_jobs=None, **job_kwargs):
+    """
+    Runs one job per segment in a process pool.
+
+    Jobs are submitted in the given order, so passing the segments
+    largest first schedules the longest jobs first.
+
+    Parameters
+    ----------
+    job : callable
+        Module-level function called as job(name, data, **job_kwargs)
+        in a worker process.
+    segment_data : list of tuple
+        (name, data) of every segment, in scheduling order.
+    n_jobs : int, optional
+        Number of worker processes; 1 runs the jobs in this process.
+    **job_kwargs : dict
+        Extra keyword arguments passed to every job.
+
+    Returns
+    -------
+    dict
+        Segment names as keys and job results as values, in scheduling
+        order; None for segments whose job failed.
+    """
+    results = {}
+    if n_jobs == 1:
+        for name, data in segment_data:
+            results[name] = _run_job(job, name, data, job_kwargs)
+        return results
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=n_jobs,
+                             mp_context=context) as executor:
+        futures = [(name, executor.submit(_run_job, job, name, data,
+                                          job_kwargs))
+                   for name, data in segment_data]
+        for name, future in futures:
+            results[name] = future.result()
+    return results
+
+
+def _run_job(job, name, data, job_kwargs):
+    """Run the job of one segment, reporting errors instead of raising."""
+    try:
+        return job(name, data, **job_kwargs)
+    except Exception as exc:  # pylint: disable=broad-except
+        # e.g. a LightGBMError or XGBoostError must not stop the pool
+        print(f"Error while training segment {name}: "
+              f"{type(exc).__name__}: {exc}")
+        return None
+
+
+def segment_metrics_table(results):
+    """
+    Combines the per-segment metrics.
+
+    Parameters
+    ----------
+    results : dict
+        Segment names as keys and lists of metric dictionaries (one
+        per model, with a 'Model' key) as values; None values are
+        skipped.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per segment and model with a leading Segment column.
+    """
+    rows = [{'Segment': name, **metrics}
+            for name, metrics_list in results.items()
+            if metrics_list is not None
+            for metrics in metrics_list]
+    return pd.DataFrame(rows)
+
+
+def main():
+    """
+    Parses command-line arguments and prints the segment plan of a
+    dataset: the segments in scheduling order, the pooled segments and
+    the skipped ones.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Print the per-segment training plan of a dataset."
+    )
+    parser.add_argument("X", type=str,
+                        help="Path to the CSV file, a directory of "
+                        "partitions or a glob pattern.")
+    parser.add_argument("segment_column", type=str,
+                        help="Column whose values define the segments.")
+    parser.add_argument("--min_segment_size", type=int, default=50,
+                        help="Segments with fewer rows are pooled.")
+    parser.add_argument("--skip_small", action="store_true",
+                        help="Skip small segments instead of pooling them.")
+
+    args = parser.parse_args()
+
+    try:
+        data = load_data(args.X)
+        keys = data[args.segment_column]
+        segments, skipped = plan_segments(keys, args.min_segment_size,
+                                          not args.skip_small)
+        print(segment_plan_table(segments, skipped, keys).to_string(
+            index=False))
+    except FileNotFoundError:
+        print(f"Error: The file '{args.X}' was not found.")
+    except KeyError:
+        print(f"Error: Column '{args.segment_column}' does not exist.")
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
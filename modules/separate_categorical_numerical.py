@@ -10,9 +10,18 @@ Functions:
 
 import argparse
 import json
+import os
+import sys
 
 import pandas as pd
 
+# Add the root directory to the Python path
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+# pylint: disable=wrong-import-position, import-error
+from modules.load_data import load_data  # noqa: E402
+# pylint: enable=wrong-import-position, import-error
+
 
 def separate_categorical_numerical(data):
     """
@@ -84,7 +93,8 @@ def main():
     )
     parser.add_argument(
         "input_file", type=str,
-        help="Path to the input CSV file containing the data."
+        help="Path to the input CSV file containing the data, a "
+        "directory of partitions or a glob pattern."
     )
     parser.add_argument(
         "--output_categorical", type=str,
@@ -99,7 +109,7 @@ def main():
 
     try:
         # Load the data from the CSV file
-        data = pd.read_csv(args.input_file)
+        data = load_data(args.input_file)
 
         # Separate the columns into categorical and numerical
         numerical_cols = separate_categorical_numerical(data)
@@ -0,0 +1,310 @@
+"""
+This module provides checkpoints of a hyperparameter search, so that a
+search that was killed (by preemption or running out of memory) resumes
+where it stopped instead of starting over.
+
+A search checkpoint is a directory identified by a key of the estimator,
+its fixed parameters, the training data, the number of folds and the fit
+parameters: a checkpoint is only reused for exactly the same search
+problem. Every completed (candidate, fold) result is written to its own
+small JSON file as soon as it is known, through a temporary file and an
+atomic rename, so a checkpoint never holds a partly written result.
+When the search of a model completes, its best estimator, parameters
+and cv_results_ are saved as well, and a later run with the same
+candidates skips the model entirely. A search problem changes with the
+data, so every model keeps the checkpoints of its max_searches most
+recently used search problems and older ones are removed when a
+checkpoint is opened.
+
+Layout of a checkpoint directory::
+
+    <checkpoint_dir>/<model>/<search key>/results/<candidate>_<fold>.json
+    <checkpoint_dir>/<model>/<search key>/finished.joblib
+
+Classes:
+- SearchCheckpoint: Completed results and final state of one search.
+
+Functions:
+- search_key: Computes the key of a search problem.
+- candidate_key: Computes the key of a candidate's parameters.
+- main: Parses command-line arguments and summarizes a checkpoint
+  directory.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import joblib
+
+FINISHED_FILE = 'finished.joblib'
+RESULTS_DIR = 'results'
+
+# Default number of search problems whose checkpoints a model keeps
+MAX_SEARCHES = 3
+
+# Fields of a (candidate, fold) result, in the order of the searches
+RESULT_FIELDS = ('score', 'fit_time', 'score_time', 'peak_memory')
+
+
+def search_key(estimator, x, y, cv, fit_params=None):
+    """
+    Computes the key of a search problem.
+
+    Parameters
+    ----------
+    estimator : object
+        The estimator to tune, with its fixed parameters.
+    x : pd.DataFrame or np.ndarray
+        Training data features.
+    y : pd.Series or np.ndarray
+        Training data labels.
+    cv : int
+        Number of folds.
+    fit_params : dict, optional
+        Extra keyword arguments of fit.
+
+    Returns
+    -------
+    str
+        Hexadecimal digest.
+    """
+    return joblib.hash((type(estimator).__name__, estimator.get_params(),
+                        x, y, cv, fit_params or {}))
+
+
+def candidate_key(params):
+    """
+    Computes the key of a candidate's parameters.
+
+    Parameters
+    ----------
+    params : dict
+        The candidate's parameters.
+
+    Returns
+    -------
+    str
+        Hexadecimal digest, independent of the order of the parameters.
+    """
+    text = json.dumps(params, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def _atomic_write(path, write):
+    """Write a file through a temporary file and an atomic rename."""
+    directory = os.path.dirname(path)
+    handle, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class SearchCheckpoint:
+    """
+    Completed results and final state of one hyperparameter search.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the checkpoint, normally
+        <checkpoint_dir>/<model>/<search key>; created if needed.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, RESULTS_DIR), exist_ok=True)
+
+    @classmethod
+    def for_search(cls, checkpoint_dir, name, estimator, x, y, cv,
+                   fit_params=None, max_searches=MAX_SEARCHES):
+        """
+        Open the checkpoint of a model's search problem and remove the
+        checkpoints of the model's least recently used other search
+        problems above max_searches.
+
+        Parameters
+        ----------
+        checkpoint_dir : str
+            Root directory of the checkpoints.
+        name : str
+            Name of the model.
+        estimator, x, y, cv, fit_params
+            The search problem, see search_key.
+        max_searches : int
+            Number of search problems whose checkpoints the model keeps,
+            including this one.
+
+        Returns
+        -------
+        SearchCheckpoint
+            The checkpoint.
+        """
+        if max_searches < 1:
+            raise ValueError("max_searches must be positive.")
+        model_dir = os.path.join(checkpoint_dir, name.replace(os.sep, '_'))
+        checkpoint = cls(os.path.join(model_dir, search_key(
+            estimator, x, y, cv, fit_params)))
+        os.utime(checkpoint.directory)  # Mark as recently used
+        searches = sorted(
+            (os.path.join(model_dir, key) for key in os.listdir(model_dir)),
+            key=os.path.getmtime)
+        for directory in searches[:-max_searches]:
+            if directory != checkpoint.directory:
+                shutil.rmtree(directory, ignore_errors=True)
+        return checkpoint
+
+    def _result_path(self, params, fold):
+        """Return the path of the result of a candidate on a fold."""
+        return os.path.join(self.directory, RESULTS_DIR,
+                            f"{candidate_key(params)}_{fold}.json")
+
+    def load_result(self, params, fold):
+        """
+        Return the saved result of a candidate on a fold.
+
+        Parameters
+        ----------
+        params : dict
+            The candidate's parameters.
+        fold : int
+            Index of the fold.
+
+        Returns
+        -------
+        tuple or None
+            Score, fit time, score time and peak memory, or None if the
+            result was not saved.
+        """
+        try:
+            with open(self._result_path(params, fold), 'r',
+                      encoding='utf-8') as file:
+                record = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        return tuple(float(record[field]) for field in RESULT_FIELDS)
+
+    def save_result(self, params, fold, result):
+        """
+        Save the result of a candidate on a fold.
+
+        Parameters
+        ----------
+        params : dict
+            The candidate's parameters.
+        fold : int
+            Index of the fold.
+        result : tuple
+            Score, fit time, score time and peak memory.
+        """
+        record = {'params': params, 'fold': fold,
+                  **{field: float(value)
+                     for field, value in zip(RESULT_FIELDS, result)}}
+        payload = json.dumps(record, default=repr).encode('utf-8')
+        _atomic_write(self._result_path(params, fold),
+                      lambda file: file.write(payload))
+
+    def n_results(self):
+        """Return the number of saved (candidate, fold) results."""
+        return sum(name.endswith('.json') for name in
+                   os.listdir(os.path.join(self.directory, RESULTS_DIR)))
+
+    def save_finished(self, candidates, best_estimator, best_params,
+                      cv_results):
+        """
+        Save the final state of a completed search.
+
+        Parameters
+        ----------
+        candidates : list of dict
+            The candidates of the search.
+        best_estimator : object
+            The refitted best estimator.
+        best_params : dict
+            Parameters of the best candidate.
+        cv_results : dict
+            The search's cv_results_.
+        """
+        state = {'candidates': sorted(candidate_key(params)
+                                      for params in candidates),
+                 'best_estimator': best_estimator,
+                 'best_params': best_params,
+                 'cv_results': cv_results}
+        _atomic_write(os.path.join(self.directory, FINISHED_FILE),
+                      lambda file: joblib.dump(state, file))
+
+    def load_finished(self, candidates):
+        """
+        Return the final state of a completed search over the same
+        candidates.
+
+        Parameters
+        ----------
+        candidates : list of dict
+            The candidates of the search to run.
+
+        Returns
+        -------
+        tuple or None
+            Best estimator, best parameters and cv_results_, or None if
+            the search did not complete or had other candidates.
+        """
+        try:
+            state = joblib.load(os.path.join(self.directory,
+                                             FINISHED_FILE))
+        except FileNotFoundError:
+            return None
+        if state['candidates'] != sorted(candidate_key(params)
+                                         for params in candidates):
+            return None
+        return (state['best_estimator'], state['best_params'],
+                state['cv_results'])
+
+
+def main():
+    """
+    Parses command-line arguments and prints, for every model and search
+    of a checkpoint directory, the number of saved results and whether
+    the search completed.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Summarize a hyperparameter search checkpoint."
+    )
+    parser.add_argument("checkpoint_dir", type=str,
+                        help="Root directory of the checkpoints.")
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.checkpoint_dir):
+        print(f"Error: The directory '{args.checkpoint_dir}' was not "
+              "found.")
+        return
+    for name in sorted(os.listdir(args.checkpoint_dir)):
+        model_dir = os.path.join(args.checkpoint_dir, name)
+        if not os.path.isdir(model_dir):
+            continue
+        for key in sorted(os.listdir(model_dir)):
+            checkpoint = SearchCheckpoint(os.path.join(model_dir, key))
+            finished = os.path.exists(os.path.join(checkpoint.directory,
+                                                   FINISHED_FILE))
+            print(f"{name} [{key[:12]}]: {checkpoint.n_results()} "
+                  f"results, {'finished' if finished else 'in progress'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+This module provides functionality to turn the results of hyperparameter
+searches into a performance table of every candidate and to summarize
+the trade-off between accuracy and cost.
+
+The table has one row per model and candidate with its parameters,
+fit and score times, peak memory and fold scores, and flags the
+candidates on the accuracy/cost Pareto front (no other candidate of the
+same model is both faster and more accurate). Folds where a
+candidate reused the fit of an equivalent one (see
+candidate_equivalence) cost nothing and are counted in n_reused_folds;
+such candidates count towards the tuning time but not towards the
+per-candidate costs. The summaries show, per
+model, how much cheaper the fastest candidate that is about as good as
+the best one is, and, per parameter value, what it costs on average.
+Searches run with a time budget also leave a coverage table: how many
+of each model's candidates were evaluated within the budget.
+
+Functions:
+- performance_table: Builds the per-candidate performance table.
+- summarize_cost_accuracy: Summarizes accuracy versus cost per model.
+- parameter_costs: Averages cost and score per parameter value.
+- save_tuning_performance: Saves the table and summaries as CSV files.
+- coverage_table: Builds the table of the search coverage per model.
+- main: Parses command-line arguments and prints the summaries of a
+  saved performance table.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+PERFORMANCE_FILE = 'tuning_performance.csv'
+SUMMARY_FILE = 'tuning_summary.csv'
+PARAMETER_COSTS_FILE = 'tuning_parameter_costs.csv'
+COVERAGE_FILE = 'tuning_coverage.csv'
+
+
+def _pareto_front(cost, score):
+    """Return a mask of the points not dominated in (low cost, high score)."""
+    order = np.lexsort((-score, cost))
+    front = np.zeros(len(cost), dtype=bool)
+    best_score = -np.inf
+    for index in order:
+        if score[index] > best_score:
+            front[index] = True
+            best_score = score[index]
+    return front
+
+
+def _measured(frame):
+    """Return a mask of the candidates fitted on every fold, whose
+    cost was measured rather than reused from an equivalent one."""
+    if 'n_reused_folds' not in frame.columns:
+        return np.ones(len(frame), dtype=bool)
+    return (frame['n_reused_folds'].fillna(0) == 0).to_numpy()
+
+
+def performance_table(cv_results):
+    """
+    Builds the per-candidate performance table.
+
+    Parameters
+    ----------
+    cv_results : dict
+        Dictionary with model names as keys and the cv_results_ of
+        their search as values; None values are skipped.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per model and candidate with the columns model, params
+        (JSON), one param_<name> column per parameter, mean/std fit and
+        score time, total_time (mean fit plus score time), peak_memory
+        (bytes, if recorded), split<k>_test_score, mean/std test score,
+        rank_test_score and pareto_optimal.
+
+    Raises
+    ------
+    ValueError
+        If there are no results.
+    """
+    frames = []
+    for name, results in cv_results.items():
+        if results is None:
+            continue
+        columns = {'model': name,
+                   'params': [json.dumps(params, sort_keys=True, default=str)
+                              for params in results['params']]}
+        for key, values in results.items():
+            if key == 'params':
+                continue
+            if key == 'max_peak_memory':
+                key = 'peak_memory'
+            columns[key] = list(values)
+        frame = pd.DataFrame(columns)
+        frame['total_time'] = (frame['mean_fit_time'] +
+                               frame['mean_score_time'])
+        measured = _measured(frame)
+        frame['pareto_optimal'] = False
+        frame.loc[measured, 'pareto_optimal'] = _pareto_front(
+            frame['total_time'].to_numpy()[measured],
+            frame['mean_test_score'].to_numpy()[measured])
+        frames.append(frame)
+
+    if not frames:
+        raise ValueError("There are no tuning results to tabulate.")
+
+    table = pd.concat(frames, ignore_index=True)
+    leading = ['model', 'params'] + sorted(
+        column for column in table.columns if column.startswith('param_'))
+    return table[leading + [column for column in table.columns
+                            if column not in leading]]
+
+
+def summarize_cost_accuracy(table, tolerance=None):
+    """
+    Summarizes accuracy versus cost per model.
+
+    A candidate counts as about as good as the best one if its mean
+    score is within the tolerance of the best mean score; by default
+    the tolerance is the standard deviation of the best candidate's
+    fold scores.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        Table built by performance_table.
+    tolerance : float, optional
+        Score difference still considered about as good.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per model with the number of candidates, the total
+        tuning time, the best score and its cost, and the fastest
+        candidate about as good as the best with its score, cost and
+        speedup.
+    """
+    rows = []
+    for name, group in table.groupby('model', sort=False):
+        best = group.loc[group['mean_test_score'].idxmax()]
+        margin = best['std_test_score'] if tolerance is None else tolerance
+        close = group[group['mean_test_score'] >=
+                      best['mean_test_score'] - margin]
+        if _measured(close).any():
+            close = close[_measured(close)]
+        fastest = close.loc[close['total_time'].idxmin()]
+        n_folds = group.filter(regex=r'^split\d+_test_score$').notna().sum(
+            axis=1)
+        rows.append({
+            'model': name,
+            'n_candidates': len(group),
+            'tuning_time': (group['total_time'] * n_folds).sum(),
+            'best_params': best['params'],
+            'best_score': best['mean_test_score'],
+            'best_time': best['total_time'],
+            'best_peak_memory': best.get('peak_memory', np.nan),
+            'fastest_close_params': fastest['params'],
+            'fastest_close_score': fastest['mean_test_score'],
+            'fastest_close_time': fastest['total_time'],
+            'speedup': best['total_time'] / max(fastest['total_time'],
+                                                1e-12),
+            'n_pareto_optimal': int(group['pareto_optimal'].sum()),
+        })
+    return pd.DataFrame(rows)
+
+
+def parameter_costs(table):
+    """
+    Averages cost and score per parameter value.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        Table built by performance_table.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per model, parameter and value with the number of
+        candidates, their mean total time, mean peak memory and mean
+        score, sorted by decreasing time within each parameter.
+    """
+    metrics = {'total_time': 'mean', 'mean_test_score': 'mean'}
+    if 'peak_memory' in table.columns:
+        metrics['peak_memory'] = 'mean'
+    # Candidates that reused the fits of equivalent ones have no cost
+    # of their own
+    table = table.copy()
+    costs = [name for name in metrics if name != 'mean_test_score']
+    table.loc[~_measured(table), costs] = np.nan
+
+    # One row per candidate and parameter, from the JSON parameters so
+    # that a None value is kept apart from a parameter not in the grid
+    long_rows = [
+        {'model': model, 'parameter': parameter, 'value': str(value),
+         'row': row}
+        for row, (model, params) in enumerate(zip(table['model'],
+                                                   table['params']))
+        for parameter, value in json.loads(params).items()
+    ]
+    columns = ['model', 'parameter', 'value', 'n_candidates', *metrics]
+    if not long_rows:
+        return pd.DataFrame(columns=columns)
+
+    long_table = pd.DataFrame(long_rows).join(
+        table[list(metrics)].reset_index(drop=True), on='row')
+    grouped = long_table.groupby(['model', 'parameter', 'value'],
+                                 sort=False)
+    costs = grouped.agg(metrics).reset_index()
+    costs.insert(3, 'n_candidates', grouped.size().to_numpy())
+    return costs.sort_values(['model', 'parameter', 'total_time'],
+                             ascending=[True, True, False],
+                             ignore_index=True)[columns]
+
+
+def save_tuning_performance(cv_results, output_dir):
+    """
+    Saves the performance table and its summaries as CSV files.
+
+    Parameters
+    ----------
+    cv_results : dict
+        Dictionary with model names as keys and the cv_results_ of
+        their search as values.
+    output_dir : str
+        Directory to save tuning_performance.csv, tuning_summary.csv
+        and tuning_parameter_costs.csv in.
+
+    Returns
+    -------
+    pd.DataFrame
+        The accuracy versus cost summary.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    table = performance_table(cv_results)
+    summary = summarize_cost_accuracy(table)
+    table.to_csv(os.path.join(output_dir, PERFORMANCE_FILE), index=False)
+    summary.to_csv(os.path.join(output_dir, SUMMARY_FILE), index=False)
+    parameter_costs(table).to_csv(
+        os.path.join(output_dir, PARAMETER_COSTS_FILE), index=False)
+    return summary
+
+
+def coverage_table(coverage):
+    """
+    Builds the table of how much of each model's search space was
+    covered.
+
+    Parameters
+    ----------
+    coverage : dict
+        Dictionary with model names as keys and the coverage_ of their
+        search as values; models whose tuning failed (None) are left
+        out.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per model with the columns model, n_candidates,
+        n_evaluated, coverage, search_time, time_budget and complete.
+    """
+    columns = ['n_candidates', 'n_evaluated', 'coverage', 'search_time',
+               'time_budget', 'complete']
+    rows = [{'model': name, **{column: record[column]
+                               for column in columns}}
+            for name, record in coverage.items() if record is not None]
+    return pd.DataFrame(rows, columns=['model'] + columns)
+
+
+def main():
+    """
+    Parses command-line arguments and prints the accuracy versus cost
+    summaries of a saved performance table.
+
+    Raises
+    ------
+    SystemExit
+        If the command-line arguments are invalid.
+    """
+    parser = argparse.ArgumentParser(
+        description="Summarize the accuracy versus cost of tuned "
+        "candidates."
+    )
+    parser.add_argument("file", type=str,
+                        help="Path to the tuning_performance.csv file.")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="Score difference still considered about "
+                        "as good as the best.")
+
+    args = parser.parse_args()
+
+    try:
+        table = pd.read_csv(args.file)
+        with pd.option_context('display.max_columns', None,
+                               'display.width', 200):
+            print(summarize_cost_accuracy(table, args.tolerance))
+            print()
+            print(parameter_costs(table))
+    except FileNotFoundError:
+        print(f"Error: The file '{args.file}' was not found.")
+    except pd.errors.EmptyDataError:
+        print("Error: The file is empty.")
+
+
+if __name__ == "__main__":
+    main()
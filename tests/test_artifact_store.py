@@ -0,0 +1,127 @@
+"""
+Unit tests for artifact_store module.
+
+This module contains tests to ensure the correct functionality
+of the versioned artifact store, including content hashing,
+memory-mapped arrays and error handling.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from modules.artifact_store import (
+    ArtifactNotFoundError, ArtifactStore, parse_artifact_reference
+)
+from modules.flat_tree_ensemble import compile_tree_ensemble
+
+
+class TestArtifactStore(unittest.TestCase):
+    """
+    Test case for the artifact_store module.
+
+    This class contains various test methods to ensure
+    the correct functionality of saving, versioning and
+    loading artifacts.
+    """
+
+    def setUp(self):
+        """Set up a store in a temporary directory and a small forest."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = ArtifactStore(self.temp_dir)
+        rng = np.random.default_rng(0)
+        self.x = rng.normal(size=(300, 3))
+        self.y = self.x[:, 0] + rng.normal(scale=0.1, size=300)
+        self.model = RandomForestRegressor(n_estimators=5, random_state=0)
+        self.model.fit(self.x, self.y)
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """Test that a saved model predicts the same after loading."""
+        version = self.store.save('rf', self.model, {'n_estimators': 5})
+        loaded = self.store.load('rf', verify=True)
+        np.testing.assert_array_equal(loaded.predict(self.x),
+                                      self.model.predict(self.x))
+        manifest = self.store.manifest('rf', version)
+        self.assertEqual(manifest['metadata'], {'n_estimators': 5})
+        self.assertTrue(manifest['arrays'])
+
+    def test_identical_object_keeps_version(self):
+        """Test that saving identical content does not add a version."""
+        self.assertEqual(self.store.save('rf', self.model), 1)
+        self.assertEqual(self.store.save('rf', self.model), 1)
+        self.assertEqual(self.store.save('rf', {'other': 1}), 2)
+        self.assertEqual(self.store.versions('rf'), [1, 2])
+        self.assertEqual(self.store.load('rf', 2), {'other': 1})
+
+    def test_arrays_memory_mapped_and_shared(self):
+        """Test that arrays are stored once and loaded memory-mapped."""
+        array = np.arange(10_000, dtype=np.float64)
+        self.store.save('a', {'values': array})
+        self.store.save('b', [array])
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir,
+                                                     'objects'))), 1)
+        loaded = self.store.load('a')['values']
+        self.assertIsInstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, array)
+
+    def test_compiled_ensemble(self):
+        """Test that a compiled ensemble loads with mapped node arrays."""
+        self.store.save('rf.compiled', compile_tree_ensemble(self.model))
+        loaded = self.store.load('rf.compiled')
+        self.assertIsInstance(loaded.threshold, np.memmap)
+        np.testing.assert_allclose(loaded.predict(self.x),
+                                   self.model.predict(self.x))
+
+    def test_compression(self):
+        """Test that pickles are compressed and load at any level."""
+        obj = {'values': np.zeros(100), 'names': ['feature'] * 1000}
+        sizes = []
+        for compress in (0, 9):
+            store = ArtifactStore(os.path.join(self.temp_dir, str(compress)),
+                                  compress=compress)
+            store.save('obj', obj)
+            loaded = store.load('obj', verify=True)
+            self.assertEqual(loaded['names'], obj['names'])
+            np.testing.assert_array_equal(loaded['values'], obj['values'])
+            sizes.append(os.path.getsize(os.path.join(
+                store.root, 'artifacts', 'obj', 'v1', 'object.pkl')))
+            # The content hash does not depend on the compression
+            self.assertEqual(ArtifactStore(store.root).save('obj', obj), 1)
+        self.assertLess(sizes[1], sizes[0] / 10)
+        with self.assertRaises(ValueError):
+            ArtifactStore(self.temp_dir, compress=10)
+
+    def test_corruption_detected(self):
+        """Test that verify detects a modified pickle."""
+        self.store.save('obj', {'a': 1})
+        path = os.path.join(self.temp_dir, 'artifacts', 'obj', 'v1',
+                            'object.pkl')
+        with open(path, 'ab') as file:
+            file.write(b'x')
+        with self.assertRaises(ValueError):
+            self.store.load('obj', verify=True)
+
+    def test_missing_artifact(self):
+        """Test that a missing artifact or version raises."""
+        with self.assertRaises(ArtifactNotFoundError):
+            self.store.load('missing')
+        self.store.save('obj', 1)
+        with self.assertRaises(ArtifactNotFoundError):
+            self.store.load('obj', 3)
+
+    def test_parse_artifact_reference(self):
+        """Test parsing of 'name@version' references."""
+        self.assertEqual(parse_artifact_reference('LGBM'), ('LGBM', None))
+        self.assertEqual(parse_artifact_reference('LGBM@2'), ('LGBM', 2))
+        with self.assertRaises(ValueError):
+            parse_artifact_reference('LGBM@latest')
+
+
+if __name__ == '__main__':
+    unittest.main()
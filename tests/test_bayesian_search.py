@@ -0,0 +1,185 @@
+"""
+Unit tests for bayesian_search module.
+
+This module contains tests to ensure that the model-based
+search maps its ranges correctly, proposes candidates within
+them, keeps a trial history and warm-starts from it.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMRegressor
+from sklearn.datasets import make_regression
+from sklearn.tree import DecisionTreeRegressor
+from modules.bayesian_search import (
+    BayesianSearchCV, BinnedBayesianSearchCV, Integer, Real, TrialHistory,
+    data_signature, expected_improvement
+)
+from modules.hyperparameter_tuning import hyperparameter_tuning
+
+
+class TestBayesianSearch(unittest.TestCase):
+    """
+    Test case for the bayesian_search module.
+
+    This class contains various test methods to ensure
+    the ranges, the trial history and the searches behave
+    as expected.
+    """
+
+    def setUp(self):
+        """Set up test data and temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.history_file = os.path.join(self.temp_dir, 'history.jsonl')
+        x, self.y = make_regression(n_samples=200, n_features=5, noise=5,
+                                    random_state=42)[:2]
+        self.x = pd.DataFrame(x, columns=[f'f{i}' for i in range(5)])
+        self.space = {'max_depth': Integer(2, 12),
+                      'min_samples_leaf': Integer(1, 20, log=True),
+                      'splitter': ['best', 'random']}
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_ranges(self):
+        """Test the mapping of ranges to the unit interval."""
+        rate = Real(0.001, 0.1, log=True)
+        self.assertAlmostEqual(rate.to_unit(0.01), 0.5)
+        self.assertAlmostEqual(rate.from_unit(0.5), 0.01)
+        depth = Integer(2, 12)
+        self.assertEqual(depth.from_unit(0.0), 2)
+        self.assertEqual(depth.from_unit(1.0), 12)
+        self.assertIsInstance(depth.from_unit(0.33), int)
+        with self.assertRaises(ValueError):
+            Real(1, 1)
+        with self.assertRaises(ValueError):
+            Real(0, 1, log=True)
+
+    def test_expected_improvement(self):
+        """Test that a higher mean or spread improves more."""
+        improvement = expected_improvement(np.array([0.0, 1.0, 0.0]),
+                                           np.array([0.1, 0.1, 1.0]), 0.5)
+        self.assertLess(improvement[0], improvement[2])
+        self.assertLess(improvement[2], improvement[1])
+
+    def test_trial_history(self):
+        """Test that trials are filtered by model and similar data."""
+        history = TrialHistory(self.history_file)
+        self.assertEqual(history.trials(), [])
+        signature = data_signature(self.x)
+        history.append('DecisionTree', signature,
+                       [({'max_depth': np.int64(3)}, -1.5)])
+        history.append('DecisionTree', {**signature, 'n_rows': 1000},
+                       [({'max_depth': 4}, -1.0)])
+        history.append('LGBM', signature, [({'num_leaves': 8}, -0.5)])
+        trials = history.trials('DecisionTree', signature)
+        self.assertEqual(len(trials), 1)
+        self.assertEqual(trials[0]['params'], {'max_depth': 3})
+        self.assertEqual(len(history.trials()), 3)
+        other = data_signature(self.x.rename(columns={'f0': 'g0'}))
+        self.assertEqual(history.trials('DecisionTree', other), [])
+        # Arrays are described by the given feature columns
+        self.assertEqual(data_signature(self.x.to_numpy(),
+                                        list(self.x.columns)), signature)
+        self.assertNotEqual(data_signature(self.x.to_numpy()), signature)
+
+    def test_trial_history_bounded(self):
+        """Test that repeated trials are skipped and the history keeps
+        the most recent trials."""
+        history = TrialHistory(self.history_file, max_trials=5)
+        signature = data_signature(self.x)
+        trials = [({'max_depth': np.int64(depth)}, -float(depth))
+                  for depth in range(4)]
+        history.append('DecisionTree', signature, trials)
+        history.append('DecisionTree', signature, trials)
+        self.assertEqual(len(history.trials()), 4)
+        # A new score of the same parameters is a new trial
+        history.append('DecisionTree', signature,
+                       [({'max_depth': 0}, -0.5), ({'max_depth': 9}, -9.0)])
+        depths = [trial['params']['max_depth'] for trial in history.trials()]
+        self.assertEqual(depths, [1, 2, 3, 0, 9])
+
+    def test_search(self):
+        """Test that the search evaluates n_iter candidates in range."""
+        search = BayesianSearchCV(DecisionTreeRegressor(random_state=0),
+                                  self.space, n_iter=12, n_initial=4,
+                                  batch_size=4).fit(self.x, self.y)
+        params = search.cv_results_['params']
+        self.assertEqual(len(params), 12)
+        self.assertEqual(len({str(candidate) for candidate in params}), 12)
+        for candidate in params:
+            self.assertTrue(2 <= candidate['max_depth'] <= 12)
+            self.assertTrue(1 <= candidate['min_samples_leaf'] <= 20)
+            self.assertIn(candidate['splitter'], ['best', 'random'])
+        self.assertEqual(search.best_score_,
+                         np.max(search.cv_results_['mean_test_score']))
+        self.assertTrue(search.coverage_['complete'])
+        search.best_estimator_.predict(self.x)
+
+    def test_warm_start(self):
+        """Test that a second search starts from the best earlier trial
+        and that trials are appended to the history."""
+        history = TrialHistory(self.history_file)
+        first = BayesianSearchCV(DecisionTreeRegressor(random_state=0),
+                                 self.space, n_iter=8, n_initial=4,
+                                 batch_size=4, history=history,
+                                 history_name='DecisionTree').fit(self.x,
+                                                                  self.y)
+        self.assertEqual(len(history.trials('DecisionTree')), 8)
+        second = BayesianSearchCV(DecisionTreeRegressor(random_state=0),
+                                  self.space, n_iter=4, n_initial=4,
+                                  batch_size=4, history=history,
+                                  history_name='DecisionTree',
+                                  random_state=1).fit(self.x, self.y)
+        self.assertEqual(second.cv_results_['params'][0], first.best_params_)
+        self.assertGreaterEqual(second.best_score_, first.best_score_)
+        # The second search re-evaluated the best earlier trials, with
+        # the same scores, so they are not appended again
+        self.assertEqual(len(history.trials('DecisionTree')), 8)
+
+    def test_unfit_history_skipped(self):
+        """Test that earlier parameters outside the space are skipped."""
+        history = TrialHistory(self.history_file)
+        history.append('DecisionTree', data_signature(self.x), [
+            ({'max_depth': None, 'min_samples_leaf': 1,
+              'splitter': 'best'}, 0.0)])
+        search = BayesianSearchCV(DecisionTreeRegressor(random_state=0),
+                                  self.space, n_iter=6, n_initial=2,
+                                  batch_size=2, history=history,
+                                  history_name='DecisionTree')
+        search.fit(self.x, self.y)
+        self.assertEqual(len(search.cv_results_['params']), 6)
+
+    def test_binned_search(self):
+        """Test that boosted models are searched on binned datasets."""
+        search = BinnedBayesianSearchCV(
+            LGBMRegressor(verbose=-1),
+            {'num_leaves': Integer(4, 32, log=True),
+             'learning_rate': Real(0.01, 0.3, log=True),
+             'n_estimators': Integer(10, 50)},
+            n_iter=6, n_initial=3, batch_size=3).fit(self.x, self.y)
+        self.assertEqual(len(search.cv_results_['params']), 6)
+        self.assertGreater(search.dataset_build_time_, 0)
+        self.assertIsInstance(search.best_estimator_, LGBMRegressor)
+
+    def test_tuning_with_bayes(self):
+        """Test the model-based search through hyperparameter_tuning."""
+        models = [('DecisionTree', DecisionTreeRegressor(random_state=0))]
+        best_models, best_params = hyperparameter_tuning(
+            models, [self.space], self.x, self.y, search='bayes', n_iter=6,
+            trial_history=self.history_file)
+        self.assertIsNotNone(best_models['DecisionTree'])
+        self.assertEqual(set(best_params['DecisionTree']), set(self.space))
+        self.assertEqual(len(TrialHistory(self.history_file).trials()), 6)
+        with self.assertRaises(ValueError):
+            hyperparameter_tuning(models, [self.space], self.x, self.y,
+                                  search='random')
+
+
+if __name__ == '__main__':
+    unittest.main()
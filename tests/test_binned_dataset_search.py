@@ -0,0 +1,149 @@
+"""
+Unit tests for binned_dataset_search module.
+
+This module contains tests to ensure that BinnedDatasetSearchCV
+gives the same results as GridSearchCV for LightGBM and XGBoost,
+reuses datasets across candidates and caches them on disk.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from lightgbm import LGBMRegressor
+from lightgbm import train as lgb_train
+from sklearn.datasets import make_regression
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.exceptions import FitFailedWarning
+from sklearn.model_selection import GridSearchCV
+from xgboost import XGBRegressor
+from modules.binned_dataset_search import (
+    BinnedDatasetSearchCV, supports_binned_search
+)
+
+
+class TestBinnedDatasetSearchCV(unittest.TestCase):
+    """
+    Test case for the BinnedDatasetSearchCV class.
+
+    This class contains various test methods to ensure
+    that the search matches GridSearchCV and that binned
+    datasets are shared and cached.
+    """
+
+    def setUp(self):
+        """Set up test data and temporary directory."""
+        self.x, self.y = make_regression(
+            n_samples=300, n_features=6, noise=0.1, random_state=42)[:2]
+        self.x[:, 2] = np.arange(300) % 4
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def assert_matches_grid_search(self, model, grid, **fit_params):
+        """Compare the search against GridSearchCV."""
+        reference = GridSearchCV(model, grid, cv=3,
+                                 scoring='neg_mean_squared_error')
+        reference.fit(self.x, self.y, **fit_params)
+        search = BinnedDatasetSearchCV(model, grid, cv=3)
+        search.fit(self.x, self.y, **fit_params)
+        np.testing.assert_allclose(search.cv_results_['mean_test_score'],
+                                   reference.cv_results_['mean_test_score'],
+                                   rtol=1e-6)
+        self.assertEqual(search.best_params_, reference.best_params_)
+        self.assertIsInstance(search.best_estimator_, type(model))
+        return search
+
+    def test_lgbm_matches_grid_search(self):
+        """Test LightGBM with a categorical feature."""
+        self.assert_matches_grid_search(
+            LGBMRegressor(verbose=-1),
+            {'num_leaves': [7, 15], 'n_estimators': [20, 40]},
+            categorical_feature=[2])
+
+    def test_xgb_matches_grid_search(self):
+        """Test XGBoost."""
+        self.assert_matches_grid_search(
+            XGBRegressor(), {'max_depth': [2, 4], 'n_estimators': [20, 40]})
+
+    def test_datasets_shared_across_batches(self):
+        """Test that batches of candidates reuse the fold's datasets."""
+        grid = {'max_depth': [2, 3, 4], 'n_estimators': [10, 20],
+                'max_bin': [63, 255]}
+        search = BinnedDatasetSearchCV(XGBRegressor(), grid, cv=3,
+                                       time_budget=1e6, batch_size=2)
+        with patch.object(BinnedDatasetSearchCV, '_xgb_dataset',
+                          wraps=BinnedDatasetSearchCV._xgb_dataset) as build:
+            search.fit(self.x, self.y)
+        # One dataset per fold and max_bin value for the six batches
+        self.assertEqual(build.call_count, 6)
+        self.assertEqual(search.coverage_['n_evaluated'], 12)
+        self.assertEqual(search._fold_datasets, [])
+
+    def test_n_jobs_sets_native_threads(self):
+        """Test that n_jobs is the thread count of every candidate."""
+        search = BinnedDatasetSearchCV(LGBMRegressor(verbose=-1),
+                                       {'n_estimators': [10]}, cv=3,
+                                       n_jobs=2)
+        with patch('lightgbm.train', wraps=lgb_train) as train:
+            search.fit(self.x, self.y)
+        self.assertEqual({call.args[0]['n_jobs']
+                          for call in train.call_args_list}, {2})
+
+    def test_dataset_cache(self):
+        """Test that LightGBM datasets are saved and reused from disk."""
+        grid = {'num_leaves': [7, 15], 'max_bin': [63, 255]}
+        first = BinnedDatasetSearchCV(LGBMRegressor(verbose=-1), grid, cv=3,
+                                      cache_dir=self.temp_dir)
+        first.fit(self.x, self.y)
+        # One dataset per fold and max_bin value
+        self.assertEqual(len(os.listdir(self.temp_dir)), 6)
+
+        second = BinnedDatasetSearchCV(LGBMRegressor(verbose=-1), grid, cv=3,
+                                       cache_dir=self.temp_dir)
+        second.fit(self.x, self.y)
+        self.assertEqual(len(os.listdir(self.temp_dir)), 6)
+        np.testing.assert_allclose(second.cv_results_['mean_test_score'],
+                                   first.cv_results_['mean_test_score'])
+
+    def test_dataset_cache_bounded(self):
+        """Test that the least recently used datasets are evicted."""
+        grid = {'num_leaves': [7], 'max_bin': [63]}
+        stale = os.path.join(self.temp_dir, 'lgbm_stale.bin')
+        with open(stale, 'wb') as file:
+            file.write(b'')
+        os.utime(stale, (0, 0))
+        search = BinnedDatasetSearchCV(LGBMRegressor(verbose=-1), grid, cv=3,
+                                       cache_dir=self.temp_dir,
+                                       max_cached_datasets=3)
+        search.fit(self.x, self.y)
+        # One dataset per fold, the stale one was evicted
+        self.assertEqual(len(os.listdir(self.temp_dir)), 3)
+        self.assertFalse(os.path.exists(stale))
+        with self.assertRaises(ValueError):
+            BinnedDatasetSearchCV(LGBMRegressor(), grid,
+                                  max_cached_datasets=0)
+
+    def test_supports_binned_search(self):
+        """Test which estimators are supported."""
+        self.assertTrue(supports_binned_search(LGBMRegressor()))
+        self.assertTrue(supports_binned_search(XGBRegressor()))
+        self.assertFalse(supports_binned_search(RandomForestRegressor()))
+
+    def test_failing_candidate(self):
+        """Test that a candidate LightGBM rejects is scored NaN."""
+        search = BinnedDatasetSearchCV(
+            LGBMRegressor(n_estimators=10, verbose=-1),
+            {'num_leaves': [1, 7]})
+        with self.assertWarns(FitFailedWarning):
+            search.fit(self.x, self.y)
+        self.assertTrue(np.isnan(search.cv_results_['mean_test_score'][0]))
+        self.assertEqual(search.best_params_, {'num_leaves': 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
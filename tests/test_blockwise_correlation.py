@@ -0,0 +1,113 @@
+"""
+Unit tests for blockwise_correlation module.
+
+This module contains tests to ensure the correct functionality
+of the blockwise float32 correlation matrix, its storage and
+the reduction of features to a drawable selection.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from modules.blockwise_correlation import (
+    blockwise_correlation, cluster_representatives, correlation_fingerprint,
+    load_correlation, save_correlation, top_k_by_target
+)
+
+
+class TestBlockwiseCorrelation(unittest.TestCase):
+    """
+    Test case for the blockwise_correlation module.
+
+    This class contains various test methods to ensure
+    the blockwise matrix matches pandas and the feature
+    selections pick the expected columns.
+    """
+
+    def setUp(self):
+        """Set up data with three groups of correlated columns."""
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        base = rng.normal(size=(400, 3))
+        columns = {}
+        for group in range(3):
+            for member in range(4):
+                columns[f"g{group}_{member}"] = (
+                    base[:, group] + 0.3 * rng.normal(size=400))
+        self.data = pd.DataFrame(columns)
+        self.data['SalePrice'] = base[:, 1] + 0.1 * rng.normal(size=400)
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_matches_pandas(self):
+        """Test that every block size gives the pandas correlations."""
+        expected = self.data.corr().to_numpy()
+        for block_size in (1, 5, 512):
+            corr = blockwise_correlation(self.data, block_size)
+            self.assertEqual(corr.dtype, np.float32)
+            np.testing.assert_allclose(corr, expected, atol=1e-5)
+
+    def test_constant_and_missing_values(self):
+        """Test NaN rows for constant columns and ignored missing values."""
+        data = self.data.iloc[:, :3].copy()
+        data['constant'] = 1.0
+        corr = blockwise_correlation(data)
+        self.assertTrue(np.isnan(corr[3]).all())
+        self.assertTrue(np.isnan(corr[:, 3]).all())
+        self.assertEqual(corr[0, 0], 1)
+
+        data.iloc[0, 0] = np.nan
+        corr = blockwise_correlation(data)
+        self.assertFalse(np.isnan(corr[:3, :3]).any())
+        with self.assertRaises(ValueError):
+            blockwise_correlation(np.empty((0, 3)))
+
+    def test_save_and_load(self):
+        """Test saving directly to a file and loading memory-mapped."""
+        path = os.path.join(self.temp_dir, 'corr.npy')
+        corr = blockwise_correlation(self.data, output_file=path)
+        save_correlation(corr, self.data.columns, path)
+        loaded, columns = load_correlation(path)
+        self.assertIsInstance(loaded, np.memmap)
+        self.assertEqual(columns, self.data.columns.tolist())
+        np.testing.assert_array_equal(loaded, corr)
+
+        other = os.path.join(self.temp_dir, 'copy.npy')
+        save_correlation(np.asarray(corr), columns, other)
+        np.testing.assert_array_equal(np.load(other), corr)
+
+        self.assertIsNone(correlation_fingerprint(path))
+        save_correlation(corr, columns, path, fingerprint='abc')
+        self.assertEqual(correlation_fingerprint(path), 'abc')
+        save_correlation(corr, columns, path)
+        self.assertIsNone(correlation_fingerprint(path))
+
+    def test_top_k_by_target(self):
+        """Test that the target group is selected, target first."""
+        corr = blockwise_correlation(self.data)
+        columns = self.data.columns.tolist()
+        selected = [columns[index] for index in
+                    top_k_by_target(corr, columns, 'SalePrice', 5)]
+        self.assertEqual(selected[0], 'SalePrice')
+        self.assertTrue(all(name.startswith('g1_')
+                            for name in selected[1:]))
+        with self.assertRaises(ValueError):
+            top_k_by_target(corr, columns, 'missing')
+
+    def test_cluster_representatives(self):
+        """Test that one feature of each correlated group is selected."""
+        corr = blockwise_correlation(self.data.drop(columns='SalePrice'))
+        selected = cluster_representatives(corr, 3)
+        groups = sorted(self.data.columns[index][:2] for index in selected)
+        self.assertEqual(groups, ['g0', 'g1', 'g2'])
+        self.assertEqual(cluster_representatives(corr, 20),
+                         list(range(12)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for bootstrap_metrics module.
+
+This module contains tests to ensure that the vectorized bootstrap
+matches a per-replicate computation, stays within its memory budget
+and produces sensible intervals for metrics and differences.
+"""
+
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+import numpy as np
+from sklearn.metrics import mean_squared_error, r2_score
+from modules.bootstrap_metrics import (
+    bootstrap_confidence_intervals, bootstrap_pairwise_differences,
+    bootstrap_replicates, iter_bootstrap_indices, save_bootstrap_intervals
+)
+
+
+class TestBootstrapMetrics(unittest.TestCase):
+    """
+    Test case for the bootstrap_metrics module.
+
+    This class contains various test methods to ensure
+    the correct functionality of the bootstrap engine and
+    of the interval tables.
+    """
+
+    def setUp(self):
+        """Set up true values and the predictions of two models."""
+        rng = np.random.default_rng(0)
+        self.y_true = rng.normal(size=500)
+        self.predictions = {
+            'good': self.y_true + rng.normal(scale=0.2, size=500),
+            'bad': self.y_true + rng.normal(scale=0.5, size=500),
+        }
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_matches_per_replicate_metrics(self):
+        """Test the replicates against scikit-learn metrics."""
+        replicates = bootstrap_replicates(self.y_true, self.predictions,
+                                          n_replicates=20,
+                                          max_block_bytes=1)
+        indices = np.concatenate(list(iter_bootstrap_indices(
+            500, 20, max_block_bytes=1)))
+        for replicate in (0, 7, 19):
+            rows = indices[replicate]
+            y_pred = self.predictions['bad'][rows]
+            self.assertAlmostEqual(
+                replicates['MSE'][1, replicate],
+                mean_squared_error(self.y_true[rows], y_pred))
+            self.assertAlmostEqual(
+                replicates['R2-Score'][1, replicate],
+                r2_score(self.y_true[rows], y_pred))
+
+    def test_block_size_independent(self):
+        """Test that the block size does not change the replicates."""
+        small = bootstrap_replicates(self.y_true, self.predictions, 50,
+                                     max_block_bytes=10_000)
+        large = bootstrap_replicates(self.y_true, self.predictions, 50)
+        np.testing.assert_allclose(small['MSE'], large['MSE'])
+
+    def test_blocks_within_budget(self):
+        """Test that index blocks respect the memory budget."""
+        blocks = list(iter_bootstrap_indices(1000, 100,
+                                             max_block_bytes=120_000))
+        self.assertEqual(sum(len(block) for block in blocks), 100)
+        # 4 bytes of index and two float64 values per row and replicate
+        self.assertTrue(all(len(block) <= 6 for block in blocks))
+
+    def test_replicates_within_budget(self):
+        """Test that the replicates stay within the memory budget."""
+        rng = np.random.default_rng(0)
+        y_true = rng.normal(size=20_000)
+        predictions = {name: y_true + rng.normal(size=20_000)
+                       for name in ('a', 'b', 'c')}
+        tracemalloc.start()
+        try:
+            bootstrap_replicates(y_true, predictions, 200,
+                                 max_block_bytes=4_000_000)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # The centered targets and errors of the inputs are under 1 MB
+        self.assertLess(peak, 5_500_000)
+
+    def test_confidence_intervals(self):
+        """Test that intervals contain the estimates."""
+        intervals = bootstrap_confidence_intervals(
+            self.y_true, self.predictions, n_replicates=500)
+        self.assertEqual(len(intervals), 4)
+        self.assertTrue((intervals['Lower'] <= intervals['Estimate']).all())
+        self.assertTrue((intervals['Estimate'] <= intervals['Upper']).all())
+
+    def test_pairwise_differences(self):
+        """Test that a clearly better model is significantly better."""
+        differences = bootstrap_pairwise_differences(
+            self.y_true, self.predictions, n_replicates=500)
+        mse = differences[differences['Metric'] == 'MSE'].iloc[0]
+        self.assertEqual((mse['Model A'], mse['Model B']), ('good', 'bad'))
+        self.assertLess(mse['Upper'], 0)
+        self.assertTrue(mse['Significant'])
+
+    def test_mismatched_predictions(self):
+        """Test that predictions of another length raise a ValueError."""
+        with self.assertRaises(ValueError):
+            bootstrap_replicates(self.y_true, {'short': self.y_true[:10]})
+
+    def test_save_bootstrap_intervals(self):
+        """Test that both tables are saved."""
+        save_bootstrap_intervals(self.y_true, self.predictions,
+                                 self.temp_dir, n_replicates=100)
+        for name in ['bootstrap_metrics.csv', 'bootstrap_differences.csv']:
+            self.assertTrue(os.path.isfile(os.path.join(self.temp_dir,
+                                                        name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
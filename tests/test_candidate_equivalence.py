@@ -0,0 +1,137 @@
+"""
+Unit tests for candidate_equivalence module.
+
+This module contains tests to ensure that equivalent tree
+candidates are detected, that a search fits them once and
+that their reused results equal the ones of a full search.
+"""
+
+import unittest
+from unittest import mock
+import numpy as np
+from sklearn.datasets import make_regression
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+from lightgbm import LGBMRegressor
+from modules import candidate_search
+from modules.candidate_equivalence import (
+    equivalence_key, plan_rounds, realized_depth, supports_deduplication
+)
+from modules.candidate_search import CandidateSearchCV
+
+
+class TestCandidateEquivalence(unittest.TestCase):
+    """
+    Test case for the candidate_equivalence module.
+
+    This class contains various test methods to ensure
+    the equivalence keys, the realized depths and
+    deduplicating searches behave as expected.
+    """
+
+    def setUp(self):
+        """Set up test data and a tree grid."""
+        self.x, self.y = make_regression(
+            n_samples=120, n_features=4, noise=10, random_state=42)[:2]
+        self.grid = {'max_depth': [2, 20, 30, None],
+                     'min_samples_split': [2, 5, 10],
+                     'min_samples_leaf': [1, 4]}
+
+    def test_supports_deduplication(self):
+        """Test that only trees and forests of trees are supported."""
+        self.assertTrue(supports_deduplication(DecisionTreeRegressor()))
+        self.assertTrue(supports_deduplication(RandomForestRegressor()))
+        self.assertTrue(supports_deduplication(Pipeline(
+            [('scale', StandardScaler()),
+             ('tree', DecisionTreeRegressor())])))
+        self.assertFalse(supports_deduplication(LinearRegression()))
+        self.assertFalse(supports_deduplication(LGBMRegressor()))
+
+    def test_equivalence_key(self):
+        """Test that min_samples_split below twice min_samples_leaf is
+        ignored and max_depth is split off."""
+        tree = DecisionTreeRegressor()
+        key, depth = equivalence_key(tree, {'min_samples_split': 2,
+                                            'min_samples_leaf': 4,
+                                            'max_depth': None})
+        self.assertEqual(depth, np.inf)
+        self.assertEqual(equivalence_key(tree, {'min_samples_split': 5,
+                                                'min_samples_leaf': 4,
+                                                'max_depth': 20}),
+                         (key, 20.0))
+        self.assertNotEqual(equivalence_key(tree, {'min_samples_split': 10,
+                                                   'min_samples_leaf': 4})[0],
+                            key)
+        # Fractions of the samples are not compared
+        self.assertNotEqual(
+            equivalence_key(tree, {'min_samples_split': 0.1})[0],
+            equivalence_key(tree, {'min_samples_split': 0.2})[0])
+        pipeline = Pipeline([('tree', tree)])
+        self.assertEqual(
+            equivalence_key(pipeline, {'tree__min_samples_split': 2,
+                                       'tree__min_samples_leaf': 4}),
+            equivalence_key(pipeline, {'tree__min_samples_split': 8,
+                                       'tree__min_samples_leaf': 4,
+                                       'tree__max_depth': None}))
+
+    def test_realized_depth(self):
+        """Test the depth of fitted trees, forests and other models."""
+        tree = DecisionTreeRegressor(max_depth=3).fit(self.x, self.y)
+        self.assertEqual(realized_depth(tree), 3)
+        forest = RandomForestRegressor(n_estimators=5, max_depth=4,
+                                       random_state=0).fit(self.x, self.y)
+        self.assertEqual(realized_depth(forest), 4)
+        self.assertIsNone(realized_depth(LinearRegression().fit(self.x,
+                                                                self.y)))
+
+    def test_plan_rounds(self):
+        """Test that groups are ordered by decreasing depth."""
+        groups = plan_rounds([('a', 2.0), ('a', np.inf), ('b', 3.0),
+                              ('a', 2.0)])
+        self.assertEqual(groups['a'], [(np.inf, [1]), (2.0, [0, 3])])
+        self.assertEqual(groups['b'], [(3.0, [2])])
+
+    def test_deduplicated_search(self):
+        """Test that a deduplicating search fits fewer candidates and
+        finds the same results."""
+        model = DecisionTreeRegressor(random_state=0)
+        reference = CandidateSearchCV(model, self.grid).fit(self.x, self.y)
+        with mock.patch.object(candidate_search, '_fit_and_score',
+                               wraps=candidate_search._fit_and_score) as fit:
+            search = CandidateSearchCV(model, self.grid,
+                                       deduplicate=True).fit(self.x, self.y)
+        n_fits = len(search.cv_results_['params']) * 3
+        self.assertEqual(fit.call_count, n_fits - search.n_reused_fits_)
+        # max_depth 20, 30 and None grow the same trees on 80 rows, and
+        # min_samples_split 2 and 5 are the same with min_samples_leaf 4
+        self.assertGreaterEqual(search.n_reused_fits_, n_fits // 2)
+        for fold in range(3):
+            name = f'split{fold}_test_score'
+            np.testing.assert_allclose(search.cv_results_[name],
+                                       reference.cv_results_[name])
+        self.assertEqual(reference.n_reused_fits_, 0)
+        # Only the fits that ran count towards the cost of the search
+        self.assertEqual(search.cv_results_['n_reused_folds'].sum(),
+                         search.n_reused_fits_)
+        reused = search.cv_results_['mean_fit_time'] == 0
+        self.assertTrue(reused.any())
+        self.assertTrue(np.isnan(search.cv_results_['max_peak_memory'][
+            reused]).all())
+
+    def test_forest_search(self):
+        """Test deduplication of a random forest with a fixed seed."""
+        model = RandomForestRegressor(n_estimators=5, random_state=0)
+        grid = {'max_depth': [20, None], 'min_samples_leaf': [1, 4]}
+        reference = CandidateSearchCV(model, grid).fit(self.x, self.y)
+        search = CandidateSearchCV(model, grid, deduplicate=True).fit(
+            self.x, self.y)
+        self.assertEqual(search.n_reused_fits_, 6)
+        np.testing.assert_allclose(search.cv_results_['mean_test_score'],
+                                   reference.cv_results_['mean_test_score'])
+
+
+if __name__ == '__main__':
+    unittest.main()
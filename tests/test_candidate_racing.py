@@ -0,0 +1,171 @@
+"""
+Unit tests for candidate_racing module.
+
+This module contains tests to ensure that racing eliminates
+candidates and models that are statistically worse than the
+leader, keeps close ones and finds the same best candidate.
+"""
+
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMRegressor
+from sklearn.datasets import make_regression
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import KFold
+from sklearn.tree import DecisionTreeRegressor
+from modules.binned_dataset_search import BinnedDatasetSearchCV
+from modules.candidate_racing import (
+    REFERENCE, CandidateRace, paired_z_statistic
+)
+from modules.candidate_search import CandidateSearchCV
+from modules.hyperparameter_tuning import hyperparameter_tuning
+
+
+class TestCandidateRacing(unittest.TestCase):
+    """
+    Test case for the candidate_racing module.
+
+    This class contains various test methods to ensure
+    the paired statistic, the eliminations of a race and
+    racing searches behave as expected.
+    """
+
+    def setUp(self):
+        """Set up test data and folds."""
+        self.rng = np.random.default_rng(0)
+        self.x, self.y = make_regression(
+            n_samples=300, n_features=5, noise=10, random_state=42)[:2]
+        self.folds = list(KFold(n_splits=3).split(self.x))
+        self.grid = {'max_depth': [1, 4, 8], 'min_samples_leaf': [1, 5]}
+
+    def test_paired_z_statistic(self):
+        """Test the sign and scale of the paired statistic."""
+        errors = self.rng.exponential(size=200)
+        self.assertEqual(paired_z_statistic([errors], [errors]), 0.0)
+        self.assertGreater(paired_z_statistic([errors + 1], [errors]), 1e6)
+        noise = self.rng.normal(size=200)
+        self.assertGreater(paired_z_statistic([errors + 2 + noise],
+                                              [errors]), 10)
+        self.assertLess(paired_z_statistic([errors + noise / 100],
+                                           [errors]), 3)
+
+    def test_race_eliminates_worse_candidates(self):
+        """Test that a clearly worse candidate is eliminated after one
+        fold and a close one is kept."""
+        race = CandidateRace(self.folds, alpha=0.01)
+        size = len(self.folds[0][1])
+        errors = self.rng.exponential(size=size)
+        race.add(0, 0, errors)
+        race.add(1, 0, errors * 3)
+        race.add(2, 0, errors + self.rng.normal(scale=0.01, size=size))
+        race.add(3, 0, None)
+        self.assertIn(race.leader(1), [0, 2])
+        self.assertEqual(race.eliminate(1), [1])
+        self.assertFalse(race.is_alive(1))
+        self.assertTrue(race.is_alive(2))
+        self.assertTrue(race.is_alive(3))
+        self.assertIsNone(race.out_of_fold_errors(0, len(self.y)))
+
+    def test_reference_leads(self):
+        """Test that a better reference eliminates every candidate."""
+        reference = np.zeros(len(self.y))
+        race = CandidateRace(self.folds, reference=reference)
+        size = len(self.folds[0][1])
+        race.add(0, 0, self.rng.exponential(size=size))
+        race.add(1, 0, self.rng.exponential(size=size))
+        self.assertEqual(race.leader(1), REFERENCE)
+        self.assertEqual(race.eliminate(1), [0, 1])
+
+    def test_out_of_fold_errors(self):
+        """Test that the errors of all folds are put in row order."""
+        race = CandidateRace(self.folds)
+        for fold, (_, test_index) in enumerate(self.folds):
+            race.add(0, fold, test_index.astype(float))
+        errors = race.out_of_fold_errors(0, len(self.y))
+        np.testing.assert_array_equal(errors, np.arange(len(self.y)))
+
+    def test_invalid_alpha(self):
+        """Test that the significance level must be a probability."""
+        with self.assertRaises(ValueError):
+            CandidateRace(self.folds, alpha=0)
+
+    def test_racing_search(self):
+        """Test that racing skips folds of losing candidates and finds
+        the same best candidate."""
+        model = DecisionTreeRegressor(random_state=0)
+        reference = CandidateSearchCV(model, self.grid).fit(self.x, self.y)
+        search = CandidateSearchCV(model, self.grid, racing=True).fit(
+            self.x, self.y)
+        results = search.cv_results_
+        self.assertEqual(search.best_params_, reference.best_params_)
+        self.assertAlmostEqual(search.best_score_, reference.best_score_)
+        self.assertFalse(search.eliminated_)
+        shallow = results['param_max_depth'] == 1
+        self.assertTrue(np.all(results['n_folds_evaluated'][shallow] < 3))
+        self.assertTrue(np.all(np.isnan(results['split2_test_score'][
+            shallow])))
+        self.assertEqual(results['rank_test_score'][search.best_index_], 1)
+        self.assertEqual(search.oof_squared_errors_.shape, (len(self.y),))
+
+    def test_racing_binned_search(self):
+        """Test that the binned search races on the same statistic."""
+        model = LGBMRegressor(n_estimators=20, verbose=-1)
+        search = BinnedDatasetSearchCV(
+            model, {'num_leaves': [2, 15], 'learning_rate': [0.001, 0.1]},
+            racing=True).fit(pd.DataFrame(self.x), self.y)
+        self.assertEqual(search.best_params_['learning_rate'], 0.1)
+        self.assertLess(search.cv_results_['n_folds_evaluated'].min(), 3)
+
+    def test_search_dropped_by_reference(self):
+        """Test that a search whose candidates are all worse than the
+        reference is dropped after one fold and still refits."""
+        search = CandidateSearchCV(
+            DecisionTreeRegressor(random_state=0), self.grid, racing=True,
+            race_reference=np.zeros(len(self.y))).fit(self.x, self.y)
+        self.assertTrue(search.eliminated_)
+        np.testing.assert_array_equal(
+            search.cv_results_['n_folds_evaluated'], 1)
+        search.best_estimator_.predict(self.x)
+
+    def test_tuning_drops_models(self):
+        """Test that a model worse than an earlier one is dropped."""
+        models = [('LinearRegression', LinearRegression()),
+                  ('DecisionTree', DecisionTreeRegressor(random_state=0))]
+        best_models, _, cv_results = hyperparameter_tuning(
+            models, [{}, self.grid], self.x, self.y,
+            return_cv_results=True, racing=True)
+        self.assertIsNotNone(best_models['DecisionTree'])
+        np.testing.assert_array_equal(
+            cv_results['DecisionTree']['n_folds_evaluated'], 1)
+
+    def test_racing_with_checkpoint(self):
+        """Test that a raced search is not reused as a full search and
+        that a model restored from the checkpoint still races."""
+        checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, checkpoint_dir)
+        models = [('DecisionTree', DecisionTreeRegressor(random_state=0))]
+        hyperparameter_tuning(models, [self.grid], self.x, self.y,
+                              checkpoint_dir=checkpoint_dir, racing=True)
+        _, _, cv_results = hyperparameter_tuning(
+            models, [self.grid], self.x, self.y, return_cv_results=True,
+            checkpoint_dir=checkpoint_dir)
+        self.assertFalse(np.isnan(
+            cv_results['DecisionTree']['split2_test_score']).any())
+
+        checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, checkpoint_dir)
+        models = [('LinearRegression', LinearRegression())] + models
+        hyperparameter_tuning(models[:1], [{}], self.x, self.y,
+                              checkpoint_dir=checkpoint_dir)
+        _, _, cv_results = hyperparameter_tuning(
+            models, [{}, self.grid], self.x, self.y, return_cv_results=True,
+            checkpoint_dir=checkpoint_dir, racing=True)
+        np.testing.assert_array_equal(
+            cv_results['DecisionTree']['n_folds_evaluated'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Unit tests for candidate_search module.
+
+This module contains tests to ensure that CandidateSearchCV
+selects the same candidates and scores as GridSearchCV,
+exposes the same results interface and stops within a time
+budget.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_regression
+from sklearn.exceptions import FitFailedWarning
+from sklearn.model_selection import GridSearchCV
+from sklearn.tree import DecisionTreeRegressor
+from modules.candidate_search import (
+    CandidateSearchCV, prioritize_candidates
+)
+
+
+class TestCandidateSearchCV(unittest.TestCase):
+    """
+    Test case for the CandidateSearchCV class.
+
+    This class contains various test methods to ensure
+    that the search matches GridSearchCV and handles
+    DataFrame input and fit parameters.
+    """
+
+    def setUp(self):
+        """Set up test data."""
+        self.x, self.y = make_regression(
+            n_samples=150, n_features=5, noise=0.1, random_state=42)[:2]
+        self.grid = {'max_depth': [2, 4, None], 'min_samples_leaf': [1, 5]}
+
+    def test_matches_grid_search(self):
+        """Test that scores and best parameters match GridSearchCV."""
+        model = DecisionTreeRegressor(random_state=0)
+        reference = GridSearchCV(model, self.grid, cv=3,
+                                 scoring='neg_mean_squared_error')
+        reference.fit(self.x, self.y)
+        search = CandidateSearchCV(model, self.grid, cv=3).fit(self.x,
+                                                               self.y)
+        np.testing.assert_allclose(search.cv_results_['mean_test_score'],
+                                   reference.cv_results_['mean_test_score'])
+        self.assertEqual(search.best_params_, reference.best_params_)
+        self.assertIsInstance(search.best_estimator_, DecisionTreeRegressor)
+        self.assertEqual(search.best_estimator_.max_depth,
+                         reference.best_params_['max_depth'])
+
+    def test_results_layout(self):
+        """Test the keys and shapes of cv_results_."""
+        search = CandidateSearchCV(DecisionTreeRegressor(random_state=0),
+                                   self.grid, cv=3).fit(self.x, self.y)
+        results = search.cv_results_
+        for key in ['mean_fit_time', 'mean_score_time', 'max_peak_memory',
+                    'split0_test_score', 'split2_test_score',
+                    'rank_test_score', 'param_max_depth']:
+            self.assertEqual(len(results[key]), 6)
+        self.assertEqual(results['rank_test_score'][search.best_index_], 1)
+        self.assertTrue(np.all(results['max_peak_memory'] >= 0))
+
+    def test_dataframe_input(self):
+        """Test that DataFrame and Series input is supported."""
+        search = CandidateSearchCV(DecisionTreeRegressor(random_state=0),
+                                   {'max_depth': [2, 3]}, cv=3)
+        search.fit(pd.DataFrame(self.x), pd.Series(self.y))
+        self.assertIn(search.best_params_['max_depth'], [2, 3])
+
+    def test_empty_grid(self):
+        """Test that an empty grid evaluates the default estimator."""
+        search = CandidateSearchCV(DecisionTreeRegressor(random_state=0),
+                                   {}, cv=3).fit(self.x, self.y)
+        self.assertEqual(search.best_params_, {})
+
+    def test_prioritize_candidates(self):
+        """Test that the order starts central and spreads out."""
+        candidates = [{'max_depth': depth, 'min_samples_leaf': leaf}
+                      for depth in [1, 2, 3, 4, 5] for leaf in [1, 2, 3]]
+        order = prioritize_candidates(candidates)
+        self.assertEqual(sorted(order, key=candidates.index), candidates)
+        self.assertEqual(order[0], {'max_depth': 3, 'min_samples_leaf': 2})
+        self.assertEqual({params['max_depth'] for params in order[1:5]},
+                         {1, 5})
+        self.assertEqual(prioritize_candidates([{}]), [{}])
+
+    def test_coverage_without_budget(self):
+        """Test that every candidate is evaluated without a budget."""
+        search = CandidateSearchCV(DecisionTreeRegressor(random_state=0),
+                                   self.grid, cv=3).fit(self.x, self.y)
+        self.assertEqual(search.coverage_['n_evaluated'], 6)
+        self.assertEqual(search.coverage_['coverage'], 1.0)
+        self.assertTrue(search.coverage_['complete'])
+        self.assertEqual(search.cv_results_['params'][0],
+                         {'max_depth': 2, 'min_samples_leaf': 1})
+
+    def test_time_budget_spent(self):
+        """Test that a spent budget stops after the first batch."""
+        search = CandidateSearchCV(DecisionTreeRegressor(random_state=0),
+                                   self.grid, cv=3, time_budget=0,
+                                   batch_size=2).fit(self.x, self.y)
+        self.assertEqual(search.coverage_['n_evaluated'], 2)
+        self.assertAlmostEqual(search.coverage_['coverage'], 2 / 6)
+        self.assertFalse(search.coverage_['complete'])
+        self.assertEqual(len(search.cv_results_['params']), 2)
+        self.assertIn(search.best_params_, search.cv_results_['params'])
+        self.assertIsInstance(search.best_estimator_, DecisionTreeRegressor)
+        search.best_estimator_.predict(self.x)
+
+    def test_time_budget_large(self):
+        """Test that a large budget covers the grid with the same best."""
+        model = DecisionTreeRegressor(random_state=0)
+        reference = CandidateSearchCV(model, self.grid, cv=3).fit(self.x,
+                                                                  self.y)
+        search = CandidateSearchCV(model, self.grid, cv=3, time_budget=1e6,
+                                   batch_size=2).fit(self.x, self.y)
+        self.assertTrue(search.coverage_['complete'])
+        self.assertEqual(search.best_params_, reference.best_params_)
+        self.assertAlmostEqual(search.best_score_, reference.best_score_)
+
+    def test_failing_candidates(self):
+        """Test that failing candidates are scored NaN like GridSearchCV
+        and that the search only fails if every candidate does."""
+        model = DecisionTreeRegressor(random_state=0)
+        grid = {'min_samples_split': [1, 2, 5]}
+        reference = GridSearchCV(model, grid, cv=3,
+                                 scoring='neg_mean_squared_error')
+        with self.assertWarns(FitFailedWarning):
+            reference.fit(self.x, self.y)
+        for deduplicate in (False, True):
+            with self.assertWarns(FitFailedWarning):
+                search = CandidateSearchCV(
+                    model, grid, deduplicate=deduplicate).fit(self.x,
+                                                              self.y)
+            self.assertEqual(search.best_params_, reference.best_params_)
+            np.testing.assert_allclose(
+                search.cv_results_['mean_test_score'],
+                reference.cv_results_['mean_test_score'])
+            self.assertEqual(search.cv_results_['rank_test_score'][0], 3)
+        with self.assertWarns(FitFailedWarning):
+            with self.assertRaises(ValueError):
+                CandidateSearchCV(model, {'min_samples_split': [0, 1]}).fit(
+                    self.x, self.y)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Unit tests for data_fingerprint module.
+
+This module contains tests to ensure the correct functionality
+of the content fingerprints of DataFrames.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from modules.data_fingerprint import data_fingerprint
+
+
+class TestDataFingerprint(unittest.TestCase):
+    """
+    Test case for the data_fingerprint module.
+
+    This class contains various test methods to ensure
+    the fingerprint depends on the data, the version and
+    the parameters only.
+    """
+
+    def setUp(self):
+        """Set up a small DataFrame."""
+        self.data = pd.DataFrame({'GrLivArea': np.arange(20.0),
+                                  'Street': ['Pave', 'Grvl'] * 10})
+
+    def test_same_data(self):
+        """Test that copies and reindexed rows keep the fingerprint."""
+        fingerprint = data_fingerprint(self.data)
+        self.assertEqual(fingerprint, data_fingerprint(self.data.copy()))
+        self.assertEqual(fingerprint,
+                         data_fingerprint(self.data.set_axis(range(5, 25))))
+
+    def test_changed_data(self):
+        """Test that values, columns, version and parameters change
+        the fingerprint."""
+        fingerprint = data_fingerprint(self.data)
+        changed = self.data.copy()
+        changed.loc[3, 'GrLivArea'] += 1
+        self.assertNotEqual(fingerprint, data_fingerprint(changed))
+        self.assertNotEqual(fingerprint, data_fingerprint(
+            self.data.rename(columns={'Street': 'Alley'})))
+        self.assertNotEqual(fingerprint, data_fingerprint(self.data,
+                                                          version=2))
+        self.assertNotEqual(fingerprint, data_fingerprint(self.data,
+                                                          kind='a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Unit tests for encode_categorical_columns module.
+
+This module contains tests to ensure the correct functionality
+of the categorical encoding functions under various scenarios,
+including unseen levels, missing values and error handling.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from modules.encode_categorical_columns import (
+    apply_categorical_encoding, categorical_feature_indices,
+    encode_categorical_columns, load_encoding,
+    make_sparse_one_hot_encoder, save_encoding
+)
+
+
+class TestEncodeCategoricalColumns(unittest.TestCase):
+    """
+    Test case for the encode_categorical_columns module.
+
+    This class contains various test methods to ensure
+    the correct functionality of learning, applying,
+    saving and loading categorical encodings.
+    """
+
+    def setUp(self):
+        """Set up test data and temporary directory."""
+        self.data = pd.DataFrame({
+            'LotArea': [8450, 9600, 11250, 9550],
+            'MSZoning': ['RL', 'RM', 'RL', None],
+            'Street': ['Pave', 'Pave', 'Grvl', 'Pave']
+        })
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_encode_non_numeric_columns(self):
+        """Test that only non-numeric columns are encoded by default."""
+        encoded, encoding = encode_categorical_columns(self.data)
+        self.assertEqual(set(encoding), {'MSZoning', 'Street'})
+        self.assertEqual(encoding['MSZoning'], ['NA', 'RL', 'RM'])
+        self.assertEqual(encoded['MSZoning'].tolist(), [1, 2, 1, 0])
+        self.assertEqual(encoded['Street'].tolist(), [1, 1, 0, 1])
+        self.assertEqual(encoded['MSZoning'].dtype, np.int8)
+        pd.testing.assert_series_equal(encoded['LotArea'],
+                                       self.data['LotArea'])
+
+    def test_apply_unseen_level(self):
+        """Test that unseen levels are encoded as missing."""
+        _, encoding = encode_categorical_columns(self.data)
+        new_data = pd.DataFrame({
+            'LotArea': [7000, 8000],
+            'MSZoning': ['FV', 'RM'],
+            'Street': ['Pave', 'Grvl']
+        })
+        encoded = apply_categorical_encoding(new_data, encoding)
+        self.assertTrue(np.isnan(encoded['MSZoning'].iloc[0]))
+        self.assertEqual(encoded['MSZoning'].iloc[1], 2)
+        self.assertEqual(encoded['Street'].tolist(), [1, 0])
+
+    def test_missing_column(self):
+        """Test that a missing column raises a ValueError."""
+        with self.assertRaises(ValueError):
+            encode_categorical_columns(self.data, ['Alley'])
+        with self.assertRaises(ValueError):
+            apply_categorical_encoding(self.data, {'Alley': ['Grvl']})
+
+    def test_invalid_input(self):
+        """Test that a non-DataFrame input raises a TypeError."""
+        with self.assertRaises(TypeError):
+            encode_categorical_columns([1, 2, 3])
+
+    def test_save_and_load(self):
+        """Test that an encoding survives a round trip to JSON."""
+        _, encoding = encode_categorical_columns(self.data)
+        path = os.path.join(self.temp_dir, 'encoding.json')
+        save_encoding(encoding, path)
+        self.assertEqual(load_encoding(path), encoding)
+
+    def test_feature_indices(self):
+        """Test the positions of encoded columns among the features."""
+        _, encoding = encode_categorical_columns(self.data)
+        indices = categorical_feature_indices(
+            ['LotArea', 'MSZoning', 'Street'], encoding)
+        self.assertEqual(indices, [1, 2])
+
+    def test_sparse_one_hot(self):
+        """Test the sparse one-hot expansion of encoded columns."""
+        encoded, encoding = encode_categorical_columns(self.data)
+        transformer = make_sparse_one_hot_encoder(
+            [1, 2], [len(encoding['MSZoning']), len(encoding['Street'])])
+        matrix = transformer.fit_transform(encoded.values.astype(float))
+        self.assertTrue(hasattr(matrix, 'toarray'))
+        self.assertEqual(matrix.shape, (4, 6))
+        np.testing.assert_array_equal(matrix.toarray()[:, :5].sum(axis=1),
+                                      [2, 2, 2, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Unit tests for feature_matrix_store module.
+
+This module contains tests to ensure the correct functionality
+of the memory-mapped float32 train/test split, its reuse and the
+zero-copy access to the matrices.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from modules.feature_matrix_store import FeatureMatrixStore
+
+
+class TestFeatureMatrixStore(unittest.TestCase):
+    """
+    Test case for the FeatureMatrixStore class.
+
+    This class contains various test methods to ensure
+    the stored split matches train_test_split and is
+    reused only for the same data and parameters.
+    """
+
+    def setUp(self):
+        """Set up test data and temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame(rng.normal(size=(103, 4)),
+                                 columns=['a', 'b', 'c', 'SalePrice'])
+        self.store = FeatureMatrixStore(os.path.join(self.temp_dir,
+                                                     'matrix'))
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_matches_train_test_split(self):
+        """Test that the split equals train_test_split in float32."""
+        self.assertTrue(self.store.write(self.data, block_rows=10))
+        x_train, x_test, y_train, y_test = self.store.load()
+        expected = train_test_split(self.data.iloc[:, :-1].values,
+                                    self.data.iloc[:, -1].values,
+                                    test_size=0.2, random_state=42)
+        for actual, wanted in zip((x_train, x_test), expected[:2]):
+            self.assertEqual(actual.dtype, np.float32)
+            np.testing.assert_array_equal(actual,
+                                          wanted.astype(np.float32))
+        np.testing.assert_array_equal(y_train, expected[2])
+        np.testing.assert_array_equal(y_test, expected[3])
+        self.assertEqual(self.store.feature_columns, ['a', 'b', 'c'])
+
+    def test_zero_copy_views(self):
+        """Test that both matrices are contiguous views of one map."""
+        self.store.write(self.data)
+        x_train, x_test, _, _ = self.store.load()
+        self.assertIsInstance(x_train, np.memmap)
+        self.assertTrue(x_train.flags['C_CONTIGUOUS'])
+        self.assertTrue(x_test.flags['C_CONTIGUOUS'])
+        self.assertTrue(np.shares_memory(x_train.base, x_test.base))
+
+    def test_split_indices(self):
+        """Test that the split indices point to the original rows."""
+        self.store.write(self.data)
+        train_index, test_index = self.store.split_indices()
+        self.assertEqual(sorted(np.concatenate([train_index, test_index])),
+                         list(range(len(self.data))))
+        x_train, _, _, _ = self.store.load()
+        np.testing.assert_array_equal(
+            x_train, self.data.iloc[train_index, :-1].to_numpy(np.float32))
+
+    def test_reuse(self):
+        """Test that the same data is not written again."""
+        self.assertTrue(self.store.write(self.data))
+        x_train, _, _, _ = self.store.load()
+        before = np.array(x_train)
+        self.assertFalse(self.store.write(self.data.copy()))
+        self.assertTrue(self.store.write(self.data, random_state=0))
+        changed = self.data.copy()
+        changed.iloc[0, 0] += 1
+        self.assertTrue(self.store.write(changed))
+        # Matrices mapped before a rewrite keep their content
+        np.testing.assert_array_equal(x_train, before)
+
+    def test_invalid_input(self):
+        """Test that invalid input raises errors."""
+        with self.assertRaises(ValueError):
+            self.store.write(self.data.iloc[:0])
+        with self.assertRaises(ValueError):
+            self.store.write(self.data[['SalePrice']])
+        with self.assertRaises(FileNotFoundError):
+            FeatureMatrixStore(os.path.join(self.temp_dir, 'empty')).load()
+
+
+if __name__ == '__main__':
+    unittest.main()
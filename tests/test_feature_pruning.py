@@ -0,0 +1,108 @@
+"""
+Unit tests for feature_pruning module.
+
+This module contains tests to ensure the correct functionality
+of the mutual information scores, the pruning of redundant and
+uninformative features and the kept features file.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from modules.feature_pruning import (
+    KEPT, REDUNDANT, UNINFORMATIVE, load_kept_features,
+    mutual_information_scores, prune_features, save_kept_features
+)
+
+
+class TestFeaturePruning(unittest.TestCase):
+    """
+    Test case for the feature_pruning module.
+
+    This class contains various test methods to ensure
+    near-duplicate and noise features are pruned while
+    the informative ones are kept.
+    """
+
+    def setUp(self):
+        """Set up data with a near-duplicate pair and a noise column."""
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        n_rows = 500
+        garage_cars = rng.integers(0, 4, n_rows).astype(float)
+        living_area = rng.normal(1500, 400, n_rows)
+        self.x = pd.DataFrame({
+            'GarageCars': garage_cars,
+            'GarageArea': 250 * garage_cars + rng.normal(0, 40, n_rows),
+            'GrLivArea': living_area,
+            'Noise': rng.normal(size=n_rows),
+            'Neighborhood': rng.integers(0, 5, n_rows).astype(float),
+        })
+        self.y = (20_000 * garage_cars + 60 * living_area
+                  + 10_000 * self.x['Neighborhood']
+                  + rng.normal(0, 5_000, n_rows))
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_mutual_information(self):
+        """Test that informative columns score above noise."""
+        scores = mutual_information_scores(self.x, self.y, [4], n_jobs=2)
+        self.assertEqual(scores.shape, (5,))
+        self.assertGreater(scores[2], scores[3])
+        self.assertGreater(scores[4], scores[3])
+
+    def test_prune_features(self):
+        """Test that one of the duplicates and the noise are dropped."""
+        kept, report = prune_features(self.x, self.y, ['Neighborhood'],
+                                      min_mutual_info=0.02)
+        status = report.set_index('feature')['status']
+        self.assertEqual(status['Noise'], UNINFORMATIVE)
+        self.assertEqual(
+            sorted([status['GarageCars'], status['GarageArea']]),
+            sorted([KEPT, REDUNDANT]))
+        redundant = report[report['status'] == REDUNDANT].iloc[0]
+        self.assertIn(redundant['correlated_with'],
+                      ('GarageCars', 'GarageArea'))
+        self.assertGreater(redundant['correlation'], 0.75)
+        self.assertIn('GrLivArea', kept)
+        self.assertIn('Neighborhood', kept)
+        self.assertEqual(kept, [column for column in self.x.columns
+                                if column in kept])
+
+    def test_categorical_not_correlated(self):
+        """Test that categorical codes take no part in the redundancy
+        check."""
+        x = self.x.assign(NeighborhoodCopy=self.x['Neighborhood'])
+        kept, _ = prune_features(x, self.y,
+                                 ['Neighborhood', 'NeighborhoodCopy'])
+        self.assertIn('Neighborhood', kept)
+        self.assertIn('NeighborhoodCopy', kept)
+
+    def test_threshold_keeps_all(self):
+        """Test that a threshold of one keeps the duplicates."""
+        kept, _ = prune_features(self.x[['GarageCars', 'GarageArea']],
+                                 self.y, correlation_threshold=1.0)
+        self.assertEqual(kept, ['GarageCars', 'GarageArea'])
+
+    def test_kept_features_file(self):
+        """Test that the kept features round-trip through JSON."""
+        path = os.path.join(self.temp_dir, 'kept_features.json')
+        save_kept_features(['GrLivArea', 'GarageCars'], path)
+        self.assertEqual(load_kept_features(path),
+                         ['GrLivArea', 'GarageCars'])
+
+    def test_invalid_input(self):
+        """Test that invalid input raises errors."""
+        with self.assertRaises(TypeError):
+            prune_features(self.x.values, self.y)
+        with self.assertRaises(ValueError):
+            prune_features(self.x[[]], self.y)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Unit tests for figure_cache module.
+
+This module contains tests to ensure the correct functionality
+of the data fingerprints, the bounded cache of rendered figures
+and the skipping of unchanged plots.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from modules.figure_cache import (
+    FigureCache, data_fingerprint, figure_up_to_date, read_fingerprint,
+    save_figure
+)
+from modules.plot_boxplot import plot_boxplot
+from modules.plot_categorical_columns import plot_categorical_columns
+from modules.plot_heatmaps import plot_heatmaps
+
+
+# Set the matplotlib backend to 'Agg' for non-interactive plotting
+matplotlib.use('Agg')
+
+
+class TestFigureCache(unittest.TestCase):
+    """
+    Test case for the figure_cache module.
+
+    This class contains various test methods to ensure
+    unchanged plots are not rendered again and the cache
+    stays within its bound.
+    """
+
+    def setUp(self):
+        """Set up test data and temporary directories."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.temp_dir, 'plots')
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame({
+            'Neighborhood': rng.choice(['A', 'B', 'C'], 60),
+            'GrLivArea': rng.normal(1500, 300, 60),
+            'SalePrice': rng.normal(180_000, 40_000, 60),
+        })
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def _render(self, path, fingerprint, cache=None):
+        """Render a small figure to path with its fingerprint."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fig, ax = plt.subplots()
+        ax.plot([0, 1], [0, 1])
+        save_figure(path, fingerprint, cache)
+        plt.close(fig)
+
+    def test_fingerprint(self):
+        """Test that the fingerprint depends on data and parameters
+        only."""
+        fingerprint = data_fingerprint(self.data, kind='a')
+        self.assertEqual(fingerprint,
+                         data_fingerprint(self.data.copy(), kind='a'))
+        self.assertEqual(
+            fingerprint,
+            data_fingerprint(self.data.set_axis(range(100, 160)), kind='a'))
+        self.assertNotEqual(fingerprint, data_fingerprint(self.data,
+                                                          kind='b'))
+        changed = self.data.copy()
+        changed.loc[3, 'GrLivArea'] += 1
+        self.assertNotEqual(fingerprint, data_fingerprint(changed, kind='a'))
+        self.assertNotEqual(
+            fingerprint,
+            data_fingerprint(self.data.rename(columns={'GrLivArea': 'x'}),
+                             kind='a'))
+
+    def test_fingerprint_in_image(self):
+        """Test that the fingerprint is stored in the PNG file."""
+        path = os.path.join(self.output_dir, 'figure.png')
+        self.assertIsNone(read_fingerprint(path))
+        self._render(path, 'abc')
+        self.assertEqual(read_fingerprint(path), 'abc')
+        self.assertTrue(figure_up_to_date(path, 'abc'))
+        self.assertFalse(figure_up_to_date(path, 'def'))
+
+    def test_restore_from_cache(self):
+        """Test that an overwritten figure is restored from the cache."""
+        cache = FigureCache(self.cache_dir)
+        path = os.path.join(self.output_dir, 'figure.png')
+        self._render(path, 'first', cache)
+        self._render(path, 'second', cache)
+        self.assertTrue(figure_up_to_date(path, 'first', cache))
+        self.assertEqual(read_fingerprint(path), 'first')
+        self.assertFalse(figure_up_to_date(path, 'third', cache))
+
+    def test_cache_is_bounded(self):
+        """Test that the least recently used figures are evicted."""
+        cache = FigureCache(self.cache_dir, max_entries=2)
+        path = os.path.join(self.output_dir, 'figure.png')
+        for index, fingerprint in enumerate(['a', 'b', 'c']):
+            self._render(path, fingerprint, cache)
+            os.utime(os.path.join(self.cache_dir, f"{fingerprint}.png"),
+                     (index, index))
+        names = sorted(os.path.basename(entry) for entry in cache.entries())
+        self.assertEqual(len(names), 2)
+        self.assertNotIn('a.png', names)
+        with self.assertRaises(ValueError):
+            FigureCache(self.cache_dir, max_entries=0)
+
+    def test_plots_skip_rendering(self):
+        """Test that unchanged plots are not rendered again."""
+        plot_boxplot(self.data, 'Neighborhood', 'SalePrice', self.output_dir)
+        plot_heatmaps(self.data, self.output_dir)
+        plot_categorical_columns(self.data, self.output_dir)
+        with patch('matplotlib.pyplot.savefig') as mock_savefig:
+            plot_boxplot(self.data, 'Neighborhood', 'SalePrice',
+                         self.output_dir)
+            plot_heatmaps(self.data, self.output_dir)
+            plot_categorical_columns(self.data, self.output_dir)
+            mock_savefig.assert_not_called()
+
+    def test_changed_data_renders(self):
+        """Test that a plot of changed data is rendered again."""
+        plot_file = os.path.join(self.output_dir,
+                                 'Boxplot_of_SalePrice_by_Neighborhood.png')
+        plot_boxplot(self.data, 'Neighborhood', 'SalePrice', self.output_dir)
+        first = read_fingerprint(plot_file)
+        changed = self.data.assign(SalePrice=self.data['SalePrice'] * 2)
+        plot_boxplot(changed, 'Neighborhood', 'SalePrice', self.output_dir)
+        self.assertNotEqual(read_fingerprint(plot_file), first)
+        self.assertEqual(
+            read_fingerprint(plot_file),
+            data_fingerprint(changed[['Neighborhood', 'SalePrice']],
+                             kind='boxplot'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for flat_tree_ensemble module.
+
+This module contains tests to ensure that compiled tree ensembles
+predict the same values as the original models, including missing
+values and categorical splits, and survive a save/load round trip.
+"""
+
+import shutil
+import tempfile
+import unittest
+import lightgbm as lgb
+import numpy as np
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+from modules.flat_tree_ensemble import (
+    FlatTreeEnsemble, compile_tree_ensemble, supports_compilation
+)
+
+
+class TestFlatTreeEnsemble(unittest.TestCase):
+    """
+    Test case for the flat_tree_ensemble module.
+
+    This class contains various test methods to ensure
+    the compiled ensembles match the predictions of
+    scikit-learn, LightGBM and XGBoost models.
+    """
+
+    def setUp(self):
+        """Set up data with missing values, zeros and a categorical."""
+        rng = np.random.default_rng(0)
+        n_samples = 1000
+        self.x = rng.normal(size=(n_samples, 4))
+        self.x[:, 3] = rng.integers(0, 6, n_samples)
+        self.y = (2 * self.x[:, 0] + 3 * np.isin(self.x[:, 3], [1, 4]) +
+                  rng.normal(scale=0.1, size=n_samples))
+        self.x[rng.random(n_samples) < 0.1, 1] = np.nan
+        self.x[rng.random(n_samples) < 0.1, 2] = 0.0
+
+        # Scoring rows with missing, unknown and negative categories
+        self.x_score = self.x.copy()
+        self.x_score[:5, 3] = np.nan
+        self.x_score[5:10, 3] = 9
+        self.x_score[10:15, 3] = -1
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def assert_same_predictions(self, model, x, rtol=1e-7):
+        """Assert the compiled model predicts like the model."""
+        ensemble = compile_tree_ensemble(model)
+        np.testing.assert_allclose(ensemble.predict(x), model.predict(x),
+                                   rtol=rtol, atol=rtol)
+
+    def test_decision_tree(self):
+        """Test a scikit-learn decision tree."""
+        model = DecisionTreeRegressor(max_depth=6, random_state=0)
+        self.assert_same_predictions(model.fit(self.x, self.y), self.x)
+
+    def test_random_forest(self):
+        """Test a scikit-learn random forest."""
+        model = RandomForestRegressor(n_estimators=10, random_state=0)
+        self.assert_same_predictions(model.fit(self.x, self.y), self.x)
+
+    def test_lgbm_categorical(self):
+        """Test LightGBM with a categorical feature."""
+        model = lgb.LGBMRegressor(n_estimators=30, verbose=-1)
+        model.fit(self.x, self.y, categorical_feature=[3])
+        self.assert_same_predictions(model, self.x_score)
+
+    def test_lgbm_zero_as_missing(self):
+        """Test LightGBM treating zeros as missing."""
+        model = lgb.LGBMRegressor(n_estimators=30, zero_as_missing=True,
+                                  verbose=-1)
+        self.assert_same_predictions(model.fit(self.x, self.y), self.x)
+
+    def test_xgb(self):
+        """Test XGBoost, which sums leaves in single precision."""
+        model = xgb.XGBRegressor(n_estimators=30, max_depth=4)
+        self.assert_same_predictions(model.fit(self.x, self.y), self.x,
+                                     rtol=1e-5)
+
+    def test_xgb_categorical(self):
+        """Test XGBoost with a categorical feature."""
+        model = xgb.XGBRegressor(n_estimators=30, tree_method='hist',
+                                 enable_categorical=True,
+                                 feature_types=['q', 'q', 'q', 'c'],
+                                 max_cat_to_onehot=1)
+        self.assert_same_predictions(model.fit(self.x, self.y),
+                                     self.x_score, rtol=1e-5)
+
+    def test_chunked_threads(self):
+        """Test that chunked multi-threaded scoring gives the same values."""
+        model = lgb.LGBMRegressor(n_estimators=30, verbose=-1)
+        ensemble = compile_tree_ensemble(model.fit(self.x, self.y))
+        np.testing.assert_array_equal(
+            ensemble.predict(self.x, n_jobs=4, chunk_size=128),
+            ensemble.predict(self.x))
+
+    def test_save_load_memory_mapped(self):
+        """Test that a saved ensemble loads memory-mapped."""
+        model = RandomForestRegressor(n_estimators=5, random_state=0)
+        ensemble = compile_tree_ensemble(model.fit(self.x, self.y))
+        ensemble.save(self.temp_dir)
+        loaded = FlatTreeEnsemble.load(self.temp_dir)
+        self.assertIsInstance(loaded.threshold, np.memmap)
+        self.assertEqual(loaded.n_trees, 5)
+        np.testing.assert_array_equal(loaded.predict(self.x),
+                                      ensemble.predict(self.x))
+
+    def test_unsupported_model(self):
+        """Test that a non-tree model raises a TypeError."""
+        model = LinearRegression().fit(self.x[:, [0]], self.y)
+        self.assertFalse(supports_compilation(model))
+        with self.assertRaises(TypeError):
+            compile_tree_ensemble(model)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ import pandas as pd
 from sklearn.datasets import make_regression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
 from modules.hyperparameter_tuning import hyperparameter_tuning
 
 
@@ -136,6 +137,50 @@ class TestHyperparameterTuning(unittest.TestCase):
         self.assertIn('RandomForest', best_models)
         self.assertIn('RandomForest', best_params)
 
+    def test_return_cv_results(self):
+        """
+        Test that the search results of each model can be returned.
+        """
+        models = [('DecisionTree', DecisionTreeRegressor(random_state=42))]
+        param_grids = [{'max_depth': [2, 4]}]
+        _, _, cv_results = hyperparameter_tuning(
+            models, param_grids, self.x, self.y, return_cv_results=True)
+        results = cv_results['DecisionTree']
+        self.assertEqual(len(results['params']), 2)
+        for key in ['mean_fit_time', 'mean_score_time', 'max_peak_memory',
+                    'split0_test_score', 'mean_test_score']:
+            self.assertIn(key, results)
+
+    def test_time_budget_coverage(self):
+        """
+        Test that per-model budgets stop the searches and the coverage
+        of each model is returned.
+        """
+        models = [('DecisionTree', DecisionTreeRegressor(random_state=42)),
+                  ('LinearRegression', LinearRegression())]
+        param_grids = [{'max_depth': [2, 3, 4, 5, 6, 7, 8, 9]}, {}]
+        best_models, _, coverage = hyperparameter_tuning(
+            models, param_grids, self.x, self.y,
+            model_time_budget={'DecisionTree': 0}, return_coverage=True)
+        self.assertIsNotNone(best_models['DecisionTree'])
+        self.assertEqual(coverage['DecisionTree']['n_candidates'], 8)
+        self.assertEqual(coverage['DecisionTree']['n_evaluated'], 4)
+        self.assertFalse(coverage['DecisionTree']['complete'])
+        self.assertTrue(coverage['LinearRegression']['complete'])
+        self.assertIsNone(coverage['LinearRegression']['time_budget'])
+
+    def test_global_time_budget(self):
+        """Test that a global budget is shared between the models."""
+        models = [('DecisionTree', DecisionTreeRegressor(random_state=42)),
+                  ('LinearRegression', LinearRegression())]
+        _, _, cv_results, coverage = hyperparameter_tuning(
+            models, [{'max_depth': [2, 4]}, {}], self.x, self.y,
+            return_cv_results=True, time_budget=3600,
+            return_coverage=True)
+        self.assertLessEqual(coverage['DecisionTree']['time_budget'], 1800)
+        self.assertTrue(coverage['DecisionTree']['complete'])
+        self.assertEqual(len(cv_results['DecisionTree']['params']), 2)
+
 
 if __name__ == '__main__':
     unittest.main()
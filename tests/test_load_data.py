@@ -0,0 +1,159 @@
+"""
+Unit tests for load_data module.
+
+This module contains tests to ensure the correct functionality
+of loading partitioned datasets, including partition pruning,
+schema checks and chunked iteration.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from modules import load_data as load_data_module
+from modules.load_data import (
+    default_engine, infer_columns, iter_data_chunks, load_data,
+    parse_filters, partition_values, resolve_partitions
+)
+
+
+class TestLoadData(unittest.TestCase):
+    """
+    Test case for the load_data module.
+
+    This class contains various test methods to ensure
+    the correct functionality of reading one file, a
+    directory of partitions or a glob pattern.
+    """
+
+    def setUp(self):
+        """Write a small dataset partitioned by Bundesland."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.parts = {
+            'Bayern': pd.DataFrame({'LotArea': [1, 2],
+                                    'SalePrice': [10, 20]}),
+            'Berlin': pd.DataFrame({'LotArea': [3],
+                                    'SalePrice': [30]}),
+            'Hessen': pd.DataFrame({'LotArea': [4, 5, 6],
+                                    'SalePrice': [40, 50, 60]}),
+        }
+        for state, frame in self.parts.items():
+            directory = os.path.join(self.temp_dir, f"Bundesland={state}")
+            os.makedirs(directory)
+            frame.to_csv(os.path.join(directory, 'part-0.csv'), index=False)
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_single_file(self):
+        """Test that a single file is read unchanged."""
+        path = os.path.join(self.temp_dir, 'Bundesland=Berlin', 'part-0.csv')
+        pd.testing.assert_frame_equal(load_data(path), self.parts['Berlin'])
+
+    def test_directory_adds_partition_columns(self):
+        """Test that key=value directories become leading columns."""
+        data = load_data(self.temp_dir, n_jobs=2)
+        self.assertEqual(data.columns.tolist(),
+                         ['Bundesland', 'LotArea', 'SalePrice'])
+        self.assertEqual(len(data), 6)
+        self.assertEqual(data['Bundesland'].tolist(),
+                         ['Bayern'] * 2 + ['Berlin'] + ['Hessen'] * 3)
+
+    def test_glob_pattern(self):
+        """Test that a glob pattern selects the matching files."""
+        pattern = os.path.join(self.temp_dir, 'Bundesland=B*', '*.csv')
+        self.assertEqual(len(resolve_partitions(pattern)), 2)
+        self.assertEqual(len(load_data(pattern)), 3)
+
+    def test_filters_prune_partitions(self):
+        """Test that filters on partition keys skip whole files."""
+        with mock.patch.object(load_data_module.pd, 'read_csv',
+                               wraps=pd.read_csv) as read_csv:
+            data = load_data(self.temp_dir,
+                             parse_filters(['Bundesland=Berlin,Hessen']))
+        self.assertEqual(read_csv.call_count, 2)
+        self.assertEqual(sorted(data['Bundesland'].unique()),
+                         ['Berlin', 'Hessen'])
+        with self.assertRaises(ValueError):
+            load_data(self.temp_dir, {'Bundesland': ['Sachsen']})
+
+    def test_row_filters(self):
+        """Test that filters on data columns are applied to rows."""
+        data = load_data(self.temp_dir, {'LotArea': [2, 5]})
+        self.assertEqual(data['SalePrice'].tolist(), [20, 50])
+
+    def test_schema_union(self):
+        """Test that differing columns raise unless they are unioned."""
+        extra = os.path.join(self.temp_dir, 'Bundesland=Sachsen')
+        os.makedirs(extra)
+        pd.DataFrame({'LotArea': [7], 'PoolArea': [1], 'SalePrice': [70]}
+                     ).to_csv(os.path.join(extra, 'part-0.csv'), index=False)
+        with self.assertRaises(ValueError):
+            load_data(self.temp_dir)
+        data = load_data(self.temp_dir, union_schema=True)
+        self.assertEqual(data.columns.tolist(),
+                         ['Bundesland', 'LotArea', 'PoolArea', 'SalePrice'])
+        self.assertEqual(int(data['PoolArea'].isna().sum()), 6)
+
+    def test_iter_data_chunks(self):
+        """Test that chunks cover the filtered rows of all partitions."""
+        chunks = list(iter_data_chunks(self.temp_dir, chunksize=2,
+                                       filters={'Bundesland': ['Hessen']}))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual(pd.concat(chunks)['LotArea'].tolist(), [4, 5, 6])
+
+    def test_column_projection(self):
+        """Test that only the selected columns are parsed and returned."""
+        with mock.patch.object(load_data_module.pd, 'read_csv',
+                               wraps=pd.read_csv) as read_csv:
+            data = load_data(self.temp_dir, {'LotArea': [1, 4]},
+                             columns=['SalePrice'], engine='c')
+        self.assertEqual(data.columns.tolist(), ['SalePrice'])
+        self.assertEqual(data['SalePrice'].tolist(), [10, 40])
+        usecols = [call.kwargs['usecols'] for call in read_csv.call_args_list
+                   if call.kwargs.get('nrows') != 0]
+        self.assertEqual(usecols, [['LotArea', 'SalePrice']] * 3)
+
+        data = load_data(self.temp_dir,
+                         columns=lambda column: column != 'LotArea')
+        self.assertEqual(data.columns.tolist(), ['Bundesland', 'SalePrice'])
+        with self.assertRaises(ValueError):
+            load_data(self.temp_dir, columns=['PoolArea'])
+
+    def test_infer_columns(self):
+        """Test that columns are selected by their inferred type."""
+        self.assertEqual(infer_columns(self.temp_dir, include='number'),
+                         ['LotArea', 'SalePrice'])
+        self.assertEqual(infer_columns(self.temp_dir, exclude='number'),
+                         ['Bundesland'])
+        self.assertIn(default_engine(), ('pyarrow', 'c'))
+
+    def test_compressed_partitions(self):
+        """Test that compressed partitions are found and decompressed."""
+        directory = os.path.join(self.temp_dir, 'Bundesland=Sachsen')
+        os.makedirs(directory)
+        pd.DataFrame({'LotArea': [7, 8], 'SalePrice': [70, 80]}).to_csv(
+            os.path.join(directory, 'part-0.csv.gz'), index=False)
+        self.assertEqual(len(load_data(self.temp_dir)), 8)
+        chunks = list(iter_data_chunks(self.temp_dir, chunksize=1,
+                                       filters={'Bundesland': ['Sachsen']},
+                                       columns=['SalePrice']))
+        self.assertEqual([chunk.columns.tolist() for chunk in chunks],
+                         [['SalePrice']] * 2)
+        self.assertEqual(pd.concat(chunks)['SalePrice'].tolist(), [70, 80])
+
+    def test_partition_values_and_errors(self):
+        """Test path parsing and the handling of invalid input."""
+        self.assertEqual(partition_values('/d/a=1/b=x/part.csv', '/d'),
+                         {'a': '1', 'b': 'x'})
+        with self.assertRaises(FileNotFoundError):
+            resolve_partitions(os.path.join(self.temp_dir, 'missing'))
+        with self.assertRaises(ValueError):
+            parse_filters(['Bundesland'])
+
+
+if __name__ == '__main__':
+    unittest.main()
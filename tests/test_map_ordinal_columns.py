@@ -0,0 +1,141 @@
+"""
+Unit tests for map_ordinal_columns module.
+
+This module contains tests to ensure the correct functionality
+of the ordinal mapping functions under various scenarios,
+including missing values, unknown levels, generated specs
+and error handling.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from modules.map_ordinal_columns import (
+    DEFAULT_ORDINAL_SPEC, load_ordinal_spec, map_ordinal_columns,
+    parse_ordinal_spec, save_ordinal_spec
+)
+
+DESCRIPTION = (
+    "ExterQual: Evaluates the quality of the material on the exterior \n"
+    "\t\t\n"
+    "       Ex\tExcellent\n"
+    "       Gd\tGood\n"
+    "       TA\tAverage/Typical\n"
+    "       Fa\tFair\n"
+    "       Po\tPoor\n"
+    "\t\t\n"
+    "BsmtQual: Evaluates the height of the basement\n"
+    "\n"
+    "       Ex\tExcellent (100+ inches)\t\n"
+    "       Gd\tGood (90-99 inches)\n"
+    "       TA\tTypical (80-89 inches)\n"
+    "       Fa\tFair (70-79 inches)\n"
+    "       Po\tPoor (<70 inches\n"
+    "       NA\tNo Basement\n"
+    "\n"
+    "GarageFinish: Interior finish of the garage\n"
+    "\n"
+    "       Fin\tFinished\n"
+    "       RFn\tRough Finished\t\n"
+    "       Unf\tUnfinished\n"
+    "       NA\tNo Garage\n"
+)
+
+
+class TestMapOrdinalColumns(unittest.TestCase):
+    """
+    Test case for the map_ordinal_columns module.
+
+    This class contains various test methods to ensure
+    the correct functionality of the spec-driven mapping
+    and of the spec generation from the data description.
+    """
+
+    def setUp(self):
+        """Set up test data and temporary directory."""
+        self.data = pd.DataFrame({
+            'ExterQual': ['Ex', 'Gd', 'TA', 'Po'],
+            'BsmtQual': ['Fa', None, 'Gd', 'TA'],
+            'GarageFinish': ['Fin', 'Unf', None, 'RFn'],
+            'LotArea': [8450, 9600, 11250, 9550]
+        })
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_default_spec(self):
+        """Test the mapping with the default spec."""
+        mapped = map_ordinal_columns(self.data)
+        self.assertEqual(mapped['ExterQual'].tolist(), [5, 4, 3, 1])
+        self.assertEqual(mapped['GarageFinish'].tolist()[:2], [3, 1])
+        self.assertTrue(np.isnan(mapped['BsmtQual'].iloc[1]))
+        self.assertTrue(np.isnan(mapped['GarageFinish'].iloc[2]))
+        pd.testing.assert_series_equal(mapped['LotArea'],
+                                       self.data['LotArea'])
+
+    def test_matches_per_column_map(self):
+        """Test that the lookup table matches a per-column map."""
+        mapping = {'Ex': 5, 'Gd': 4, 'TA': 3, 'Fa': 2, 'Po': 1}
+        mapped = map_ordinal_columns(self.data)
+        for column in ['ExterQual', 'BsmtQual']:
+            expected = self.data[column].map(mapping).astype(float)
+            pd.testing.assert_series_equal(mapped[column], expected)
+
+    def test_unknown_level(self):
+        """Test that unknown levels are mapped to NaN."""
+        data = pd.DataFrame({'ExterQual': ['Ex', 'Excellent']})
+        mapped = map_ordinal_columns(data)
+        self.assertEqual(mapped['ExterQual'].iloc[0], 5)
+        self.assertTrue(np.isnan(mapped['ExterQual'].iloc[1]))
+
+    def test_custom_spec(self):
+        """Test a custom spec with a column missing from the data."""
+        spec = {'rating': {'levels': ['low', 'high'],
+                           'columns': ['Rating', 'Missing']}}
+        data = pd.DataFrame({'Rating': ['high', 'low', 'high']})
+        mapped = map_ordinal_columns(data, spec)
+        self.assertEqual(mapped['Rating'].tolist(), [2, 1, 2])
+
+    def test_column_on_two_scales(self):
+        """Test that a column rated on two scales raises a ValueError."""
+        spec = {'a': {'levels': ['x'], 'columns': ['C']},
+                'b': {'levels': ['y'], 'columns': ['C']}}
+        with self.assertRaises(ValueError):
+            map_ordinal_columns(pd.DataFrame({'C': ['x']}), spec)
+
+    def test_invalid_input(self):
+        """Test that a non-DataFrame input raises a TypeError."""
+        with self.assertRaises(TypeError):
+            map_ordinal_columns(['Ex', 'Gd'])
+
+    def test_parse_description(self):
+        """Test generating a spec from a data description file."""
+        path = os.path.join(self.temp_dir, 'data_description.txt')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(DESCRIPTION)
+        spec = parse_ordinal_spec(
+            path, ['ExterQual', 'BsmtQual', 'GarageFinish'])
+        self.assertEqual(len(spec), 2)
+        self.assertEqual(spec['ExterQual']['levels'],
+                         DEFAULT_ORDINAL_SPEC['quality']['levels'])
+        self.assertEqual(spec['ExterQual']['columns'],
+                         ['ExterQual', 'BsmtQual'])
+        self.assertEqual(spec['GarageFinish']['levels'],
+                         ['Unf', 'RFn', 'Fin'])
+        with self.assertRaises(ValueError):
+            parse_ordinal_spec(path, ['Neighborhood'])
+
+    def test_save_and_load(self):
+        """Test that a spec survives a round trip to JSON."""
+        path = os.path.join(self.temp_dir, 'spec.json')
+        save_ordinal_spec(DEFAULT_ORDINAL_SPEC, path)
+        self.assertEqual(load_ordinal_spec(path), DEFAULT_ORDINAL_SPEC)
+
+
+if __name__ == '__main__':
+    unittest.main()
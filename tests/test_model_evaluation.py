@@ -5,12 +5,23 @@ This module contains comprehensive tests to ensure the correct functionality
 of the hyperparameter_tuning function under various scenarios, including
 edge cases and unexpected inputs.
 """
+import os
+import shutil
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
 from sklearn.datasets import make_regression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
+from sklearn.metrics import (
+    mean_absolute_error, mean_squared_error, r2_score
+)
 from modules.hyperparameter_tuning import hyperparameter_tuning
+from modules.model_evaluation import (
+    RegressionMetricsAccumulator, iter_test_chunks, model_evaluation,
+    stream_model_evaluation
+)
 
 
 class TestHyperparameterTuning(unittest.TestCase):
@@ -141,5 +152,98 @@ class TestHyperparameterTuning(unittest.TestCase):
         self.assertIn('RandomForest', best_params)
 
 
+class TestStreamingEvaluation(unittest.TestCase):
+    """
+    Test case for the streaming evaluation functions.
+
+    This class contains various test methods to ensure that
+    the running accumulators and the chunked evaluation match
+    the in-memory metrics.
+    """
+
+    def setUp(self):
+        """Set up a fitted model and test files."""
+        x, y = make_regression(n_samples=250, n_features=4, noise=5.0,
+                               random_state=0)[:2]
+        self.model = LinearRegression().fit(x[:50], y[:50])
+        self.x_test, self.y_test = x[50:], y[50:]
+        self.temp_dir = tempfile.mkdtemp()
+        self.x_file = os.path.join(self.temp_dir, 'x.csv')
+        self.y_file = os.path.join(self.temp_dir, 'y.csv')
+        pd.DataFrame(self.x_test).to_csv(self.x_file, index=False)
+        pd.DataFrame({'y': self.y_test}).to_csv(self.y_file, index=False)
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_accumulator_matches_metrics(self):
+        """Test the running metrics against scikit-learn."""
+        y_pred = self.model.predict(self.x_test)
+        accumulator = RegressionMetricsAccumulator()
+        for start in range(0, 200, 30):
+            accumulator.update(self.y_test[start:start + 30],
+                               y_pred[start:start + 30])
+        metrics = accumulator.metrics()
+        self.assertAlmostEqual(metrics['MSE'],
+                               mean_squared_error(self.y_test, y_pred))
+        self.assertAlmostEqual(metrics['R2-Score'],
+                               r2_score(self.y_test, y_pred))
+        self.assertAlmostEqual(metrics['MAE'],
+                               mean_absolute_error(self.y_test, y_pred))
+        self.assertEqual(metrics['n_samples'], 200)
+
+    def test_histogram_grows(self):
+        """Test that the histogram range grows to cover all residuals."""
+        accumulator = RegressionMetricsAccumulator(n_bins=8)
+        accumulator.update(np.zeros(3), [0.1, -0.2, 0.3])
+        accumulator.update(np.zeros(2), [5.0, -3.0])
+        counts, edges = accumulator.histogram()
+        self.assertEqual(counts.sum(), 5)
+        self.assertEqual(len(edges), 9)
+        self.assertGreaterEqual(edges[-1], 5.0)
+
+    def test_stream_matches_in_memory(self):
+        """Test that streaming gives the in-memory metrics and file."""
+        stream_file = os.path.join(self.temp_dir, 'stream.txt')
+        memory_file = os.path.join(self.temp_dir, 'memory.txt')
+        histogram_file = os.path.join(self.temp_dir, 'histogram.csv')
+        streamed = stream_model_evaluation(
+            'LR', self.model,
+            iter_test_chunks(self.x_file, self.y_file, chunksize=64),
+            stream_file, histogram_file=histogram_file)
+        in_memory = model_evaluation('LR', self.model, self.x_test,
+                                     self.y_test, memory_file)
+        self.assertAlmostEqual(streamed['MSE'], in_memory['MSE'])
+        self.assertAlmostEqual(streamed['R2-Score'], in_memory['R2-Score'])
+        pd.testing.assert_frame_equal(pd.read_csv(stream_file),
+                                      pd.read_csv(memory_file))
+        self.assertEqual(pd.read_csv(histogram_file)['Count'].sum(), 200)
+
+    def test_stream_kept_columns(self):
+        """Test that the kept columns are read in the given order."""
+        columns = [str(index) for index in range(self.x_test.shape[1])]
+        kept = columns[::-1][:2]
+        chunks = list(iter_test_chunks(self.x_file, self.y_file,
+                                       chunksize=64, columns=kept))
+        x_read = np.vstack([x_chunk for x_chunk, _ in chunks])
+        np.testing.assert_allclose(
+            x_read, self.x_test[:, [int(column) for column in kept]])
+
+    def test_mismatched_files(self):
+        """Test that test files of different lengths raise."""
+        pd.DataFrame({'y': self.y_test[:10]}).to_csv(self.y_file,
+                                                     index=False)
+        with self.assertRaises(ValueError):
+            list(iter_test_chunks(self.x_file, self.y_file, chunksize=64))
+
+    def test_empty_stream(self):
+        """Test that an empty test set raises a ValueError."""
+        with self.assertRaises(ValueError):
+            stream_model_evaluation(
+                'LR', self.model, [],
+                os.path.join(self.temp_dir, 'empty.txt'))
+
+
 if __name__ == '__main__':
     unittest.main()
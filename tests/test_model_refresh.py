@@ -0,0 +1,112 @@
+"""
+Unit tests for model_refresh module.
+
+This module contains tests to ensure the correct functionality
+of refreshing tuned models by continued boosting or refitting
+and of the holdout drift check.
+"""
+
+import tempfile
+import unittest
+import numpy as np
+from lightgbm import LGBMRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+from xgboost import XGBRegressor
+from modules.artifact_store import ArtifactStore
+from modules.model_refresh import (
+    continue_training, holdout_mse, refresh_model, relative_drift,
+    stored_fit_params, supports_continued_training
+)
+
+
+class TestModelRefresh(unittest.TestCase):
+    """
+    Test case for the model_refresh module.
+
+    This class contains various test methods to ensure
+    the correct functionality of continued boosting,
+    refitting and the drift computation.
+    """
+
+    def setUp(self):
+        """Set up history and new rows with a shifted target."""
+        rng = np.random.default_rng(0)
+        self.x_old = rng.normal(size=(400, 4))
+        self.y_old = 2 * self.x_old[:, 0] + rng.normal(scale=0.1, size=400)
+        self.x_new = rng.normal(size=(200, 4))
+        self.y_new = 2 * self.x_new[:, 0] + 1 + rng.normal(scale=0.1,
+                                                             size=200)
+
+    def test_supports_continued_training(self):
+        """Test that only fitted boosted models can continue."""
+        self.assertFalse(supports_continued_training(LGBMRegressor()))
+        self.assertFalse(supports_continued_training(
+            LinearRegression().fit(self.x_old, self.y_old)))
+        self.assertTrue(supports_continued_training(
+            LGBMRegressor(n_estimators=5, verbose=-1).fit(self.x_old,
+                                                          self.y_old)))
+
+    def test_continue_lgbm(self):
+        """Test that LightGBM keeps its trees and adds new rounds."""
+        model = LGBMRegressor(n_estimators=20, verbose=-1).fit(
+            self.x_old, self.y_old)
+        refreshed = continue_training(model, self.x_new, self.y_new,
+                                      n_rounds=10)
+        self.assertEqual(refreshed.booster_.num_trees(), 30)
+        self.assertEqual(model.booster_.num_trees(), 20)
+        self.assertEqual(refreshed.get_params(), model.get_params())
+        self.assertLess(holdout_mse(refreshed, self.x_new, self.y_new),
+                        holdout_mse(model, self.x_new, self.y_new))
+
+    def test_continue_xgb(self):
+        """Test that XGBoost keeps its trees and adds new rounds."""
+        model = XGBRegressor(n_estimators=20).fit(self.x_old, self.y_old)
+        refreshed = continue_training(model, self.x_new, self.y_new)
+        self.assertEqual(refreshed.get_booster().num_boosted_rounds(), 22)
+        self.assertLess(holdout_mse(refreshed, self.x_new, self.y_new),
+                        holdout_mse(model, self.x_new, self.y_new))
+        with self.assertRaises(TypeError):
+            continue_training(LinearRegression(), self.x_new, self.y_new)
+
+    def test_refresh_refits_cheap_models(self):
+        """Test that other models are refitted with their parameters."""
+        model = DecisionTreeRegressor(max_depth=3).fit(self.x_old,
+                                                       self.y_old)
+        x_all = np.vstack([self.x_old, self.x_new])
+        y_all = np.concatenate([self.y_old, self.y_new])
+        refreshed, action = refresh_model(model, self.x_new, self.y_new,
+                                          x_all, y_all)
+        self.assertEqual(action, 'refit')
+        self.assertIsNot(refreshed, model)
+        self.assertEqual(refreshed.get_params(), model.get_params())
+        self.assertEqual(refreshed.tree_.n_node_samples[0], 600)
+
+    def test_stored_fit_params(self):
+        """Test that LightGBM gets the stored categorical features."""
+        model = LGBMRegressor(n_estimators=5, verbose=-1).fit(self.x_old,
+                                                              self.y_old)
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = ArtifactStore(store_dir)
+            self.assertEqual(stored_fit_params(store, model, {
+                'metadata': {}}), (None, {}))
+            version = store.save('preprocessing', {
+                'feature_columns': ['a', 'b', 'c', 'd'],
+                'encoding': {'c': ['x', 'y']}})
+            manifest = {'metadata': {'preprocessing_version': version}}
+            self.assertEqual(stored_fit_params(store, model, manifest),
+                             (['a', 'b', 'c', 'd'],
+                              {'categorical_feature': [2]}))
+            tree = DecisionTreeRegressor()
+            self.assertEqual(stored_fit_params(store, tree, manifest)[1],
+                             {})
+
+    def test_relative_drift(self):
+        """Test the relative error increase and missing references."""
+        self.assertAlmostEqual(relative_drift(1.5, 1.0), 0.5)
+        self.assertTrue(np.isnan(relative_drift(1.0, None)))
+        self.assertTrue(np.isnan(relative_drift(1.0, 0.0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+"""
+Unit tests for normal_equation_regression module.
+
+This module contains tests to ensure that the streamed normal
+equations merge exactly, solve to the same models as scikit-learn
+and cross-validate from per-fold statistics.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from modules.candidate_search import CandidateSearchCV
+from modules.encode_categorical_columns import make_sparse_one_hot_encoder
+from modules.hyperparameter_tuning import hyperparameter_tuning
+from modules.normal_equation_regression import (
+    NormalEquationRegressor, NormalEquations, NormalEquationSearchCV,
+    fit_normal_equations_from_csv, normal_equations_from_csv,
+    supports_normal_equations
+)
+
+
+class TestNormalEquationRegression(unittest.TestCase):
+    """
+    Test case for the normal_equation_regression module.
+
+    This class contains various test methods to ensure
+    the statistics, the regressor and the searches behave
+    as expected.
+    """
+
+    def setUp(self):
+        """Set up data with features of very different magnitudes."""
+        rng = np.random.default_rng(0)
+        self.x = np.column_stack([
+            rng.normal(size=500), rng.normal(2000, 30, size=500),
+            rng.integers(0, 3, size=500)]).astype(np.float64)
+        self.y = (2 * self.x[:, 0] + 0.01 * self.x[:, 1] -
+                  self.x[:, 2] + rng.normal(scale=0.5, size=500))
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_merge_is_exact(self):
+        """Test that merged chunk statistics equal the ones of all rows."""
+        whole = NormalEquations(3).update(self.x, self.y)
+        merged = NormalEquations(3)
+        for start in (300, 0, 150):
+            merged = merged + NormalEquations(3).update(
+                self.x[start:start + 150], self.y[start:start + 150])
+        merged.update(self.x[450:], self.y[450:])
+        self.assertEqual(merged.n, 500)
+        np.testing.assert_allclose(merged.mean, whole.mean)
+        np.testing.assert_allclose(merged.comoment, whole.comoment,
+                                   rtol=1e-9, atol=1e-6)
+
+    def test_sparse_chunks(self):
+        """Test that sparse chunks give the statistics of dense ones."""
+        one_hot = make_sparse_one_hot_encoder([2], [3]).fit(self.x)
+        x = one_hot.transform(self.x)
+        self.assertTrue(sparse.issparse(x))
+        dense = NormalEquations(x.shape[1]).update(x.toarray(), self.y)
+        chunks = NormalEquations(x.shape[1])
+        for start in range(0, 500, 120):
+            chunks.update(x[start:start + 120], self.y[start:start + 120])
+        np.testing.assert_allclose(chunks.mean, dense.mean)
+        np.testing.assert_allclose(chunks.comoment, dense.comoment,
+                                   rtol=1e-9, atol=1e-6)
+
+    def test_solve_matches_sklearn(self):
+        """Test that the solutions equal LinearRegression and Ridge."""
+        for alpha, reference in ((0.0, LinearRegression()),
+                                 (5.0, Ridge(alpha=5.0))):
+            reference.fit(self.x, self.y)
+            model = NormalEquationRegressor(alpha=alpha, chunksize=64)
+            model.fit(self.x, self.y)
+            np.testing.assert_allclose(model.coef_, reference.coef_,
+                                       rtol=1e-6)
+            self.assertAlmostEqual(model.intercept_, reference.intercept_,
+                                   places=5)
+        no_intercept = NormalEquationRegressor(fit_intercept=False).fit(
+            self.x, self.y)
+        np.testing.assert_allclose(
+            no_intercept.coef_,
+            LinearRegression(fit_intercept=False).fit(self.x, self.y).coef_,
+            rtol=1e-6)
+        with self.assertRaises(ValueError):
+            NormalEquations(3).solve()
+
+    def test_squared_error(self):
+        """Test the error of a model computed from the statistics."""
+        model = NormalEquationRegressor().fit(self.x[:400], self.y[:400])
+        test = NormalEquations(3).update(self.x[400:], self.y[400:])
+        expected = np.sum((self.y[400:] - model.predict(self.x[400:])) ** 2)
+        self.assertAlmostEqual(
+            test.squared_error(model.coef_, model.intercept_), expected,
+            places=6)
+
+    def test_partial_fit(self):
+        """Test that partial_fit adds rows to the model."""
+        model = NormalEquationRegressor()
+        model.partial_fit(self.x[:200], self.y[:200])
+        model.partial_fit(self.x[200:], self.y[200:])
+        np.testing.assert_allclose(
+            model.coef_, NormalEquationRegressor().fit(self.x, self.y).coef_)
+
+    def test_search_matches_candidate_search(self):
+        """Test that the search scores candidates like refitting them."""
+        grid = {'alpha': [0.0, 10.0]}
+        search = NormalEquationSearchCV(NormalEquationRegressor(), grid,
+                                        chunksize=70, n_jobs=2)
+        search.fit(self.x, self.y)
+        reference = CandidateSearchCV(NormalEquationRegressor(), grid).fit(
+            self.x, self.y)
+        for fold in range(3):
+            name = f'split{fold}_test_score'
+            np.testing.assert_allclose(search.cv_results_[name],
+                                       reference.cv_results_[name])
+        self.assertEqual(search.best_params_, reference.best_params_)
+        np.testing.assert_allclose(search.best_estimator_.coef_,
+                                   reference.best_estimator_.coef_)
+
+    def test_search_pipeline_and_racing(self):
+        """Test a one-hot pipeline and the errors used for racing."""
+        model = make_pipeline(make_sparse_one_hot_encoder([2], [3]),
+                              NormalEquationRegressor())
+        self.assertTrue(supports_normal_equations(model))
+        self.assertFalse(supports_normal_equations(LinearRegression()))
+        search = NormalEquationSearchCV(model, {}, racing=True).fit(
+            self.x, self.y)
+        reference = CandidateSearchCV(make_pipeline(
+            make_sparse_one_hot_encoder([2], [3]), LinearRegression()),
+            {}).fit(self.x, self.y)
+        self.assertAlmostEqual(search.best_score_, reference.best_score_)
+        self.assertAlmostEqual(float(np.mean(search.oof_squared_errors_)),
+                               -search.best_score_, places=3)
+        np.testing.assert_allclose(search.best_estimator_.predict(self.x),
+                                   reference.best_estimator_.predict(self.x),
+                                   atol=1e-6)
+
+    def test_search_learning_transformer(self):
+        """Test that transformers learning from the data are fitted on
+        the training rows of each fold only."""
+        grid = {'normalequationregressor__alpha': [0.0, 10.0]}
+        search = NormalEquationSearchCV(make_pipeline(
+            StandardScaler(), NormalEquationRegressor()), grid,
+            chunksize=1000).fit(self.x, self.y)
+        reference = CandidateSearchCV(make_pipeline(
+            StandardScaler(), NormalEquationRegressor()), grid).fit(
+            self.x, self.y)
+        np.testing.assert_allclose(search.cv_results_['mean_test_score'],
+                                   reference.cv_results_['mean_test_score'])
+        np.testing.assert_allclose(search.best_estimator_.predict(self.x),
+                                   reference.best_estimator_.predict(self.x))
+
+        # A fitted transformer is kept as it is
+        scaler = StandardScaler().fit(self.x[:50])
+        search = NormalEquationSearchCV(make_pipeline(
+            scaler, NormalEquationRegressor()), grid).fit(self.x, self.y)
+        self.assertIs(search.best_estimator_.steps[0][1], scaler)
+
+    def test_from_csv(self):
+        """Test the out-of-core fit, independent of the chunking."""
+        train_file = os.path.join(self.temp_dir, 'train.csv')
+        pd.DataFrame(np.column_stack([self.x, self.y]),
+                     columns=['A', 'B', 'C', 'y']).to_csv(train_file,
+                                                          index=False)
+        small = normal_equations_from_csv(train_file, chunksize=45,
+                                          n_jobs=2)
+        large = normal_equations_from_csv(train_file, chunksize=1000)
+        self.assertEqual(sum(statistics.n for statistics in small), 500)
+        for fold_small, fold_large in zip(small, large):
+            self.assertEqual(fold_small.n, fold_large.n)
+            np.testing.assert_allclose(fold_small.mean, fold_large.mean)
+        model, cv_scores = fit_normal_equations_from_csv(
+            NormalEquationRegressor(), train_file,
+            {'alpha': [0.0, 1e6]}, chunksize=100)
+        self.assertEqual(model.alpha, 0.0)
+        self.assertEqual(len(cv_scores), 2)
+        np.testing.assert_allclose(
+            model.coef_, LinearRegression().fit(self.x, self.y).coef_,
+            rtol=1e-5)
+
+    def test_tuning_uses_normal_equations(self):
+        """Test that hyperparameter_tuning dispatches to the search."""
+        best_models, best_params = hyperparameter_tuning(
+            [('MultipleLinearRegression', NormalEquationRegressor())],
+            [{'alpha': [0.0, 1.0]}], self.x, self.y)
+        self.assertIsInstance(best_models['MultipleLinearRegression'],
+                              NormalEquationRegressor)
+        self.assertIn(best_params['MultipleLinearRegression']['alpha'],
+                      [0.0, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
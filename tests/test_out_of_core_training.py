@@ -0,0 +1,95 @@
+"""
+Unit tests for out_of_core_training module.
+
+This module contains tests to ensure the correct functionality
+of the streaming split and the out-of-core training functions,
+including chunking independence and error handling.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from modules.out_of_core_training import (
+    hash_split_mask, split_csv_by_hash, train_lgbm_from_csv,
+    train_xgb_from_csv
+)
+
+
+class TestOutOfCoreTraining(unittest.TestCase):
+    """
+    Test case for the out_of_core_training module.
+
+    This class contains various test methods to ensure
+    the correct functionality of the hash-based split and
+    of the chunked and file-based training functions.
+    """
+
+    def setUp(self):
+        """Set up a CSV file with a linear target."""
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame(rng.normal(size=(600, 3)),
+                                 columns=['A', 'B', 'C'])
+        self.data['y'] = (2 * self.data['A'] - self.data['B'] +
+                          rng.normal(scale=0.01, size=600))
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.temp_dir, 'data.csv')
+        self.data.to_csv(self.input_file, index=False)
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_hash_split_independent_of_chunking(self):
+        """Test that the split does not depend on chunk boundaries."""
+        whole = hash_split_mask(self.data)
+        chunked = np.concatenate([hash_split_mask(self.data.iloc[i:i + 70])
+                                  for i in range(0, 600, 70)])
+        np.testing.assert_array_equal(whole, chunked)
+        self.assertAlmostEqual(whole.mean(), 0.2, delta=0.05)
+
+    def test_hash_split_seed(self):
+        """Test that another seed selects another split."""
+        self.assertFalse(np.array_equal(
+            hash_split_mask(self.data, random_state=1),
+            hash_split_mask(self.data, random_state=2)))
+
+    def test_hash_split_invalid_size(self):
+        """Test that an invalid test size raises a ValueError."""
+        with self.assertRaises(ValueError):
+            hash_split_mask(self.data, test_size=1.5)
+
+    def test_split_csv_by_hash(self):
+        """Test that the train and test files partition the rows."""
+        train_file = os.path.join(self.temp_dir, 'train.csv')
+        test_file = os.path.join(self.temp_dir, 'test.csv')
+        n_train, n_test = split_csv_by_hash(
+            self.input_file, train_file, test_file, chunksize=100)
+        train = pd.read_csv(train_file)
+        test = pd.read_csv(test_file)
+        self.assertEqual((len(train), len(test)), (n_train, n_test))
+        self.assertEqual(n_train + n_test, 600)
+        self.assertEqual(n_test, int(hash_split_mask(
+            pd.read_csv(self.input_file)).sum()))
+
+    def test_train_lgbm_from_csv(self):
+        """Test training LightGBM directly from the file."""
+        booster = train_lgbm_from_csv(self.input_file,
+                                      {'learning_rate': 0.1}, 50)
+        predictions = booster.predict(self.data[['A', 'B', 'C']].values)
+        self.assertEqual(predictions.shape, (600,))
+        self.assertLess(np.mean((predictions - self.data['y']) ** 2), 0.5)
+
+    def test_train_xgb_from_csv(self):
+        """Test training XGBoost from an external-memory matrix."""
+        model = train_xgb_from_csv(self.input_file, {'max_depth': 3}, 50,
+                                   chunksize=100, cache_dir=self.temp_dir)
+        predictions = model.predict(self.data[['A', 'B', 'C']].values)
+        self.assertEqual(predictions.shape, (600,))
+        self.assertLess(np.mean((predictions - self.data['y']) ** 2), 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
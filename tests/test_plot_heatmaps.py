@@ -52,6 +52,30 @@ class TestPlotHeatmaps(unittest.TestCase):
                                      "Correlation_Matrix_Heatmap.png")
         self.assertTrue(os.path.exists(expected_file))
 
+    def test_wide_data(self):
+        """Test the reduced mode and saving the full matrix."""
+        rng = np.random.default_rng(0)
+        wide = pd.DataFrame(rng.normal(size=(50, 30)),
+                            columns=[f"f{i}" for i in range(30)])
+        wide['SalePrice'] = wide['f0'] + rng.normal(size=50)
+        path = os.path.join(self.temp_dir, 'corr.npy')
+        for selection in ('cluster', 'target'):
+            plot_heatmaps(wide, self.temp_dir, max_features=10, n_display=5,
+                          selection=selection, correlation_file=path)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.temp_dir, "Correlation_Matrix_Heatmap.png")))
+        self.assertEqual(np.load(path).shape, (31, 31))
+
+        # A correlation file saved from other data is rewritten even
+        # though the heatmaps are up to date
+        plot_heatmaps(wide.drop(columns='f1'),
+                      os.path.join(self.temp_dir, 'other'), max_features=10,
+                      n_display=5, correlation_file=path)
+        self.assertEqual(np.load(path).shape, (30, 30))
+        plot_heatmaps(wide, self.temp_dir, max_features=10, n_display=5,
+                      selection='target', correlation_file=path)
+        self.assertEqual(np.load(path).shape, (31, 31))
+
     def test_empty_dataframe(self):
         """Test handling of an empty DataFrame."""
         empty_df = pd.DataFrame()
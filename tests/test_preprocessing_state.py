@@ -0,0 +1,90 @@
+"""
+Unit tests for preprocessing_state module.
+
+This module contains tests to ensure the correct functionality
+of the running column statistics, the threshold decisions and
+saving and loading the preprocessing state.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from modules.preprocessing_state import PreprocessingState, zero_counts
+
+
+class TestPreprocessingState(unittest.TestCase):
+    """
+    Test case for the preprocessing_state module.
+
+    This class contains various test methods to ensure
+    the correct functionality of updating the statistics
+    and detecting changed threshold decisions.
+    """
+
+    def setUp(self):
+        """Set up a state fitted on a small dataset."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = pd.DataFrame({
+            'PoolArea': [0, 0, 0, 5],
+            'HalfBath': [0, 1, 0, 1],
+            'LotArea': [100, 200, 300, 400],
+            'Street': ['Pave', 'Grvl', 'Pave', 'Pave'],
+        })
+        self.state = PreprocessingState(['HalfBath', 'LotArea', 'Street'],
+                                        ['Street'], ['LotArea'])
+        self.state.update(self.data)
+        self.state.record_threshold('first', 2,
+                                    ['PoolArea', 'HalfBath', 'LotArea'],
+                                    ['HalfBath', 'LotArea'])
+        self.state.record_threshold('second', 3, ['HalfBath', 'LotArea'],
+                                    ['HalfBath', 'LotArea'])
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_zero_counts(self):
+        """Test that zeros and missing values of numeric columns count."""
+        data = pd.DataFrame({'a': [0, np.nan, 1], 'b': ['x', 'y', 'z']})
+        self.assertEqual(zero_counts(data), {'a': 2})
+
+    def test_update_accumulates(self):
+        """Test that batches add to the running statistics."""
+        self.assertEqual(self.state.n_rows, 4)
+        self.assertEqual(self.state.zero_counts['PoolArea'], 3)
+        self.assertTrue(self.state.threshold_changes().empty)
+        self.state.update(self.data.iloc[:1])
+        self.assertEqual(self.state.n_rows, 5)
+        self.assertEqual(self.state.zero_counts['HalfBath'], 3)
+
+    def test_threshold_changes(self):
+        """Test that flipped decisions are reported with their effect."""
+        self.state.update(pd.DataFrame({'PoolArea': [1, 1],
+                                        'HalfBath': [0, 0],
+                                        'LotArea': [1, 2]}))
+        changes = self.state.threshold_changes()
+        columns = ['step', 'column', 'current']
+        self.assertEqual(changes[columns].values.tolist(),
+                         [['first', 'HalfBath', 'drop'],
+                          ['second', 'HalfBath', 'drop']])
+        self.assertTrue(changes['affects_output'].all())
+
+        # A column a later step drops anyway does not change the output
+        self.state.steps[1]['dropped'] = ['HalfBath']
+        changes = self.state.threshold_changes()
+        self.assertEqual(changes['column'].tolist(), ['HalfBath'])
+        self.assertFalse(changes['affects_output'].any())
+
+    def test_save_and_load(self):
+        """Test that a saved state loads unchanged."""
+        path = os.path.join(self.temp_dir, 'state.json')
+        self.state.save(path)
+        loaded = PreprocessingState.load(path)
+        self.assertEqual(loaded.to_dict(), self.state.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Unit tests for run_history module.
+
+This module contains tests to ensure that runs, their metrics,
+parameters, tuning timings and stage durations are recorded and
+that the queries across runs and the regression checks work.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+from modules.run_history import RunHistory, file_fingerprint
+
+
+class TestRunHistory(unittest.TestCase):
+    """
+    Test case for the run_history module.
+
+    This class contains various test methods to ensure
+    the recording, the queries and the regression checks
+    behave as expected.
+    """
+
+    def setUp(self):
+        """Set up a run history in a temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'history', 'runs.sqlite')
+        self.history = RunHistory(self.path)
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def _record_run(self, r2, mse, duration, fingerprint='data',
+                    settings=None):
+        """Record a finished run with one model and one stage."""
+        self.history.start_run(fingerprint, 'data.csv', 100, 5,
+                               settings or {'n_folds': 3})
+        self.history.record_metrics([{'Model': 'LGBM', 'R2-Score': r2,
+                                      'MSE': mse}])
+        self.history.record_stage('tuning', duration)
+        self.history.finish_run()
+        return self.history.run_id
+
+    def test_schema(self):
+        """Test that the tables and indexes are created."""
+        with sqlite3.connect(self.path) as connection:
+            names = {row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master")}
+        self.assertTrue({'runs', 'metrics', 'params', 'tuning',
+                         'stages', 'metrics_model_metric',
+                         'runs_fingerprint'} <= names)
+        # Opening an existing history keeps its runs
+        self._record_run(0.9, 10.0, 1.0)
+        self.assertEqual(len(RunHistory(self.path).runs()), 1)
+
+    def test_runs_and_trend(self):
+        """Test the runs and the trend of a metric, oldest first."""
+        first = self._record_run(0.8, 10.0, 1.0)
+        second = self._record_run(0.9, 8.0, 1.0)
+        runs = self.history.runs()
+        self.assertEqual(runs['run_id'].tolist(), [first, second])
+        self.assertTrue(runs['finished_at'].notna().all())
+        self.assertEqual(runs['n_rows'].tolist(), [100, 100])
+        trend = self.history.metric_trend('LGBM')
+        self.assertEqual(trend['value'].tolist(), [0.8, 0.9])
+        self.assertEqual(
+            self.history.metric_trend('LGBM', 'MSE', last=1)['value']
+            .tolist(), [8.0])
+
+    def test_stages(self):
+        """Test the stage context manager and the slowest stages."""
+        self.history.start_run()
+        with self.history.stage('load_data'):
+            pass
+        with self.assertRaises(RuntimeError):
+            with self.history.stage('tuning'):
+                raise RuntimeError
+        self.history.record_stage('evaluation', 5.0)
+        slowest = self.history.slowest_stages()
+        self.assertEqual(slowest['stage'].iloc[0], 'evaluation')
+        self.assertEqual(set(slowest['stage']),
+                         {'load_data', 'tuning', 'evaluation'})
+
+    def test_params_and_tuning(self):
+        """Test recording best parameters and tuning timings."""
+        self.history.start_run()
+        self.history.record_params({'LGBM': {'num_leaves': 31}})
+        cv_results = {
+            'params': [{'a': 1}, {'a': 2}],
+            'split0_test_score': np.array([-1.0, -2.0]),
+            'split1_test_score': np.array([-1.0, -2.0]),
+            'mean_fit_time': np.array([0.5, 1.0]),
+            'mean_test_score': np.array([-1.0, -2.0]),
+            'n_folds_evaluated': np.array([2, 1]),
+        }
+        self.history.record_tuning(
+            {'LGBM': cv_results, 'SVR': None},
+            {'LGBM': {'n_candidates': 4, 'search_time': 3.0}})
+        tuning = self.history._query("SELECT * FROM tuning")
+        self.assertEqual(len(tuning), 1)
+        row = tuning.iloc[0]
+        self.assertEqual(row['n_candidates'], 4)
+        self.assertEqual(row['n_evaluated'], 2)
+        self.assertAlmostEqual(row['fit_time'], 2.0)
+        self.assertAlmostEqual(row['best_score'], -1.0)
+        self.assertIsNone(row['max_peak_memory'])
+        params = self.history._query("SELECT * FROM params")
+        self.assertEqual(params['params'].iloc[0], '{"num_leaves": 31}')
+
+    def test_regressions(self):
+        """Test that only worse runs on the same data are reported."""
+        self._record_run(0.90, 10.0, 1.0)
+        self._record_run(0.91, 10.0, 1.2)
+        self.assertTrue(self.history.regressions().empty)
+        self._record_run(0.91, 10.1, 1.1)
+        self.assertTrue(self.history.regressions().empty)
+
+        self._record_run(0.80, 12.0, 3.0)
+        regressions = self.history.regressions()
+        self.assertEqual(
+            set(zip(regressions['kind'], regressions['measure'])),
+            {('metric', 'R2-Score'), ('metric', 'MSE'),
+             ('stage', 'duration')})
+
+        # A run on other data, or with other settings, has nothing to be
+        # compared with
+        self._record_run(0.10, 99.0, 9.0, fingerprint='other')
+        self.assertTrue(self.history.regressions().empty)
+        self._record_run(0.10, 99.0, 9.0, settings={'racing': True})
+        self.assertTrue(self.history.regressions().empty)
+
+    def test_restored_searches(self):
+        """Test that searches restored from a checkpoint record no
+        timings and leave the tuning stage out of the comparison."""
+        cv_results = {'params': [{}], 'split0_test_score': np.array([-1.0]),
+                      'mean_fit_time': np.array([0.5]),
+                      'mean_test_score': np.array([-1.0])}
+        for duration in (10.0, 11.0, 0.1, 10.5):
+            self._record_run(0.9, 10.0, duration)
+            self.history.record_tuning(
+                {'LGBM': cv_results},
+                {'LGBM': {'search_time': duration,
+                          'restored': duration < 1}})
+        tuning = self.history._query("SELECT * FROM tuning")
+        self.assertEqual(tuning['restored'].tolist(), [0, 0, 1, 0])
+        self.assertTrue(np.isnan(tuning['search_time'][2]))
+        self.assertTrue(np.isnan(tuning['fit_time'][2]))
+        # Without the restored run the median is 10.5, not 10.0
+        self.assertTrue(self.history.regressions(time_tolerance=0.01)
+                        .empty)
+        regressions = self.history.regressions(
+            self.history.runs()['run_id'].iloc[2], time_tolerance=0.01)
+        self.assertTrue(regressions.empty)
+
+    def test_file_fingerprint(self):
+        """Test that the fingerprint changes with the files."""
+        path = os.path.join(self.temp_dir, 'data.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('a,b\n1,2\n')
+        fingerprint = file_fingerprint([path])
+        self.assertEqual(file_fingerprint([path]), fingerprint)
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write('3,4\n')
+        self.assertNotEqual(file_fingerprint([path]), fingerprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Unit tests for segmented_training module.
+
+This module contains tests to ensure the correct functionality
+of planning, scheduling and summarizing per-segment training jobs.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from modules.segmented_training import (
+    POOLED_SEGMENT, plan_segments, run_segment_jobs, segment_metrics_table,
+    segment_plan_table
+)
+
+
+class SegmentLibraryError(Exception):
+    """Stand-in for an error of a native library such as LightGBM."""
+
+
+def mean_target_job(name, data, scale=1):
+    """Return one metrics row with the scaled mean of a segment."""
+    if name == 'fail':
+        raise ValueError("segment failed")
+    if name == 'library_error':
+        raise SegmentLibraryError("native library failed")
+    return [{'Model': 'Mean', 'Value': data['y'].mean() * scale,
+             'n_rows': len(data)}]
+
+
+class TestSegmentedTraining(unittest.TestCase):
+    """
+    Test case for the segmented_training module.
+
+    This class contains various test methods to ensure
+    the correct functionality of the segment plan, the
+    process pool scheduling and the metrics table.
+    """
+
+    def setUp(self):
+        """Set up segment keys of different sizes."""
+        self.keys = np.array(['a'] * 10 + ['b'] * 30 + ['c'] * 3 +
+                             ['d'] * 4 + ['e'] * 20)
+
+    def test_plan_orders_largest_first(self):
+        """Test that segments are ordered by decreasing size."""
+        segments, skipped = plan_segments(self.keys, min_segment_size=10)
+        self.assertEqual([name for name, _ in segments],
+                         ['b', 'e', 'a'])
+        self.assertEqual(skipped, {'c': 3, 'd': 4})
+        np.testing.assert_array_equal(segments[2][1], np.arange(10))
+
+    def test_small_segments_are_pooled(self):
+        """Test that small segments are pooled once large enough."""
+        segments, skipped = plan_segments(self.keys, min_segment_size=5)
+        names = [name for name, _ in segments]
+        self.assertIn(POOLED_SEGMENT, names)
+        self.assertEqual(skipped, {})
+        pooled = dict(segments)[POOLED_SEGMENT]
+        self.assertEqual(sorted(set(self.keys[pooled])), ['c', 'd'])
+        plan = segment_plan_table(segments, skipped, self.keys)
+        self.assertEqual(
+            plan.loc[plan['Status'] == 'pooled', 'Segment'].tolist(),
+            ['c', 'd'])
+        self.assertEqual(plan['n_rows'][plan['Status'] != 'trained'].sum(),
+                         7)
+
+    def test_small_segments_can_be_skipped(self):
+        """Test that small segments are skipped without pooling."""
+        segments, skipped = plan_segments(self.keys, min_segment_size=5,
+                                          pool_small=False)
+        self.assertNotIn(POOLED_SEGMENT, dict(segments))
+        self.assertEqual(skipped, {'c': 3, 'd': 4})
+
+    def test_run_segment_jobs(self):
+        """Test jobs in a process pool and in the calling process."""
+        data = pd.DataFrame({'y': np.arange(len(self.keys), dtype=float)})
+        segments, _ = plan_segments(self.keys, min_segment_size=10)
+        segment_data = [(name, data.iloc[indices])
+                        for name, indices in segments]
+        segment_data += [('fail', data), ('library_error', data)]
+        for n_jobs in (1, 2):
+            results = run_segment_jobs(mean_target_job, segment_data,
+                                       n_jobs, scale=2)
+            self.assertEqual(list(results),
+                             ['b', 'e', 'a', 'fail', 'library_error'])
+            self.assertIsNone(results['fail'])
+            self.assertIsNone(results['library_error'])
+            self.assertAlmostEqual(results['a'][0]['Value'], 9.0)
+
+            metrics = segment_metrics_table(results)
+            self.assertEqual(metrics['Segment'].tolist(), ['b', 'e', 'a'])
+            self.assertEqual(metrics['n_rows'].tolist(), [30, 20, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
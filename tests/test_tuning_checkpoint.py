@@ -0,0 +1,200 @@
+"""
+Unit tests for tuning_checkpoint module.
+
+This module contains tests to ensure that searches save every
+(candidate, fold) result, resume an interrupted run from them
+and skip models whose search already completed.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from lightgbm import LGBMRegressor
+from sklearn.datasets import make_regression
+from sklearn.model_selection import ParameterGrid
+from sklearn.tree import DecisionTreeRegressor
+from modules import candidate_search
+from modules.binned_dataset_search import BinnedDatasetSearchCV
+from modules.candidate_search import CandidateSearchCV
+from modules.hyperparameter_tuning import hyperparameter_tuning
+from modules.tuning_checkpoint import (
+    SearchCheckpoint, candidate_key, search_key
+)
+
+
+class TestTuningCheckpoint(unittest.TestCase):
+    """
+    Test case for the tuning_checkpoint module.
+
+    This class contains various test methods to ensure
+    interrupted searches resume with identical results and
+    completed ones are skipped.
+    """
+
+    def setUp(self):
+        """Set up test data and temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.x, self.y = make_regression(
+            n_samples=150, n_features=5, noise=0.1, random_state=42)[:2]
+        self.model = DecisionTreeRegressor(random_state=0)
+        self.grid = {'max_depth': [2, 4, None], 'min_samples_leaf': [1, 5]}
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def _checkpoint(self, model=None):
+        """Open the checkpoint of the test search."""
+        return SearchCheckpoint.for_search(self.temp_dir, 'DecisionTree',
+                                           model or self.model, self.x,
+                                           self.y, 3)
+
+    def test_keys(self):
+        """Test that the keys identify the search and the candidate."""
+        self.assertEqual(candidate_key({'a': 1, 'b': None}),
+                         candidate_key({'b': None, 'a': 1}))
+        self.assertNotEqual(candidate_key({'a': 1}), candidate_key({'a': 2}))
+        key = search_key(self.model, self.x, self.y, 3)
+        self.assertEqual(key, search_key(DecisionTreeRegressor(
+            random_state=0), self.x.copy(), self.y, 3))
+        self.assertNotEqual(key, search_key(self.model, self.x, self.y, 5))
+        self.assertNotEqual(key, search_key(self.model, self.x,
+                                            self.y + 1, 3))
+
+    def test_old_searches_removed(self):
+        """Test that a model keeps its most recently used searches."""
+        directories = []
+        for offset in range(4):
+            checkpoint = SearchCheckpoint.for_search(
+                self.temp_dir, 'DecisionTree', self.model, self.x,
+                self.y + offset, 3, max_searches=2)
+            os.utime(checkpoint.directory, (offset, offset))
+            directories.append(checkpoint.directory)
+        model_dir = os.path.join(self.temp_dir, 'DecisionTree')
+        self.assertEqual(sorted(os.listdir(model_dir)),
+                         sorted(os.path.basename(directory)
+                                for directory in directories[2:]))
+        # Reopening a search marks it as recently used
+        SearchCheckpoint.for_search(self.temp_dir, 'DecisionTree',
+                                    self.model, self.x, self.y + 2, 3,
+                                    max_searches=1)
+        self.assertEqual(os.listdir(model_dir),
+                         [os.path.basename(directories[2])])
+        with self.assertRaises(ValueError):
+            SearchCheckpoint.for_search(self.temp_dir, 'DecisionTree',
+                                        self.model, self.x, self.y, 3,
+                                        max_searches=0)
+
+    def test_result_round_trip(self):
+        """Test that saved results are read back."""
+        checkpoint = self._checkpoint()
+        self.assertIsNone(checkpoint.load_result({'max_depth': 2}, 0))
+        checkpoint.save_result({'max_depth': 2}, 0, (-1.5, 0.1, 0.01,
+                                                     np.nan))
+        result = checkpoint.load_result({'max_depth': 2}, 0)
+        self.assertEqual(result[:3], (-1.5, 0.1, 0.01))
+        self.assertTrue(np.isnan(result[3]))
+        self.assertEqual(checkpoint.n_results(), 1)
+        leftovers = [name for name in os.listdir(os.path.join(
+            checkpoint.directory, 'results')) if name.endswith('.tmp')]
+        self.assertEqual(leftovers, [])
+
+    def test_resume_interrupted_search(self):
+        """Test that an interrupted search resumes where it stopped."""
+        reference = CandidateSearchCV(self.model, self.grid).fit(self.x,
+                                                                 self.y)
+        fit_and_score = candidate_search._fit_and_score
+        calls = []
+        limit = [8]
+
+        def interrupted(*args):
+            if len(calls) == limit[0]:
+                raise MemoryError("Killed")
+            calls.append(args)
+            return fit_and_score(*args)
+
+        with patch.object(candidate_search, '_fit_and_score', interrupted):
+            with self.assertRaises(MemoryError):
+                CandidateSearchCV(self.model, self.grid,
+                                  checkpoint=self._checkpoint()).fit(
+                                      self.x, self.y)
+        self.assertEqual(self._checkpoint().n_results(), 8)
+
+        calls.clear()
+        limit[0] = None
+        with patch.object(candidate_search, '_fit_and_score', interrupted):
+            search = CandidateSearchCV(
+                self.model, self.grid,
+                checkpoint=self._checkpoint()).fit(self.x, self.y)
+        self.assertEqual(len(calls), 18 - 8)
+        np.testing.assert_allclose(search.cv_results_['mean_test_score'],
+                                   reference.cv_results_['mean_test_score'])
+        self.assertEqual(search.best_params_, reference.best_params_)
+
+    def test_binned_search_checkpoint(self):
+        """Test that the binned search saves and reuses its results."""
+        model = LGBMRegressor(n_estimators=10, verbose=-1)
+        grid = {'num_leaves': [4, 8]}
+        checkpoint = self._checkpoint(model)
+        first = BinnedDatasetSearchCV(model, grid,
+                                      checkpoint=checkpoint).fit(self.x,
+                                                                 self.y)
+        self.assertEqual(checkpoint.n_results(), 6)
+        with patch('lightgbm.train') as mock_train:
+            second = BinnedDatasetSearchCV(model, grid,
+                                           checkpoint=checkpoint)
+            second._evaluate_fold = mock_train
+            second.fit(self.x, self.y)
+            mock_train.assert_not_called()
+        np.testing.assert_allclose(second.cv_results_['mean_test_score'],
+                                   first.cv_results_['mean_test_score'])
+
+    def test_budgeted_search_extended(self):
+        """Test that a search stopped by its budget is resumed later."""
+        models = [('DecisionTree', self.model)]
+        _, _, coverage = hyperparameter_tuning(
+            models, [self.grid], self.x, self.y,
+            checkpoint_dir=self.temp_dir, model_time_budget=0,
+            return_coverage=True)
+        self.assertEqual(coverage['DecisionTree']['n_evaluated'], 4)
+        self.assertIsNone(self._checkpoint().load_finished(
+            list(ParameterGrid(self.grid))))
+        self.assertEqual(self._checkpoint().n_results(), 12)
+
+        _, _, coverage = hyperparameter_tuning(
+            models, [self.grid], self.x, self.y,
+            checkpoint_dir=self.temp_dir, return_coverage=True)
+        self.assertTrue(coverage['DecisionTree']['complete'])
+        self.assertIsNotNone(self._checkpoint().load_finished(
+            list(ParameterGrid(self.grid))))
+
+    def test_finished_models_skipped(self):
+        """Test that completed searches are not run again."""
+        models = [('DecisionTree', self.model)]
+        first_models, first_params = hyperparameter_tuning(
+            models, [self.grid], self.x, self.y,
+            checkpoint_dir=self.temp_dir)
+        with patch.object(CandidateSearchCV, 'fit') as mock_fit:
+            best_models, best_params = hyperparameter_tuning(
+                models, [self.grid], self.x, self.y,
+                checkpoint_dir=self.temp_dir)
+            mock_fit.assert_not_called()
+        self.assertEqual(best_params, first_params)
+        np.testing.assert_allclose(
+            best_models['DecisionTree'].predict(self.x),
+            first_models['DecisionTree'].predict(self.x))
+
+        # A changed grid reuses the saved results but is searched again
+        grid = {**self.grid, 'max_depth': [2, 4, 6]}
+        with patch.object(candidate_search, '_fit_and_score',
+                          wraps=candidate_search._fit_and_score) as mock:
+            hyperparameter_tuning(models, [grid], self.x, self.y,
+                                  checkpoint_dir=self.temp_dir, n_jobs=1)
+            self.assertEqual(mock.call_count, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Unit tests for tuning_performance module.
+
+This module contains tests to ensure the correct functionality
+of the per-candidate performance table and of the accuracy
+versus cost summaries.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from modules.tuning_performance import (
+    coverage_table, parameter_costs, performance_table,
+    save_tuning_performance, summarize_cost_accuracy
+)
+
+
+class TestTuningPerformance(unittest.TestCase):
+    """
+    Test case for the tuning_performance module.
+
+    This class contains various test methods to ensure
+    the correct functionality of the performance table,
+    the Pareto front and the summaries.
+    """
+
+    def setUp(self):
+        """Set up search results of two models."""
+        self.cv_results = {
+            'DecisionTree': {
+                'params': [{'max_depth': None}, {'max_depth': 3},
+                           {'max_depth': 10}],
+                'mean_fit_time': np.array([3.0, 1.0, 2.0]),
+                'std_fit_time': np.zeros(3),
+                'mean_score_time': np.array([0.5, 0.1, 0.2]),
+                'std_score_time': np.zeros(3),
+                'max_peak_memory': np.array([300.0, 100.0, 200.0]),
+                'param_max_depth': np.array([None, 3, 10], dtype=object),
+                'split0_test_score': np.array([-1.0, -2.0, -1.05]),
+                'split1_test_score': np.array([-1.2, -2.2, -1.15]),
+                'mean_test_score': np.array([-1.1, -2.1, -1.1]),
+                'std_test_score': np.array([0.1, 0.1, 0.05]),
+                'rank_test_score': np.array([1, 3, 2]),
+            },
+            'Broken': None,
+        }
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_performance_table(self):
+        """Test the rows, columns and Pareto flags of the table."""
+        table = performance_table(self.cv_results)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(list(table.columns[:3]),
+                         ['model', 'params', 'param_max_depth'])
+        np.testing.assert_allclose(table['total_time'], [3.5, 1.1, 2.2])
+        self.assertEqual(table['peak_memory'].tolist(), [300, 100, 200])
+        # The slowest candidate is dominated by max_depth=10
+        self.assertEqual(table['pareto_optimal'].tolist(),
+                         [False, True, True])
+        self.assertEqual(json.loads(table['params'][0]),
+                         {'max_depth': None})
+
+    def test_no_results(self):
+        """Test that a table without results raises a ValueError."""
+        with self.assertRaises(ValueError):
+            performance_table({'Broken': None})
+
+    def test_summary(self):
+        """Test the fastest candidate about as good as the best."""
+        summary = summarize_cost_accuracy(performance_table(self.cv_results))
+        row = summary.iloc[0]
+        self.assertEqual(row['n_candidates'], 3)
+        self.assertAlmostEqual(row['tuning_time'], 2 * (3.5 + 1.1 + 2.2))
+        self.assertEqual(json.loads(row['fastest_close_params']),
+                         {'max_depth': 10})
+        self.assertAlmostEqual(row['speedup'], 3.5 / 2.2)
+
+    def test_reused_candidates(self):
+        """Test that candidates reusing the fits of equivalent ones count
+        towards the tuning time but not the per-candidate costs."""
+        results = self.cv_results['DecisionTree']
+        results['mean_fit_time'][2] = 0.0
+        results['mean_score_time'][2] = 0.0
+        results['n_reused_folds'] = np.array([0, 0, 2])
+        table = performance_table(self.cv_results)
+        self.assertEqual(table['pareto_optimal'].tolist(),
+                         [True, True, False])
+        row = summarize_cost_accuracy(table).iloc[0]
+        self.assertAlmostEqual(row['tuning_time'], 2 * (3.5 + 1.1))
+        self.assertEqual(json.loads(row['fastest_close_params']),
+                         {'max_depth': None})
+        costs = parameter_costs(table).set_index('value')
+        self.assertTrue(np.isnan(costs.loc['10', 'total_time']))
+        self.assertAlmostEqual(costs.loc['3', 'total_time'], 1.1)
+
+    def test_parameter_costs(self):
+        """Test that None values are kept as their own value."""
+        costs = parameter_costs(performance_table(self.cv_results))
+        self.assertEqual(costs['value'].tolist(), ['None', '10', '3'])
+        self.assertEqual(costs['n_candidates'].tolist(), [1, 1, 1])
+
+    def test_save_tuning_performance(self):
+        """Test that the table and summaries are written and readable."""
+        save_tuning_performance(self.cv_results, self.temp_dir)
+        for name in ['tuning_performance.csv', 'tuning_summary.csv',
+                     'tuning_parameter_costs.csv']:
+            self.assertTrue(os.path.isfile(os.path.join(self.temp_dir,
+                                                        name)))
+        table = pd.read_csv(os.path.join(self.temp_dir,
+                                         'tuning_performance.csv'))
+        summary = summarize_cost_accuracy(table)
+        self.assertEqual(summary['model'].tolist(), ['DecisionTree'])
+
+    def test_coverage_table(self):
+        """Test that the coverage of each tuned model is tabulated."""
+        coverage = {'DecisionTree': {'n_candidates': 8, 'n_evaluated': 4,
+                                     'coverage': 0.5, 'search_time': 2.5,
+                                     'time_budget': 2.0, 'complete': False},
+                    'Broken': None}
+        table = coverage_table(coverage)
+        self.assertEqual(table['model'].tolist(), ['DecisionTree'])
+        self.assertEqual(table.loc[0, 'n_evaluated'], 4)
+        self.assertFalse(table.loc[0, 'complete'])
+        self.assertEqual(len(coverage_table({})), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
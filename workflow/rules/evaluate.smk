@@ -1,11 +1,12 @@
 rule evaluate:
     input:
-        "data/preprocessed_data.csv"
+        data="data/preprocessed_data.csv",
+        encoding="data/preprocessed_data_encoding.json"
     output:
         "results/evaluation_model/metrics.csv"
     params:
         output_dir="results/evaluation_model"
     shell:
         """
-        python workflow/scripts/evaluate_models.py {input} {params.output_dir}
+        python workflow/scripts/evaluate_models.py {input.data} {params.output_dir} --encoding_file {input.encoding}
         """
@@ -2,10 +2,12 @@ rule preprocess:
     input:
         "data/train.csv"
     output:
-        "data/preprocessed_data.csv"
+        data="data/preprocessed_data.csv",
+        encoding="data/preprocessed_data_encoding.json",
+        state="data/preprocessed_data_state.json"
     params:
         output_dir="results/plot_preprocessing"
     shell:
         """
-        python workflow/scripts/preprocess_data.py {input} {output} {params.output_dir}
+        python workflow/scripts/preprocess_data.py {input} {output.data} {params.output_dir} --encoding_file {output.encoding} --state_file {output.state}
         """
@@ -16,19 +16,28 @@ sys.path.append(
 
 from modules.plot_boxplot import plot_boxplot
 from modules.plot_heatmaps import plot_heatmaps
+from modules.figure_cache import FigureCache
+from modules.load_data import infer_columns, load_data
 
 
-def analyze_data(input_file, output_dir, selected_column):
+def analyze_data(input_file, output_dir, selected_column,
+                 figure_cache=None):
     """
     Analyze data by generating a boxplot and heatmap.
     Args:
-        input_file (str): Path to the CSV file containing the data.
+        input_file (str): Path to the CSV file containing the data, a
+            directory of partitions or a glob pattern.
         output_dir (str): Directory where the analysis results will be saved.
         selected_column (str): Column to be used
         for the boxplot against SalePrice.
+        figure_cache (str): Directory of a cache of rendered figures;
+            plots whose data did not change are not rendered again.
     """
     try:
-        data = pd.read_csv(input_file)
+        # Only the columns of the boxplot and the heatmap are parsed
+        numeric_columns = infer_columns(input_file, include='number')
+        data = load_data(input_file, columns=set(
+            numeric_columns + [selected_column, 'SalePrice']))
     except pd.errors.EmptyDataError as e:
         print(f"Error reading {input_file}: {e}")
         return
@@ -38,9 +47,11 @@ def analyze_data(input_file, output_dir, selected_column):
 
     # Analysis step: Generate boxplot with
     # the specified column against 'SalePrice'
-    plot_boxplot(data, selected_column, 'SalePrice', output_dir)
+    cache = FigureCache(figure_cache) if figure_cache else None
+    plot_boxplot(data, selected_column, 'SalePrice', output_dir,
+                 cache=cache)
     # Heatmap by calling data from modules
-    plot_heatmaps(data, output_dir)
+    plot_heatmaps(data, output_dir, cache=cache)
 
     try:
         with open(os.path.join(output_dir, 'analysis_complete.txt'),
@@ -54,11 +65,15 @@ def analyze_data(input_file, output_dir, selected_column):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Analyze house pricing data.")
     parser.add_argument("input_file", type=str,
-                        help="Path to the input CSV file.")
+                        help="Path to the input CSV file, a directory of "
+                        "partitions or a glob pattern.")
     parser.add_argument("output_dir", type=str,
                         help="Directory to save the analysis results.")
     parser.add_argument("selected_column", type=str,
                         help="Name of the column to plot against SalePrice.")
+    parser.add_argument("--figure_cache", type=str, default=None,
+                        help="Directory of a cache of rendered figures.")
     args = parser.parse_args()
 
-    analyze_data(args.input_file, args.output_dir, args.selected_column)
+    analyze_data(args.input_file, args.output_dir, args.selected_column,
+                 args.figure_cache)
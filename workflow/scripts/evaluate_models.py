@@ -5,13 +5,16 @@ hyperameter tuning to find the best params
 and best model to fit the data.
 """
 import argparse
+import contextlib
 import logging
 import os
 import sys
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
 from sklearn.tree import DecisionTreeRegressor
 from xgboost import XGBRegressor
 from lightgbm import LGBMRegressor
@@ -24,7 +27,43 @@ sys.path.append(
             '../..')))
 
 from modules.hyperparameter_tuning import hyperparameter_tuning
-from modules.model_evaluation import model_evaluation
+from modules.bayesian_search import Integer, Real
+from modules.model_evaluation import (
+    model_evaluation, stream_model_evaluation
+)
+from modules.encode_categorical_columns import (
+    categorical_feature_indices, load_encoding, make_sparse_one_hot_encoder
+)
+from modules.artifact_store import ArtifactStore
+from modules.flat_tree_ensemble import (
+    FlatTreeEnsemble, compile_tree_ensemble, supports_compilation
+)
+from modules.tuning_performance import (
+    COVERAGE_FILE, coverage_table, save_tuning_performance
+)
+from modules.load_data import load_data, parse_filters, resolve_partitions
+from modules.bootstrap_metrics import save_bootstrap_intervals
+from modules.feature_matrix_store import FeatureMatrixStore
+from modules.feature_pruning import (
+    CORRELATION_THRESHOLD, KEPT, MIN_MUTUAL_INFO, prune_features,
+    save_kept_features
+)
+from modules.model_refresh import (
+    ACTION_RETUNE, DRIFT_THRESHOLD, holdout_mse, refresh_model,
+    relative_drift
+)
+from modules.segmented_training import (
+    plan_segments, run_segment_jobs, segment_metrics_table,
+    segment_plan_table
+)
+from modules.out_of_core_training import (
+    iter_csv_chunks, split_csv_by_hash, train_lgbm_from_csv,
+    train_xgb_from_csv
+)
+from modules.normal_equation_regression import (
+    NormalEquationRegressor, fit_normal_equations_from_csv
+)
+from modules.run_history import RUN_HISTORY_FILE, RunHistory, file_fingerprint
 
 
 # Set up logging
@@ -67,15 +106,134 @@ def get_param_grids():
     }
 
 
-def evaluate_models(input_file, output_dir):
+def get_search_spaces():
+    """
+    Return a dictionary of models and the ranges of their
+    hyperparameters for the model-based search.
+
+    The ranges contain the values of get_param_grids, but are searched
+    at a finer resolution; ranges of learning rates and counts are
+    searched on a log scale.
+
+    Returns:
+        dict: A dictionary where keys are model names and values map
+        parameter names to Real or Integer ranges.
+    """
+    return {
+        'MultipleLinearRegression': {},
+        'RandomForest': {
+            'n_estimators': Integer(50, 400, log=True),
+            'max_depth': Integer(5, 40),
+            'min_samples_split': Integer(2, 20),
+            'min_samples_leaf': Integer(1, 8)
+        },
+        'LGBM': {
+            'num_leaves': Integer(8, 128, log=True),
+            'learning_rate': Real(0.005, 0.3, log=True),
+            'n_estimators': Integer(50, 600, log=True)
+        },
+        'DecisionTree': {
+            'max_depth': Integer(3, 30),
+            'min_samples_split': Integer(2, 20),
+            'min_samples_leaf': Integer(1, 10)
+        },
+        'XGB': {
+            'n_estimators': Integer(50, 600, log=True),
+            'learning_rate': Real(0.005, 0.3, log=True),
+            'max_depth': Integer(2, 8)
+        }
+    }
+
+
+def evaluate_models(input_file, output_dir, encoding_file=None,
+                    out_of_core=False, chunksize=100_000,
+                    compile_trees=False, artifact_store=None,
+                    n_bootstrap=None, filters=None, union_schema=False,
+                    segment_column=None, min_segment_size=50,
+                    pool_small_segments=True, n_jobs=None, prune=False,
+                    correlation_threshold=CORRELATION_THRESHOLD,
+                    min_mutual_info=MIN_MUTUAL_INFO, time_budget=None,
+                    model_time_budget=None, racing=False, search='grid',
+                    n_iter=30, trial_history=None, run_history=None,
+                    normal_equations=False, checkpoint_dir=None,
+                    dataset_cache_dir=None):
     """
     Evaluate models using the provided dataset and save the results.
 
     Args:
-        input_file (str): Path to the input CSV file.
+        input_file (str): Path to the input CSV file, a directory of
+            partitions or a glob pattern.
         output_dir (str): Directory to save the evaluation results.
+        encoding_file (str): Path to the categorical encoding written by
+            the preprocessing step. Defaults to the JSON file next to
+            input_file; without it all columns are treated as numerical.
+        out_of_core (bool): Train without loading the data into memory,
+            see evaluate_models_out_of_core.
+        chunksize (int): Number of rows read at a time when out_of_core.
+        compile_trees (bool): Score the tree models with their compiled
+            flat-array form, see compile_best_models.
+        artifact_store (str): Directory of an artifact store to save the
+            tuned models and preprocessing state in, see save_artifacts.
+        n_bootstrap (int): Number of bootstrap replicates for the
+            confidence intervals of the metrics; 0 disables them.
+            Defaults to 1000 in memory and to 0 out of core, where the
+            intervals need every test prediction in memory.
+        filters (dict): Column names and the list of accepted values;
+            filters on partition columns skip whole partitions.
+        union_schema (bool): Whether partitions may have different
+            columns.
+        segment_column (str): Column such as Neighborhood or Bundesland
+            to train one model set per value of, see
+            evaluate_models_by_segment.
+        min_segment_size (int): Segments with fewer rows are pooled or
+            skipped.
+        pool_small_segments (bool): Whether to train the small segments
+            together instead of skipping them.
+        n_jobs (int): Number of worker processes training segments.
+        prune (bool): Drop redundant and uninformative features before
+            tuning, see prune_data.
+        correlation_threshold (float): Absolute correlation above which
+            a feature duplicates a more informative one when pruning.
+        min_mutual_info (float): Mutual information with the target a
+            feature must exceed to be kept when pruning.
+        time_budget (float): Wall-clock seconds for tuning all models;
+            the searches stop early and keep the best candidate found,
+            and the coverage is saved to tuning_coverage.csv. Not used
+            for segments.
+        model_time_budget (float): Wall-clock seconds for tuning each
+            model.
+        racing (bool): Evaluate the folds one at a time and drop
+            candidates and models that are statistically worse than the
+            leader. Not used for segments.
+        search (str): 'grid' to search get_param_grids, or 'bayes' for a
+            model-based search of get_search_spaces. Not used for
+            segments.
+        n_iter (int): Number of candidates per model of the 'bayes'
+            search.
+        trial_history (str): Trial history the 'bayes' search
+            warm-starts from and appends to. If None, no trials are
+            recorded.
+        run_history (str): SQLite run history the data fingerprint,
+            settings, stage durations, metrics, best parameters and
+            tuning timings of the run are added to, see run_history;
+            run_history.sqlite in the parent directory of output_dir by
+            default, so that cleaning the results keeps it. Segment
+            runs only record their stage durations.
+        normal_equations (bool): Fit MultipleLinearRegression from
+            streamed normal equations instead of LinearRegression, see
+            get_models. Always used out of core.
+        checkpoint_dir (str): Directory of the search checkpoints that
+            an interrupted run resumes from, see tuning_checkpoint;
+            segments use a subdirectory per segment. If None, nothing
+            is saved.
+        dataset_cache_dir (str): Directory where binned LightGBM
+            datasets are cached between runs, see
+            binned_dataset_search. If None, they are only reused within
+            the run. Not used for segments.
     """
-    if not os.path.isfile(input_file):
+    try:
+        partitions = resolve_partitions(input_file)
+    except FileNotFoundError:
         logging.error("Input file '%s' does not exist.", input_file)
         return
 
@@ -83,59 +241,742 @@ def evaluate_models(input_file, output_dir):
         os.makedirs(output_dir)
         logging.info("Created output directory '%s'.", output_dir)
 
-    data = pd.read_csv(input_file)
-    logging.info("Loaded data from '%s' with shape '%s'.",
-                 input_file, data.shape)
+    history = RunHistory(run_history or os.path.join(
+        os.path.dirname(os.path.abspath(output_dir)), RUN_HISTORY_FILE))
+    history.start_run(input_file=input_file, settings={
+        'out_of_core': out_of_core, 'compile_trees': compile_trees,
+        'filters': filters, 'segment_column': segment_column,
+        'prune': prune, 'time_budget': time_budget,
+        'model_time_budget': model_time_budget, 'racing': racing,
+        'search': search, 'n_iter': n_iter,
+        'normal_equations': normal_equations})
+    if out_of_core:
+        evaluate_models_out_of_core(input_file, output_dir, encoding_file,
+                                    chunksize, n_bootstrap or 0, filters,
+                                    union_schema, history)
+        return
 
-    x_train, x_test, y_train, y_test = split_data(data)
-    models = get_models()
-    param_grids = get_param_grids()
-    best_models, best_params = hyperparameter_tuning(
-        models, [param_grids[name] for name, _ in models], x_train, y_train)
+    with history.stage('load_data'):
+        data = load_data(input_file, filters, union_schema)
+    logging.info("Loaded data from '%s' (%d file(s)) with shape '%s'.",
+                 input_file, len(partitions), data.shape)
+
+    encoding = read_encoding(input_file, encoding_file)
+    if segment_column:
+        with history.stage('segments'):
+            evaluate_models_by_segment(data, output_dir, segment_column,
+                                       encoding, min_segment_size,
+                                       pool_small_segments, n_jobs,
+                                       normal_equations, checkpoint_dir)
+        history.finish_run()
+        return
+    if prune:
+        with history.stage('prune_features'):
+            data, encoding = prune_data(data, output_dir, encoding,
+                                        correlation_threshold,
+                                        min_mutual_info)
+    feature_columns = data.columns[:-1].tolist()
+
+    store_dir = os.path.join(output_dir, 'feature_matrix')
+    with history.stage('split_data'):
+        x_train, x_test, y_train, y_test = split_data(data, store_dir)
+    history.set_data(FeatureMatrixStore(store_dir).manifest()['fingerprint'],
+                     len(data), len(feature_columns))
+    del data  # Tuning and evaluation read the memory-mapped matrices
+    models = get_models(feature_columns, encoding, normal_equations)
+    param_grids = (get_search_spaces() if search == 'bayes'
+                   else get_param_grids())
+    fit_params = get_fit_params(feature_columns, encoding)
+    with history.stage('tuning'):
+        best_models, best_params, cv_results, coverage = \
+            hyperparameter_tuning(
+                models, [param_grids[name] for name, _ in models], x_train,
+                y_train, [fit_params.get(name, {}) for name, _ in models],
+                dataset_cache_dir=dataset_cache_dir, return_cv_results=True,
+                checkpoint_dir=checkpoint_dir, time_budget=time_budget,
+                model_time_budget=model_time_budget, return_coverage=True,
+                racing=racing, search=search, n_iter=n_iter,
+                trial_history=trial_history, feature_columns=feature_columns)
 
     log_best_params(best_params)
-    metrics_list = evaluate_and_save_models(
-        best_models, x_test, y_test, output_dir)
+    with history.stage('evaluation'):
+        scored_models = (compile_best_models(best_models, output_dir)
+                         if compile_trees else best_models)
+        metrics_list, predictions = evaluate_and_save_models(
+            scored_models, x_test, y_test, output_dir,
+            return_predictions=True)
     save_metrics(metrics_list, output_dir)
+    with history.stage('bootstrap'):
+        save_confidence_intervals(
+            y_test, predictions, output_dir,
+            1000 if n_bootstrap is None else n_bootstrap)
     save_best_params(best_params, output_dir)
+    save_tuning_performance(cv_results, output_dir)
+    logging.info("Saved tuning performance table and summaries to '%s'.",
+                 output_dir)
+    if time_budget is not None or model_time_budget is not None:
+        save_tuning_coverage(coverage, output_dir)
+    if artifact_store:
+        save_artifacts(artifact_store, best_models, best_params,
+                       metrics_list, feature_columns, encoding)
+    record_run(history, metrics_list, best_params, cv_results, coverage)
+
+
+def record_run(history, metrics_list, best_params, cv_results=None,
+               coverage=None):
+    """
+    Record the results of a run in the run history and log the
+    regressions against the earlier runs on the same data.
+
+    Args:
+        history (RunHistory): The run history; its current run is
+            recorded and finished.
+        metrics_list (list): A list of evaluation metrics for each model.
+        best_params (dict): The best hyperparameters of each model.
+        cv_results (dict): The cv_results_ of each model's search.
+        coverage (dict): The coverage_ of each model's search.
+    """
+    history.record_metrics(metrics_list)
+    history.record_params({name: params or {}
+                           for name, params in best_params.items()})
+    if cv_results:
+        history.record_tuning(cv_results, coverage)
+    history.finish_run()
+    logging.info("Recorded run %d in the run history '%s'.",
+                 history.run_id, history.path)
+    for row in history.regressions().itertuples():
+        logging.warning("Regression of %s '%s' %s: %.4g against a median "
+                        "of %.4g over earlier runs (%+.1f%%).", row.kind,
+                        row.name, row.measure, row.value, row.baseline,
+                        100 * row.change)
+
+
+def prune_data(data, output_dir, encoding=None,
+               correlation_threshold=CORRELATION_THRESHOLD,
+               min_mutual_info=MIN_MUTUAL_INFO):
+    """
+    Drop redundant and uninformative features before tuning.
+
+    The features are scored on the training rows of split_data only, so
+    the test rows take no part in the selection. The kept features are
+    saved to kept_features.json, the scoring-time column selection, and
+    the decision on every feature to feature_pruning.csv.
+
+    Args:
+        data (pd.DataFrame): The input data; the target is last.
+        output_dir (str): Directory to save the kept features and the
+            report in.
+        encoding (dict): Categorical encoding of the features.
+        correlation_threshold (float): Absolute correlation above which
+            a feature duplicates a more informative one.
+        min_mutual_info (float): Mutual information with the target a
+            feature must exceed.
+
+    Returns:
+        tuple: The data restricted to the kept features and the target,
+        and the encoding of the kept features.
+    """
+    encoding = encoding or {}
+    train_index, _ = train_test_split(np.arange(len(data)), test_size=0.2,
+                                      random_state=42)
+    train = data.iloc[train_index]
+    kept, report = prune_features(train.iloc[:, :-1], train.iloc[:, -1],
+                                  list(encoding), correlation_threshold,
+                                  min_mutual_info)
+    save_kept_features(kept, os.path.join(output_dir, 'kept_features.json'))
+    report.to_csv(os.path.join(output_dir, 'feature_pruning.csv'),
+                  index=False)
+    for row in report[report['status'] != KEPT].itertuples():
+        logging.info("Pruned feature '%s' (%s).", row.feature, row.status)
+    logging.info("Kept %d of %d features.", len(kept), len(report))
+    return (data[kept + [data.columns[-1]]],
+            {column: levels for column, levels in encoding.items()
+             if column in kept})
+
+
+def evaluate_models_by_segment(data, output_dir, segment_column,
+                               encoding=None, min_segment_size=50,
+                               pool_small=True, n_jobs=None,
+                               normal_equations=False, checkpoint_dir=None):
+    """
+    Tune and evaluate one model set per segment of the data.
+
+    The data is grouped by the segment column once and one job per
+    segment is scheduled on a shared process pool, largest segment
+    first. Each segment's results are saved under
+    output_dir/segments/<segment>, the plan to segments.csv and the
+    metrics of all segments to segment_metrics.csv.
+
+    Args:
+        data (pd.DataFrame): The preprocessed data; the last column is
+            the target.
+        output_dir (str): Directory to save the evaluation results.
+        segment_column (str): Column whose values define the segments.
+        encoding (dict): Categorical encoding of the features, also
+            used to name the segments of an encoded column.
+        min_segment_size (int): Segments with fewer rows are pooled or
+            skipped.
+        pool_small (bool): Whether to train the small segments together
+            instead of skipping them.
+        n_jobs (int): Number of worker processes.
+        normal_equations (bool): Fit MultipleLinearRegression from
+            normal equations, see get_models.
+        checkpoint_dir (str): Directory under which each segment's
+            search checkpoints are saved. If None, nothing is saved.
+
+    Returns:
+        pd.DataFrame: The metrics of every segment and model.
+    """
+    encoding = encoding or {}
+    keys = decode_segment_keys(data[segment_column], segment_column,
+                               encoding)
+    segments, skipped = plan_segments(keys, min_segment_size, pool_small)
+    plan = segment_plan_table(segments, skipped, keys)
+    plan.to_csv(os.path.join(output_dir, 'segments.csv'), index=False)
+    logging.info("Training %d segment(s) of '%s', skipping %d.",
+                 len(segments), segment_column, len(skipped))
+
+    results = run_segment_jobs(
+        tune_and_evaluate_segment,
+        [(name, data.iloc[indices]) for name, indices in segments],
+        n_jobs, output_dir=os.path.join(output_dir, 'segments'),
+        encoding=encoding, param_grids=get_param_grids(),
+        normal_equations=normal_equations, checkpoint_dir=checkpoint_dir)
+
+    metrics = segment_metrics_table(results)
+    metrics_csv_path = os.path.join(output_dir, 'segment_metrics.csv')
+    metrics.to_csv(metrics_csv_path, index=False)
+    logging.info("Saved per-segment metrics to '%s'.", metrics_csv_path)
+    return metrics
+
+
+def decode_segment_keys(keys, column, encoding):
+    """
+    Return readable segment names for the values of a segment column.
+
+    Args:
+        keys (pd.Series): Values of the segment column.
+        column (str): Name of the segment column.
+        encoding (dict): Categorical encoding of the features.
+
+    Returns:
+        pd.Series: The level names of an encoded column ('missing' for
+        codes without a level), or the values as strings.
+    """
+    if column not in encoding:
+        return keys.astype(str)
+    levels = encoding[column]
+    return keys.map(lambda code: levels[int(code)]
+                    if 0 <= code < len(levels) else 'missing')
+
+
+def tune_and_evaluate_segment(name, data, output_dir, encoding=None,
+                              param_grids=None, normal_equations=False,
+                              checkpoint_dir=None):
+    """
+    Tune and evaluate the models of one segment and save its results.
+
+    Runs in a worker process of evaluate_models_by_segment, so the
+    candidate searches themselves run sequentially and LightGBM and
+    XGBoost train with one thread, leaving the cores to the other
+    workers.
+
+    Args:
+        name (str): Name of the segment.
+        data (pd.DataFrame): The rows of the segment.
+        output_dir (str): Directory under which the segment's results
+            are saved in a subdirectory named after it.
+        encoding (dict): Categorical encoding of the features.
+        param_grids (dict): Hyperparameter grids of the models.
+            Defaults to get_param_grids().
+        normal_equations (bool): Fit MultipleLinearRegression from
+            normal equations, see get_models.
+        checkpoint_dir (str): Directory under which the segment's
+            search checkpoints are saved in a subdirectory named after
+            it. If None, nothing is saved.
+
+    Returns:
+        list: Evaluation metrics of each model, with the numbers of
+        training and test rows.
+    """
+    segment_dir = os.path.join(output_dir, name.replace(os.sep, '_'))
+    if checkpoint_dir is not None:
+        checkpoint_dir = os.path.join(checkpoint_dir,
+                                      name.replace(os.sep, '_'))
+    os.makedirs(segment_dir, exist_ok=True)
+    feature_columns = data.columns[:-1].tolist()
+    x_train, x_test, y_train, y_test = split_data(
+        data, os.path.join(segment_dir, 'feature_matrix'))
+    models = [(model, estimator.set_params(n_jobs=1)
+               if model in ('LGBM', 'XGB') else estimator)
+              for model, estimator in get_models(feature_columns, encoding,
+                                                 normal_equations)]
+    param_grids = param_grids or get_param_grids()
+    fit_params = get_fit_params(feature_columns, encoding)
+    best_models, best_params = hyperparameter_tuning(
+        models, [param_grids[model] for model, _ in models], x_train,
+        y_train, [fit_params.get(model, {}) for model, _ in models],
+        n_jobs=1, checkpoint_dir=checkpoint_dir)
+    best_models = {model: estimator for model, estimator
+                   in best_models.items() if estimator is not None}
+
+    metrics_list = evaluate_and_save_models(best_models, x_test, y_test,
+                                            segment_dir)
+    save_metrics(metrics_list, segment_dir)
+    save_best_params(best_params, segment_dir)
+    return [{**metrics, 'n_train': len(y_train), 'n_test': len(y_test)}
+            for metrics in metrics_list]
+
+
+def refresh_models(input_file, new_file, output_dir, artifact_store,
+                   drift_threshold=DRIFT_THRESHOLD, n_rounds=None):
+    """
+    Refresh the tuned models of an artifact store with new rows instead
+    of re-tuning them.
+
+    The new rows are split into training rows and a holdout. A model
+    whose holdout error drifted past the threshold relative to its
+    reference error (its test error when last tuned) is re-tuned on all
+    rows. Otherwise LightGBM and XGBoost continue boosting on the new
+    training rows and the other models are refitted with their tuned
+    parameters on the history and the new training rows. The refreshed
+    models are evaluated on the holdout and saved as new versions.
+
+    Args:
+        input_file (str): Path to the preprocessed rows the models were
+            trained on, a directory of partitions or a glob pattern.
+        new_file (str): Path to the new preprocessed rows.
+        output_dir (str): Directory to save the evaluation results and
+            refresh_report.csv in.
+        artifact_store (str): Directory of the artifact store holding
+            the tuned models and the preprocessing state.
+        drift_threshold (float): Relative holdout MSE increase that
+            triggers a full re-tune.
+        n_rounds (int): Number of boosting rounds added to LightGBM and
+            XGBoost, see continue_training.
+
+    Returns:
+        pd.DataFrame: One row per model with the action taken, the
+        reference MSE, the holdout MSE before and after and the drift.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    store = ArtifactStore(artifact_store)
+    preprocessing = store.load('preprocessing')
+    feature_columns = preprocessing['feature_columns']
+    encoding = preprocessing['encoding']
+
+    history = load_data(input_file)
+    new_data = load_data(new_file)
+    for name, data in (('history', history), ('new rows', new_data)):
+        if not set(feature_columns) <= set(data.columns[:-1]):
+            raise ValueError(f"The columns of the {name} do not match the "
+                             "stored preprocessing state.")
+    # Select the stored features, which may be the kept set of a pruning
+    history = history[feature_columns + [history.columns[-1]]]
+    new_data = new_data[feature_columns + [new_data.columns[-1]]]
+    x_new, x_holdout, y_new, y_holdout = train_test_split(
+        new_data.iloc[:, :-1].values, new_data.iloc[:, -1].values,
+        test_size=0.2, random_state=42)
+    x_all = np.vstack([history.iloc[:, :-1].values, x_new])
+    y_all = np.concatenate([history.iloc[:, -1].values, y_new])
+    logging.info("Refreshing models with '%d' new rows and a holdout of "
+                 "'%d' rows.", len(y_new), len(y_holdout))
+
+    models = dict(get_models(feature_columns, encoding))
+    fit_params = get_fit_params(feature_columns, encoding)
+    refreshed = {}
+    metadata = {}
+    rows = []
+    for name in models:
+        if not store.versions(name):
+            logging.warning("No stored model '%s' to refresh.", name)
+            continue
+        model = store.load(name, mmap_mode=None)
+        manifest = store.manifest(name)
+        reference = manifest['metadata'].get(
+            'reference_mse',
+            manifest['metadata'].get('metrics', {}).get('MSE'))
+        mse = holdout_mse(model, x_holdout, y_holdout)
+        drift = relative_drift(mse, reference)
+        if drift > drift_threshold:
+            action = ACTION_RETUNE
+        else:
+            refreshed[name], action = refresh_model(
+                model, x_new, y_new, x_all, y_all, fit_params.get(name),
+                n_rounds)
+        logging.info("Model '%s': holdout drift '%.3f', %s.",
+                     name, drift, action)
+        metadata[name] = {**manifest['metadata'], 'reference_mse': reference,
+                          'refreshed_from': manifest['version'],
+                          'refresh_action': action}
+        rows.append({'Model': name, 'Action': action,
+                     'Reference MSE': reference, 'MSE Before': mse,
+                     'Drift': drift})
+
+    retune = [row['Model'] for row in rows if row['Action'] == ACTION_RETUNE]
+    if retune:
+        param_grids = get_param_grids()
+        best_models, best_params = hyperparameter_tuning(
+            [(name, models[name]) for name in retune],
+            [param_grids[name] for name in retune], x_all, y_all,
+            [fit_params.get(name, {}) for name in retune])
+        for name in retune:
+            if best_models[name] is not None:
+                refreshed[name] = best_models[name]
+                metadata[name]['best_params'] = best_params[name]
+
+    metrics_list = evaluate_and_save_models(refreshed, x_holdout, y_holdout,
+                                            output_dir)
+    save_metrics(metrics_list, output_dir)
+    metrics_by_name = {metrics['Model']: metrics for metrics in metrics_list}
+    for row in rows:
+        row['MSE After'] = metrics_by_name.get(row['Model'], {}).get(
+            'MSE', np.nan)
+        name = row['Model']
+        if name not in refreshed:
+            continue
+        if row['Action'] == ACTION_RETUNE:
+            metadata[name]['reference_mse'] = float(row['MSE After'])
+        metadata[name]['metrics'] = {
+            key: float(value) for key, value
+            in metrics_by_name[name].items() if key != 'Model'}
+        version = store.save(name, refreshed[name], metadata[name])
+        logging.info("Saved refreshed model '%s' as version %d.",
+                     name, version)
+        if supports_compilation(refreshed[name]):
+            store.save(f"{name}.compiled",
+                       compile_tree_ensemble(refreshed[name]),
+                       {**metadata[name], 'source_version': version})
+
+    report = pd.DataFrame(rows)
+    report_path = os.path.join(output_dir, 'refresh_report.csv')
+    report.to_csv(report_path, index=False)
+    logging.info("Saved refresh report to '%s'.", report_path)
+    return report
+
+
+def save_artifacts(store_dir, best_models, best_params, metrics_list,
+                   feature_columns, encoding):
+    """
+    Save the tuned models and the preprocessing state to an artifact
+    store.
+
+    Each model is saved under its name with its parameters and metrics
+    as metadata; tree models are also saved compiled under
+    '<name>.compiled', whose node arrays load memory-mapped. The
+    feature columns and categorical encoding are saved as
+    'preprocessing'.
+
+    Args:
+        store_dir (str): Directory of the artifact store.
+        best_models (dict): A dictionary where keys are
+        model names and values are the best model instances.
+        best_params (dict): A dictionary where keys are model
+        names and values are the best hyperparameters.
+        metrics_list (list): Evaluation metrics of each model.
+        feature_columns (list): Names of the feature columns.
+        encoding (dict): Categorical encoding of the features.
+    """
+    store = ArtifactStore(store_dir)
+    preprocessing_version = store.save(
+        'preprocessing',
+        {'feature_columns': feature_columns, 'encoding': encoding})
+    metrics_by_name = {metrics['Model']: metrics for metrics in metrics_list}
+
+    for name, model in best_models.items():
+        metadata = {
+            'best_params': best_params.get(name),
+            'metrics': {key: float(value) for key, value
+                        in metrics_by_name.get(name, {}).items()
+                        if key != 'Model'},
+            'preprocessing_version': preprocessing_version,
+        }
+        version = store.save(name, model, metadata)
+        logging.info("Saved model '%s' to '%s' as version %d.",
+                     name, store_dir, version)
+        if supports_compilation(model):
+            store.save(f"{name}.compiled", compile_tree_ensemble(model),
+                       {**metadata, 'source_version': version})
+
+
+def compile_best_models(best_models, output_dir):
+    """
+    Compile the tree models into flat node arrays and load them back
+    memory-mapped for scoring.
+
+    Args:
+        best_models (dict): A dictionary where keys are
+        model names and values are the best model instances.
+        output_dir (str): Directory under which the compiled models
+            are saved, one subdirectory per model.
+
+    Returns:
+        dict: The models, with supported tree models replaced by their
+        compiled FlatTreeEnsemble.
+    """
+    compiled_models = {}
+    for name, model in best_models.items():
+        if not supports_compilation(model):
+            compiled_models[name] = model
+            continue
+        path = os.path.join(output_dir, 'compiled', name)
+        compile_tree_ensemble(model).save(path)
+        compiled_models[name] = FlatTreeEnsemble.load(path)
+        logging.info("Compiled model '%s' to '%s'.", name, path)
+    return compiled_models
+
+
+def get_out_of_core_params():
+    """
+    Return the fixed training parameters used in out-of-core mode, where
+    no grid search is run.
+
+    Returns:
+        dict: A dictionary where keys are model names and values
+        are the training parameters and number of boosting rounds;
+        the ridge penalties cross-validated for the linear model.
+    """
+    return {
+        'MultipleLinearRegression': {'alpha': [0.0, 0.1, 1.0, 10.0]},
+        'LGBM': ({'num_leaves': 31, 'learning_rate': 0.05}, 200),
+        'XGB': ({'max_depth': 5, 'learning_rate': 0.05}, 300)
+    }
 
 
-def split_data(data):
+def evaluate_models_out_of_core(input_file, output_dir, encoding_file=None,
+                                chunksize=100_000, n_bootstrap=0,
+                                filters=None, union_schema=False,
+                                history=None):
+    """
+    Train and evaluate models without loading the dataset into memory.
+
+    The data is split by row hash into train and test files, a linear
+    model is cross-validated and fitted in one pass over the train file
+    from its normal equations, and the LightGBM and XGBoost models are
+    trained from the train file on disk.
+
+    Args:
+        input_file (str): Path to the input CSV file, a directory of
+            partitions or a glob pattern.
+        output_dir (str): Directory to save the evaluation results.
+        encoding_file (str): Path to the categorical encoding.
+        chunksize (int): Number of rows read at a time.
+        n_bootstrap (int): Number of bootstrap replicates for the
+            confidence intervals; 0 disables them. Otherwise the test
+            predictions and targets are held in memory.
+        filters (dict): Column names and the list of accepted values.
+        union_schema (bool): Whether partitions may have different
+            columns.
+        history (RunHistory): Run history to record the stage durations,
+            metrics and parameters of the run in, and to finish it.
+    """
+    encoding = read_encoding(input_file, encoding_file)
+
+    work_dir = os.path.join(output_dir, 'out_of_core')
+    os.makedirs(work_dir, exist_ok=True)
+    train_file = os.path.join(work_dir, 'train.csv')
+    test_file = os.path.join(work_dir, 'test.csv')
+    with _stage(history, 'split_data'):
+        n_train, n_test = split_csv_by_hash(
+            input_file, train_file, test_file, chunksize=chunksize,
+            filters=filters, union_schema=union_schema)
+    logging.info("Split data into train and test files with "
+                 "'%d' and '%d' rows.", n_train, n_test)
+
+    feature_columns = pd.read_csv(train_file, nrows=0).columns[:-1].tolist()
+    indices = categorical_feature_indices(feature_columns, encoding)
+
+    params = get_out_of_core_params()
+    alphas = params['MultipleLinearRegression']
+    if indices:
+        linear_model = make_pipeline(
+            make_sparse_one_hot_encoder(
+                indices, [len(encoding[feature_columns[i]])
+                          for i in indices]),
+            NormalEquationRegressor())
+        alphas = {f'normalequationregressor__{name}': values
+                  for name, values in alphas.items()}
+        feature_types = ['c' if column in encoding else 'q'
+                         for column in feature_columns]
+    else:
+        linear_model = NormalEquationRegressor()
+        feature_types = None
+
+    with _stage(history, 'training'):
+        linear_model, cv_scores = fit_normal_equations_from_csv(
+            linear_model, train_file, alphas, chunksize=chunksize,
+            n_jobs=-1)
+        logging.info("Cross-validated linear model MSE: '%s'.",
+                     {candidate: -score
+                      for candidate, score in cv_scores.items()})
+        best_models = {
+            'MultipleLinearRegression': linear_model,
+            'LGBM': train_lgbm_from_csv(
+                train_file, params['LGBM'][0], params['LGBM'][1], indices),
+            'XGB': train_xgb_from_csv(
+                train_file, params['XGB'][0], params['XGB'][1], chunksize,
+                work_dir, feature_types)
+        }
+    logging.info("Trained models '%s' out of core.", list(best_models))
+
+    # Predictions and targets are only held in memory for the bootstrap
+    with _stage(history, 'evaluation'):
+        if n_bootstrap > 0:
+            metrics_list, predictions = stream_evaluate_and_save_models(
+                best_models, test_file, output_dir, chunksize,
+                return_predictions=True)
+        else:
+            metrics_list = stream_evaluate_and_save_models(
+                best_models, test_file, output_dir, chunksize)
+    save_metrics(metrics_list, output_dir)
+    if n_bootstrap > 0:
+        with _stage(history, 'bootstrap'):
+            target = pd.read_csv(test_file, nrows=0).columns[-1]
+            y_test = pd.read_csv(test_file,
+                                 usecols=[target])[target].values
+            save_confidence_intervals(y_test, predictions, output_dir,
+                                      n_bootstrap)
+    if history is not None:
+        history.set_data(file_fingerprint(resolve_partitions(input_file)),
+                         n_train + n_test, len(feature_columns))
+        record_run(history, metrics_list, {
+            'MultipleLinearRegression': {
+                name: value for name, value in linear_model.get_params()
+                .items() if name.endswith('alpha')},
+            'LGBM': params['LGBM'][0], 'XGB': params['XGB'][0]})
+
+
+def _stage(history, name):
+    """
+    Return a context manager timing a stage in the run history, or
+    doing nothing without one.
+    """
+    if history is None:
+        return contextlib.nullcontext()
+    return history.stage(name)
+
+
+def split_data(data, store_dir=None):
     """
     Split the data into training and testing sets.
 
     Args:
         data (pd.DataFrame): The input data.
+        store_dir (str): Directory of a FeatureMatrixStore. If given,
+            the features are written there once as a float32 matrix and
+            returned as zero-copy views of its memory map; a split of
+            the same data written before is reused.
 
     Returns:
         tuple: x_train, x_test, y_train, y_test
     """
-    x = data.iloc[:, :-1].values
-    y = data.iloc[:, -1].values
-    x_train, x_test, y_train, y_test = train_test_split(
-        x, y, test_size=0.2, random_state=42)
+    if store_dir:
+        store = FeatureMatrixStore(store_dir)
+        if store.write(data, test_size=0.2, random_state=42):
+            logging.info("Wrote float32 feature matrices to '%s'.",
+                         store_dir)
+        else:
+            logging.info("Reusing the float32 feature matrices in '%s'.",
+                         store_dir)
+        x_train, x_test, y_train, y_test = store.load()
+    else:
+        x = data.iloc[:, :-1].values
+        y = data.iloc[:, -1].values
+        x_train, x_test, y_train, y_test = train_test_split(
+            x, y, test_size=0.2, random_state=42)
     logging.info("Split data into train and test sets with "
                  "shapes '%s' and '%s'.", x_train.shape, x_test.shape)
     return x_train, x_test, y_train, y_test
 
 
-def get_models():
+def read_encoding(input_file, encoding_file=None):
+    """
+    Read the categorical encoding written by the preprocessing step.
+
+    Args:
+        input_file (str): Path to the preprocessed CSV file.
+        encoding_file (str): Path to the encoding JSON file. Defaults to
+            the file next to input_file.
+
+    Returns:
+        dict: The encoding, or an empty dictionary if there is none.
+    """
+    if encoding_file is None:
+        encoding_file = os.path.splitext(input_file)[0] + '_encoding.json'
+    if not os.path.isfile(encoding_file):
+        logging.info("No categorical encoding found at '%s'.", encoding_file)
+        return {}
+    logging.info("Loaded categorical encoding from '%s'.", encoding_file)
+    return load_encoding(encoding_file)
+
+
+def get_models(feature_columns=None, encoding=None, normal_equations=False):
     """
     Return a list of models to be evaluated.
 
+    Encoded categorical columns are passed to XGBoost as native
+    categoricals and expanded into a sparse one-hot matrix for
+    linear regression.
+
+    Args:
+        feature_columns (list): The feature column names.
+        encoding (dict): The categorical encoding of the features.
+        normal_equations (bool): Use NormalEquationRegressor instead of
+            LinearRegression for MultipleLinearRegression; it is tuned
+            in one pass over the data, but on collinear features its
+            predictions can differ from LinearRegression's.
+
     Returns:
         list: A list of tuples where each tuple contains
         a model name and an instance of the model.
     """
+    encoding = encoding or {}
+    indices = categorical_feature_indices(feature_columns or [], encoding)
+    linear_model = (NormalEquationRegressor() if normal_equations
+                    else LinearRegression())
+    if not indices:
+        return [
+            ('MultipleLinearRegression', linear_model),
+            ('RandomForest', RandomForestRegressor()),
+            ('LGBM', LGBMRegressor()),
+            ('DecisionTree', DecisionTreeRegressor()),
+            ('XGB', XGBRegressor())
+        ]
+
+    n_levels = [len(encoding[feature_columns[i]]) for i in indices]
+    feature_types = ['c' if column in encoding else 'q'
+                     for column in feature_columns]
     return [
-        ('MultipleLinearRegression', LinearRegression()),
+        ('MultipleLinearRegression', make_pipeline(
+            make_sparse_one_hot_encoder(indices, n_levels),
+            linear_model)),
         ('RandomForest', RandomForestRegressor()),
         ('LGBM', LGBMRegressor()),
         ('DecisionTree', DecisionTreeRegressor()),
-        ('XGB', XGBRegressor())
+        ('XGB', XGBRegressor(tree_method='hist', enable_categorical=True,
+                             feature_types=feature_types))
     ]
 
 
+def get_fit_params(feature_columns=None, encoding=None):
+    """
+    Return the extra fit parameters of each model.
+
+    Args:
+        feature_columns (list): The feature column names.
+        encoding (dict): The categorical encoding of the features.
+
+    Returns:
+        dict: A dictionary where keys are model names
+        and values are keyword arguments for fit.
+    """
+    indices = categorical_feature_indices(feature_columns or [],
+                                          encoding or {})
+    if not indices:
+        return {}
+    return {'LGBM': {'categorical_feature': indices}}
+
+
 def log_best_params(best_params):
     """
     Log the best hyperparameters for each model.
@@ -148,7 +989,8 @@ def log_best_params(best_params):
         logging.info("Best parameters for '%s': '%s'", name, params)
 
 
-def evaluate_and_save_models(best_models, x_test, y_test, output_dir):
+def evaluate_and_save_models(best_models, x_test, y_test, output_dir,
+                             return_predictions=False):
     """
     Evaluate the best models and save the results.
 
@@ -158,21 +1000,94 @@ def evaluate_and_save_models(best_models, x_test, y_test, output_dir):
         x_test (np.ndarray): The test features.
         y_test (np.ndarray): The test labels.
         output_dir (str): Directory to save the evaluation results.
+        return_predictions (bool): Whether to also return the
+            predictions of each model.
 
     Returns:
         list: A list of evaluation metrics for each model.
+        dict: The predictions of each model by name; only returned if
+        return_predictions is True.
     """
     metrics_list = []
+    predictions = {}
     for name, model in best_models.items():
         output_name = f"yPred_yTrue_table_{name}.txt"
         path = os.path.join(output_dir, output_name)
-        metrics = model_evaluation(name, model, x_test, y_test, path)
+        metrics, predictions[name] = model_evaluation(
+            name, model, x_test, y_test, path, return_predictions=True)
         metrics_list.append(metrics)
         logging.info("Evaluated model '%s' and saved results to '%s'.",
                      name, path)
+    if return_predictions:
+        return metrics_list, predictions
+    return metrics_list
+
+
+def stream_evaluate_and_save_models(best_models, test_file, output_dir,
+                                    chunksize=100_000,
+                                    return_predictions=False):
+    """
+    Evaluate the best models on a test file read in chunks and save
+    the results, including a residual histogram per model.
+
+    Args:
+        best_models (dict): A dictionary where keys are
+        model names and values are the best model instances.
+        test_file (str): Path to the test CSV file; the last column
+            is the target.
+        output_dir (str): Directory to save the evaluation results.
+        chunksize (int): Number of test rows read at a time.
+        return_predictions (bool): Whether to also collect and return
+            the predictions of each model, one float per test row.
+
+    Returns:
+        list: A list of evaluation metrics for each model.
+        dict: The predictions of each model by name; only returned if
+        return_predictions is True.
+    """
+    metrics_list = []
+    predictions = {}
+    for name, model in best_models.items():
+        path = os.path.join(output_dir, f"yPred_yTrue_table_{name}.txt")
+        chunks = ((chunk.iloc[:, :-1].values, chunk.iloc[:, -1].values)
+                  for chunk in iter_csv_chunks(test_file, chunksize))
+        evaluation = stream_model_evaluation(
+            name, model, chunks, path,
+            return_predictions=return_predictions,
+            histogram_file=os.path.join(
+                output_dir, f"residual_histogram_{name}.csv"))
+        if return_predictions:
+            metrics, predictions[name] = evaluation
+        else:
+            metrics = evaluation
+        metrics_list.append(metrics)
+        logging.info("Evaluated model '%s' chunk by chunk and saved "
+                     "results to '%s'.", name, path)
+    if return_predictions:
+        return metrics_list, predictions
     return metrics_list
 
 
+def save_confidence_intervals(y_test, predictions, output_dir,
+                              n_bootstrap=1000):
+    """
+    Save bootstrap confidence intervals of the metrics of each model
+    and of their pairwise differences.
+
+    Args:
+        y_test (np.ndarray): The test labels.
+        predictions (dict): The predictions of each model by name.
+        output_dir (str): Directory to save the intervals in.
+        n_bootstrap (int): Number of bootstrap replicates; 0 skips
+            the intervals.
+    """
+    if n_bootstrap <= 0:
+        return
+    save_bootstrap_intervals(y_test, predictions, output_dir, n_bootstrap)
+    logging.info("Saved bootstrap confidence intervals (%d replicates) "
+                 "to '%s'.", n_bootstrap, output_dir)
+
+
 def save_metrics(metrics_list, output_dir):
     """
     Save the evaluation metrics to a CSV file.
@@ -202,13 +1117,131 @@ def save_best_params(best_params, output_dir):
     logging.info("Saved best hyperparameters to '%s'.", best_params_csv_path)
 
 
+def save_tuning_coverage(coverage, output_dir):
+    """
+    Save how much of each model's search space was covered within the
+    time budget to a CSV file.
+
+    Args:
+        coverage (dict): A dictionary where keys are model names and
+            values are the coverage_ of their search.
+        output_dir (str): Directory to save the evaluation results.
+    """
+    table = coverage_table(coverage)
+    table.to_csv(os.path.join(output_dir, COVERAGE_FILE), index=False)
+    for row in table.itertuples():
+        logging.info("Tuned %s on %d of %d candidates in %.1fs.",
+                     row.model, row.n_evaluated, row.n_candidates,
+                     row.search_time)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Evaluate house pricing models.")
     parser.add_argument(
-        "input_file", type=str, help="Path to the input CSV file.")
+        "input_file", type=str, help="Path to the input CSV file, a "
+        "directory of partitions or a glob pattern.")
     parser.add_argument("output_dir", type=str,
                         help="Directory to save the evaluation results.")
+    parser.add_argument("--encoding_file", type=str, default=None,
+                        help="Path to the categorical encoding JSON file.")
+    parser.add_argument("--out_of_core", action="store_true",
+                        help="Train without loading the data into memory.")
+    parser.add_argument("--chunksize", type=int, default=100_000,
+                        help="Number of rows read at a time out of core.")
+    parser.add_argument("--compile_trees", action="store_true",
+                        help="Score tree models with their compiled "
+                        "flat-array form.")
+    parser.add_argument("--artifact_store", type=str, default=None,
+                        help="Artifact store directory to save the tuned "
+                        "models and preprocessing state in.")
+    parser.add_argument("--n_bootstrap", type=int, default=None,
+                        help="Number of bootstrap replicates for the "
+                        "confidence intervals; 0 disables them. 1000 by "
+                        "default, 0 with --out_of_core.")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="Keep rows with KEY=VALUE[,VALUE...]; "
+                        "partitions are pruned by key. May be repeated.")
+    parser.add_argument("--union_schema", action="store_true",
+                        help="Union the columns of the partitions.")
+    parser.add_argument("--segment_column", type=str, default=None,
+                        help="Train one model set per value of this "
+                        "column, e.g. Neighborhood.")
+    parser.add_argument("--min_segment_size", type=int, default=50,
+                        help="Segments with fewer rows are pooled.")
+    parser.add_argument("--skip_small_segments", action="store_true",
+                        help="Skip small segments instead of pooling them.")
+    parser.add_argument("--n_jobs", type=int, default=None,
+                        help="Number of processes training segments.")
+    parser.add_argument("--prune_features", action="store_true",
+                        help="Drop redundant and uninformative features "
+                        "before tuning.")
+    parser.add_argument("--correlation_threshold", type=float,
+                        default=CORRELATION_THRESHOLD,
+                        help="Absolute correlation of duplicate features "
+                        "when pruning.")
+    parser.add_argument("--min_mutual_info", type=float,
+                        default=MIN_MUTUAL_INFO,
+                        help="Mutual information a feature must exceed "
+                        "when pruning.")
+    parser.add_argument("--time_budget", type=float, default=None,
+                        help="Wall-clock seconds for tuning all models.")
+    parser.add_argument("--model_time_budget", type=float, default=None,
+                        help="Wall-clock seconds for tuning each model.")
+    parser.add_argument("--racing", action="store_true",
+                        help="Drop candidates and models statistically "
+                        "worse than the leader after each fold.")
+    parser.add_argument("--search", choices=['grid', 'bayes'],
+                        default='grid',
+                        help="Grid search, or model-based search over "
+                        "finer ranges warm-started from earlier runs.")
+    parser.add_argument("--n_iter", type=int, default=30,
+                        help="Candidates per model of the model-based "
+                        "search.")
+    parser.add_argument("--trial_history", type=str, default=None,
+                        help="Trial history to warm-start the model-based "
+                        "search from and append its trials to.")
+    parser.add_argument("--run_history", type=str, default=None,
+                        help="SQLite run history to record the run in; "
+                        "run_history.sqlite next to output_dir by "
+                        "default.")
+    parser.add_argument("--normal_equations", action="store_true",
+                        help="Fit the linear baseline from streamed normal "
+                        "equations instead of LinearRegression.")
+    parser.add_argument("--checkpoint_dir", type=str, default=None,
+                        help="Directory to checkpoint the searches in and "
+                        "resume them from.")
+    parser.add_argument("--dataset_cache_dir", type=str, default=None,
+                        help="Directory to cache binned LightGBM datasets.")
+    parser.add_argument("--refresh", type=str, default=None,
+                        metavar="NEW_FILE",
+                        help="Refresh the models of --artifact_store with "
+                        "the new rows of this file instead of tuning.")
+    parser.add_argument("--drift_threshold", type=float,
+                        default=DRIFT_THRESHOLD,
+                        help="Relative holdout MSE increase that triggers "
+                        "a full re-tune when refreshing.")
+    parser.add_argument("--n_rounds", type=int, default=None,
+                        help="Boosting rounds added when refreshing.")
     args = parser.parse_args()
 
-    evaluate_models(args.input_file, args.output_dir)
+    if args.refresh:
+        if not args.artifact_store:
+            parser.error("--refresh requires --artifact_store.")
+        refresh_models(args.input_file, args.refresh, args.output_dir,
+                       args.artifact_store, args.drift_threshold,
+                       args.n_rounds)
+    else:
+        evaluate_models(args.input_file, args.output_dir,
+                        args.encoding_file, args.out_of_core,
+                        args.chunksize, args.compile_trees,
+                        args.artifact_store, args.n_bootstrap,
+                        parse_filters(args.filter), args.union_schema,
+                        args.segment_column, args.min_segment_size,
+                        not args.skip_small_segments, args.n_jobs,
+                        args.prune_features, args.correlation_threshold,
+                        args.min_mutual_info, args.time_budget,
+                        args.model_time_budget, args.racing, args.search,
+                        args.n_iter, args.trial_history, args.run_history,
+                        args.normal_equations, args.checkpoint_dir,
+                        args.dataset_cache_dir)
@@ -4,19 +4,40 @@ by cleaning and transforming it for further analysis.
 
 The preprocessing steps include:
 - Dropping unnecessary columns.
-- Mapping quality ratings to numerical values.
+- Mapping ordinal ratings to numerical values.
+- Encoding categorical columns into compact integer codes.
 - Counting and handling missing data.
 - Separating categorical and numerical data.
-- Generating histograms of numerical data before and after cleaning.
+- Generating histograms of numerical data before and after cleaning;
+  histograms whose data did not change are not rendered again.
 - Applying log transformations to selected numerical columns.
 
+With --append, the rows of input_file are new listings: the decisions
+fitted on the full history (saved as a preprocessing state next to the
+output file) are applied to them only and they are appended to
+output_file, while the running column statistics of the zero-count
+thresholds are updated and threshold decisions that would now differ
+are reported.
+
 Usage:
     python preprocess_script.py <input_file> <output_file> <output_dir>
+        [--encoding_file <encoding_file>] [--ordinal_spec <ordinal_spec>]
+        [--filter KEY=VALUE[,VALUE...]] [--union_schema]
+        [--state_file <state_file>] [--append]
+        [--figure_cache <figure_cache>]
 
 Arguments:
-- input_file: Path to the input CSV file containing the raw data.
+- input_file: Path to the input CSV file containing the raw data, a
+  directory of partitions or a glob pattern.
 - output_file: Path where the cleaned data will be saved.
 - output_dir: Directory where histogram plots will be saved.
+- encoding_file: Path where the categorical encoding will be saved.
+- ordinal_spec: Path to a JSON spec of the ordinal scales to map.
+- filter: Keep only the rows (and partitions) with the given values.
+- union_schema: Union the columns of partitions with different schemas.
+- state_file: Path of the fitted preprocessing state.
+- append: Preprocess new rows with the fitted state and append them.
+- figure_cache: Directory of a cache of rendered figures.
 """
 
 import argparse
@@ -41,17 +62,37 @@ from modules.drop_columns_with_zero_threshold import (  # noqa: E402
 from modules.apply_1_plus_log_transformation import (  # noqa: E402
     apply_1_plus_log_transformation
 )
+from modules.encode_categorical_columns import (  # noqa: E402
+    apply_categorical_encoding, encode_categorical_columns, load_encoding,
+    save_encoding
+)
+from modules.map_ordinal_columns import (  # noqa: E402
+    load_ordinal_spec, map_ordinal_columns
+)
+from modules.figure_cache import (  # noqa: E402
+    FigureCache, data_fingerprint, figure_up_to_date, save_figure
+)
+from modules.load_data import load_data, parse_filters  # noqa: E402
+from modules.preprocessing_state import PreprocessingState  # noqa: E402
 # pylint: enable=wrong-import-position, import-error
 
 
-def plot_histograms(data, filename, output_dir):
+def plot_histograms(data, filename, output_dir, cache=None):
     """
-    Plot histograms for the given data and save the figure.
+    Plot histograms for the given data and save the figure, unless the
+    existing figure was drawn from the same data.
     Args:
         data (pd.DataFrame): Data to plot
         filename (str): Name of the output file
         output_dir (str): Directory to save the plot
+        cache (FigureCache): Cache of rendered figures to restore the
+            plot from and add it to.
     """
+    plot_file = os.path.join(output_dir, filename)
+    fingerprint = data_fingerprint(data, kind='histograms')
+    if figure_up_to_date(plot_file, fingerprint, cache):
+        return
+
     n_cols = len(data.columns)
     n_rows = (n_cols + 3) // 4  # Round up to the nearest multiple of 4
     fig, axes = plt.subplots(n_rows, 4, figsize=(20, 5*n_rows))
@@ -70,46 +111,110 @@ def plot_histograms(data, filename, output_dir):
         fig.delaxes(axes[i])
 
     plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, filename))
+    save_figure(plot_file, fingerprint, cache)
     plt.close()
 
 
-def preprocess_data(input_file, output_file, output_dir):
+def default_encoding_file(data_file):
+    """
+    Return the path of the categorical encoding saved next to a data file.
+    Args:
+        data_file (str): Path to the preprocessed CSV file.
+    Returns:
+        str: Path to the encoding JSON file.
+    """
+    return os.path.splitext(data_file)[0] + '_encoding.json'
+
+
+def default_state_file(data_file):
+    """
+    Return the path of the preprocessing state saved next to a data file.
+    Args:
+        data_file (str): Path to the preprocessed CSV file.
+    Returns:
+        str: Path to the state JSON file.
+    """
+    return os.path.splitext(data_file)[0] + '_state.json'
+
+
+def add_age_column(data):
+    """
+    Replace the year built and year sold by the age of the house,
+    placed before the target column.
+    Args:
+        data (pd.DataFrame): Data with the YearBuilt and YrSold columns.
+    Returns:
+        pd.DataFrame: The data with the Age column.
+    """
+    columns = data.columns.tolist()
+    columns.insert(-1, 'Age')
+    data['Age'] = data['YrSold'] - data['YearBuilt']
+    columns.remove('YearBuilt')
+    columns.remove('YrSold')
+    return data[columns]
+
+
+def preprocess_data(input_file, output_file, output_dir, encoding_file=None,
+                    ordinal_spec=None, filters=None, union_schema=False,
+                    state_file=None, figure_cache=None):
     """
     Preprocess the data by cleaning and transforming it for further analysis.
     Args:
-        input_file (str): Path to the input CSV file.
+        input_file (str): Path to the input CSV file, a directory of
+            partitions or a glob pattern.
         output_file (str): Path to save the preprocessed CSV file.
         output_dir (str): Directory to save the plots.
+        encoding_file (str): Path to save the categorical encoding.
+            Defaults to a JSON file next to output_file.
+        ordinal_spec (dict): Spec of the ordinal scales to map.
+            Defaults to the spec of the map_ordinal_columns module.
+        filters (dict): Column names and the list of accepted values;
+            filters on partition columns skip whole partitions.
+        union_schema (bool): Whether partitions may have different
+            columns.
+        state_file (str): Path to save the preprocessing state used by
+            append_data. Defaults to a JSON file next to output_file.
+        figure_cache (str): Directory of a cache of rendered figures.
     """
-    data = pd.read_csv(input_file)
+    cache = FigureCache(figure_cache) if figure_cache else None
+    if encoding_file is None:
+        encoding_file = default_encoding_file(output_file)
+    if state_file is None:
+        state_file = default_state_file(output_file)
+
+    data = load_data(input_file, filters, union_schema)
 
     # Preprocessing steps
     data = data.drop('Id', axis=1)
 
-    mapping = {'Ex': 5, 'Gd': 4, 'TA': 3, 'Fa': 2, 'Po': 1}
-    columns_to_map = ['GarageQual', 'GarageCond', 'PoolQC', 'FireplaceQu',
-                      'KitchenQual', 'HeatingQC', 'BsmtCond', 'BsmtQual',
-                      'ExterCond', 'ExterQual']
+    data = map_ordinal_columns(data, ordinal_spec)
 
-    for column in columns_to_map:
-        data[column] = data[column].map(mapping)
+    # Keep the remaining categorical columns aside as integer codes so
+    # the zero-count thresholds below only apply to numerical columns
+    categorical_cols = data.select_dtypes(exclude='number').columns
+    categorical_data, encoding = encode_categorical_columns(
+        data[categorical_cols])
+    data = data.drop(columns=categorical_cols)
+    save_encoding(encoding, encoding_file)
 
     count_null_data(data)
 
-    columns = data.columns.tolist()
-    columns.insert(-1, 'Age')
-    data['Age'] = data['YrSold'] - data['YearBuilt']
-    columns.remove('YearBuilt')
-    columns.remove('YrSold')
-    data = data[columns]
+    data = add_age_column(data)
 
     data = data.fillna(0)
 
     count_null_data(data)
 
+    # Record the decisions and the running column statistics needed to
+    # append new rows later without reprocessing the history
+    state = PreprocessingState(categorical_columns=categorical_cols.tolist())
+    state.update(data)
+
     threshold = 900
+    candidates = data.columns.tolist()
     data = delete_columns_with_zero_data(data, threshold)
+    state.record_threshold('delete_columns_with_zero_data', threshold,
+                           candidates, data.columns)
 
     count_null_data(data)
     numerical_cols = separate_categorical_numerical(data)
@@ -120,23 +225,28 @@ def preprocess_data(input_file, output_file, output_dir):
     plot_histograms(
         numerical_data,
         'numerical_data_histogram_plot.png',
-        output_dir
+        output_dir,
+        cache
     )
 
     column_to_delete = ['GarageQual', 'GarageCond', 'GarageYrBlt']
     numerical_data = numerical_data.drop(column_to_delete, axis=1)
 
     threshold_0 = 200
+    candidates = numerical_data.columns.tolist()
     numerical_data = drop_columns_with_zero_threshold(
         numerical_data,
         threshold_0
     )
+    state.record_threshold('drop_columns_with_zero_threshold', threshold_0,
+                           candidates, numerical_data.columns)
 
     # Plot histograms after cleaning
     plot_histograms(
         numerical_data,
         'after_cleaning_numericalData_histogram_plot.png',
-        output_dir
+        output_dir,
+        cache
     )
 
     columns_to_transform = ['1stFlrSF', 'GrLivArea', 'LotArea', 'SalePrice']
@@ -149,12 +259,100 @@ def preprocess_data(input_file, output_file, output_dir):
     plot_histograms(
         transformed_data,
         'transformed_data_histogram_plot.png',
-        output_dir
+        output_dir,
+        cache
     )
 
+    # Re-attach the encoded categorical columns, keeping the target last
+    transformed_data = pd.concat(
+        [transformed_data.drop(columns='SalePrice'), categorical_data,
+         transformed_data['SalePrice']], axis=1)
+
     # Save the preprocessed data
     transformed_data.to_csv(output_file, index=False)
 
+    state.columns = transformed_data.columns.tolist()
+    state.log_columns = columns_to_transform
+    state.save(state_file)
+
+
+def append_data(input_file, output_file, encoding_file=None,
+                ordinal_spec=None, filters=None, union_schema=False,
+                state_file=None):
+    """
+    Preprocess newly arrived rows with the fitted state and append them
+    to the preprocessed data.
+
+    The fitted column decisions, ordinal mappings, categorical encoding
+    and log transformations are applied to the new rows only; no
+    histogram is plotted. The running zero counts of the threshold
+    steps are updated, and the columns the steps would now keep or
+    drop differently are logged and returned.
+
+    Args:
+        input_file (str): Path to the CSV file of the new rows, a
+            directory of partitions or a glob pattern.
+        output_file (str): Path of the preprocessed CSV file to append to.
+        encoding_file (str): Path of the categorical encoding.
+            Defaults to the JSON file next to output_file.
+        ordinal_spec (dict): Spec of the ordinal scales to map.
+        filters (dict): Column names and the list of accepted values.
+        union_schema (bool): Whether partitions may have different
+            columns.
+        state_file (str): Path of the preprocessing state. Defaults to
+            the JSON file next to output_file.
+
+    Returns:
+        pd.DataFrame: The threshold decisions that differ from the
+        fitted ones, see PreprocessingState.threshold_changes.
+
+    Raises:
+        ValueError: If the columns of output_file do not match the state.
+    """
+    if encoding_file is None:
+        encoding_file = default_encoding_file(output_file)
+    if state_file is None:
+        state_file = default_state_file(output_file)
+    state = PreprocessingState.load(state_file)
+    if pd.read_csv(output_file, nrows=0).columns.tolist() != state.columns:
+        raise ValueError(f"The columns of '{output_file}' do not match "
+                         f"the preprocessing state '{state_file}'.")
+
+    data = load_data(input_file, filters, union_schema)
+    data = data.drop('Id', axis=1)
+    data = map_ordinal_columns(data, ordinal_spec)
+
+    categorical_data = apply_categorical_encoding(
+        data[state.categorical_columns], load_encoding(encoding_file))
+    data = data.drop(columns=state.categorical_columns)
+    data = add_age_column(data).fillna(0)
+    state.update(data)
+
+    numerical_columns = [column for column in state.columns
+                         if column not in state.categorical_columns]
+    transformed_data = apply_1_plus_log_transformation(
+        data[numerical_columns], state.log_columns)
+    transformed_data = pd.concat([transformed_data, categorical_data],
+                                 axis=1)[state.columns]
+    transformed_data.to_csv(output_file, mode='a', header=False,
+                            index=False)
+    state.save(state_file)
+    print(f"Appended {len(transformed_data)} rows to {output_file}.")
+
+    changes = state.threshold_changes()
+    for change in changes.itertuples(index=False):
+        if change.affects_output:
+            print(f"Warning: {change.step} would now {change.current} "
+                  f"column '{change.column}' ({change.zero_count} zero "
+                  f"values, threshold {change.threshold}); rebuild the "
+                  "output to apply it.")
+        else:
+            print(f"Note: {change.step} would now {change.current} column "
+                  f"'{change.column}' ({change.zero_count} zero values, "
+                  f"threshold {change.threshold}), which does not change "
+                  "the output.")
+    return changes
+
 
 def main():
     """Main function to parse arguments and call preprocess_data."""
@@ -164,7 +362,8 @@ def main():
     parser.add_argument(
         "input_file",
         type=str,
-        help="Path to the input CSV file."
+        help="Path to the input CSV file, a directory of partitions or a "
+        "glob pattern."
     )
     parser.add_argument(
         "output_file",
@@ -176,9 +375,63 @@ def main():
         type=str,
         help="Directory to save the plots."
     )
+    parser.add_argument(
+        "--encoding_file",
+        type=str,
+        default=None,
+        help="Path to save the categorical encoding."
+    )
+    parser.add_argument(
+        "--ordinal_spec",
+        type=str,
+        default=None,
+        help="Path to a JSON spec of the ordinal scales to map."
+    )
+    parser.add_argument(
+        "--filter",
+        action="append",
+        default=[],
+        help="Keep rows with KEY=VALUE[,VALUE...]; partitions are pruned "
+        "by key. May be repeated."
+    )
+    parser.add_argument(
+        "--union_schema",
+        action="store_true",
+        help="Union the columns of the partitions."
+    )
+    parser.add_argument(
+        "--state_file",
+        type=str,
+        default=None,
+        help="Path of the fitted preprocessing state."
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Preprocess the input as new rows with the fitted state and "
+        "append them to output_file."
+    )
+    parser.add_argument(
+        "--figure_cache",
+        type=str,
+        default=None,
+        help="Directory of a cache of rendered figures."
+    )
     args = parser.parse_args()
 
-    preprocess_data(args.input_file, args.output_file, args.output_dir)
+    ordinal_spec = None
+    if args.ordinal_spec:
+        ordinal_spec = load_ordinal_spec(args.ordinal_spec)
+
+    if args.append:
+        append_data(args.input_file, args.output_file, args.encoding_file,
+                    ordinal_spec, parse_filters(args.filter),
+                    args.union_schema, args.state_file)
+    else:
+        preprocess_data(args.input_file, args.output_file, args.output_dir,
+                        args.encoding_file, ordinal_spec,
+                        parse_filters(args.filter), args.union_schema,
+                        args.state_file, args.figure_cache)
 
 
 if __name__ == "__main__":